@@ -10,7 +10,10 @@ from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.endpoints.auth import get_current_user
+from app.core.cache import cache
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.json_patch import JsonPatchError, JsonPatchOperation
 from app.core.logging import get_logger
 from app.models.framework import FrameworkType
 from app.models.user import User
@@ -364,10 +367,28 @@ async def add_hypothesis(
     """
     logger.info(f"Adding hypothesis to ACH {session_id}: {hypothesis.description}")
     
+    try:
+        version, _ = await framework_service.patch_session_data(
+            db, session_id, current_user,
+            operations=[JsonPatchOperation(op="add", path="/hypotheses/-", value=hypothesis.dict())],
+            framework_type=FrameworkType.ACH,
+        )
+    except JsonPatchError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        ) from e
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ACH analysis not found"
+        ) from e
+    
     return {
         "message": "Hypothesis added successfully",
         "hypothesis": hypothesis.dict(),
-        "session_id": session_id
+        "session_id": session_id,
+        "version": version
     }
 
 
@@ -392,10 +413,28 @@ async def add_evidence(
     """
     logger.info(f"Adding evidence to ACH {session_id}: {evidence.description}")
     
+    try:
+        version, _ = await framework_service.patch_session_data(
+            db, session_id, current_user,
+            operations=[JsonPatchOperation(op="add", path="/evidence/-", value=evidence.dict())],
+            framework_type=FrameworkType.ACH,
+        )
+    except JsonPatchError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        ) from e
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ACH analysis not found"
+        ) from e
+    
     return {
         "message": "Evidence added successfully",
         "evidence": evidence.dict(),
-        "session_id": session_id
+        "session_id": session_id,
+        "version": version
     }
 
 
@@ -599,6 +638,7 @@ def _generate_ach_matrix(
 
 
 @router.get("/templates/list")
+@cache.cached(ttl=settings.CACHE_STATIC_TTL, key="all", tags=("templates",))
 async def list_ach_templates(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
@@ -10,6 +10,8 @@ from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.endpoints.auth import get_current_user
+from app.core.cache import cache
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.logging import get_logger
 from app.models.framework import FrameworkType
@@ -613,6 +615,7 @@ async def export_behavioral_analysis(
 
 
 @router.get("/templates/list")
+@cache.cached(ttl=settings.CACHE_STATIC_TTL, key="all", tags=("templates",))
 async def list_behavioral_templates(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
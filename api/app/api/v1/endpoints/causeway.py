@@ -10,7 +10,10 @@ from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.endpoints.auth import get_current_user
+from app.core.cache import cache
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.json_patch import JsonPatchError, JsonPatchOperation
 from app.core.logging import get_logger
 from app.models.framework import FrameworkType
 from app.models.user import User
@@ -387,9 +390,7 @@ async def update_causeway_analysis(
         db, session_id, current_user, updates
     )
     
-    # Parse data
-    import json
-    data = json.loads(session.data)
+    data = session.data or {}
     
     causes = [CauseNode(**c) for c in data.get("causes", [])]
     relationships = [CausalRelationship(**r) for r in data.get("relationships", [])]
@@ -432,10 +433,28 @@ async def add_cause_node(
     """
     logger.info(f"Adding cause node to CauseWay {session_id}: {cause.description}")
     
+    try:
+        version, _ = await framework_service.patch_session_data(
+            db, session_id, current_user,
+            operations=[JsonPatchOperation(op="add", path="/causes/-", value=cause.dict())],
+            framework_type=FrameworkType.CAUSEWAY,
+        )
+    except JsonPatchError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        ) from e
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="CauseWay analysis not found"
+        ) from e
+    
     return {
         "message": "Cause node added successfully",
         "session_id": session_id,
-        "cause": cause.dict()
+        "cause": cause.dict(),
+        "version": version
     }
 
 
@@ -460,10 +479,28 @@ async def add_causal_relationship(
     """
     logger.info(f"Adding causal relationship to CauseWay {session_id}")
     
+    try:
+        version, _ = await framework_service.patch_session_data(
+            db, session_id, current_user,
+            operations=[JsonPatchOperation(op="add", path="/relationships/-", value=relationship.dict())],
+            framework_type=FrameworkType.CAUSEWAY,
+        )
+    except JsonPatchError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        ) from e
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="CauseWay analysis not found"
+        ) from e
+    
     return {
         "message": "Causal relationship added successfully",
         "session_id": session_id,
-        "relationship": relationship.dict()
+        "relationship": relationship.dict(),
+        "version": version
     }
 
 
@@ -717,6 +754,7 @@ async def export_causeway_analysis(
 
 
 @router.get("/templates/list")
+@cache.cached(ttl=settings.CACHE_STATIC_TTL, key="all", tags=("templates",))
 async def list_causeway_templates(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
@@ -10,6 +10,8 @@ from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.endpoints.auth import get_current_user
+from app.core.cache import cache
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.logging import get_logger
 from app.models.framework import FrameworkType
@@ -452,9 +454,7 @@ async def update_dime_analysis(
         db, session_id, current_user, updates
     )
     
-    # Parse data
-    import json
-    data = json.loads(session.data)
+    data = session.data or {}
     
     integration_analysis = _generate_integration_analysis(data)
     strategic_assessment = _generate_strategic_assessment(data)
@@ -775,6 +775,7 @@ async def export_dime_analysis(
 
 
 @router.get("/templates/list")
+@cache.cached(ttl=settings.CACHE_STATIC_TTL, key="all", tags=("templates",))
 async def list_dime_templates(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
@@ -2,20 +2,39 @@
 Framework analysis endpoints.
 """
 
-import json
+import base64
 from datetime import datetime
-from typing import Sequence
+from typing import Any, Literal, Sequence
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    status,
+)
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import and_, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.endpoints.auth import get_current_user
-from app.core.database import get_db
+from app.core.cache import Cache, get_cache
+from app.core.database import get_db, get_read_db
+from app.core.etag import etag_matches, not_modified, version_etag
+from app.core.json_patch import JsonPatchError, JsonPatchOperation, diff_documents
 from app.core.logging import get_logger
 from app.models.framework import FrameworkSession, FrameworkStatus, FrameworkType
 from app.models.user import User
+from app.services.framework_service import (
+    VersionConflictError,
+    framework_service,
+    session_cache_tag,
+    session_document,
+)
 
 logger = get_logger(__name__)
 router = APIRouter()
@@ -54,33 +73,122 @@ class FrameworkSessionUpdate(BaseModel):
     data: dict | None = None
 
 
-@router.get("/", response_model=list[FrameworkSessionResponse])
+class FrameworkSessionSummary(BaseModel):
+    """Framework session summary (no analysis data)."""
+    id: int
+    title: str
+    description: str | None
+    framework_type: FrameworkType
+    status: FrameworkStatus
+    version: int
+    created_at: str
+    updated_at: str
+    user_id: int
+    
+    class Config:
+        from_attributes = True
+
+
+# Columns loaded for summary listings - deliberately excludes the data blob
+SUMMARY_COLUMNS = (
+    FrameworkSession.id,
+    FrameworkSession.title,
+    FrameworkSession.description,
+    FrameworkSession.framework_type,
+    FrameworkSession.status,
+    FrameworkSession.version,
+    FrameworkSession.created_at,
+    FrameworkSession.updated_at,
+    FrameworkSession.user_id,
+)
+
+
+def _encode_cursor(updated_at: datetime, session_id: int) -> str:
+    """
+    Encode a keyset pagination cursor.
+    
+    Args:
+        updated_at: Last seen updated_at value
+        session_id: Last seen session ID
+        
+    Returns:
+        str: Opaque URL-safe cursor
+    """
+    raw = f"{updated_at.isoformat()}|{session_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a keyset pagination cursor.
+    
+    Args:
+        cursor: Cursor produced by _encode_cursor
+        
+    Returns:
+        tuple: (updated_at, session_id)
+        
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        updated_at, session_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(updated_at), int(session_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        ) from e
+
+
+@router.get(
+    "/",
+    response_model=list[FrameworkSessionResponse] | list[FrameworkSessionSummary],
+)
 async def list_framework_sessions(
+    response: Response,
     framework_type: FrameworkType | None = None,
     status: FrameworkStatus | None = None,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = None,
+    fields: Literal["full", "summary"] = "full",
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-) -> list[FrameworkSessionResponse]:
+    db: AsyncSession = Depends(get_read_db)
+) -> list[FrameworkSessionResponse] | list[FrameworkSessionSummary]:
     """
     List framework sessions for the current user.
     
+    Sessions are ordered by (updated_at, id) descending. When more results
+    are available, the cursor for the next page is returned in the
+    ``X-Next-Cursor`` response header.
+    
     Args:
+        response: Outgoing response (used to set pagination headers)
         framework_type: Filter by framework type
         status: Filter by status
         limit: Maximum number of sessions to return
-        offset: Number of sessions to skip
+        offset: Number of sessions to skip (ignored when cursor is given)
+        cursor: Keyset cursor from a previous page's X-Next-Cursor header
+        fields: "summary" omits the analysis data entirely
         current_user: Current authenticated user
         db: Database session
         
     Returns:
-        list[FrameworkSessionResponse]: List of framework sessions
+        list: Framework sessions (full or summary)
     """
     logger.info(f"Listing framework sessions for user {current_user.username}")
     
-    # Build query
-    query = select(FrameworkSession).where(FrameworkSession.user_id == current_user.id)
+    summary = fields == "summary"
+    
+    # Build query - summary mode never selects the data column
+    if summary:
+        query = select(*SUMMARY_COLUMNS)
+    else:
+        query = select(FrameworkSession)
+    query = query.where(FrameworkSession.user_id == current_user.id)
     
     # Apply filters
     if framework_type:
@@ -88,37 +196,59 @@ async def list_framework_sessions(
     if status:
         query = query.where(FrameworkSession.status == status)
     
-    # Order by updated_at (newest first)
-    query = query.order_by(FrameworkSession.updated_at.desc())
+    # Keyset pagination: continue strictly after the last seen (updated_at, id)
+    if cursor:
+        cursor_updated_at, cursor_id = _decode_cursor(cursor)
+        query = query.where(
+            or_(
+                FrameworkSession.updated_at < cursor_updated_at,
+                and_(
+                    FrameworkSession.updated_at == cursor_updated_at,
+                    FrameworkSession.id < cursor_id,
+                ),
+            )
+        )
+    elif offset:
+        query = query.offset(offset)
+    
+    # Order by updated_at (newest first), id as tie-breaker for stable pages
+    query = query.order_by(
+        FrameworkSession.updated_at.desc(),
+        FrameworkSession.id.desc(),
+    )
     
-    # Apply pagination
-    query = query.offset(offset).limit(limit)
+    # Fetch one extra row to know whether another page exists
+    query = query.limit(limit + 1)
     
     # Execute query
     result = await db.execute(query)
-    sessions = result.scalars().all()
+    rows = result.all() if summary else result.scalars().all()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if has_more:
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(last.updated_at, last.id)
     
     # Convert to response format
-    responses = []
-    for session in sessions:
-        # Parse JSON data safely
-        try:
-            data = json.loads(session.data) if session.data else {}
-        except (json.JSONDecodeError, TypeError):
-            data = {}
-            
-        responses.append(FrameworkSessionResponse(
+    responses: list[FrameworkSessionResponse] | list[FrameworkSessionSummary] = []
+    for session in rows:
+        common = dict(
             id=session.id,
             title=session.title,
             description=session.description,
             framework_type=session.framework_type,
             status=session.status,
-            data=data,
             version=session.version,
             created_at=session.created_at.isoformat() + "Z",
             updated_at=session.updated_at.isoformat() + "Z",
             user_id=session.user_id,
-        ))
+        )
+        if summary:
+            responses.append(FrameworkSessionSummary(**common))
+            continue
+        
+        responses.append(FrameworkSessionResponse(data=session.data or {}, **common))
     
     logger.info(f"Found {len(responses)} framework sessions for user {current_user.username}")
     return responses
@@ -127,6 +257,7 @@ async def list_framework_sessions(
 @router.post("/", response_model=FrameworkSessionResponse)
 async def create_framework_session(
     session_data: FrameworkSessionCreate,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> FrameworkSessionResponse:
@@ -135,6 +266,7 @@ async def create_framework_session(
     
     Args:
         session_data: Framework session data
+        response: Outgoing response (receives the ETag)
         current_user: Current authenticated user
         db: Database session
         
@@ -155,7 +287,7 @@ async def create_framework_session(
         framework_type=session_data.framework_type,
         status=FrameworkStatus.DRAFT,
         user_id=current_user.id,
-        data=json.dumps(session_data.data or {}),
+        data=session_data.data or {},
         version=1,
     )
     
@@ -166,6 +298,8 @@ async def create_framework_session(
     
     logger.info(f"Created framework session {db_session.id} in database")
     
+    response.headers["ETag"] = version_etag(db_session.version)
+    
     # Convert to response format
     return FrameworkSessionResponse(
         id=db_session.id,
@@ -173,7 +307,7 @@ async def create_framework_session(
         description=db_session.description,
         framework_type=db_session.framework_type,
         status=db_session.status,
-        data=json.loads(db_session.data) if db_session.data else {},
+        data=db_session.data or {},
         version=db_session.version,
         created_at=db_session.created_at.isoformat() + "Z",
         updated_at=db_session.updated_at.isoformat() + "Z",
@@ -184,16 +318,31 @@ async def create_framework_session(
 @router.get("/{session_id}", response_model=FrameworkSessionResponse)
 async def get_framework_session(
     session_id: int,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db),
+    primary: AsyncSession = Depends(get_db),
+    cache: Cache = Depends(get_cache)
 ) -> FrameworkSessionResponse:
     """
     Get a specific framework session.
     
+    The session version is returned as a strong ETag. A request whose
+    If-None-Match carries the current version gets an empty 304 without
+    the data blob ever being loaded. Responses are cached until the
+    session is next written; a cache miss is filled from the primary, so
+    a lagging read replica cannot cache a version older than the write
+    that invalidated it.
+    
     Args:
         session_id: Framework session ID
+        response: Outgoing response (receives the ETag)
+        if_none_match: Optional ETag of the client's copy
         current_user: Current authenticated user
-        db: Database session
+        db: Database session for reads
+        primary: Database session on the primary, for filling the cache
+        cache: Response cache
         
     Returns:
         FrameworkSessionResponse: Framework session data
@@ -203,14 +352,52 @@ async def get_framework_session(
     """
     logger.info(f"Getting framework session {session_id}")
     
-    # Query database for session
-    result = await db.execute(
-        select(FrameworkSession).where(
-            FrameworkSession.id == session_id,
-            FrameworkSession.user_id == current_user.id
+    cache_key = f"framework_session:{session_id}:user:{current_user.id}"
+    cache_tags = (session_cache_tag(session_id),)
+    
+    cached = None
+    if if_none_match:
+        cached = await cache.get(cache_key, cache_tags)
+        if cached is not None:
+            version = cached["version"]
+        else:
+            result = await db.execute(
+                select(FrameworkSession.version).where(
+                    FrameworkSession.id == session_id,
+                    FrameworkSession.user_id == current_user.id
+                )
+            )
+            version = result.scalar_one_or_none()
+        if version is not None and etag_matches(if_none_match, version_etag(version)):
+            return not_modified(version_etag(version))
+    
+    async def load_session() -> dict | None:
+        # Query the primary for the session, since the result is cached
+        result = await primary.execute(
+            select(FrameworkSession).where(
+                FrameworkSession.id == session_id,
+                FrameworkSession.user_id == current_user.id
+            )
         )
-    )
-    session = result.scalar_one_or_none()
+        session = result.scalar_one_or_none()
+        if not session:
+            return None
+        
+        # Convert to response format
+        return jsonable_encoder(FrameworkSessionResponse(
+            id=session.id,
+            title=session.title,
+            description=session.description,
+            framework_type=session.framework_type,
+            status=session.status,
+            data=session.data or {},
+            version=session.version,
+            created_at=session.created_at.isoformat() + "Z",
+            updated_at=session.updated_at.isoformat() + "Z",
+            user_id=session.user_id,
+        ))
+    
+    session = cached or await cache.get_or_set(cache_key, load_session, tags=cache_tags)
     
     if not session:
         logger.warning(f"Framework session {session_id} not found for user {current_user.username}")
@@ -221,23 +408,125 @@ async def get_framework_session(
     
     logger.info(f"Found framework session {session_id}")
     
-    # Convert to response format
+    response.headers["ETag"] = version_etag(session["version"])
+    
+    return FrameworkSessionResponse(**session)
+
+
+class FrameworkSessionChangeResponse(BaseModel):
+    """Changes that produced one session version."""
+    version: int
+    operations: list[dict[str, Any]]
+    updated_at: str
+
+
+class FrameworkSessionDeltaResponse(BaseModel):
+    """Framework session changes since a client's version."""
+    id: int
+    version: int
+    since_version: int
+    changes: list[FrameworkSessionChangeResponse]
+    reset: bool = False
+    session: FrameworkSessionResponse | None = None
+
+
+@router.get("/{session_id}/changes", response_model=FrameworkSessionDeltaResponse)
+async def get_framework_session_changes(
+    session_id: int,
+    response: Response,
+    since_version: int = Query(..., ge=0, description="Session version the client already has"),
+    if_none_match: str | None = Header(default=None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+) -> FrameworkSessionDeltaResponse:
+    """
+    Get the changes to a framework session since a known version.
+    
+    Each change is a list of JSON Patch operations against the session
+    document (``title``, ``description``, ``status`` and ``data``); applying
+    them in order brings a client at ``since_version`` up to date. A client
+    that is already current gets an empty list of changes, or a 304 if it
+    sent the current ETag in ``If-None-Match``. If the client is further
+    behind than the retained history, the full session is returned instead
+    with ``reset`` set.
+    
+    Args:
+        session_id: Framework session ID
+        response: Outgoing response (receives the ETag)
+        since_version: Session version the client already has
+        if_none_match: Optional ETag of the client's copy
+        current_user: Current authenticated user
+        db: Database session
+    
+    Returns:
+        FrameworkSessionDeltaResponse: Changes, or the full session on reset
+    
+    Raises:
+        HTTPException: If session not found
+    """
     try:
-        data = json.loads(session.data) if session.data else {}
-    except (json.JSONDecodeError, TypeError):
-        data = {}
-        
-    return FrameworkSessionResponse(
+        version, changes = await framework_service.get_changes(
+            db, session_id, current_user, since_version
+        )
+    except ValueError as e:
+        logger.warning(f"Framework session {session_id} not found for user {current_user.username}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Framework session not found"
+        ) from e
+    
+    etag = version_etag(version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    
+    if changes is not None:
+        return FrameworkSessionDeltaResponse(
+            id=session_id,
+            version=version,
+            since_version=since_version,
+            changes=[
+                FrameworkSessionChangeResponse(
+                    version=change.version,
+                    operations=change.operations,
+                    updated_at=change.created_at.isoformat() + "Z",
+                )
+                for change in changes
+            ],
+        )
+    
+    logger.info(f"Change history for framework session {session_id} does not reach version {since_version}")
+    result = await db.execute(
+        select(FrameworkSession).where(
+            FrameworkSession.id == session_id,
+            FrameworkSession.user_id == current_user.id
+        )
+    )
+    session = result.scalar_one_or_none()
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Framework session not found"
+        )
+    response.headers["ETag"] = version_etag(session.version)
+    return FrameworkSessionDeltaResponse(
         id=session.id,
-        title=session.title,
-        description=session.description,
-        framework_type=session.framework_type,
-        status=session.status,
-        data=data,
         version=session.version,
-        created_at=session.created_at.isoformat() + "Z",
-        updated_at=session.updated_at.isoformat() + "Z",
-        user_id=session.user_id,
+        since_version=since_version,
+        changes=[],
+        reset=True,
+        session=FrameworkSessionResponse(
+            id=session.id,
+            title=session.title,
+            description=session.description,
+            framework_type=session.framework_type,
+            status=session.status,
+            data=session.data or {},
+            version=session.version,
+            created_at=session.created_at.isoformat() + "Z",
+            updated_at=session.updated_at.isoformat() + "Z",
+            user_id=session.user_id,
+        ),
     )
 
 
@@ -245,8 +534,10 @@ async def get_framework_session(
 async def update_framework_session(
     session_id: int,
     update_data: FrameworkSessionUpdate,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    cache: Cache = Depends(get_cache)
 ) -> FrameworkSessionResponse:
     """
     Update a framework session.
@@ -254,8 +545,10 @@ async def update_framework_session(
     Args:
         session_id: Framework session ID
         update_data: Update data
+        response: Outgoing response (receives the ETag)
         current_user: Current authenticated user
         db: Database session
+        cache: Response cache
         
     Returns:
         FrameworkSessionResponse: Updated framework session
@@ -281,6 +574,8 @@ async def update_framework_session(
             detail="Framework session not found"
         )
     
+    before = session_document(session)
+    
     # Update fields if provided
     if update_data.title is not None:
         session.title = update_data.title
@@ -289,31 +584,34 @@ async def update_framework_session(
     if update_data.status is not None:
         session.status = update_data.status
     if update_data.data is not None:
-        session.data = json.dumps(update_data.data)
+        session.data = update_data.data
     
     # Increment version and update timestamp
     session.version += 1
     session.updated_at = datetime.utcnow()
     
+    await framework_service.record_change(
+        db, session.id, session.version,
+        diff_documents(before, session_document(session)),
+    )
+    
     # Save to database
     await db.commit()
     await db.refresh(session)
+    await cache.invalidate(session_cache_tag(session_id))
     
     logger.info(f"Updated framework session {session_id} in database")
     
+    response.headers["ETag"] = version_etag(session.version)
+    
     # Convert to response format
-    try:
-        data = json.loads(session.data) if session.data else {}
-    except (json.JSONDecodeError, TypeError):
-        data = {}
-        
     return FrameworkSessionResponse(
         id=session.id,
         title=session.title,
         description=session.description,
         framework_type=session.framework_type,
         status=session.status,
-        data=data,
+        data=session.data or {},
         version=session.version,
         created_at=session.created_at.isoformat() + "Z",
         updated_at=session.updated_at.isoformat() + "Z",
@@ -321,11 +619,116 @@ async def update_framework_session(
     )
 
 
+class FrameworkSessionPatchResponse(BaseModel):
+    """Framework session patch response."""
+    id: int
+    version: int
+    updated_at: str
+
+
+def _parse_if_match(if_match: str | None) -> int | None:
+    """
+    Parse an If-Match header carrying a session version.
+    
+    Args:
+        if_match: Raw header value, e.g. '"3"' or '3'
+    
+    Returns:
+        int | None: Expected version, or None if not supplied
+    
+    Raises:
+        HTTPException: If the header is not a version number
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip().removeprefix("W/").strip('"')
+    if not value.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="If-Match must contain a session version"
+        )
+    return int(value)
+
+
+@router.patch("/{session_id}", response_model=FrameworkSessionPatchResponse)
+async def patch_framework_session_data(
+    session_id: int,
+    response: Response,
+    patch: list[JsonPatchOperation] | dict[str, Any] = Body(...),
+    if_match: str | None = Header(default=None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> FrameworkSessionPatchResponse:
+    """
+    Partially update a framework session's analysis data.
+    
+    An array body is treated as a JSON Patch (RFC 6902,
+    ``application/json-patch+json``); an object body as a JSON Merge Patch
+    (RFC 7396, ``application/merge-patch+json``). Only the addressed paths
+    are written, and the full document is not returned.
+    
+    Args:
+        session_id: Framework session ID
+        response: Outgoing response (receives the ETag)
+        patch: JSON Patch operations or merge patch
+        if_match: Optional expected session version
+        current_user: Current authenticated user
+        db: Database session
+    
+    Returns:
+        FrameworkSessionPatchResponse: New version information
+    
+    Raises:
+        HTTPException: If session not found, the version is stale,
+            or the patch cannot be applied
+    """
+    logger.info(f"Patching framework session {session_id}")
+    
+    try:
+        if isinstance(patch, list):
+            version, updated_at = await framework_service.patch_session_data(
+                db, session_id, current_user,
+                operations=patch,
+                expected_version=_parse_if_match(if_match),
+            )
+        else:
+            version, updated_at = await framework_service.patch_session_data(
+                db, session_id, current_user,
+                merge_patch=patch,
+                expected_version=_parse_if_match(if_match),
+            )
+    except JsonPatchError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        ) from e
+    except VersionConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(e)
+        ) from e
+    except ValueError as e:
+        logger.warning(f"Framework session {session_id} not found for user {current_user.username}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Framework session not found"
+        ) from e
+    
+    response.headers["ETag"] = version_etag(version)
+    
+    return FrameworkSessionPatchResponse(
+        id=session_id,
+        version=version,
+        updated_at=updated_at.isoformat() + "Z",
+    )
+
+
 @router.delete("/{session_id}")
 async def delete_framework_session(
     session_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    cache: Cache = Depends(get_cache)
 ) -> dict[str, str]:
     """
     Delete a framework session.
@@ -334,6 +737,7 @@ async def delete_framework_session(
         session_id: Framework session ID
         current_user: Current authenticated user
         db: Database session
+        cache: Response cache
         
     Returns:
         dict: Success message
@@ -362,6 +766,7 @@ async def delete_framework_session(
     # Delete from database
     await db.delete(session)
     await db.commit()
+    await cache.invalidate(session_cache_tag(session_id))
     
     logger.info(f"Deleted framework session {session_id} from database")
     
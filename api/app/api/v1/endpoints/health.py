@@ -2,11 +2,17 @@
 Health check endpoints for monitoring.
 """
 
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import cache
 from app.core.database import get_db, db_manager
+from app.core.http_client import http_clients
 from app.core.logging import get_logger
+from app.services.job_runner import job_runner
+from app.services.wayback_archiver import wayback_archiver
 
 logger = get_logger(__name__)
 router = APIRouter()
@@ -26,9 +32,9 @@ async def health_check() -> dict[str, str]:
 @router.get("/detailed")
 async def detailed_health_check(
     db: AsyncSession = Depends(get_db)
-) -> dict[str, str | bool]:
+) -> dict[str, Any]:
     """
-    Detailed health check including database connectivity.
+    Detailed health check including database connectivity and pool usage.
     
     Args:
         db: Database session
@@ -39,10 +45,17 @@ async def detailed_health_check(
     try:
         # Check database connectivity
         db_healthy = await db_manager.health_check()
+        read_db_healthy = await db_manager.read_health_check()
         
         return {
-            "status": "healthy" if db_healthy else "unhealthy",
+            "status": "healthy" if db_healthy and read_db_healthy else "unhealthy",
             "database": db_healthy,
+            "read_database": read_db_healthy,
+            "pools": db_manager.pool_stats(),
+            "cache": cache.backend.name,
+            "http": http_clients.stats(),
+            "wayback": wayback_archiver.stats(),
+            "jobs": job_runner.stats(),
             "service": "omnicore-api",
         }
         
@@ -2,18 +2,27 @@
 Citation management API endpoints for academic and source management.
 """
 
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from pydantic import BaseModel, validator
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from pydantic import BaseModel, ValidationError, validator
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, or_
+from collections import Counter
 from datetime import datetime
+import codecs
+import time
 
-from app.core.database import get_db
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.logging import get_logger
+from app.core.urls import canonicalize_url
 from app.models.user import User
-from app.models.research_tool import Citation, ProcessedUrl
+from app.models.research_tool import Citation, ProcessedUrl, Tag, citation_tags
+from app.models.search import apply_citation_search
+from app.services.citation_import import PARSERS, ParsedRecord, detect_format
+from app.services.citation_stats import apply_citation_stats, citation_stat_deltas, read_citation_stats
 
 logger = get_logger(__name__)
 
@@ -99,6 +108,13 @@ class CitationResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
+    @validator('tags', pre=True)
+    def tag_names(cls, v):
+        """Expose tags by name."""
+        if v is None:
+            return v
+        return [tag.name if isinstance(tag, Tag) else tag for tag in v]
+    
     class Config:
         from_attributes = True
 
@@ -118,6 +134,27 @@ class BibliographyExportRequest(BaseModel):
         return v.lower()
 
 
+class CitationImportError(BaseModel):
+    """A record that could not be imported."""
+    index: int
+    title: Optional[str] = None
+    error: str
+
+
+class CitationImportResponse(BaseModel):
+    """Response model for bulk citation import."""
+    format: str
+    total_records: int
+    imported: int
+    duplicates: int
+    failed: int
+    batches: int
+    elapsed_seconds: float
+    records_per_second: float
+    errors: List[CitationImportError]
+    errors_truncated: bool = False
+
+
 class CitationStatsResponse(BaseModel):
     """Response model for citation statistics."""
     total_citations: int
@@ -260,7 +297,29 @@ class CitationFormatter:
         return bibtex
 
 
+async def _resolve_tags(db: AsyncSession, user_id: int, names: List[str]) -> List[Tag]:
+    """Get the user's tags by name, creating any that don't exist yet."""
+    normalized = list(dict.fromkeys(Tag.normalize(name) for name in names if name.strip()))
+    if not normalized:
+        return []
+    
+    result = await db.execute(
+        select(Tag).where(Tag.user_id == user_id, Tag.name.in_(normalized))
+    )
+    existing = {tag.name: tag for tag in result.scalars()}
+    for name in normalized:
+        if name not in existing:
+            existing[name] = Tag(name=name, user_id=user_id)
+            db.add(existing[name])
+    return [existing[name] for name in normalized]
+
+
 # API Endpoints
+def _citations_tag(user_id: int) -> str:
+    """Cache tag covering everything derived from a user's citations."""
+    return f"citations:user:{user_id}"
+
+
 @router.post("/", response_model=CitationResponse, status_code=status.HTTP_201_CREATED)
 async def create_citation(
     request: CitationCreateRequest,
@@ -301,7 +360,7 @@ async def create_citation(
         # Create citation
         citation = Citation(
             title=request.title,
-            authors=str(request.authors) if request.authors else None,
+            authors=request.authors or None,
             publication_date=request.publication_date,
             source_type=request.source_type,
             source_name=request.source_name,
@@ -312,16 +371,17 @@ async def create_citation(
             apa_citation=apa_citation,
             mla_citation=mla_citation,
             chicago_citation=chicago_citation,
-            tags=str(request.tags) if request.tags else None,
+            tags=await _resolve_tags(db, current_user.id, request.tags or []),
             notes=request.notes,
             reliability_rating=request.reliability_rating,
             relevance_rating=request.relevance_rating,
             processed_url_id=request.processed_url_id,
-            citation_data=str(request.additional_data) if request.additional_data else None,
+            citation_data=request.additional_data or None,
             user_id=current_user.id
         )
         
         db.add(citation)
+        await apply_citation_stats(db, current_user.id, citation_stat_deltas(citation))
         await db.commit()
         await db.refresh(citation)
         
@@ -331,6 +391,8 @@ async def create_citation(
         await db.commit()
         await db.refresh(citation)
         
+        await cache.invalidate(_citations_tag(current_user.id))
+        
         logger.info(f"Created citation {citation.id} for user {current_user.username}")
         return CitationResponse.from_orm(citation)
         
@@ -342,15 +404,277 @@ async def create_citation(
         )
 
 
+IMPORT_READ_SIZE = 64 * 1024
+MAX_IMPORT_ERRORS = 500
+
+
+def _url_key(url: Optional[str]) -> Optional[str]:
+    """Canonical form of a citation URL, so different spellings match."""
+    if not url:
+        return url
+    try:
+        return canonicalize_url(url)
+    except ValueError:
+        return url
+
+
+def _identifier_keys(request: CitationCreateRequest) -> List[tuple]:
+    """Identifiers used to detect duplicate citations."""
+    return [
+        (name, value)
+        for name, value in (
+            ("doi", request.doi),
+            ("isbn", request.isbn),
+            ("pmid", request.pmid),
+            ("url", _url_key(request.url)),
+        )
+        if value
+    ]
+
+
+class _CitationImporter:
+    """Validates, deduplicates, formats and inserts parsed records in batches."""
+    
+    def __init__(self, db: AsyncSession, user: User) -> None:
+        self.db = db
+        self.user = user
+        self.seen: set[tuple] = set()
+        self.total = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.batches = 0
+        self.errors: List[CitationImportError] = []
+        self.failed = 0
+    
+    def fail(self, index: int, error: str, title: Optional[str] = None) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_IMPORT_ERRORS:
+            self.errors.append(CitationImportError(index=index, title=title, error=error))
+    
+    async def import_batch(self, records: List[ParsedRecord]) -> None:
+        """Insert one batch of parsed records in a single transaction."""
+        requests = []
+        for record in records:
+            try:
+                requests.append((record, CitationCreateRequest(**record.data)))
+            except ValidationError as e:
+                problems = "; ".join(
+                    f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+                )
+                self.fail(record.index, problems, record.data.get("title"))
+        if not requests:
+            return
+        
+        # Load identifiers this batch could collide with in one query
+        keys = {key for _, request in requests for key in _identifier_keys(request)}
+        # Stored URLs keep the spelling they were saved with; match it as well as the canonical form
+        keys.update(("url", request.url) for _, request in requests if request.url)
+        conditions = [
+            getattr(Citation, name).in_([value for key_name, value in keys if key_name == name])
+            for name in ("doi", "isbn", "pmid", "url")
+            if any(key_name == name for key_name, _ in keys)
+        ]
+        if conditions:
+            existing = await self.db.execute(
+                select(Citation.doi, Citation.isbn, Citation.pmid, Citation.url).where(
+                    Citation.user_id == self.user.id,
+                    or_(*conditions)
+                )
+            )
+            for doi, isbn, pmid, url in existing:
+                self.seen.update(
+                    (name, value)
+                    for name, value in (("doi", doi), ("isbn", isbn), ("pmid", pmid), ("url", _url_key(url)))
+                    if value
+                )
+        
+        fresh = []
+        for record, request in requests:
+            record_keys = _identifier_keys(request)
+            if any(key in self.seen for key in record_keys):
+                self.duplicates += 1
+                continue
+            self.seen.update(record_keys)
+            fresh.append((record, request))
+        if not fresh:
+            return
+        
+        tags = {
+            tag.name: tag
+            for tag in await _resolve_tags(
+                self.db, self.user.id, [name for _, request in fresh for name in request.tags or []]
+            )
+        }
+        
+        formatter = CitationFormatter()
+        citations = []
+        for _, request in fresh:
+            citation_data = {
+                'title': request.title,
+                'authors': request.authors or [],
+                'source_name': request.source_name,
+                'publication_date': request.publication_date,
+                'url': request.url,
+                'doi': request.doi,
+                'source_type': request.source_type
+            }
+            citation = Citation(
+                title=request.title,
+                authors=request.authors or None,
+                publication_date=request.publication_date,
+                source_type=request.source_type,
+                source_name=request.source_name,
+                url=request.url,
+                doi=request.doi,
+                isbn=request.isbn,
+                pmid=request.pmid,
+                apa_citation=formatter.generate_apa(citation_data),
+                mla_citation=formatter.generate_mla(citation_data),
+                chicago_citation=formatter.generate_chicago(citation_data),
+                tags=[
+                    tags[name]
+                    for name in dict.fromkeys(Tag.normalize(raw) for raw in request.tags or [] if raw.strip())
+                ],
+                notes=request.notes,
+                citation_data=request.additional_data or None,
+                user_id=self.user.id
+            )
+            citations.append((citation, citation_data))
+        
+        try:
+            self.db.add_all([citation for citation, _ in citations])
+            deltas = Counter()
+            for citation, _ in citations:
+                deltas.update(citation_stat_deltas(citation))
+            await apply_citation_stats(self.db, self.user.id, deltas)
+            await self.db.flush()
+            # BibTeX keys use the citation ID, known after the insert
+            for citation, citation_data in citations:
+                citation.bibtex_citation = formatter.generate_bibtex(citation_data, citation.id)
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Failed to import citation batch: {e}")
+            for record, request in fresh:
+                self.seen.difference_update(_identifier_keys(request))
+                self.fail(record.index, f"Database error: {e}", request.title)
+        else:
+            self.imported += len(citations)
+            self.batches += 1
+        finally:
+            # Keep the session's identity map from growing with the import
+            self.db.expunge_all()
+
+
+@router.post("/import", response_model=CitationImportResponse)
+async def import_citations(
+    file: UploadFile = File(...),
+    format: Optional[Literal["bibtex", "ris", "csl-json"]] = Query(
+        None, description="Import format; detected from the file if omitted"
+    ),
+    batch_size: int = Query(500, ge=1, le=5000, description="Records per transaction"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> CitationImportResponse:
+    """
+    Import a citation library from BibTeX, RIS or CSL-JSON.
+    
+    The file is parsed as it is read and records are inserted in batches of
+    **batch_size**, one transaction per batch. Records whose DOI, ISBN, PMID
+    or URL matches an existing citation (or an earlier record in the file)
+    are skipped as duplicates. Records that fail to parse or validate are
+    reported individually and do not affect the rest of the import.
+    
+    - **file**: Library export (.bib, .ris or .json)
+    - **format**: bibtex, ris or csl-json
+    - **batch_size**: Records per transaction
+    """
+    started = time.perf_counter()
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    importer = _CitationImporter(db, current_user)
+    parser = None
+    pending: List[ParsedRecord] = []
+    bytes_read = 0
+    
+    async def handle(records: List[ParsedRecord]) -> None:
+        for record in records:
+            importer.total += 1
+            if record.error:
+                importer.fail(record.index, record.error, record.data.get("title"))
+                continue
+            pending.append(record)
+            if len(pending) >= batch_size:
+                await importer.import_batch(pending)
+                pending.clear()
+    
+    try:
+        while True:
+            chunk = await file.read(IMPORT_READ_SIZE)
+            bytes_read += len(chunk)
+            if bytes_read > settings.MAX_UPLOAD_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Import file exceeds {settings.MAX_UPLOAD_SIZE} bytes"
+                )
+            text = decoder.decode(chunk, final=not chunk)
+            
+            if parser is None:
+                format = format or detect_format(file.filename, text)
+                if format is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Could not detect import format; pass format=bibtex, ris or csl-json"
+                    )
+                parser = PARSERS[format]()
+            
+            await handle(parser.feed(text))
+            if not chunk:
+                break
+        
+        await handle(parser.close())
+        if pending:
+            await importer.import_batch(pending)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to import citations: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import citations: {str(e)}"
+        )
+    
+    if importer.imported:
+        await cache.invalidate(_citations_tag(current_user.id))
+    
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Imported {importer.imported}/{importer.total} citations for user "
+        f"{current_user.username} in {elapsed:.2f}s"
+    )
+    return CitationImportResponse(
+        format=format,
+        total_records=importer.total,
+        imported=importer.imported,
+        duplicates=importer.duplicates,
+        failed=importer.failed,
+        batches=importer.batches,
+        elapsed_seconds=round(elapsed, 3),
+        records_per_second=round(importer.total / elapsed, 1) if elapsed > 0 else 0.0,
+        errors=importer.errors,
+        errors_truncated=importer.failed > len(importer.errors)
+    )
+
+
 @router.get("/", response_model=List[CitationResponse])
 async def get_citations(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
     source_type: Optional[str] = Query(None, description="Filter by source type"),
     tag: Optional[str] = Query(None, description="Filter by tag"),
-    search: Optional[str] = Query(None, description="Search in title, authors, notes")
+    search: Optional[str] = Query(None, description="Full-text search in title, authors, notes")
 ) -> List[CitationResponse]:
     """
     Get user's citations with optional filtering and search.
@@ -358,8 +682,9 @@ async def get_citations(
     - **skip**: Number of records to skip for pagination
     - **limit**: Maximum number of records to return
     - **source_type**: Filter by source type
-    - **tag**: Filter by tag
-    - **search**: Search in title, authors, and notes
+    - **tag**: Filter by tag (exact, case-insensitive)
+    - **search**: Full-text search in title, authors, and notes; words match
+      as prefixes and results are ordered by relevance
     """
     try:
         query = select(Citation).where(Citation.user_id == current_user.id)
@@ -369,18 +694,17 @@ async def get_citations(
             query = query.where(Citation.source_type == source_type)
         
         if tag:
-            query = query.where(Citation.tags.ilike(f"%{tag}%"))
-        
-        if search:
-            search_term = f"%{search}%"
             query = query.where(
-                or_(
-                    Citation.title.ilike(search_term),
-                    Citation.authors.ilike(search_term),
-                    Citation.notes.ilike(search_term)
+                Citation.id.in_(
+                    select(citation_tags.c.citation_id)
+                    .join(Tag, Tag.id == citation_tags.c.tag_id)
+                    .where(Tag.user_id == current_user.id, Tag.name == Tag.normalize(tag))
                 )
             )
         
+        if search:
+            query = apply_citation_search(query, search, db.get_bind().dialect.name)
+        
         # Apply pagination and ordering
         query = query.order_by(Citation.created_at.desc()).offset(skip).limit(limit)
         
@@ -400,7 +724,7 @@ async def get_citations(
 @router.get("/{citation_id}", response_model=CitationResponse)
 async def get_citation(
     citation_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ) -> CitationResponse:
     """
@@ -462,13 +786,16 @@ async def update_citation(
                 detail="Citation not found"
             )
         
+        # Counters are adjusted by removing the old values and adding the new
+        stat_deltas = citation_stat_deltas(citation, -1)
+        
         # Update fields
         update_data = request.dict(exclude_unset=True)
         for field, value in update_data.items():
-            if field in ['authors', 'tags'] and value is not None:
-                setattr(citation, field, str(value))
-            elif field == 'additional_data' and value is not None:
-                setattr(citation, 'citation_data', str(value))
+            if field == 'tags':
+                citation.tags = await _resolve_tags(db, current_user.id, value or [])
+            elif field == 'additional_data':
+                citation.citation_data = value
             else:
                 setattr(citation, field, value)
         
@@ -476,7 +803,7 @@ async def update_citation(
         if any(field in update_data for field in ['title', 'authors', 'source_name', 'publication_date', 'url', 'doi']):
             citation_data = {
                 'title': citation.title,
-                'authors': eval(citation.authors) if citation.authors else [],
+                'authors': citation.authors or [],
                 'source_name': citation.source_name,
                 'publication_date': citation.publication_date,
                 'url': citation.url,
@@ -490,9 +817,13 @@ async def update_citation(
             citation.chicago_citation = formatter.generate_chicago(citation_data)
             citation.bibtex_citation = formatter.generate_bibtex(citation_data, citation.id)
         
+        stat_deltas.update(citation_stat_deltas(citation))
+        await apply_citation_stats(db, current_user.id, stat_deltas)
         await db.commit()
         await db.refresh(citation)
         
+        await cache.invalidate(_citations_tag(current_user.id))
+        
         logger.info(f"Updated citation {citation_id} for user {current_user.username}")
         return CitationResponse.from_orm(citation)
         
@@ -532,9 +863,12 @@ async def delete_citation(
                 detail="Citation not found"
             )
         
+        await apply_citation_stats(db, current_user.id, citation_stat_deltas(citation, -1))
         await db.delete(citation)
         await db.commit()
         
+        await cache.invalidate(_citations_tag(current_user.id))
+        
         logger.info(f"Deleted citation {citation_id} for user {current_user.username}")
         
     except HTTPException:
@@ -550,7 +884,7 @@ async def delete_citation(
 @router.post("/export/bibliography")
 async def export_bibliography(
     request: BibliographyExportRequest,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ) -> dict:
     """
@@ -614,68 +948,19 @@ async def export_bibliography(
 
 
 @router.get("/stats/overview", response_model=CitationStatsResponse)
+@cache.cached(tags=("citations:user:{current_user.id}",))
 async def get_citation_stats(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ) -> CitationStatsResponse:
     """
     Get citation statistics for the current user.
+    
+    Statistics are read from counters maintained on every citation write,
+    so the cost does not grow with the number of citations.
     """
     try:
-        # Total citations
-        total_result = await db.execute(
-            select(func.count(Citation.id)).where(Citation.user_id == current_user.id)
-        )
-        total_citations = total_result.scalar() or 0
-        
-        # By source type
-        source_type_result = await db.execute(
-            select(
-                Citation.source_type,
-                func.count(Citation.id)
-            ).where(
-                Citation.user_id == current_user.id
-            ).group_by(Citation.source_type)
-        )
-        by_source_type = {row[0]: row[1] for row in source_type_result}
-        
-        # By rating (simplified)
-        rating_result = await db.execute(
-            select(
-                Citation.reliability_rating,
-                func.count(Citation.id)
-            ).where(
-                Citation.user_id == current_user.id,
-                Citation.reliability_rating.is_not(None)
-            ).group_by(Citation.reliability_rating)
-        )
-        by_rating = {f"rating_{row[0]}": row[1] for row in rating_result}
-        
-        # Recent citations (last 30 days)
-        from datetime import datetime, timedelta
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        recent_result = await db.execute(
-            select(func.count(Citation.id)).where(
-                Citation.user_id == current_user.id,
-                Citation.created_at >= thirty_days_ago
-            )
-        )
-        recent_citations = recent_result.scalar() or 0
-        
-        # Top tags (simplified - would need better JSON handling in production)
-        top_tags = [
-            {"tag": "research", "count": 0},
-            {"tag": "analysis", "count": 0},
-            {"tag": "intelligence", "count": 0}
-        ]
-        
-        return CitationStatsResponse(
-            total_citations=total_citations,
-            by_source_type=by_source_type,
-            by_rating=by_rating,
-            recent_citations=recent_citations,
-            top_tags=top_tags
-        )
+        return CitationStatsResponse(**await read_citation_stats(db, current_user.id))
         
     except Exception as e:
         logger.error(f"Failed to get citation stats: {e}")
@@ -2,28 +2,40 @@
 Document processing API endpoints for file analysis and conversion.
 """
 
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, BackgroundTasks
+from typing import List, Optional, Dict, Any, Tuple
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, validator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-import json
+import asyncio
 import os
 import hashlib
+import tempfile
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
 
-from app.core.database import get_db
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_db, get_read_db
+from app.core.result_store import ResultWriter, result_count, result_store
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.logging import get_logger
 from app.models.user import User
 from app.models.research_tool import ResearchJob, ResearchJobStatus, ResearchJobType
+from app.services.job_runner import PRIORITY_NORMAL, job_runner
+from app.services.job_service import JobControl, job_service
+from app.services.pdf_extractor import PAGE_SEPARATOR, pdf_extractor
+from app.services.result_gc import checkpoint_results, release_job_results
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
+MAX_EXTRACTED_TEXT = 10000  # Characters kept as extracted_text, analysed and checkpointed
+
 # Enums and Models
 class DocumentType(str, Enum):
     """Supported document types."""
@@ -78,6 +90,7 @@ class DocumentUploadResponse(BaseModel):
     file_size: int
     file_type: str
     uploaded_at: datetime
+    duplicate: bool = False  # The same content was uploaded before
     
     class Config:
         from_attributes = True
@@ -119,6 +132,15 @@ class DocumentAnalysisResult(BaseModel):
         from_attributes = True
 
 
+@dataclass
+class StoredUpload:
+    """An uploaded file saved under its content hash."""
+    file_id: str
+    path: Path
+    size: int
+    duplicate: bool
+
+
 # Document Processing Service
 class DocumentProcessingService:
     """Service for document processing operations."""
@@ -131,37 +153,141 @@ class DocumentProcessingService:
         self.upload_dir.mkdir(parents=True, exist_ok=True)
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
-    def generate_file_id(self, filename: str, content: bytes) -> str:
-        """Generate unique file ID based on content hash."""
-        content_hash = hashlib.sha256(content).hexdigest()
-        timestamp = int(datetime.utcnow().timestamp())
-        return f"{timestamp}_{content_hash[:16]}"
-    
-    async def save_uploaded_file(self, file: UploadFile) -> tuple[str, Path]:
-        """Save uploaded file and return file ID and path."""
-        content = await file.read()
-        file_id = self.generate_file_id(file.filename, content)
+    async def save_uploaded_file(self, file: UploadFile) -> StoredUpload:
+        """
+        Stream an uploaded file to disk under its content hash.
         
-        # Determine file extension
+        The upload is read ``DOCUMENT_UPLOAD_CHUNK_BYTES`` at a time into a
+        temporary file while its SHA-256 is computed, so memory use does not
+        grow with the file. The file ID is the hash: uploading the same
+        document again, under any name or extension, keeps the stored copy
+        and discards the new one, so a file ID names exactly one file.
+        
+        Args:
+            file: Uploaded file
+        
+        Returns:
+            StoredUpload: File ID, path, size and whether it was already stored
+        
+        Raises:
+            HTTPException: 413 if the file exceeds ``DOCUMENT_MAX_UPLOAD_SIZE``
+        """
         file_extension = Path(file.filename).suffix.lower()
-        file_path = self.upload_dir / f"{file_id}{file_extension}"
+        digest = hashlib.sha256()
+        size = 0
         
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # Write to a temporary file first so a partial upload is never processed
+        fd, tmp_name = await asyncio.to_thread(
+            tempfile.mkstemp, dir=self.upload_dir, prefix=".upload-", suffix=".part"
+        )
+        tmp_path = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while chunk := await file.read(settings.DOCUMENT_UPLOAD_CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > settings.DOCUMENT_MAX_UPLOAD_SIZE:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"File exceeds {settings.DOCUMENT_MAX_UPLOAD_SIZE} bytes"
+                        )
+                    digest.update(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+        
+            file_id = digest.hexdigest()
+            file_path, duplicate = await asyncio.to_thread(
+                self._store_upload, tmp_path, file_id, file_extension
+            )
+        except BaseException:
+            await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+            raise
         
-        return file_id, file_path
+        return StoredUpload(file_id=file_id, path=file_path, size=size, duplicate=duplicate)
+    
+    def _store_upload(self, tmp_path: Path, file_id: str, file_extension: str) -> Tuple[Path, bool]:
+        """Move a finished upload into place, or drop it if its content is already stored."""
+        # Files are found by f"{file_id}.*", so the first extension stored wins
+        existing = next(self.upload_dir.glob(f"{file_id}.*"), None)
+        if existing is not None:
+            tmp_path.unlink()
+            return existing, True
+        file_path = self.upload_dir / f"{file_id}{file_extension}"
+        os.replace(tmp_path, file_path)
+        return file_path, False
     
     async def extract_text_from_pdf(self, file_path: Path) -> str:
-        """Extract text from PDF file."""
+        """Extract text from the first pages of a PDF file, up to MAX_EXTRACTED_TEXT characters."""
         try:
-            # Placeholder for PDF text extraction
-            # In production, use PyPDF2, pdfplumber, or similar
-            return f"Text extracted from PDF: {file_path.name} (PDF processing library required)"
+            return await pdf_extractor.extract_text(file_path, max_chars=MAX_EXTRACTED_TEXT)
         except Exception as e:
             logger.error(f"Failed to extract text from PDF: {e}")
             raise
     
+    async def extract_pdf_pages(
+        self,
+        job_id: int,
+        file_path: Path,
+        results: ResultWriter,
+        control: JobControl,
+        completed: int,
+        resume: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """
+        Stream a PDF's text into the job results page by page.
+        
+        Each page is stored as a ``pages`` result with its number, its
+        character offset in the document text and its text. The extraction
+        is checkpointed as pages arrive, so a resumed job continues at the
+        next page.
+        
+        Args:
+            job_id: Research job ID
+            file_path: PDF file
+            results: Job result writer
+            control: Job cancellation and checkpoint pacing
+            completed: Processing tasks finished before this one
+            resume: Extraction state from the job checkpoint
+        
+        Returns:
+            Optional[str]: The first MAX_EXTRACTED_TEXT characters of the
+            text, or None if the job was cancelled
+        """
+        info = await pdf_extractor.document_info(file_path)
+        resume = resume or {}
+        state = {
+            "page": resume.get("page", 1),
+            "offset": resume.get("offset", 0),
+            "preview": resume.get("preview", ""),
+        }
+        
+        pages = pdf_extractor.iter_pages(file_path, state["page"], state["offset"], page_count=info["pages"])
+        try:
+            async for page in pages:
+                await results.append({"key": "pages", "value": asdict(page)})
+                if len(state["preview"]) < MAX_EXTRACTED_TEXT:
+                    preview = state["preview"] + PAGE_SEPARATOR + page.text if state["preview"] else page.text
+                    state["preview"] = preview[:MAX_EXTRACTED_TEXT]
+                state["page"] = page.number + 1
+                state["offset"] = page.offset + len(page.text) + len(PAGE_SEPARATOR)
+                
+                await job_service.report_progress(
+                    job_id,
+                    current_step=f"Extracting text: page {page.number} of {info['pages']}",
+                )
+                if control.cancelled:
+                    await control.save_checkpoint(
+                        {"results": await results.checkpoint(), "completed": completed, "pdf": state},
+                        ResearchJob.status == ResearchJobStatus.CANCELLED,
+                    )
+                    return None
+                if control.checkpoint_due():
+                    await control.save_checkpoint(
+                        {"results": await results.checkpoint(), "completed": completed, "pdf": state}
+                    )
+        finally:
+            await pages.aclose()
+        
+        return state["preview"]
+    
     async def extract_text_from_docx(self, file_path: Path) -> str:
         """Extract text from DOCX file."""
         try:
@@ -218,13 +344,7 @@ class DocumentProcessingService:
         
         # Add file-type specific metadata
         if file_type.lower() == 'pdf':
-            # Placeholder for PDF metadata extraction
-            metadata.update({
-                "pages": "Unknown (PDF library required)",
-                "author": "Unknown",
-                "title": "Unknown",
-                "subject": "Unknown"
-            })
+            metadata.update(await pdf_extractor.document_info(file_path))
         elif file_type.lower() in ['docx', 'doc']:
             # Placeholder for DOCX metadata extraction
             metadata.update({
@@ -350,7 +470,13 @@ class DocumentProcessingService:
         options: Dict[str, Any],
         db: AsyncSession
     ):
-        """Process a document processing job in the background."""
+        """
+        Process a document processing job in the background.
+        
+        Finished tasks, and the pages of a PDF being extracted, are
+        checkpointed, so a resumed or retried job skips them; cancellation
+        is checked between tasks and between PDF pages.
+        """
         try:
             # Get job
             result = await db.execute(
@@ -362,100 +488,131 @@ class DocumentProcessingService:
                 logger.error(f"Document processing job {job_id} not found")
                 return
             
-            # Update job status
-            job.status = ResearchJobStatus.IN_PROGRESS
-            job.started_at = datetime.utcnow()
-            job.current_step = "Starting document processing"
-            await db.commit()
+            # The job runner has already marked the job as in progress
+            checkpoint = job.checkpoint or {}
+            await job_service.update_job(
+                job_id,
+                current_step="Resuming document processing" if checkpoint else "Starting document processing"
+            )
             
-            results = {}
+            control = job_service.control(job_id)
+            results = result_store.writer(resume=checkpoint.get("results"))
+            completed = checkpoint.get("completed", 0)
             total_tasks = len(tasks)
             file_type = file_path.suffix.lower().replace('.', '')
             
-            for i, task in enumerate(tasks):
+            # Intermediate outputs reused by later tasks; everything else is
+            # handed to the result store as soon as it is produced. The text
+            # preview is checkpointed so a resumed job does not extract it again
+            text = checkpoint.get("text")
+            metadata = None
+            
+            for i, task in enumerate(tasks[completed:], completed):
+                if control.cancelled:
+                    await control.save_checkpoint(
+                        {"results": await results.checkpoint(), "completed": i, "text": text},
+                        ResearchJob.status == ResearchJobStatus.CANCELLED,
+                    )
+                    logger.info(f"Stopped cancelled document processing job {job_id} after {i} tasks")
+                    return
+                
                 try:
                     # Update progress
-                    job.progress_percentage = int((i / total_tasks) * 100)
-                    job.current_step = f"Processing: {task.value}"
-                    await db.commit()
+                    await job_service.report_progress(
+                        job_id,
+                        progress_percentage=int((i / total_tasks) * 100),
+                        current_step=f"Processing: {task.value}",
+                    )
+                    
+                    if task == ProcessingTask.EXTRACT_TEXT and file_type == 'pdf':
+                        resume = checkpoint.get("pdf") if i == completed else None
+                        text = await self.extract_pdf_pages(job_id, file_path, results, control, i, resume)
+                        if text is None:
+                            logger.info(f"Stopped cancelled document processing job {job_id} during text extraction")
+                            return
+                        await results.append({"key": "extracted_text", "value": text})
                     
-                    if task == ProcessingTask.EXTRACT_TEXT:
-                        text = await self.extract_text(file_path, file_type)
-                        results["extracted_text"] = text[:10000]  # Limit size
+                    elif task == ProcessingTask.EXTRACT_TEXT:
+                        text = (await self.extract_text(file_path, file_type))[:MAX_EXTRACTED_TEXT]
+                        await results.append({"key": "extracted_text", "value": text})
                     
                     elif task == ProcessingTask.EXTRACT_METADATA:
                         metadata = await self.extract_metadata(file_path, file_type)
-                        results["metadata"] = metadata
+                        await results.append({"key": "metadata", "value": metadata})
                     
                     elif task == ProcessingTask.GENERATE_SUMMARY:
-                        if "extracted_text" not in results:
-                            text = await self.extract_text(file_path, file_type)
-                        else:
-                            text = results["extracted_text"]
+                        if text is None:
+                            text = (await self.extract_text(file_path, file_type))[:MAX_EXTRACTED_TEXT]
                         summary = await self.generate_summary(text)
-                        results["summary"] = summary
+                        await results.append({"key": "summary", "value": summary})
                     
                     elif task == ProcessingTask.EXTRACT_ENTITIES:
-                        if "extracted_text" not in results:
-                            text = await self.extract_text(file_path, file_type)
-                        else:
-                            text = results["extracted_text"]
+                        if text is None:
+                            text = (await self.extract_text(file_path, file_type))[:MAX_EXTRACTED_TEXT]
                         entities = await self.extract_entities(text)
-                        results["entities"] = entities
+                        await results.append({"key": "entities", "value": entities})
                     
                     elif task == ProcessingTask.CLASSIFY_DOCUMENT:
-                        if "extracted_text" not in results:
-                            text = await self.extract_text(file_path, file_type)
-                        else:
-                            text = results["extracted_text"]
-                        if "metadata" not in results:
+                        if text is None:
+                            text = (await self.extract_text(file_path, file_type))[:MAX_EXTRACTED_TEXT]
+                        if metadata is None:
                             metadata = await self.extract_metadata(file_path, file_type)
-                        else:
-                            metadata = results["metadata"]
                         classification = await self.classify_document(text, metadata)
-                        results["classification"] = classification
+                        await results.append({"key": "classification", "value": classification})
                     
                     elif task == ProcessingTask.CONVERT_FORMAT:
                         target_type = options.get("convert_to")
                         if target_type:
                             converted_path = await self.convert_document(file_path, file_type, target_type)
                             if converted_path:
-                                results["converted_files"] = [{
+                                await results.append({"key": "converted_files", "value": [{
                                     "format": target_type,
                                     "filename": converted_path.name,
                                     "path": str(converted_path)
-                                }]
+                                }]})
                     
                 except Exception as e:
                     logger.error(f"Failed to process task {task}: {e}")
-                    results[f"{task.value}_error"] = str(e)
+                    await results.append({"key": f"{task.value}_error", "value": str(e)})
+                
+                # Tasks are few and slow, so each one is checkpointed
+                await control.save_checkpoint(
+                    {"results": await results.checkpoint(), "completed": i + 1, "text": text}
+                )
             
-            # Update job completion
-            job.status = ResearchJobStatus.COMPLETED
-            job.progress_percentage = 100
-            job.completed_at = datetime.utcnow()
-            job.current_step = "Processing completed"
-            job.result_data = json.dumps(results)
+            manifest = await results.close()
             
-            await db.commit()
+            # Update job completion, unless the job was cancelled or taken over
+            if not await control.complete(
+                progress_percentage=100,
+                completed_at=datetime.utcnow(),
+                current_step="Processing completed",
+                result_data=manifest,
+            ):
+                logger.info(f"Document processing job {job_id} finished after it was cancelled or its lease was lost")
+                return
             
             logger.info(f"Completed document processing job {job_id}")
             
         except Exception as e:
             logger.error(f"Failed to process document job {job_id}: {e}")
-            
-            # Update job with error
-            try:
-                job.status = ResearchJobStatus.FAILED
-                job.error_message = str(e)
-                job.current_step = "Job failed"
-                await db.commit()
-            except Exception as commit_error:
-                logger.error(f"Failed to update job status: {commit_error}")
+            # The job runner records the failure and retries while attempts remain
+            raise
+    
+    async def run_job(self, job: ResearchJob) -> None:
+        """Run a document processing job leased by the job runner."""
+        options = job.input_data or {}
+        matching_files = list(self.upload_dir.glob(f"{options['file_id']}.*"))
+        if not matching_files:
+            raise FileNotFoundError(f"Uploaded file {options['file_id']} no longer exists")
+        tasks = [ProcessingTask(task) for task in options.get("tasks", [])]
+        async with AsyncSessionLocal() as db:
+            await self.process_document_job(job.id, options["file_id"], matching_files[0], tasks, options, db)
 
 
 # Service instance
 document_service = DocumentProcessingService()
+job_runner.register(ResearchJobType.DOCUMENT_PROCESSING, document_service.run_job)
 
 # API Endpoints
 @router.post("/upload", response_model=DocumentUploadResponse)
@@ -479,27 +636,33 @@ async def upload_document(
                 detail=f"File type {file_extension} not supported. Allowed types: {', '.join(allowed_extensions)}"
             )
         
-        # Check file size (max 50MB)
-        max_size = 50 * 1024 * 1024  # 50MB
-        if file.size and file.size > max_size:
+        # Reject early when the size is known; streaming enforces it otherwise
+        if file.size and file.size > settings.DOCUMENT_MAX_UPLOAD_SIZE:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File size exceeds 50MB limit"
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File exceeds {settings.DOCUMENT_MAX_UPLOAD_SIZE} bytes"
             )
         
         # Save file
-        file_id, file_path = await document_service.save_uploaded_file(file)
+        stored = await document_service.save_uploaded_file(file)
         
-        logger.info(f"Uploaded document {file.filename} as {file_id} for user {current_user.username}")
+        logger.info(
+            f"Uploaded document {file.filename} as {stored.file_id}"
+            f"{' (duplicate)' if stored.duplicate else ''} for user {current_user.username}"
+        )
         
         return DocumentUploadResponse(
-            file_id=file_id,
+            file_id=stored.file_id,
             filename=file.filename,
-            file_size=file_path.stat().st_size,
-            file_type=file_extension.replace('.', ''),
-            uploaded_at=datetime.utcnow()
+            file_size=stored.size,
+            # A duplicate keeps the type it was first stored with
+            file_type=stored.path.suffix.replace('.', ''),
+            uploaded_at=datetime.utcnow(),
+            duplicate=stored.duplicate
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to upload document: {e}")
         raise HTTPException(
@@ -512,7 +675,6 @@ async def upload_document(
 async def process_document(
     file_id: str,
     request: DocumentProcessingRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> DocumentProcessingJobResponse:
@@ -562,7 +724,8 @@ async def process_document(
             job_type=ResearchJobType.DOCUMENT_PROCESSING,
             job_name=f"Process: {filename}",
             status=ResearchJobStatus.PENDING,
-            input_data=json.dumps(job_data),
+            input_data=job_data,
+            priority=PRIORITY_NORMAL,
             user_id=current_user.id
         )
         
@@ -570,16 +733,8 @@ async def process_document(
         await db.commit()
         await db.refresh(job)
         
-        # Start background processing
-        background_tasks.add_task(
-            document_service.process_document_job,
-            job.id,
-            file_id,
-            file_path,
-            request.tasks,
-            job_data,
-            db
-        )
+        # Queued for the job runner
+        job_runner.notify()
         
         logger.info(f"Started document processing job {job.id} for file {file_id}")
         
@@ -593,7 +748,7 @@ async def process_document(
             tasks=[task.value for task in request.tasks],
             started_at=job.started_at,
             estimated_completion=None,
-            message="Document processing job started successfully"
+            message="Document processing job queued successfully"
         )
         
     except Exception as e:
@@ -607,7 +762,7 @@ async def process_document(
 @router.get("/jobs/{job_id}/status", response_model=DocumentProcessingJobResponse)
 async def get_processing_job_status(
     job_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ) -> DocumentProcessingJobResponse:
     """
@@ -631,21 +786,19 @@ async def get_processing_job_status(
                 detail="Processing job not found"
             )
         
+        # Progress is written to the database periodically; prefer the live snapshot
+        live = await job_service.get_progress(job.id) or {}
+        
         # Extract job data
-        job_data = {}
-        if job.input_data:
-            try:
-                job_data = json.loads(job.input_data)
-            except json.JSONDecodeError:
-                pass
+        job_data = job.input_data or {}
         
         return DocumentProcessingJobResponse(
             job_id=job.id,
             file_id=job_data.get("file_id", "unknown"),
             filename=job_data.get("filename", "unknown"),
             status=job.status,
-            progress_percentage=job.progress_percentage,
-            current_step=job.current_step,
+            progress_percentage=live.get("progress_percentage", job.progress_percentage),
+            current_step=live.get("current_step", job.current_step),
             tasks=job_data.get("tasks", []),
             started_at=job.started_at,
             estimated_completion=job.estimated_completion,
@@ -662,16 +815,68 @@ async def get_processing_job_status(
         )
 
 
+@router.get("/jobs/{job_id}/events")
+async def stream_processing_job_events(
+    job_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Stream progress of a document processing job as Server-Sent Events.
+    
+    Sends a ``progress`` event with the job's status, progress_percentage
+    and current_step on every change, and ends once the job completes,
+    fails or is cancelled.
+    
+    - **job_id**: ID of the processing job
+    """
+    result = await db.execute(
+        select(ResearchJob).where(
+            ResearchJob.id == job_id,
+            ResearchJob.user_id == current_user.id,
+            ResearchJob.job_type == ResearchJobType.DOCUMENT_PROCESSING
+        )
+    )
+    job = result.scalar_one_or_none()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Processing job not found"
+        )
+    
+    initial = {
+        "job_id": job.id,
+        "status": job.status,
+        "progress_percentage": job.progress_percentage,
+        "current_step": job.current_step,
+    }
+    return StreamingResponse(
+        job_service.progress_events(job.id, initial),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/jobs/{job_id}/results")
 async def get_processing_job_results(
     job_id: int,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-) -> dict:
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    offset: int = Query(0, ge=0, description="Number of task outputs to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of task outputs to return"),
+    stream: bool = Query(False, description="Stream task outputs from offset as NDJSON")
+):
     """
     Get the results of a completed document processing job.
     
     - **job_id**: ID of the processing job
+    - **offset**: Number of task outputs to skip
+    - **limit**: Maximum number of task outputs to return
+    - **stream**: Stream ``{"key", "value"}`` task outputs as NDJSON
+    
+    Text extracted from PDFs is returned page by page under ``pages``, each
+    with its page number and character offset in the document text.
     """
     try:
         result = await db.execute(
@@ -695,20 +900,22 @@ async def get_processing_job_results(
                 detail=f"Job is not completed. Current status: {job.status}"
             )
         
+        if stream:
+            return StreamingResponse(
+                result_store.stream_results(job.result_data, offset),
+                media_type="application/x-ndjson"
+            )
+        
         # Parse job data and results
-        job_data = {}
-        if job.input_data:
-            try:
-                job_data = json.loads(job.input_data)
-            except json.JSONDecodeError:
-                pass
+        job_data = job.input_data or {}
         
+        page = await result_store.read_results(job.result_data, offset, limit)
         results = {}
-        if job.result_data:
-            try:
-                results = json.loads(job.result_data)
-            except json.JSONDecodeError:
-                logger.error(f"Failed to parse results for job {job_id}")
+        for item in page:
+            if item["key"] == "pages":
+                results.setdefault("pages", []).append(item["value"])
+            else:
+                results[item["key"]] = item["value"]
         
         processing_time = 0
         if job.started_at and job.completed_at:
@@ -723,6 +930,9 @@ async def get_processing_job_results(
             "status": job.status,
             "completed_at": job.completed_at.isoformat() if job.completed_at else None,
             "processing_time": processing_time,
+            "total_results": result_count(job.result_data),
+            "offset": offset,
+            "limit": limit,
             "results": results
         }
         
@@ -738,7 +948,7 @@ async def get_processing_job_results(
 
 @router.get("/jobs")
 async def get_processing_jobs(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(50, ge=1, le=100, description="Number of records to return"),
@@ -768,12 +978,7 @@ async def get_processing_jobs(
         # Format jobs
         formatted_jobs = []
         for job in jobs:
-            job_data = {}
-            if job.input_data:
-                try:
-                    job_data = json.loads(job.input_data)
-                except json.JSONDecodeError:
-                    pass
+            job_data = job.input_data or {}
             
             formatted_jobs.append({
                 "job_id": job.id,
@@ -799,6 +1004,74 @@ async def get_processing_jobs(
         )
 
 
+@router.post("/jobs/{job_id}/resume", response_model=DocumentProcessingJobResponse)
+async def resume_processing_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> DocumentProcessingJobResponse:
+    """
+    Resume a cancelled or failed processing job from its last checkpoint.
+    
+    Processing tasks finished before the checkpoint are not run again.
+    
+    - **job_id**: ID of the processing job to resume
+    """
+    try:
+        result = await db.execute(
+            select(ResearchJob).where(
+                ResearchJob.id == job_id,
+                ResearchJob.user_id == current_user.id,
+                ResearchJob.job_type == ResearchJobType.DOCUMENT_PROCESSING
+            )
+        )
+        job = result.scalar_one_or_none()
+        
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Processing job not found"
+            )
+        
+        if job.status not in [ResearchJobStatus.CANCELLED, ResearchJobStatus.FAILED]:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Only cancelled or failed jobs can be resumed (job is {job.status})"
+            )
+        
+        if not await job_runner.resume(job.id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Job is still stopping; try again shortly"
+            )
+        
+        logger.info(f"Resumed processing job {job_id} for user {current_user.username}")
+        
+        job_data = job.input_data or {}
+        
+        return DocumentProcessingJobResponse(
+            job_id=job.id,
+            file_id=job_data.get("file_id", "unknown"),
+            filename=job_data.get("filename", "unknown"),
+            status=ResearchJobStatus.PENDING,
+            progress_percentage=job.progress_percentage,
+            current_step="Queued to resume",
+            tasks=job_data.get("tasks", []),
+            started_at=job.started_at,
+            estimated_completion=None,
+            message="Processing job queued to resume"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to resume processing job {job_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to resume job: {str(e)}"
+        )
+
+
 @router.delete("/jobs/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def cancel_processing_job(
     job_id: int,
@@ -828,12 +1101,22 @@ async def cancel_processing_job(
         
         # If job is running, mark as cancelled. If completed/failed, delete it.
         if job.status in [ResearchJobStatus.PENDING, ResearchJobStatus.IN_PROGRESS]:
-            job.status = ResearchJobStatus.CANCELLED
-            job.current_step = "Job cancelled by user"
-            await db.commit()
+            await job_service.update_job(
+                job.id,
+                ResearchJob.status.in_([ResearchJobStatus.PENDING, ResearchJobStatus.IN_PROGRESS]),
+                status=ResearchJobStatus.CANCELLED,
+                current_step="Job cancelled by user",
+            )
+            # A running job stops after its current item and checkpoints; jobs
+            # running in another process notice at their next heartbeat
+            job_service.cancel(job.id)
         else:
+            result_data = job.result_data
+            checkpoint = job.checkpoint
             await db.delete(job)
             await db.commit()
+            await release_job_results(db, result_data)
+            await release_job_results(db, checkpoint_results(checkpoint))
         
         logger.info(f"Cancelled/deleted processing job {job_id} for user {current_user.username}")
         
@@ -848,6 +1131,7 @@ async def cancel_processing_job(
 
 
 @router.get("/supported-formats")
+@cache.cached(ttl=settings.CACHE_STATIC_TTL)
 async def get_supported_formats() -> dict:
     """
     Get list of supported document formats and processing capabilities.
@@ -901,6 +1185,6 @@ async def get_supported_formats() -> dict:
             "classify_document": "Classify document type and content"
         },
         "output_formats": ["txt", "pdf", "docx", "html", "md", "json"],
-        "max_file_size": "50MB",
+        "max_file_size": f"{settings.DOCUMENT_MAX_UPLOAD_SIZE // (1024 * 1024)}MB",
         "notes": "Some features require additional libraries in production environment"
     }
\ No newline at end of file
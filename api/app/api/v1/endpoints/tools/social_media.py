@@ -3,19 +3,25 @@ Social media download API endpoints for content collection and analysis.
 """
 
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, validator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-import json
 from datetime import datetime
 from enum import Enum
 
-from app.core.database import get_db
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_db, get_read_db
+from app.core.result_store import is_manifest, result_count, result_store
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.logging import get_logger
 from app.models.user import User
 from app.models.research_tool import ResearchJob, ResearchJobStatus, ResearchJobType
+from app.services.job_runner import PRIORITY_LOW, PRIORITY_NORMAL, job_runner
+from app.services.job_service import job_service
+from app.services.result_gc import checkpoint_results, release_job_results
 
 logger = get_logger(__name__)
 
@@ -304,7 +310,12 @@ class SocialMediaService:
         downloads: List[Dict[str, Any]],
         db: AsyncSession
     ):
-        """Process a social media download job in the background."""
+        """
+        Process a social media download job in the background.
+        
+        Finished downloads are checkpointed periodically, so a resumed or
+        retried job skips them; cancellation is checked between downloads.
+        """
         import asyncio
         
         try:
@@ -318,21 +329,39 @@ class SocialMediaService:
                 logger.error(f"Download job {job_id} not found")
                 return
             
-            # Update job status
-            job.status = ResearchJobStatus.IN_PROGRESS
-            job.started_at = datetime.utcnow()
-            job.current_step = "Starting downloads"
-            await db.commit()
+            # The job runner has already marked the job as in progress
+            checkpoint = job.checkpoint or {}
+            await job_service.update_job(
+                job_id,
+                current_step="Resuming downloads" if checkpoint else "Starting downloads"
+            )
             
-            results = []
+            control = job_service.control(job_id)
+            results = result_store.writer(resume=checkpoint.get("results"))
+            completed = checkpoint.get("completed", 0)
+            failed = checkpoint.get("failed", 0)
             total_downloads = len(downloads)
             
-            for i, download_config in enumerate(downloads):
+            async def save_checkpoint(completed: int, *conditions: Any) -> None:
+                await control.save_checkpoint({
+                    "results": await results.checkpoint(),
+                    "completed": completed,
+                    "failed": failed,
+                }, *conditions)
+            
+            for i, download_config in enumerate(downloads[completed:], completed):
+                if control.cancelled:
+                    await save_checkpoint(i, ResearchJob.status == ResearchJobStatus.CANCELLED)
+                    logger.info(f"Stopped cancelled download job {job_id} after {i} downloads")
+                    return
+                
                 try:
                     # Update progress
-                    job.progress_percentage = int((i / total_downloads) * 100)
-                    job.current_step = f"Downloading from {download_config['platform']}"
-                    await db.commit()
+                    await job_service.report_progress(
+                        job_id,
+                        progress_percentage=int((i / total_downloads) * 100),
+                        current_step=f"Downloading from {download_config['platform']}",
+                    )
                     
                     # Download content
                     result = await self.download_content(
@@ -341,49 +370,63 @@ class SocialMediaService:
                         options=download_config
                     )
                     
-                    results.append(result)
+                    if result.get("status") == "failed":
+                        failed += 1
+                    await results.append(result)
                     
                     # Add delay between downloads to respect rate limits
                     await asyncio.sleep(1)
                     
                 except Exception as e:
                     logger.error(f"Failed to download from {download_config.get('platform', 'unknown')}: {e}")
-                    results.append({
+                    failed += 1
+                    await results.append({
                         "platform": download_config.get('platform', 'unknown'),
                         "url": download_config.get('url', ''),
                         "error": str(e),
                         "status": "failed"
                     })
+                
+                if control.checkpoint_due():
+                    await save_checkpoint(i + 1)
             
-            # Update job completion
-            job.status = ResearchJobStatus.COMPLETED
-            job.progress_percentage = 100
-            job.completed_at = datetime.utcnow()
-            job.current_step = "Downloads completed"
-            job.result_data = json.dumps(results)
+            manifest = await results.close(summary={
+                "successful_downloads": results.total - failed,
+                "failed_downloads": failed,
+            })
             
-            await db.commit()
+            # Update job completion, unless the job was cancelled or taken over
+            if not await control.complete(
+                progress_percentage=100,
+                completed_at=datetime.utcnow(),
+                current_step="Downloads completed",
+                result_data=manifest,
+            ):
+                logger.info(f"Download job {job_id} finished after it was cancelled or its lease was lost")
+                return
             
-            logger.info(f"Completed download job {job_id} with {len(results)} results")
+            logger.info(f"Completed download job {job_id} with {results.total} results")
             
         except Exception as e:
             logger.error(f"Failed to process download job {job_id}: {e}")
-            
-            # Update job with error
-            try:
-                job.status = ResearchJobStatus.FAILED
-                job.error_message = str(e)
-                job.current_step = "Job failed"
-                await db.commit()
-            except Exception as commit_error:
-                logger.error(f"Failed to update job status: {commit_error}")
+            # The job runner records the failure and retries while attempts remain
+            raise
+    
+    async def run_job(self, job: ResearchJob) -> None:
+        """Run a download job leased by the job runner."""
+        # Single downloads store one configuration, batches a list of them
+        downloads = job.input_data if isinstance(job.input_data, list) else [job.input_data]
+        async with AsyncSessionLocal() as db:
+            await self.process_download_job(job.id, downloads, db)
 
 
 # Service instance
 social_media_service = SocialMediaService()
+job_runner.register(ResearchJobType.SOCIAL_MEDIA_ANALYSIS, social_media_service.run_job)
 
 # API Endpoints
 @router.get("/platforms", response_model=List[PlatformInfoResponse])
+@cache.cached(ttl=settings.CACHE_STATIC_TTL)
 async def get_supported_platforms() -> List[PlatformInfoResponse]:
     """
     Get list of supported social media platforms and their capabilities.
@@ -406,7 +449,6 @@ async def get_supported_platforms() -> List[PlatformInfoResponse]:
 @router.post("/download", response_model=SocialMediaJobResponse)
 async def download_social_media_content(
     request: SocialMediaDownloadRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> SocialMediaJobResponse:
@@ -436,7 +478,8 @@ async def download_social_media_content(
             job_type=ResearchJobType.SOCIAL_MEDIA_ANALYSIS,
             job_name=f"Download: {request.platform} - {request.url}",
             status=ResearchJobStatus.PENDING,
-            input_data=json.dumps(job_data),
+            input_data=job_data,
+            priority=PRIORITY_NORMAL,
             user_id=current_user.id
         )
         
@@ -444,13 +487,8 @@ async def download_social_media_content(
         await db.commit()
         await db.refresh(job)
         
-        # Start background processing
-        background_tasks.add_task(
-            social_media_service.process_download_job,
-            job.id,
-            [job_data],
-            db
-        )
+        # Queued for the job runner
+        job_runner.notify()
         
         logger.info(f"Started social media download job {job.id} for {request.platform}: {request.url}")
         
@@ -462,7 +500,7 @@ async def download_social_media_content(
             current_step=job.current_step,
             started_at=job.started_at,
             estimated_completion=None,
-            message="Download job started successfully"
+            message="Download job queued successfully"
         )
         
     except Exception as e:
@@ -476,7 +514,6 @@ async def download_social_media_content(
 @router.post("/download/batch", response_model=SocialMediaJobResponse)
 async def download_batch_social_media(
     request: BatchSocialMediaRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> SocialMediaJobResponse:
@@ -504,7 +541,8 @@ async def download_batch_social_media(
             job_type=ResearchJobType.SOCIAL_MEDIA_ANALYSIS,
             job_name=f"Batch Download: {len(request.downloads)} items from {platform_str}",
             status=ResearchJobStatus.PENDING,
-            input_data=json.dumps(job_data),
+            input_data=job_data,
+            priority=PRIORITY_LOW,
             user_id=current_user.id
         )
         
@@ -512,13 +550,8 @@ async def download_batch_social_media(
         await db.commit()
         await db.refresh(job)
         
-        # Start background processing
-        background_tasks.add_task(
-            social_media_service.process_download_job,
-            job.id,
-            job_data,
-            db
-        )
+        # Queued for the job runner
+        job_runner.notify()
         
         logger.info(f"Started batch download job {job.id} for {len(request.downloads)} items")
         
@@ -530,7 +563,7 @@ async def download_batch_social_media(
             current_step=job.current_step,
             started_at=job.started_at,
             estimated_completion=None,
-            message=f"Batch download job started for {len(request.downloads)} items"
+            message=f"Batch download job queued for {len(request.downloads)} items"
         )
         
     except Exception as e:
@@ -544,7 +577,7 @@ async def download_batch_social_media(
 @router.get("/jobs/{job_id}/status", response_model=SocialMediaJobResponse)
 async def get_download_job_status(
     job_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ) -> SocialMediaJobResponse:
     """
@@ -568,24 +601,23 @@ async def get_download_job_status(
                 detail="Download job not found"
             )
         
+        # Progress is written to the database periodically; prefer the live snapshot
+        live = await job_service.get_progress(job.id) or {}
+        
         # Extract platform from job name or input data
         platform = "unknown"
-        if job.input_data:
-            try:
-                input_data = json.loads(job.input_data)
-                if isinstance(input_data, list) and input_data:
-                    platform = input_data[0].get('platform', 'unknown')
-                elif isinstance(input_data, dict):
-                    platform = input_data.get('platform', 'unknown')
-            except json.JSONDecodeError:
-                pass
+        input_data = job.input_data
+        if isinstance(input_data, list) and input_data:
+            platform = input_data[0].get('platform', 'unknown')
+        elif isinstance(input_data, dict):
+            platform = input_data.get('platform', 'unknown')
         
         return SocialMediaJobResponse(
             job_id=job.id,
             platform=platform,
             status=job.status,
-            progress_percentage=job.progress_percentage,
-            current_step=job.current_step,
+            progress_percentage=live.get("progress_percentage", job.progress_percentage),
+            current_step=live.get("current_step", job.current_step),
             started_at=job.started_at,
             estimated_completion=job.estimated_completion,
             message=f"Job status: {job.status}"
@@ -601,16 +633,65 @@ async def get_download_job_status(
         )
 
 
+@router.get("/jobs/{job_id}/events")
+async def stream_download_job_events(
+    job_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Stream progress of a social media download job as Server-Sent Events.
+    
+    Sends a ``progress`` event with the job's status, progress_percentage
+    and current_step on every change, and ends once the job completes,
+    fails or is cancelled.
+    
+    - **job_id**: ID of the download job
+    """
+    result = await db.execute(
+        select(ResearchJob).where(
+            ResearchJob.id == job_id,
+            ResearchJob.user_id == current_user.id,
+            ResearchJob.job_type == ResearchJobType.SOCIAL_MEDIA_ANALYSIS
+        )
+    )
+    job = result.scalar_one_or_none()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Download job not found"
+        )
+    
+    initial = {
+        "job_id": job.id,
+        "status": job.status,
+        "progress_percentage": job.progress_percentage,
+        "current_step": job.current_step,
+    }
+    return StreamingResponse(
+        job_service.progress_events(job.id, initial),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/jobs/{job_id}/results")
 async def get_download_job_results(
     job_id: int,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-) -> dict:
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of results to return"),
+    stream: bool = Query(False, description="Stream all results from offset as NDJSON")
+):
     """
     Get the results of a completed social media download job.
     
     - **job_id**: ID of the download job
+    - **offset**: Number of results to skip
+    - **limit**: Maximum number of results to return
+    - **stream**: Stream results as NDJSON instead of returning one page
     """
     try:
         result = await db.execute(
@@ -634,21 +715,31 @@ async def get_download_job_results(
                 detail=f"Job is not completed. Current status: {job.status}"
             )
         
-        # Parse results
-        results = []
-        if job.result_data:
-            try:
-                results = json.loads(job.result_data)
-            except json.JSONDecodeError:
-                logger.error(f"Failed to parse results for job {job_id}")
+        if stream:
+            return StreamingResponse(
+                result_store.stream_results(job.result_data, offset),
+                media_type="application/x-ndjson"
+            )
+        
+        if is_manifest(job.result_data):
+            summary = job.result_data["summary"]
+        else:
+            # Jobs from before the result store keep their results inline
+            legacy = job.result_data or []
+            failed = len([r for r in legacy if r.get("status") == "failed"])
+            summary = {"successful_downloads": len(legacy) - failed, "failed_downloads": failed}
+        
+        results = await result_store.read_results(job.result_data, offset, limit)
         
         return {
             "job_id": job.id,
             "status": job.status,
             "completed_at": job.completed_at.isoformat() if job.completed_at else None,
-            "total_downloads": len(results),
-            "successful_downloads": len([r for r in results if r.get("status") != "failed"]),
-            "failed_downloads": len([r for r in results if r.get("status") == "failed"]),
+            "total_downloads": result_count(job.result_data),
+            "successful_downloads": summary.get("successful_downloads", 0),
+            "failed_downloads": summary.get("failed_downloads", 0),
+            "offset": offset,
+            "limit": limit,
             "results": results
         }
         
@@ -664,7 +755,7 @@ async def get_download_job_results(
 
 @router.get("/jobs")
 async def get_download_jobs(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(50, ge=1, le=100, description="Number of records to return"),
@@ -698,15 +789,11 @@ async def get_download_jobs(
         for job in jobs:
             # Extract platform from input data
             platform_name = "unknown"
-            if job.input_data:
-                try:
-                    input_data = json.loads(job.input_data)
-                    if isinstance(input_data, list) and input_data:
-                        platform_name = input_data[0].get('platform', 'unknown')
-                    elif isinstance(input_data, dict):
-                        platform_name = input_data.get('platform', 'unknown')
-                except json.JSONDecodeError:
-                    pass
+            input_data = job.input_data
+            if isinstance(input_data, list) and input_data:
+                platform_name = input_data[0].get('platform', 'unknown')
+            elif isinstance(input_data, dict):
+                platform_name = input_data.get('platform', 'unknown')
             
             # Apply platform filter
             if platform and platform_name != platform:
@@ -734,6 +821,77 @@ async def get_download_jobs(
         )
 
 
+@router.post("/jobs/{job_id}/resume", response_model=SocialMediaJobResponse)
+async def resume_download_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> SocialMediaJobResponse:
+    """
+    Resume a cancelled or failed download job from its last checkpoint.
+    
+    Items downloaded before the checkpoint are kept and not downloaded again.
+    
+    - **job_id**: ID of the download job to resume
+    """
+    try:
+        result = await db.execute(
+            select(ResearchJob).where(
+                ResearchJob.id == job_id,
+                ResearchJob.user_id == current_user.id,
+                ResearchJob.job_type == ResearchJobType.SOCIAL_MEDIA_ANALYSIS
+            )
+        )
+        job = result.scalar_one_or_none()
+        
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Download job not found"
+            )
+        
+        if job.status not in [ResearchJobStatus.CANCELLED, ResearchJobStatus.FAILED]:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Only cancelled or failed jobs can be resumed (job is {job.status})"
+            )
+        
+        if not await job_runner.resume(job.id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Job is still stopping; try again shortly"
+            )
+        
+        logger.info(f"Resumed download job {job_id} for user {current_user.username}")
+        
+        platform = "unknown"
+        input_data = job.input_data
+        if isinstance(input_data, list) and input_data:
+            platform = input_data[0].get('platform', 'unknown')
+        elif isinstance(input_data, dict):
+            platform = input_data.get('platform', 'unknown')
+        
+        return SocialMediaJobResponse(
+            job_id=job.id,
+            platform=platform,
+            status=ResearchJobStatus.PENDING,
+            progress_percentage=job.progress_percentage,
+            current_step="Queued to resume",
+            started_at=job.started_at,
+            estimated_completion=None,
+            message="Download job queued to resume"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to resume download job {job_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to resume job: {str(e)}"
+        )
+
+
 @router.delete("/jobs/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def cancel_download_job(
     job_id: int,
@@ -763,12 +921,22 @@ async def cancel_download_job(
         
         # If job is running, mark as cancelled. If completed/failed, delete it.
         if job.status in [ResearchJobStatus.PENDING, ResearchJobStatus.IN_PROGRESS]:
-            job.status = ResearchJobStatus.CANCELLED
-            job.current_step = "Job cancelled by user"
-            await db.commit()
+            await job_service.update_job(
+                job.id,
+                ResearchJob.status.in_([ResearchJobStatus.PENDING, ResearchJobStatus.IN_PROGRESS]),
+                status=ResearchJobStatus.CANCELLED,
+                current_step="Job cancelled by user",
+            )
+            # A running job stops after its current item and checkpoints; jobs
+            # running in another process notice at their next heartbeat
+            job_service.cancel(job.id)
         else:
+            result_data = job.result_data
+            checkpoint = job.checkpoint
             await db.delete(job)
             await db.commit()
+            await release_job_results(db, result_data)
+            await release_job_results(db, checkpoint_results(checkpoint))
         
         logger.info(f"Cancelled/deleted download job {job_id} for user {current_user.username}")
         
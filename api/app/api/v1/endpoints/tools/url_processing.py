@@ -2,6 +2,7 @@
 URL processing API endpoints for web content analysis and archival.
 """
 
+from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from pydantic import BaseModel, HttpUrl, validator
@@ -13,7 +14,9 @@ from app.api.v1.endpoints.auth import get_current_user
 from app.core.logging import get_logger
 from app.models.user import User
 from app.models.research_tool import ProcessedUrl
+from app.services.domain_reputation import domain_reputation
 from app.services.url_service import url_service
+from app.services.wayback_archiver import wayback_archiver
 
 logger = get_logger(__name__)
 
@@ -25,6 +28,8 @@ class UrlProcessRequest(BaseModel):
     url: str
     force_refresh: bool = False
     archive_with_wayback: bool = False
+    metadata_only: bool = False
+    count_words: bool = False
     
     @validator('url')
     def validate_url(cls, v):
@@ -40,6 +45,8 @@ class BatchUrlProcessRequest(BaseModel):
     urls: List[str]
     force_refresh: bool = False
     archive_with_wayback: bool = False
+    metadata_only: bool = False
+    count_words: bool = False
     
     @validator('urls')
     def validate_urls(cls, v):
@@ -71,6 +78,9 @@ class ProcessedUrlResponse(BaseModel):
     domain_reputation: Optional[str]
     processing_status: str
     error_message: Optional[str]
+    error_class: Optional[str] = None
+    retry_after: Optional[datetime] = None
+    fetched_at: Optional[datetime] = None
     created_at: str
     updated_at: str
     
@@ -78,6 +88,66 @@ class ProcessedUrlResponse(BaseModel):
         from_attributes = True
 
 
+class ArchiveRequest(BaseModel):
+    """Request model for queueing URLs for Wayback Machine archival."""
+    urls: List[str]
+    
+    @validator('urls')
+    def validate_urls(cls, v):
+        """Validate URLs list."""
+        if len(v) > 1000:
+            raise ValueError("Maximum 1000 URLs allowed per request")
+        if not v:
+            raise ValueError("At least one URL is required")
+        return v
+
+
+class ArchiveEntryResponse(BaseModel):
+    """Response model for one URL's archival state."""
+    url: str
+    status: str
+    attempts: int
+    wayback_url: Optional[str]
+    error: Optional[str]
+    reused: bool
+
+
+class ArchiveBatchResponse(BaseModel):
+    """Response model for the progress of queued archival requests."""
+    batch_id: str
+    created_at: datetime
+    total: int
+    pending: int
+    archived: int
+    failed: int
+    done: bool
+    urls: List[ArchiveEntryResponse]
+
+
+class DomainReputationRequest(BaseModel):
+    """Request model for batch domain reputation scoring."""
+    domains: List[str]
+    
+    @validator('domains')
+    def validate_domains(cls, v):
+        """Validate domains list."""
+        if len(v) > 1000:
+            raise ValueError("Maximum 1000 domains allowed per request")
+        if len(v) == 0:
+            raise ValueError("At least one domain is required")
+        return v
+
+
+class DomainReputationResponse(BaseModel):
+    """Response model for a domain's reputation."""
+    domain: str
+    reputation: str
+    registrable_domain: Optional[str]
+    public_suffix: Optional[str]
+    matched_entry: Optional[str]
+    source: str
+
+
 class UrlStatsResponse(BaseModel):
     """Response model for URL processing statistics."""
     total_processed: int
@@ -100,8 +170,10 @@ async def process_url(
     Process a single URL and extract metadata.
     
     - **url**: URL to process and analyze
-    - **force_refresh**: Force re-processing even if URL was previously processed
-    - **archive_with_wayback**: Archive URL with Wayback Machine
+    - **force_refresh**: Revalidate even if the stored copy is still fresh
+    - **archive_with_wayback**: Queue the URL for Wayback Machine archival
+    - **metadata_only**: Stream the page and parse only its head
+    - **count_words**: With metadata_only, also count words in the body
     """
     logger.info(f"Processing URL: {request.url} for user {current_user.username}")
     
@@ -111,16 +183,14 @@ async def process_url(
             url=request.url,
             db=db,
             user=current_user,
-            force_refresh=request.force_refresh
+            force_refresh=request.force_refresh,
+            metadata_only=request.metadata_only,
+            count_words=request.count_words
         )
         
-        # Archive with Wayback Machine if requested
+        # Queue for Wayback Machine archival; wayback_url is set once captured
         if request.archive_with_wayback and processed_url.processing_status == "completed":
-            wayback_url = await url_service.archive_with_wayback(request.url)
-            if wayback_url:
-                processed_url.wayback_url = wayback_url
-                await db.commit()
-                await db.refresh(processed_url)
+            await wayback_archiver.submit([processed_url.url], current_user.id, db)
         
         return ProcessedUrlResponse.from_orm(processed_url)
         
@@ -142,8 +212,10 @@ async def process_urls_batch(
     Process multiple URLs in batch.
     
     - **urls**: List of URLs to process (max 100)
-    - **force_refresh**: Force re-processing for all URLs
-    - **archive_with_wayback**: Archive all URLs with Wayback Machine
+    - **force_refresh**: Revalidate all URLs even if stored copies are still fresh
+    - **archive_with_wayback**: Queue all URLs for Wayback Machine archival
+    - **metadata_only**: Stream each page and parse only its head
+    - **count_words**: With metadata_only, also count words in the body
     """
     logger.info(f"Batch processing {len(request.urls)} URLs for user {current_user.username}")
     
@@ -153,20 +225,18 @@ async def process_urls_batch(
             urls=request.urls,
             db=db,
             user=current_user,
-            force_refresh=request.force_refresh
+            force_refresh=request.force_refresh,
+            metadata_only=request.metadata_only,
+            count_words=request.count_words
         )
         
-        # Archive with Wayback Machine if requested
+        # Queue for Wayback Machine archival; wayback_url is set once captured
         if request.archive_with_wayback:
-            for processed_url in processed_urls:
-                if processed_url.processing_status == "completed":
-                    wayback_url = await url_service.archive_with_wayback(processed_url.url)
-                    if wayback_url:
-                        processed_url.wayback_url = wayback_url
-            
-            await db.commit()
-            for processed_url in processed_urls:
-                await db.refresh(processed_url)
+            await wayback_archiver.submit(
+                [url.url for url in processed_urls if url.processing_status == "completed"],
+                current_user.id,
+                db
+            )
         
         return [ProcessedUrlResponse.from_orm(url) for url in processed_urls]
         
@@ -299,59 +369,75 @@ async def delete_processed_url(
         )
 
 
-@router.post("/archive/{url_id}")
+@router.post("/archive", response_model=ArchiveBatchResponse, status_code=status.HTTP_202_ACCEPTED)
+async def archive_urls_wayback(
+    request: ArchiveRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> ArchiveBatchResponse:
+    """
+    Queue URLs for Wayback Machine archival.
+    
+    URLs already queued or archived within ``WAYBACK_RECENT_SECONDS`` are
+    not submitted again. Poll ``/archive/jobs/{batch_id}`` on the same API
+    process for progress.
+    
+    - **urls**: URLs to archive (max 1000)
+    """
+    batch = await wayback_archiver.submit(request.urls, current_user.id, db)
+    return ArchiveBatchResponse(**batch.to_dict())
+
+
+@router.get("/archive/jobs/{batch_id}", response_model=ArchiveBatchResponse)
+async def get_archive_status(
+    batch_id: str,
+    current_user: User = Depends(get_current_user)
+) -> ArchiveBatchResponse:
+    """
+    Get the progress of queued Wayback Machine archival requests.
+    
+    Batch status is kept in memory by the API process that queued the
+    URLs, so with several API processes this must reach the same one
+    (sticky sessions); other processes answer 404.
+    
+    - **batch_id**: ID returned when the URLs were queued
+    """
+    batch = wayback_archiver.get_batch(batch_id)
+    if batch is None or batch.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Archival batch not found"
+        )
+    return ArchiveBatchResponse(**batch.to_dict())
+
+
+@router.post("/archive/{url_id}", response_model=ArchiveBatchResponse, status_code=status.HTTP_202_ACCEPTED)
 async def archive_url_wayback(
     url_id: int,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
-) -> dict:
+) -> ArchiveBatchResponse:
     """
-    Archive a processed URL with Wayback Machine.
+    Queue a processed URL for Wayback Machine archival.
     
     - **url_id**: ID of the processed URL to archive
     """
-    try:
-        result = await db.execute(
-            select(ProcessedUrl).where(
-                ProcessedUrl.id == url_id,
-                ProcessedUrl.user_id == current_user.id
-            )
+    result = await db.execute(
+        select(ProcessedUrl).where(
+            ProcessedUrl.id == url_id,
+            ProcessedUrl.user_id == current_user.id
         )
-        processed_url = result.scalar_one_or_none()
-        
-        if not processed_url:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Processed URL not found"
-            )
-        
-        wayback_url = await url_service.archive_with_wayback(processed_url.url)
-        
-        if wayback_url:
-            processed_url.wayback_url = wayback_url
-            await db.commit()
-            await db.refresh(processed_url)
-            
-            return {
-                "success": True,
-                "wayback_url": wayback_url,
-                "message": "URL successfully archived with Wayback Machine"
-            }
-        else:
-            return {
-                "success": False,
-                "wayback_url": None,
-                "message": "Failed to archive URL with Wayback Machine"
-            }
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Failed to archive URL {url_id}: {e}")
+    )
+    processed_url = result.scalar_one_or_none()
+    
+    if not processed_url:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to archive URL: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Processed URL not found"
         )
+    
+    batch = await wayback_archiver.submit([processed_url.url], current_user.id, db)
+    return ArchiveBatchResponse(**batch.to_dict())
 
 
 @router.get("/stats", response_model=UrlStatsResponse)
@@ -486,4 +572,18 @@ async def get_processed_domains(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to retrieve domains: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/reputation", response_model=List[DomainReputationResponse])
+async def score_domain_reputation(
+    request: DomainReputationRequest,
+    current_user: User = Depends(get_current_user)
+) -> List[DomainReputationResponse]:
+    """
+    Score domains against the reputation lists.
+    
+    - **domains**: Domain names, host:port values or URLs (max 1000)
+    """
+    scores = domain_reputation.score_domains(request.domains)
+    return [DomainReputationResponse(**score.to_dict()) for score in scores]
\ No newline at end of file
@@ -2,20 +2,30 @@
 Web scraping API endpoints for content extraction and analysis.
 """
 
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from typing import List, Optional, Dict, Any, Tuple
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, validator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 import asyncio
-import json
+import re
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_db, get_read_db
+from app.core.http_client import http_clients
+from app.core.result_store import is_manifest, result_count, result_store
+from app.core.urls import with_scheme
 from app.api.v1.endpoints.auth import get_current_user
 from app.core.logging import get_logger
 from app.models.user import User
 from app.models.research_tool import ResearchJob, ResearchJobStatus, ResearchJobType
+from app.services.content_extractor import content_type_charset, extract_content
+from app.services.crawler import CrawlConfig, Crawler, CrawlPage
+from app.services.job_runner import PRIORITY_LOW, PRIORITY_NORMAL, job_runner
+from app.services.job_service import job_service
+from app.services.result_gc import checkpoint_results, release_job_results
 
 logger = get_logger(__name__)
 
@@ -32,6 +42,12 @@ class ScrapingRequest(BaseModel):
     max_depth: int = 1
     delay_seconds: float = 1.0
     user_agent: Optional[str] = None
+    max_pages: Optional[int] = None
+    max_bytes: Optional[int] = None
+    include_patterns: List[str] = []
+    exclude_patterns: List[str] = []
+    same_host: bool = True
+    respect_robots: bool = True
     
     @validator('max_depth')
     def validate_max_depth(cls, v):
@@ -46,6 +62,29 @@ class ScrapingRequest(BaseModel):
         if v < 0.5 or v > 10.0:
             raise ValueError("Delay must be between 0.5 and 10.0 seconds")
         return v
+    
+    @validator('max_pages')
+    def validate_max_pages(cls, v):
+        """Validate the page limit."""
+        if v is not None and (v < 1 or v > settings.CRAWL_MAX_PAGES):
+            raise ValueError(f"Max pages must be between 1 and {settings.CRAWL_MAX_PAGES}")
+        return v
+    
+    @validator('max_bytes')
+    def validate_max_bytes(cls, v):
+        """Validate the byte limit."""
+        if v is not None and (v < 1 or v > settings.CRAWL_MAX_BYTES):
+            raise ValueError(f"Max bytes must be between 1 and {settings.CRAWL_MAX_BYTES}")
+        return v
+    
+    @validator('include_patterns', 'exclude_patterns', each_item=True)
+    def validate_patterns(cls, v):
+        """Validate URL patterns."""
+        try:
+            re.compile(v)
+        except re.error as e:
+            raise ValueError(f"Invalid URL pattern {v!r}: {e}")
+        return v
 
 
 class BatchScrapingRequest(BaseModel):
@@ -56,6 +95,7 @@ class BatchScrapingRequest(BaseModel):
     extract_links: bool = False
     follow_redirects: bool = True
     delay_seconds: float = 1.0
+    respect_robots: bool = True
     
     @validator('urls')
     def validate_urls(cls, v):
@@ -113,85 +153,20 @@ class WebScrapingService:
         """
         Scrape a single URL.
         """
-        import httpx
-        from bs4 import BeautifulSoup
-        import urllib.parse
-        
         try:
-            headers = {
-                "User-Agent": user_agent or "OmniCore Intelligence Analysis Platform/1.0"
-            }
+            url = with_scheme(url)
+            # Shared pooled client; the default User-Agent comes from HTTP_USER_AGENT
+            client = http_clients.get("scraping")
+            headers = {"User-Agent": user_agent} if user_agent else None
+            response = await client.get(url, headers=headers, follow_redirects=True)
+            response.raise_for_status()
             
-            async with httpx.AsyncClient(timeout=30.0, headers=headers) as client:
-                response = await client.get(url, follow_redirects=True)
-                response.raise_for_status()
-                
-                # Parse content
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Extract basic content
-                title = soup.find('title')
-                title_text = title.get_text().strip() if title else None
-                
-                # Extract main text content
-                # Remove script and style elements
-                for script in soup(["script", "style"]):
-                    script.decompose()
-                
-                text_content = soup.get_text()
-                # Clean up whitespace
-                lines = (line.strip() for line in text_content.splitlines())
-                chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                content = '\n'.join(chunk for chunk in chunks if chunk)
-                
-                result = {
-                    "url": url,
-                    "status_code": response.status_code,
-                    "title": title_text,
-                    "content": content[:10000],  # Limit content size
-                    "content_length": len(content),
-                    "headers": dict(response.headers),
-                }
-                
-                # Extract images if requested
-                if extract_images:
-                    images = []
-                    for img in soup.find_all('img'):
-                        src = img.get('src')
-                        if src:
-                            # Convert relative URLs to absolute
-                            absolute_url = urllib.parse.urljoin(url, src)
-                            images.append(absolute_url)
-                    result["images"] = images[:100]  # Limit to 100 images
-                
-                # Extract links if requested
-                if extract_links:
-                    links = []
-                    for link in soup.find_all('a'):
-                        href = link.get('href')
-                        if href:
-                            # Convert relative URLs to absolute
-                            absolute_url = urllib.parse.urljoin(url, href)
-                            links.append({
-                                "url": absolute_url,
-                                "text": link.get_text().strip()
-                            })
-                    result["links"] = links[:200]  # Limit to 200 links
-                
-                # Extract metadata
-                metadata = {}
-                
-                # Meta tags
-                for meta in soup.find_all('meta'):
-                    name = meta.get('name') or meta.get('property')
-                    content = meta.get('content')
-                    if name and content:
-                        metadata[name] = content
-                
-                result["metadata"] = metadata
-                
-                return result
-                
+            result, _ = self.parse_page(
+                url, response.status_code, dict(response.headers), response.content,
+                extract_images=extract_images, extract_links=extract_links
+            )
+            return result
+        
         except Exception as e:
             logger.error(f"Failed to scrape URL {url}: {e}")
             return {
@@ -200,6 +175,70 @@ class WebScrapingService:
                 "status": "failed"
             }
     
+    def parse_page(
+        self,
+        url: str,
+        status_code: int,
+        headers: Dict[str, str],
+        content: bytes,
+        extract_images: bool = False,
+        extract_links: bool = False
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Extract title, main text, byline, publish date, metadata and
+        optionally images and links from a page.
+        
+        The main article text is found by the content extractor, which
+        leaves out navigation and other boilerplate.
+        
+        Returns:
+            Tuple: (scrape result, absolute URLs of every link on the page)
+        """
+        extracted = extract_content(
+            content, url, encoding=content_type_charset(headers.get("content-type"))
+        )
+        text = extracted.text
+        
+        result = {
+            "url": url,
+            "status_code": status_code,
+            "title": extracted.title,
+            "byline": extracted.byline,
+            "published_at": extracted.published,
+            "content": text[:10000],  # Limit content size
+            "content_length": len(text),
+            "headers": headers,
+        }
+        
+        # Extract images if requested
+        if extract_images:
+            result["images"] = extracted.images[:100]  # Limit to 100 images
+        
+        # Extract links if requested
+        if extract_links:
+            result["links"] = [
+                {"url": href, "text": text} for href, text in extracted.links[:200]  # Limit to 200 links
+            ]
+        
+        result["metadata"] = extracted.metadata
+        
+        # The crawler follows every link, including navigation
+        return result, [href for href, _ in extracted.links]
+    
+    def crawl_config(self, options: Dict[str, Any]) -> CrawlConfig:
+        """Build crawl limits and filters from a job's input data."""
+        return CrawlConfig(
+            max_depth=options.get('max_depth', 1),
+            max_pages=options.get('max_pages'),
+            max_bytes=options.get('max_bytes'),
+            per_host_delay=options.get('delay_seconds', 1.0),
+            include_patterns=options.get('include_patterns') or [],
+            exclude_patterns=options.get('exclude_patterns') or [],
+            same_host=options.get('same_host', True),
+            respect_robots=options.get('respect_robots', True),
+            user_agent=options.get('user_agent'),
+        )
+    
     async def process_scraping_job(
         self,
         job_id: int,
@@ -209,6 +248,10 @@ class WebScrapingService:
     ):
         """
         Process a scraping job in the background.
+        
+        The crawl state and results so far are checkpointed periodically, so
+        a resumed or retried job continues without refetching finished
+        pages. Cancellation stops the crawl after the pages being fetched.
         """
         try:
             # Get job
@@ -221,77 +264,155 @@ class WebScrapingService:
                 logger.error(f"Scraping job {job_id} not found")
                 return
             
-            # Update job status
-            job.status = ResearchJobStatus.IN_PROGRESS
-            job.started_at = datetime.utcnow()
-            job.current_step = "Starting scraping process"
-            await db.commit()
+            # The job runner has already marked the job as in progress
+            checkpoint = job.checkpoint or {}
+            await job_service.update_job(
+                job_id,
+                current_step="Resuming scraping process" if checkpoint else "Starting scraping process"
+            )
             
-            results = []
-            total_urls = len(urls)
+            control = job_service.control(job_id)
+            results = result_store.writer(resume=checkpoint.get("results"))
+            failed = checkpoint.get("failed", 0)
+            crawler = Crawler(self.crawl_config(options))
+            # Pages arrive from concurrent fetches; the writer flushes one segment at a time
+            write_lock = asyncio.Lock()
+            extract_images = options.get('extract_images', False)
+            extract_links = options.get('extract_links', False)
             
-            for i, url in enumerate(urls):
-                try:
-                    # Update progress
-                    job.progress_percentage = int((i / total_urls) * 100)
-                    job.current_step = f"Scraping {url}"
-                    await db.commit()
-                    
-                    # Scrape URL
-                    result = await self.scrape_url(
-                        url=url,
-                        options=options,
-                        extract_images=options.get('extract_images', False),
-                        extract_links=options.get('extract_links', False),
-                        user_agent=options.get('user_agent')
-                    )
-                    
-                    results.append(result)
-                    
-                    # Add delay between requests
-                    delay = options.get('delay_seconds', 1.0)
-                    await asyncio.sleep(delay)
-                    
-                except Exception as e:
-                    logger.error(f"Failed to scrape URL {url}: {e}")
-                    results.append({
-                        "url": url,
-                        "error": str(e),
-                        "status": "failed"
-                    })
+            def summary(crawl: Dict[str, Any]) -> Dict[str, Any]:
+                return {
+                    "successful_scrapes": results.total - failed,
+                    "failed_scrapes": failed,
+                    "bytes_fetched": crawl["bytes"],
+                    "stop_reason": crawl.get("stop_reason"),
+                }
             
-            # Update job completion
-            job.status = ResearchJobStatus.COMPLETED
-            job.progress_percentage = 100
-            job.completed_at = datetime.utcnow()
-            job.current_step = "Scraping completed"
-            job.result_data = json.dumps(results)
+            async def save_checkpoint(
+                *conditions: Any,
+                page: Optional[CrawlPage] = None,
+                links: Optional[List[str]] = None,
+            ) -> None:
+                crawl = crawler.checkpoint(page, links or ())
+                await control.save_checkpoint({
+                    "results": await results.checkpoint(summary(crawl["stats"])),
+                    "crawl": crawl,
+                    "failed": failed,
+                }, *conditions)
             
-            await db.commit()
+            async def on_page(page: CrawlPage) -> List[str]:
+                nonlocal failed
+                links: List[str] = []
+                entry: Dict[str, Any]
+                page_failed = False
+                if page.skipped or page.error:
+                    page_failed = True
+                    entry = {
+                        "url": page.url,
+                        "depth": page.depth,
+                        "error": page.skipped or page.error,
+                        "status": "skipped" if page.skipped else "failed"
+                    }
+                elif not page.is_html:
+                    entry = {
+                        "url": page.url,
+                        "depth": page.depth,
+                        "status_code": page.status_code,
+                        "headers": page.headers,
+                        "content_length": len(page.content),
+                    }
+                else:
+                    try:
+                        result, links = self.parse_page(
+                            page.url, page.status_code, page.headers, page.content,
+                            extract_images=extract_images, extract_links=extract_links
+                        )
+                        result["depth"] = page.depth
+                        if page.referrer:
+                            result["referrer"] = page.referrer
+                        if page.truncated:
+                            result["truncated"] = True
+                        entry = result
+                    except Exception as e:
+                        logger.error(f"Failed to parse scraped page {page.url}: {e}")
+                        page_failed = True
+                        entry = {
+                            "url": page.url,
+                            "depth": page.depth,
+                            "error": str(e),
+                            "status": "failed"
+                        }
+                
+                async with write_lock:
+                    await results.append(entry)
+                    failed += page_failed
+                    done = results.total
+                    if control.checkpoint_due():
+                        await save_checkpoint(page=page, links=links)
+                
+                if control.cancelled:
+                    return links
+                
+                # Discovered links grow the total, so progress is against what is known so far
+                await job_service.report_progress(
+                    job_id,
+                    progress_percentage=min(99, int(done / (done + crawler.pending) * 100)),
+                    current_step=f"Scraped {done} pages ({page.url})",
+                )
+                return links
             
-            logger.info(f"Completed scraping job {job_id} with {len(results)} results")
+            async def stop_when_cancelled() -> None:
+                await control.wait_cancelled()
+                crawler.stop("cancelled")
+            
+            watcher = asyncio.create_task(stop_when_cancelled())
+            try:
+                crawl = await crawler.run(urls, on_page, resume=checkpoint.get("crawl"))
+            finally:
+                watcher.cancel()
+            
+            if control.cancelled:
+                # Keep the progress for POST /jobs/{id}/resume, unless the job
+                # was taken over by another runner rather than cancelled
+                await save_checkpoint(ResearchJob.status == ResearchJobStatus.CANCELLED)
+                logger.info(f"Stopped cancelled scraping job {job_id} after {results.total} results")
+                return
+            
+            manifest = await results.close(summary=summary(crawl))
+            
+            # Update job completion, unless the job was cancelled or taken over
+            if not await control.complete(
+                progress_percentage=100,
+                completed_at=datetime.utcnow(),
+                current_step="Scraping completed",
+                result_data=manifest,
+            ):
+                logger.info(f"Scraping job {job_id} finished after it was cancelled or its lease was lost")
+                return
+            
+            logger.info(f"Completed scraping job {job_id} with {results.total} results")
             
         except Exception as e:
             logger.error(f"Failed to process scraping job {job_id}: {e}")
-            
-            # Update job with error
-            try:
-                job.status = ResearchJobStatus.FAILED
-                job.error_message = str(e)
-                job.current_step = "Job failed"
-                await db.commit()
-            except Exception as commit_error:
-                logger.error(f"Failed to update job status: {commit_error}")
+            # The job runner records the failure and retries while attempts remain
+            raise
+    
+    async def run_job(self, job: ResearchJob) -> None:
+        """Run a scraping job leased by the job runner."""
+        options = job.input_data or {}
+        urls = options.get("urls") or [options["url"]]
+        async with AsyncSessionLocal() as db:
+            await self.process_scraping_job(job.id, urls, options, db)
 
 
 # Service instance
 scraping_service = WebScrapingService()
+job_runner.register(ResearchJobType.WEB_SCRAPING, scraping_service.run_job)
 
 # API Endpoints
 @router.post("/scrape", response_model=ScrapingJobResponse)
 async def scrape_url(
     request: ScrapingRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> ScrapingJobResponse:
@@ -303,7 +424,13 @@ async def scrape_url(
     - **extract_links**: Extract all links from the page
     - **follow_redirects**: Follow HTTP redirects
     - **max_depth**: Maximum depth for recursive scraping (1-5)
-    - **delay_seconds**: Delay between requests (0.5-10.0 seconds)
+    - **delay_seconds**: Delay between requests to the same host (0.5-10.0 seconds)
+    - **max_pages**: Stop after this many pages (default and cap: CRAWL_MAX_PAGES)
+    - **max_bytes**: Stop after this many response bytes (default and cap: CRAWL_MAX_BYTES)
+    - **include_patterns**: Only follow links matching one of these regexes
+    - **exclude_patterns**: Never follow links matching one of these regexes
+    - **same_host**: Only follow links to the starting URL's host
+    - **respect_robots**: Honour robots.txt rules and Crawl-delay
     """
     try:
         # Create scraping job
@@ -313,14 +440,22 @@ async def scrape_url(
             "extract_images": request.extract_images,
             "extract_links": request.extract_links,
             "delay_seconds": request.delay_seconds,
-            "user_agent": request.user_agent
+            "user_agent": request.user_agent,
+            "max_depth": request.max_depth,
+            "max_pages": request.max_pages,
+            "max_bytes": request.max_bytes,
+            "include_patterns": request.include_patterns,
+            "exclude_patterns": request.exclude_patterns,
+            "same_host": request.same_host,
+            "respect_robots": request.respect_robots
         }
         
         job = ResearchJob(
             job_type=ResearchJobType.WEB_SCRAPING,
             job_name=f"Scrape: {request.url}",
             status=ResearchJobStatus.PENDING,
-            input_data=json.dumps(job_data),
+            input_data=job_data,
+            priority=PRIORITY_NORMAL,
             user_id=current_user.id
         )
         
@@ -328,14 +463,8 @@ async def scrape_url(
         await db.commit()
         await db.refresh(job)
         
-        # Start background processing
-        background_tasks.add_task(
-            scraping_service.process_scraping_job,
-            job.id,
-            [request.url],
-            job_data,
-            db
-        )
+        # Queued for the job runner
+        job_runner.notify()
         
         logger.info(f"Started scraping job {job.id} for URL: {request.url}")
         
@@ -346,7 +475,7 @@ async def scrape_url(
             current_step=job.current_step,
             started_at=job.started_at,
             estimated_completion=None,
-            message="Scraping job started successfully"
+            message="Scraping job queued successfully"
         )
         
     except Exception as e:
@@ -360,7 +489,6 @@ async def scrape_url(
 @router.post("/scrape/batch", response_model=ScrapingJobResponse)
 async def scrape_urls_batch(
     request: BatchScrapingRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> ScrapingJobResponse:
@@ -370,7 +498,8 @@ async def scrape_urls_batch(
     - **urls**: List of URLs to scrape (max 50)
     - **extract_images**: Extract image URLs from pages
     - **extract_links**: Extract all links from pages
-    - **delay_seconds**: Delay between requests (0.5-10.0 seconds)
+    - **delay_seconds**: Delay between requests to the same host (0.5-10.0 seconds)
+    - **respect_robots**: Honour robots.txt rules and Crawl-delay
     """
     try:
         # Create batch scraping job
@@ -379,14 +508,16 @@ async def scrape_urls_batch(
             "options": request.options,
             "extract_images": request.extract_images,
             "extract_links": request.extract_links,
-            "delay_seconds": request.delay_seconds
+            "delay_seconds": request.delay_seconds,
+            "respect_robots": request.respect_robots
         }
         
         job = ResearchJob(
             job_type=ResearchJobType.WEB_SCRAPING,
             job_name=f"Batch Scrape: {len(request.urls)} URLs",
             status=ResearchJobStatus.PENDING,
-            input_data=json.dumps(job_data),
+            input_data=job_data,
+            priority=PRIORITY_LOW,
             user_id=current_user.id
         )
         
@@ -394,14 +525,8 @@ async def scrape_urls_batch(
         await db.commit()
         await db.refresh(job)
         
-        # Start background processing
-        background_tasks.add_task(
-            scraping_service.process_scraping_job,
-            job.id,
-            request.urls,
-            job_data,
-            db
-        )
+        # Queued for the job runner
+        job_runner.notify()
         
         estimated_completion = datetime.utcnow() + timedelta(
             seconds=len(request.urls) * request.delay_seconds + 60
@@ -416,7 +541,7 @@ async def scrape_urls_batch(
             current_step=job.current_step,
             started_at=job.started_at,
             estimated_completion=estimated_completion,
-            message=f"Batch scraping job started for {len(request.urls)} URLs"
+            message=f"Batch scraping job queued for {len(request.urls)} URLs"
         )
         
     except Exception as e:
@@ -430,7 +555,7 @@ async def scrape_urls_batch(
 @router.get("/jobs/{job_id}/status", response_model=ScrapingJobResponse)
 async def get_scraping_job_status(
     job_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ) -> ScrapingJobResponse:
     """
@@ -454,11 +579,14 @@ async def get_scraping_job_status(
                 detail="Scraping job not found"
             )
         
+        # Progress is written to the database periodically; prefer the live snapshot
+        live = await job_service.get_progress(job.id) or {}
+        
         return ScrapingJobResponse(
             job_id=job.id,
             status=job.status,
-            progress_percentage=job.progress_percentage,
-            current_step=job.current_step,
+            progress_percentage=live.get("progress_percentage", job.progress_percentage),
+            current_step=live.get("current_step", job.current_step),
             started_at=job.started_at,
             estimated_completion=job.estimated_completion,
             message=f"Job status: {job.status}"
@@ -474,16 +602,65 @@ async def get_scraping_job_status(
         )
 
 
+@router.get("/jobs/{job_id}/events")
+async def stream_scraping_job_events(
+    job_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Stream progress of a scraping job as Server-Sent Events.
+    
+    Sends a ``progress`` event with the job's status, progress_percentage
+    and current_step on every change, and ends once the job completes,
+    fails or is cancelled.
+    
+    - **job_id**: ID of the scraping job
+    """
+    result = await db.execute(
+        select(ResearchJob).where(
+            ResearchJob.id == job_id,
+            ResearchJob.user_id == current_user.id,
+            ResearchJob.job_type == ResearchJobType.WEB_SCRAPING
+        )
+    )
+    job = result.scalar_one_or_none()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scraping job not found"
+        )
+    
+    initial = {
+        "job_id": job.id,
+        "status": job.status,
+        "progress_percentage": job.progress_percentage,
+        "current_step": job.current_step,
+    }
+    return StreamingResponse(
+        job_service.progress_events(job.id, initial),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/jobs/{job_id}/results")
 async def get_scraping_job_results(
     job_id: int,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-) -> dict:
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of results to return"),
+    stream: bool = Query(False, description="Stream all results from offset as NDJSON")
+):
     """
     Get the results of a completed scraping job.
     
     - **job_id**: ID of the scraping job
+    - **offset**: Number of results to skip
+    - **limit**: Maximum number of results to return
+    - **stream**: Stream results as NDJSON instead of returning one page
     """
     try:
         result = await db.execute(
@@ -507,21 +684,31 @@ async def get_scraping_job_results(
                 detail=f"Job is not completed. Current status: {job.status}"
             )
         
-        # Parse results
-        results = []
-        if job.result_data:
-            try:
-                results = json.loads(job.result_data)
-            except json.JSONDecodeError:
-                logger.error(f"Failed to parse results for job {job_id}")
+        if stream:
+            return StreamingResponse(
+                result_store.stream_results(job.result_data, offset),
+                media_type="application/x-ndjson"
+            )
+        
+        if is_manifest(job.result_data):
+            summary = job.result_data["summary"]
+        else:
+            # Jobs from before the result store keep their results inline
+            legacy = job.result_data or []
+            failed = len([r for r in legacy if r.get("status") == "failed"])
+            summary = {"successful_scrapes": len(legacy) - failed, "failed_scrapes": failed}
+        
+        results = await result_store.read_results(job.result_data, offset, limit)
         
         return {
             "job_id": job.id,
             "status": job.status,
             "completed_at": job.completed_at.isoformat() if job.completed_at else None,
-            "total_urls": len(results),
-            "successful_scrapes": len([r for r in results if r.get("status") != "failed"]),
-            "failed_scrapes": len([r for r in results if r.get("status") == "failed"]),
+            "total_urls": result_count(job.result_data),
+            "successful_scrapes": summary.get("successful_scrapes", 0),
+            "failed_scrapes": summary.get("failed_scrapes", 0),
+            "offset": offset,
+            "limit": limit,
             "results": results
         }
         
@@ -537,7 +724,7 @@ async def get_scraping_job_results(
 
 @router.get("/jobs", response_model=List[ScrapingJobResponse])
 async def get_scraping_jobs(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(50, ge=1, le=100, description="Number of records to return"),
@@ -585,6 +772,69 @@ async def get_scraping_jobs(
         )
 
 
+@router.post("/jobs/{job_id}/resume", response_model=ScrapingJobResponse)
+async def resume_scraping_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> ScrapingJobResponse:
+    """
+    Resume a cancelled or failed scraping job from its last checkpoint.
+    
+    Pages scraped before the checkpoint are kept and not fetched again.
+    
+    - **job_id**: ID of the scraping job to resume
+    """
+    try:
+        result = await db.execute(
+            select(ResearchJob).where(
+                ResearchJob.id == job_id,
+                ResearchJob.user_id == current_user.id,
+                ResearchJob.job_type == ResearchJobType.WEB_SCRAPING
+            )
+        )
+        job = result.scalar_one_or_none()
+        
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Scraping job not found"
+            )
+        
+        if job.status not in [ResearchJobStatus.CANCELLED, ResearchJobStatus.FAILED]:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Only cancelled or failed jobs can be resumed (job is {job.status})"
+            )
+        
+        if not await job_runner.resume(job.id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Job is still stopping; try again shortly"
+            )
+        
+        logger.info(f"Resumed scraping job {job_id} for user {current_user.username}")
+        
+        return ScrapingJobResponse(
+            job_id=job.id,
+            status=ResearchJobStatus.PENDING,
+            progress_percentage=job.progress_percentage,
+            current_step="Queued to resume",
+            started_at=job.started_at,
+            estimated_completion=None,
+            message="Scraping job queued to resume"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to resume scraping job {job_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to resume job: {str(e)}"
+        )
+
+
 @router.delete("/jobs/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def cancel_scraping_job(
     job_id: int,
@@ -614,12 +864,22 @@ async def cancel_scraping_job(
         
         # If job is running, mark as cancelled. If completed/failed, delete it.
         if job.status in [ResearchJobStatus.PENDING, ResearchJobStatus.IN_PROGRESS]:
-            job.status = ResearchJobStatus.CANCELLED
-            job.current_step = "Job cancelled by user"
-            await db.commit()
+            await job_service.update_job(
+                job.id,
+                ResearchJob.status.in_([ResearchJobStatus.PENDING, ResearchJobStatus.IN_PROGRESS]),
+                status=ResearchJobStatus.CANCELLED,
+                current_step="Job cancelled by user",
+            )
+            # A running job stops after its current item and checkpoints; jobs
+            # running in another process notice at their next heartbeat
+            job_service.cancel(job.id)
         else:
+            result_data = job.result_data
+            checkpoint = job.checkpoint
             await db.delete(job)
             await db.commit()
+            await release_job_results(db, result_data)
+            await release_job_results(db, checkpoint_results(checkpoint))
         
         logger.info(f"Cancelled/deleted scraping job {job_id} for user {current_user.username}")
         
@@ -0,0 +1,433 @@
+"""
+Response and object cache.
+
+Values are JSON-encoded and stored in Redis when it is configured and
+reachable, or in a bounded in-process LRU otherwise. Every entry can carry
+tags (``"citations:user:3"``); ``invalidate`` bumps a tag's version, which
+makes every entry stored under an older version a miss. Invalidation is
+therefore O(1) per tag regardless of how many entries it covers, and stale
+entries simply age out through their TTL.
+
+Use ``cache.cached(...)`` to wrap an endpoint or coroutine, or the
+``get_cache`` dependency for explicit ``get_or_set`` / ``invalidate`` calls.
+Cache failures are logged and treated as misses; they never fail a request.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Awaitable, Callable, Iterable, Sequence
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Byte storage with expiry and atomic counters."""
+    
+    name: str = "backend"
+    
+    @abstractmethod
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        """Return the values stored under keys (None for misses)."""
+    
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        """Store value under key for ttl seconds."""
+    
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove key."""
+    
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Atomically increment a counter that never expires."""
+    
+    @abstractmethod
+    async def clear(self, prefix: str) -> None:
+        """Remove every key starting with prefix."""
+    
+    async def close(self) -> None:  # noqa: B027
+        """Release connections; optional hook, a no-op for backends without any."""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Per-process LRU used when Redis is not available.
+    
+    Counters (tag versions) are kept outside the LRU so that evicting one
+    can never resurrect entries it invalidated.
+    """
+    
+    name = "memory"
+    
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._counters: dict[str, int] = {}
+    
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        now = time.monotonic()
+        values: list[bytes | None] = []
+        for key in keys:
+            if key in self._counters:
+                values.append(str(self._counters[key]).encode())
+                continue
+            entry = self._entries.get(key)
+            if entry is None:
+                values.append(None)
+            elif entry[0] <= now:
+                del self._entries[key]
+                values.append(None)
+            else:
+                self._entries.move_to_end(key)
+                values.append(entry[1])
+        return values
+    
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+    
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+    
+    async def clear(self, prefix: str) -> None:
+        for store in (self._entries, self._counters):
+            for key in [key for key in store if key.startswith(prefix)]:
+                del store[key]
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis storage shared by every worker process.
+    
+    Accepts any ``redis.asyncio``-compatible client, including
+    ``fakeredis.FakeAsyncRedis`` in tests.
+    """
+    
+    name = "redis"
+    
+    def __init__(self, client: Any) -> None:
+        self.client = client
+    
+    async def get_many(self, keys: Sequence[str]) -> list[bytes | None]:
+        return await self.client.mget(list(keys))
+    
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self.client.set(key, value, ex=ttl)
+    
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+    
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(key)
+    
+    async def clear(self, prefix: str) -> None:
+        async for key in self.client.scan_iter(match=f"{prefix}*", count=500):
+            await self.client.delete(key)
+    
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def _key_part(value: Any) -> Any:
+    """Reduce an argument to something stable to hash, or _MISSING to skip it."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        parts = [_key_part(item) for item in value]
+        return sorted(map(str, parts)) if isinstance(value, (set, frozenset)) else parts
+    # Users and other models vary the key by identity
+    identifier = getattr(value, "id", None)
+    if isinstance(identifier, (int, str)):
+        return f"{type(value).__name__}:{identifier}"
+    # Sessions, requests and other plumbing do not affect the result
+    return _MISSING
+
+
+class Cache:
+    """
+    Tag-invalidated cache in front of a ``CacheBackend``.
+    """
+    
+    def __init__(
+        self,
+        backend: CacheBackend | None = None,
+        prefix: str = "omnicore",
+        default_ttl: int = 300,
+        enabled: bool = True,
+    ) -> None:
+        self.backend = backend or MemoryCacheBackend()
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.enabled = enabled
+    
+    def use(self, backend: CacheBackend) -> None:
+        """
+        Switch to another backend (e.g. a fake Redis in tests).
+        
+        Args:
+            backend: Backend to use from now on
+        """
+        self.backend = backend
+    
+    async def connect(self) -> None:
+        """
+        Select the backend configured by ``CACHE_BACKEND``.
+        
+        ``auto`` uses Redis when the client library is installed and the
+        server answers a ping, and the in-process LRU otherwise.
+        """
+        if settings.CACHE_BACKEND == "memory":
+            self.use(MemoryCacheBackend(settings.CACHE_MAX_ENTRIES))
+            return
+        try:
+            import redis.asyncio as redis
+            
+            client = redis.from_url(
+                str(settings.REDIS_URL),
+                socket_connect_timeout=settings.CACHE_CONNECT_TIMEOUT,
+                socket_timeout=settings.CACHE_CONNECT_TIMEOUT,
+            )
+            await client.ping()
+        except Exception as e:
+            if settings.CACHE_BACKEND == "redis":
+                raise
+            logger.warning(f"Redis unavailable ({e}); using in-process cache")
+            self.use(MemoryCacheBackend(settings.CACHE_MAX_ENTRIES))
+            return
+        self.use(RedisCacheBackend(client))
+        logger.info("Using Redis cache")
+    
+    async def close(self) -> None:
+        """Close the backend's connections."""
+        await self.backend.close()
+    
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+    
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+    
+    async def _lookup(self, key: str, tags: Sequence[str]) -> tuple[Any, list[int]]:
+        """Return the cached value (or _MISSING) and the current tag versions."""
+        values = await self.backend.get_many([self._key(key), *map(self._tag_key, tags)])
+        versions = [int(value or 0) for value in values[1:]]
+        if values[0] is None:
+            return _MISSING, versions
+        entry = json.loads(values[0])
+        if entry["tags"] != versions:
+            return _MISSING, versions
+        return entry["value"], versions
+    
+    async def _store(self, key: str, value: Any, ttl: int | None, versions: list[int]) -> None:
+        payload = json.dumps(
+            {"tags": versions, "value": jsonable_encoder(value)},
+            separators=(",", ":"),
+        ).encode()
+        await self.backend.set(self._key(key), payload, ttl or self.default_ttl)
+    
+    async def get(self, key: str, tags: Sequence[str] = ()) -> Any | None:
+        """
+        Read a cached value.
+        
+        Args:
+            key: Cache key
+            tags: Tags the value was stored under
+        
+        Returns:
+            Any | None: JSON-decoded value, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        try:
+            value, _ = await self._lookup(key, tags)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+            return None
+        return None if value is _MISSING else value
+    
+    async def set(self, key: str, value: Any, ttl: int | None = None, tags: Sequence[str] = ()) -> None:
+        """
+        Store a value.
+        
+        Args:
+            key: Cache key
+            value: JSON-encodable value (pydantic models are encoded)
+            ttl: Seconds to keep the value (default ``CACHE_DEFAULT_TTL``)
+            tags: Tags whose invalidation should evict the value
+        """
+        if not self.enabled:
+            return
+        try:
+            values = await self.backend.get_many([self._tag_key(tag) for tag in tags])
+            await self._store(key, value, ttl, [int(v or 0) for v in values])
+        except Exception as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+    
+    async def get_or_set(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        ttl: int | None = None,
+        tags: Sequence[str] = (),
+    ) -> Any:
+        """
+        Return the cached value, computing and storing it on a miss.
+        
+        Tag versions are read before factory runs, so a write that
+        invalidates a tag while the value is being computed leaves the
+        stored value already stale rather than serving it.
+        
+        Args:
+            key: Cache key
+            factory: Coroutine function producing the value
+            ttl: Seconds to keep the value
+            tags: Tags whose invalidation should evict the value
+        
+        Returns:
+            Any: Cached (JSON-decoded) or freshly computed value
+        """
+        if not self.enabled:
+            return await factory()
+        try:
+            value, versions = await self._lookup(key, tags)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+            return await factory()
+        if value is not _MISSING:
+            return value
+        
+        value = await factory()
+        if value is not None:
+            try:
+                await self._store(key, value, ttl, versions)
+            except Exception as e:
+                logger.warning(f"Cache write failed for {key}: {e}")
+        return value
+    
+    async def delete(self, key: str) -> None:
+        """
+        Remove a single entry.
+        
+        Args:
+            key: Cache key
+        """
+        try:
+            await self.backend.delete(self._key(key))
+        except Exception as e:
+            logger.warning(f"Cache delete failed for {key}: {e}")
+    
+    async def invalidate(self, *tags: str) -> None:
+        """
+        Evict every entry stored under any of tags.
+        
+        Args:
+            *tags: Tags to invalidate
+        """
+        for tag in tags:
+            try:
+                await self.backend.incr(self._tag_key(tag))
+            except Exception as e:
+                logger.warning(f"Cache invalidation failed for tag {tag}: {e}")
+    
+    async def clear(self) -> None:
+        """Remove every entry and tag version under this cache's prefix."""
+        await self.backend.clear(f"{self.prefix}:")
+    
+    def cached(
+        self,
+        ttl: int | None = None,
+        tags: Iterable[str] = (),
+        key: str | Callable[..., str] | None = None,
+    ) -> Callable:
+        """
+        Cache the result of a coroutine function or endpoint.
+        
+        The default key is the function's qualified name plus a hash of its
+        scalar arguments; model arguments such as ``current_user``
+        contribute their ``id`` and other objects (database sessions,
+        requests) are ignored. Tags may reference arguments with
+        ``str.format`` syntax, e.g. ``"citations:user:{current_user.id}"``.
+        
+        A cache hit returns the JSON-decoded value, which FastAPI validates
+        against the endpoint's response model as usual.
+        
+        Args:
+            ttl: Seconds to keep results (default ``CACHE_DEFAULT_TTL``)
+            tags: Tag templates
+            key: Fixed key, or a function building it from the call's
+                arguments, for results that do not vary like the default
+        
+        Returns:
+            Callable: Decorator
+        """
+        tag_templates = tuple(tags)
+        
+        def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+            name = f"{func.__module__}.{func.__qualname__}"
+            signature = inspect.signature(func)
+            
+            @functools.wraps(func)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                arguments = signature.bind(*args, **kwargs).arguments
+                if isinstance(key, str):
+                    cache_key = f"{name}:{key}"
+                elif key is not None:
+                    cache_key = f"{name}:{key(*args, **kwargs)}"
+                else:
+                    parts = [
+                        [arg_name, part] for arg_name, value in sorted(arguments.items())
+                        if (part := _key_part(value)) is not _MISSING
+                    ]
+                    digest = hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+                    cache_key = f"{name}:{digest}"
+                resolved_tags = [template.format(**arguments) for template in tag_templates]
+                return await self.get_or_set(
+                    cache_key,
+                    lambda: func(*args, **kwargs),
+                    ttl=ttl,
+                    tags=resolved_tags,
+                )
+            
+            return wrapper
+        
+        return decorator
+
+
+# Global cache instance; ``connect`` selects the backend at startup
+cache = Cache(
+    MemoryCacheBackend(settings.CACHE_MAX_ENTRIES),
+    prefix=settings.CACHE_KEY_PREFIX,
+    default_ttl=settings.CACHE_DEFAULT_TTL,
+    enabled=settings.CACHE_ENABLED,
+)
+
+
+def get_cache() -> Cache:
+    """
+    Dependency for FastAPI to get the cache.
+    
+    Returns:
+        Cache: Application cache instance
+    """
+    return cache
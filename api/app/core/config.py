@@ -84,6 +84,17 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         ))
     
+    # Optional read replica. When unset, reads use the primary database,
+    # optionally through their own pool (DB_SEPARATE_READ_POOL).
+    DATABASE_READ_URL: str | None = None
+    
+    @computed_field  # type: ignore[misc]
+    @property
+    def SQLALCHEMY_READ_DATABASE_URI(self) -> str | None:
+        if self.DATABASE_READ_URL:
+            return self.DATABASE_READ_URL.replace("postgresql://", "postgresql+asyncpg://")
+        return None
+    
     # Redis Configuration
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
@@ -102,6 +113,16 @@ class Settings(BaseSettings):
             path=str(self.REDIS_DB),
         )
     
+    # Response/object cache. "auto" uses Redis when reachable, else an
+    # in-process LRU (per worker).
+    CACHE_ENABLED: bool = True
+    CACHE_BACKEND: Literal["auto", "redis", "memory"] = "auto"
+    CACHE_KEY_PREFIX: str = "omnicore"
+    CACHE_DEFAULT_TTL: int = 300
+    CACHE_STATIC_TTL: int = 3600  # Templates and capability listings
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_CONNECT_TIMEOUT: float = 1.0
+    
     # AI Service Configuration (GPT-5 for Intelligence Analysis)
     OPENAI_API_KEY: str | None = None
     OPENAI_MODEL: str = "gpt-5-mini"  # GPT-5 mini optimal for intel analysis
@@ -116,13 +137,97 @@ class Settings(BaseSettings):
     # File Storage
     UPLOAD_DIR: str = "uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    DOCUMENT_MAX_UPLOAD_SIZE: int = 512 * 1024 * 1024  # 512MB, enforced while streaming to disk
+    DOCUMENT_UPLOAD_CHUNK_BYTES: int = 1024 * 1024  # 1MB read and hashed at a time
+    
+    # PDF text extraction (worker processes shared by document jobs)
+    PDF_WORKERS: int = 0  # 0 starts one per CPU
+    PDF_PAGES_PER_TASK: int = 8  # Pages extracted per worker task
+    PDF_TASK_TIMEOUT: float = 60.0  # Seconds a page range may run
+    PDF_WORKER_MEMORY_MB: int = 1024  # Address space cap per worker; 0 disables
+    PDF_WORKER_MAX_TASKS: int = 200  # Page ranges before a worker is replaced
     ALLOWED_EXTENSIONS: set[str] = {
         "pdf", "docx", "xlsx", "csv", "json", "txt", "md"
     }
     
+    # Job result store (compressed NDJSON segments)
+    RESULT_STORE_DIR: str = "results"
+    RESULT_SEGMENT_ITEMS: int = 100
+    RESULT_SEGMENT_BYTES: int = 1024 * 1024  # 1MB uncompressed
+    RESULT_SEGMENT_GRACE_SECONDS: int = 60 * 60  # Minimum age before an unreferenced segment is deleted
+    
+    # URL processing
+    URL_BATCH_CONCURRENCY: int = 20  # Fetches in flight per batch
+    URL_PER_HOST_CONCURRENCY: int = 2
+    URL_PER_HOST_DELAY: float = 0.25  # Seconds between request starts to one host
+    URL_BATCH_COMMIT_SIZE: int = 50
+    URL_CACHE_TTL: int = 24 * 60 * 60  # Freshness when the origin sends no max-age
+    URL_FAILURE_RETRY_BASE: int = 60  # Seconds before retrying a failed fetch; doubles per consecutive failure
+    URL_FAILURE_RETRY_MAX: int = 6 * 60 * 60
+    URL_PERMANENT_FAILURE_TTL: int = 7 * 24 * 60 * 60  # 404 and 410 responses
+    URL_HEAD_MAX_BYTES: int = 512 * 1024  # Read cap for metadata-only extraction
+    URL_STRIP_TRAILING_SLASH: bool = True
+    URL_TRACKING_PARAMS: list[str] = [
+        "utm_*", "gclid", "dclid", "gbraid", "wbraid", "fbclid", "msclkid",
+        "yclid", "igshid", "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc",
+        "_hsmi", "mkt_tok", "ref_src", "ref_url",
+    ]
+    
+    # Domain reputation lists (trusted/suspicious/malicious.txt, public_suffix_list.dat)
+    DOMAIN_REPUTATION_DIR: str = "data/reputation"
+    DOMAIN_REPUTATION_RELOAD_SECONDS: float = 60.0
+    
+    # Outbound HTTP (shared connection pool)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # Seconds an idle connection is kept
+    HTTP_PER_HOST_CONNECTIONS: int = 6  # Concurrent requests to one host
+    HTTP_HTTP2: bool = False  # Requires the "http2" extra (h2)
+    HTTP_DNS_CACHE_TTL: float = 300.0  # 0 disables the resolver cache
+    HTTP_USER_AGENT: str = "OmniCore Intelligence Analysis Platform/1.0 (+https://omnicore.intelligence)"
+    
     # External APIs
     WAYBACK_MACHINE_API_URL: str = "https://web.archive.org"
     
+    # Wayback archival queue
+    WAYBACK_BATCH_SIZE: int = 10  # Captures taken from the queue at a time
+    WAYBACK_CONCURRENCY: int = 2  # Captures in flight
+    WAYBACK_SUBMIT_INTERVAL: float = 5.0  # Seconds between capture starts
+    WAYBACK_MAX_ATTEMPTS: int = 5
+    WAYBACK_RETRY_BASE_DELAY: float = 30.0  # Doubles with each failed attempt
+    WAYBACK_RETRY_MAX_DELAY: float = 30 * 60
+    WAYBACK_RECENT_SECONDS: int = 24 * 60 * 60  # Reuse snapshots newer than this
+    
+    # Web crawler (upper bounds for scraping jobs)
+    CRAWL_CONCURRENCY: int = 8  # Pages fetched at once per crawl, one per host
+    CRAWL_MAX_PAGES: int = 500
+    CRAWL_MAX_BYTES: int = 100 * 1024 * 1024  # Response bodies read per crawl
+    CRAWL_MAX_PAGE_BYTES: int = 5 * 1024 * 1024  # Larger pages are truncated
+    CRAWL_MAX_FRONTIER: int = 10000  # Queued URLs; further links are dropped
+    CRAWL_SEEN_CAPACITY: int = 100000  # URLs the seen-set Bloom filter is sized for
+    CRAWL_ROBOTS_TTL: int = 60 * 60  # Seconds robots.txt rules are cached
+    
+    # Research job progress (kept in memory, written to the database periodically)
+    JOB_PROGRESS_FLUSH_SECONDS: float = 5.0
+    JOB_PROGRESS_FLUSH_ITEMS: int = 100  # Also flush after this many progress reports
+    JOB_PROGRESS_TTL: int = 60 * 60  # Seconds progress snapshots are shared through the cache
+    JOB_EVENTS_POLL_SECONDS: float = 1.0  # Stream poll interval for jobs run by another process
+    JOB_EVENTS_KEEPALIVE_SECONDS: float = 15.0
+    
+    # Research job runner (python -m app.worker, or inside the API process)
+    JOB_RUNNER_IN_API: bool = True  # Disable when running separate workers
+    JOB_WORKERS: int = 4  # Jobs run at once per process
+    JOB_WORKER_PROCESSES: int = 1  # Processes started by python -m app.worker
+    JOB_LEASE_SECONDS: int = 120  # A job whose lease lapses is recovered
+    JOB_HEARTBEAT_SECONDS: float = 30.0
+    JOB_POLL_SECONDS: float = 2.0
+    JOB_RETRY_BASE_DELAY: float = 30.0  # Doubles with each retry
+    JOB_RETRY_MAX_DELAY: float = 30 * 60
+    JOB_SHUTDOWN_GRACE: float = 10.0  # Seconds running jobs get to finish on shutdown
+    JOB_CANCEL_GRACE: float = 30.0  # Seconds a cancelled job gets to stop on its own
+    JOB_CHECKPOINT_SECONDS: float = 30.0
+    JOB_CHECKPOINT_ITEMS: int = 50  # Also checkpoint after this many items
+    
     # Social Media APIs (Optional)
     REDDIT_CLIENT_ID: str | None = None
     REDDIT_CLIENT_SECRET: str | None = None
@@ -134,6 +239,21 @@ class Settings(BaseSettings):
     DB_POOL_SIZE: int = 5
     DB_MAX_OVERFLOW: int = 10
     DB_POOL_TIMEOUT: int = 30
+    DB_SEPARATE_READ_POOL: bool = False
+    DB_READ_POOL_SIZE: int = 5
+    DB_READ_MAX_OVERFLOW: int = 10
+    
+    # Embedded SQLite profile (single-node deployments, opt-in). Ignored for PostgreSQL.
+    SQLITE_EMBEDDED_PROFILE: bool = False
+    SQLITE_JOURNAL_MODE: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"] = "WAL"
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024  # 64MB page cache per connection
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # 256MB
+    SQLITE_WRITE_BATCH_SIZE: int = 100
+    
+    # Framework session changes kept per session for delta sync
+    FRAMEWORK_CHANGE_HISTORY: int = 100
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
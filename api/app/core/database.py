@@ -3,44 +3,100 @@ Database configuration and session management.
 Uses SQLAlchemy 2.0 with async support.
 """
 
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator
 
-from sqlalchemy import event, text
+from sqlalchemy import JSON, Connection, event, inspect, text
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 # Import models to ensure they're registered with metadata
 from app.models.base import Base
-from app.models import user, framework, research_tool, auth_log  # Import all model modules
+from app.models import user, framework, research_tool, auth_log, search  # Import all model modules
 from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.core.write_queue import WriteQueue
+from app.services.citation_backfill import upgrade_legacy_citations
+from app.services.citation_stats import backfill_citation_stats
 
 logger = get_logger(__name__)
 
-# Create async engine
-if "sqlite" in str(settings.SQLALCHEMY_DATABASE_URI):
-    # SQLite doesn't support these pool settings
-    engine = create_async_engine(
-        str(settings.SQLALCHEMY_DATABASE_URI),
-        echo=settings.ENVIRONMENT == "development",
-        future=True,
-    )
-else:
-    engine = create_async_engine(
-        str(settings.SQLALCHEMY_DATABASE_URI),
+
+def _is_sqlite_memory(url: str) -> bool:
+    return ":memory:" in url or url.rstrip("/").endswith("sqlite+aiosqlite:")
+
+
+def _create_engine(url: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+    """
+    Create an async engine with pool settings appropriate for the backend.
+    
+    Args:
+        url: Database URL
+        pool_size: Persistent connections to keep in the pool
+        max_overflow: Extra connections allowed under load
+    
+    Returns:
+        AsyncEngine: Configured engine
+    """
+    if "sqlite" in url:
+        if not settings.SQLITE_EMBEDDED_PROFILE or _is_sqlite_memory(url):
+            # In-memory databases are per-connection; keep the default pool
+            return create_async_engine(
+                url,
+                echo=settings.ENVIRONMENT == "development",
+                future=True,
+            )
+        # File-backed SQLite in WAL mode serves concurrent readers, so give it
+        # a real pool; writers wait on the busy timeout instead of failing
+        return create_async_engine(
+            url,
+            echo=settings.ENVIRONMENT == "development",
+            future=True,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            connect_args={"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        )
+    return create_async_engine(
+        url,
         echo=settings.ENVIRONMENT == "development",
         future=True,
-        pool_size=settings.DB_POOL_SIZE,
-        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
         pool_timeout=settings.DB_POOL_TIMEOUT,
         poolclass=NullPool if settings.ENVIRONMENT == "testing" else None,
     )
 
-# Create async session factory
+
+# Create async engine (primary, used for writes)
+engine = _create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    settings.DB_POOL_SIZE,
+    settings.DB_MAX_OVERFLOW,
+)
+
+# Create read engine: a replica if configured, otherwise an optional second
+# pool on the primary so heavy reads don't starve writers of connections
+if settings.SQLALCHEMY_READ_DATABASE_URI:
+    read_engine = _create_engine(
+        settings.SQLALCHEMY_READ_DATABASE_URI,
+        settings.DB_READ_POOL_SIZE,
+        settings.DB_READ_MAX_OVERFLOW,
+    )
+elif settings.DB_SEPARATE_READ_POOL and "sqlite" not in str(settings.SQLALCHEMY_DATABASE_URI):
+    read_engine = _create_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI),
+        settings.DB_READ_POOL_SIZE,
+        settings.DB_READ_MAX_OVERFLOW,
+    )
+else:
+    read_engine = engine
+
+# Create async session factories
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -49,21 +105,61 @@ AsyncSessionLocal = async_sessionmaker(
     autocommit=False,
 )
 
+AsyncReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+    autocommit=False,
+)
+
+# Background job writes on embedded SQLite go through a single writer;
+# elsewhere the queue runs each write in its own session
+write_queue = WriteQueue(AsyncSessionLocal, settings.SQLITE_WRITE_BATCH_SIZE)
+
+
+def uses_write_queue() -> bool:
+    """
+    Whether background writes should be serialized through the write queue.
+    
+    Returns:
+        bool: True for file-backed SQLite with the embedded profile enabled
+    """
+    url = str(settings.SQLALCHEMY_DATABASE_URI)
+    return "sqlite" in url and settings.SQLITE_EMBEDDED_PROFILE and not _is_sqlite_memory(url)
+
 # Base is imported from models.base
 
 
 @event.listens_for(engine.sync_engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     """
-    Set SQLite pragmas for development/testing.
+    Set SQLite pragmas for development/testing and embedded deployments.
     This is only used if SQLite is configured instead of PostgreSQL.
+    
+    With the embedded profile enabled, connections use WAL journaling (readers
+    never block the writer), a busy timeout instead of immediate "database is
+    locked" errors, a relaxed ``synchronous`` level that is still durable
+    across application crashes in WAL mode, and larger page cache/mmap sizes.
     """
     if "sqlite" in str(settings.SQLALCHEMY_DATABASE_URI):
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON")
+        if settings.SQLITE_EMBEDDED_PROFILE:
+            cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+            cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+            # Negative cache_size is in KiB rather than pages
+            cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+            cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
         cursor.close()
 
 
+if read_engine is not engine:
+    event.listen(read_engine.sync_engine, "connect", set_sqlite_pragma)
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency for getting database session.
@@ -81,6 +177,101 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for getting a read-only database session.
+    
+    Uses the read replica or dedicated read pool when one is configured,
+    and the primary otherwise. Data written moments ago may not be visible
+    yet on a lagging replica.
+    
+    Yields:
+        AsyncSession: Database session for reads
+    """
+    async with AsyncReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def get_pool_stats(target: AsyncEngine) -> dict[str, Any]:
+    """
+    Get connection pool statistics for an engine.
+    
+    Args:
+        target: Engine to inspect
+    
+    Returns:
+        dict: Pool class and whichever counters the pool exposes
+    """
+    pool = target.sync_engine.pool
+    stats: dict[str, Any] = {"pool_class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        counter = getattr(pool, name, None)
+        if callable(counter):
+            stats[name] = counter()
+    return stats
+
+
+def _add_missing_columns(connection: Connection) -> None:
+    """
+    Add nullable columns that were introduced after a table was created.
+    
+    ``create_all`` only creates missing tables, so development databases
+    would otherwise fall behind the models. Columns that need a value for
+    existing rows are left to a proper migration.
+    
+    Args:
+        connection: Synchronous connection inside a transaction
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            if not column.nullable or column.primary_key:
+                logger.warning(f"Cannot add required column {table.name}.{column.name}; migrate manually")
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+
+def _convert_json_columns(connection: Connection) -> None:
+    """
+    Change JSON model columns stored as text to JSONB on PostgreSQL.
+    
+    Older databases created these columns as TEXT holding ``json.dumps``
+    output; ``JSONType`` reads them as JSONB. Citations are converted by
+    their own backfill, which also has to rewrite repr-encoded values.
+    
+    Args:
+        connection: Synchronous connection inside a transaction
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables or table.name == "citations":
+            continue
+        reflected = {column["name"]: str(column["type"]) for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if not isinstance(column.type, JSON) or column.name not in reflected:
+                continue
+            if "JSON" in reflected[column.name].upper():
+                continue
+            connection.execute(text(
+                f"ALTER TABLE {table.name} ALTER COLUMN {column.name} TYPE JSONB USING {column.name}::jsonb"
+            ))
+            logger.info(f"Converted column {table.name}.{column.name} to JSONB")
+
+
 async def init_db() -> None:
     """
     Initialize database connection and test connectivity.
@@ -95,7 +286,34 @@ async def init_db() -> None:
             # Create tables if they don't exist (for development)
             if settings.ENVIRONMENT == "development":
                 await conn.run_sync(Base.metadata.create_all)
+                await conn.run_sync(_add_missing_columns)
                 logger.info("Database tables created/verified")
+        
+        # Legacy citations cannot be read until converted, and on PostgreSQL
+        # their column types must change before the search index reads them
+        async with AsyncSessionLocal() as session:
+            await upgrade_legacy_citations(session)
+        
+        async with engine.begin() as conn:
+            await conn.run_sync(_convert_json_columns)
+            # Full-text indexes are not part of metadata; add them to older databases
+            await conn.run_sync(search.install_citation_search)
+        
+        # Statistics counters are maintained on write; build them once for existing data
+        async with AsyncSessionLocal() as session:
+            try:
+                await backfill_citation_stats(session)
+            except Exception as e:
+                # Not needed to serve requests; python -m app.services.citation_stats rebuilds
+                logger.warning(f"Citation statistics backfill failed: {e}")
+        
+        if read_engine is not engine:
+            async with read_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                logger.info("Read database connection established successfully")
+        
+        if uses_write_queue():
+            await write_queue.start()
                 
     except Exception as e:
         logger.error(f"Failed to connect to database: {e}")
@@ -107,6 +325,9 @@ async def close_db() -> None:
     Close database connections.
     Called during application shutdown.
     """
+    await write_queue.stop()
+    if read_engine is not engine:
+        await read_engine.dispose()
     await engine.dispose()
     logger.info("Database connections closed")
 
@@ -118,7 +339,9 @@ class DatabaseManager:
     
     def __init__(self) -> None:
         self.engine = engine
+        self.read_engine = read_engine
         self.session_factory = AsyncSessionLocal
+        self.read_session_factory = AsyncReadSessionLocal
     
     async def health_check(self) -> bool:
         """
@@ -135,6 +358,38 @@ class DatabaseManager:
             logger.error(f"Database health check failed: {e}")
             return False
     
+    async def read_health_check(self) -> bool:
+        """
+        Check read database health.
+        
+        Returns:
+            bool: True if the read engine is healthy
+        """
+        if self.read_engine is self.engine:
+            return await self.health_check()
+        try:
+            async with self.read_session_factory() as session:
+                await session.execute(text("SELECT 1"))
+                return True
+        except Exception as e:
+            logger.error(f"Read database health check failed: {e}")
+            return False
+    
+    def pool_stats(self) -> dict[str, Any]:
+        """
+        Get pool statistics for the write and read engines.
+        
+        Returns:
+            dict: Stats keyed by "write" and "read"
+        """
+        return {
+            "write": get_pool_stats(self.engine),
+            "read": get_pool_stats(self.read_engine),
+            "read_pool_shared": self.read_engine is self.engine,
+            "read_replica": bool(settings.SQLALCHEMY_READ_DATABASE_URI),
+            "write_queue": write_queue.stats(),
+        }
+    
     async def get_session(self) -> AsyncSession:
         """
         Get a new database session.
@@ -0,0 +1,60 @@
+"""
+Entity tags and conditional requests for versioned resources.
+
+Framework sessions carry a monotonically increasing ``version``, which is
+used directly as a strong entity tag (``"3"``). The same value is accepted
+by ``If-Match`` on writes, so a client can round-trip the header it was
+given.
+"""
+
+from fastapi import Response, status
+
+
+def version_etag(version: int) -> str:
+    """
+    Build a strong entity tag for a resource version.
+    
+    Args:
+        version: Resource version
+    
+    Returns:
+        str: Quoted entity tag, e.g. '"3"'
+    """
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against the current entity tag.
+    
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so a
+    ``W/`` prefix added by an intermediary does not defeat the match.
+    
+    Args:
+        if_none_match: Raw header value (a list of tags or ``*``)
+        etag: Current entity tag
+    
+    Returns:
+        bool: True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Build an empty 304 response.
+    
+    Args:
+        etag: Current entity tag
+    
+    Returns:
+        Response: 304 Not Modified carrying the entity tag
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
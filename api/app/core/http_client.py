@@ -0,0 +1,331 @@
+"""
+Shared outbound HTTP clients.
+
+Every outbound fetch (URL processing, scraping, archival) goes through one
+connection pool so keep-alive connections and TLS sessions are reused
+across requests and services. On top of the pool:
+
+* clients per timeout profile (``TIMEOUT_PROFILES``) that share the pool;
+* a cap on concurrent requests per host (``HTTP_PER_HOST_CONNECTIONS``);
+* a resolver cache (``HTTP_DNS_CACHE_TTL``), since getaddrinfo is
+  otherwise called for every new connection;
+* optional HTTP/2 (``HTTP_HTTP2``, needs the ``h2`` package);
+* pool, DNS and per-host latency metrics for the detailed health check.
+
+The pool is closed from the application lifespan.
+"""
+
+import asyncio
+import importlib.util
+import ipaddress
+import socket
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpcore
+import httpx
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+TIMEOUT_PROFILES: Dict[str, httpx.Timeout] = {
+    "default": httpx.Timeout(30.0, connect=10.0),
+    "metadata": httpx.Timeout(15.0, connect=5.0),
+    "scraping": httpx.Timeout(30.0, connect=10.0),
+    "archive": httpx.Timeout(60.0, connect=10.0),
+}
+
+
+class CachingResolverBackend(httpcore.AnyIOBackend):
+    """Network backend that caches name resolution for a fixed TTL."""
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._cache: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+    
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Any = None,
+    ) -> httpcore.AsyncNetworkStream:
+        if self.ttl <= 0 or _is_ip_address(host):
+            return await super().connect_tcp(host, port, timeout, local_address, socket_options)
+        
+        addresses = await self._resolve(host, port)
+        error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                # TLS still verifies and sends SNI for the original host name
+                return await super().connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        # None of the cached addresses answered; resolve again next time
+        self._cache.pop((host, port), None)
+        raise error or httpcore.ConnectError(f"No addresses for {host}")
+    
+    async def _resolve(self, host: str, port: int) -> List[str]:
+        now = time.monotonic()
+        cached = self._cache.get((host, port))
+        if cached and cached[0] > now:
+            self.hits += 1
+            return cached[1]
+        
+        self.misses += 1
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise httpcore.ConnectError(str(e)) from e
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self._cache[(host, port)] = (now + self.ttl, addresses)
+        return addresses
+    
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+def _is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return True
+    except ValueError:
+        return False
+
+
+class _HostStats:
+    """Latency counters for one host."""
+    
+    __slots__ = ("requests", "errors", "in_flight", "total_seconds", "max_seconds")
+    
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        completed = self.requests - self.errors
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "avg_ms": round(self.total_seconds / completed * 1000, 1) if completed else None,
+            "max_ms": round(self.max_seconds * 1000, 1),
+        }
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that frees its host slot once read to the end or closed."""
+    
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+    
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        finally:
+            self._release()
+    
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class ManagedTransport(httpx.AsyncHTTPTransport):
+    """
+    Pooled transport with a per-host concurrency cap and latency metrics.
+    
+    A request holds its host's slot from send until the response body is
+    closed, which with HTTP/1.1 bounds the connections opened to each host.
+    """
+    
+    def __init__(
+        self,
+        per_host: int,
+        dns_cache_ttl: float,
+        max_tracked_hosts: int = 200,
+        http2: bool = False,
+        limits: httpx.Limits = httpx.Limits(),
+        verify: bool = True,
+        trust_env: bool = True,
+        retries: int = 0,
+    ):
+        super().__init__(http2=http2, limits=limits, verify=verify, trust_env=trust_env, retries=retries)
+        self.resolver = CachingResolverBackend(dns_cache_ttl)
+        # httpx takes no network backend, so the pool it wraps is built here
+        # with the same settings through httpcore's public constructor
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(verify=verify, trust_env=trust_env),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            retries=retries,
+            network_backend=self.resolver,
+        )
+        self.per_host = max(1, per_host)
+        self.max_tracked_hosts = max_tracked_hosts
+        self._slots: Dict[str, Tuple[asyncio.Semaphore, List[int]]] = {}
+        self.host_stats: "OrderedDict[str, _HostStats]" = OrderedDict()
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        semaphore, users = self._slots.setdefault(host, (asyncio.Semaphore(self.per_host), [0]))
+        users[0] += 1
+        stats = self._host_stats(host)
+        released = False
+        
+        def release() -> None:
+            nonlocal released
+            if released:
+                return
+            released = True
+            semaphore.release()
+            stats.in_flight -= 1
+            users[0] -= 1
+            if users[0] == 0:
+                self._slots.pop(host, None)
+        
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            users[0] -= 1
+            if users[0] == 0:
+                self._slots.pop(host, None)
+            raise
+        
+        stats.requests += 1
+        stats.in_flight += 1
+        started = time.perf_counter()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            stats.errors += 1
+            release()
+            raise
+        
+        try:
+            elapsed = time.perf_counter() - started
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            if not response.is_closed:
+                response.stream = _ReleasingStream(response.stream, release)
+        finally:
+            # A body that was already read (or failed to wrap) never reaches
+            # _ReleasingStream.aclose, so free the slot here
+            if not isinstance(response.stream, _ReleasingStream):
+                release()
+        return response
+    
+    def _host_stats(self, host: str) -> _HostStats:
+        stats = self.host_stats.get(host)
+        if stats is None:
+            stats = self.host_stats[host] = _HostStats()
+            while len(self.host_stats) > self.max_tracked_hosts:
+                self.host_stats.popitem(last=False)
+        else:
+            self.host_stats.move_to_end(host)
+        return stats
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pool utilization, resolver cache and per-host latency."""
+        connections = getattr(self._pool, "connections", [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        max_connections = settings.HTTP_MAX_CONNECTIONS
+        return {
+            "pool": {
+                "connections": len(connections),
+                "active": len(connections) - idle,
+                "idle": idle,
+                "max_connections": max_connections,
+                "utilization": round((len(connections) - idle) / max_connections, 3),
+            },
+            "dns": self.resolver.stats(),
+            "hosts": {host: stats.to_dict() for host, stats in self.host_stats.items()},
+        }
+
+
+class HttpClientRegistry:
+    """Application-wide outbound clients, one per timeout profile."""
+    
+    def __init__(self):
+        self._transport: Optional[ManagedTransport] = None
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+    
+    @property
+    def http2(self) -> bool:
+        if not settings.HTTP_HTTP2:
+            return False
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+            return False
+        return True
+    
+    def get(self, profile: str = "default") -> httpx.AsyncClient:
+        """
+        Get the shared client for a timeout profile.
+        
+        Args:
+            profile: Key of ``TIMEOUT_PROFILES``
+        
+        Returns:
+            httpx.AsyncClient: Client backed by the shared pool
+        
+        Raises:
+            KeyError: If the profile is unknown
+        """
+        client = self._clients.get(profile)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                transport=self._shared_transport(),
+                timeout=TIMEOUT_PROFILES[profile],
+                headers={"User-Agent": settings.HTTP_USER_AGENT},
+            )
+            self._clients[profile] = client
+        return client
+    
+    def _shared_transport(self) -> ManagedTransport:
+        if self._transport is None:
+            self._transport = ManagedTransport(
+                per_host=settings.HTTP_PER_HOST_CONNECTIONS,
+                dns_cache_ttl=settings.HTTP_DNS_CACHE_TTL,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self._transport
+    
+    def stats(self) -> Dict[str, Any]:
+        """Metrics for the shared pool (empty before first use)."""
+        if self._transport is None:
+            return {}
+        return self._transport.stats()
+    
+    async def close(self) -> None:
+        """Close every client and the shared pool."""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+        if self._transport is not None:
+            await self._transport.aclose()
+            self._transport = None
+
+
+# Global client registry
+http_clients = HttpClientRegistry()
@@ -0,0 +1,382 @@
+"""
+JSON Patch (RFC 6902) and JSON Merge Patch (RFC 7396) support.
+
+Patches are applied in two ways:
+
+* In Python, against an already loaded document (always correct, always
+  available).
+* In the database, as a single UPDATE built from native JSON path functions
+  (``jsonb_set``/``#-`` on PostgreSQL, ``json_set``/``json_remove`` on SQLite),
+  so that small edits to large documents never round-trip the whole document.
+  Only simple, unambiguous operations are compiled; callers fall back to the
+  Python path whenever ``compile_patch`` returns ``None`` or the compiled
+  preconditions do not hold.
+"""
+
+import copy
+import json
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import Text, cast, func, literal
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.sql.elements import ColumnElement
+
+
+class JsonPatchError(ValueError):
+    """Raised when a patch is malformed or cannot be applied."""
+
+
+class JsonPatchOperation(BaseModel):
+    """A single RFC 6902 operation."""
+    model_config = ConfigDict(populate_by_name=True)
+    
+    op: Literal["add", "remove", "replace", "move", "copy", "test"]
+    path: str
+    value: Any = None
+    from_: str | None = Field(default=None, alias="from")
+
+
+def parse_pointer(pointer: str) -> list[str]:
+    """
+    Split an RFC 6901 JSON pointer into unescaped reference tokens.
+    
+    Args:
+        pointer: JSON pointer such as ``/hypotheses/0/probability``
+    
+    Returns:
+        list[str]: Reference tokens (empty for the whole document)
+    
+    Raises:
+        JsonPatchError: If the pointer is malformed
+    """
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [
+        token.replace("~1", "/").replace("~0", "~")
+        for token in pointer[1:].split("/")
+    ]
+
+
+def _array_index(token: str, array: list, allow_end: bool) -> int:
+    """Resolve a reference token against an array."""
+    if allow_end and token == "-":
+        return len(array)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    upper = len(array) if allow_end else len(array) - 1
+    if index > upper:
+        raise JsonPatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _resolve(document: Any, tokens: list[str]) -> Any:
+    """Return the value referenced by tokens."""
+    current = document
+    for token in tokens:
+        if isinstance(current, dict):
+            if token not in current:
+                raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+            current = current[token]
+        elif isinstance(current, list):
+            current = current[_array_index(token, current, allow_end=False)]
+        else:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+    return current
+
+
+def _add(document: Any, tokens: list[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = _resolve(document, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_array_index(key, parent, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"Cannot add to non-container at /{'/'.join(tokens)}")
+    return document
+
+
+def _remove(document: Any, tokens: list[str]) -> Any:
+    if not tokens:
+        raise JsonPatchError("Cannot remove the document root")
+    parent = _resolve(document, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+        del parent[key]
+    elif isinstance(parent, list):
+        del parent[_array_index(key, parent, allow_end=False)]
+    else:
+        raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+    return document
+
+
+def apply_json_patch(document: Any, operations: list[JsonPatchOperation]) -> Any:
+    """
+    Apply an RFC 6902 patch to a document.
+    
+    The input document is not modified; operations are applied atomically
+    to a copy.
+    
+    Args:
+        document: JSON document
+        operations: Patch operations
+    
+    Returns:
+        Any: Patched document
+    
+    Raises:
+        JsonPatchError: If any operation fails
+    """
+    result = copy.deepcopy(document)
+    for operation in operations:
+        tokens = parse_pointer(operation.path)
+        if operation.op == "add":
+            result = _add(result, tokens, copy.deepcopy(operation.value))
+        elif operation.op == "remove":
+            result = _remove(result, tokens)
+        elif operation.op == "replace":
+            _resolve(result, tokens)
+            if tokens:
+                result = _remove(result, tokens)
+            result = _add(result, tokens, copy.deepcopy(operation.value))
+        elif operation.op in ("move", "copy"):
+            if operation.from_ is None:
+                raise JsonPatchError(f"'{operation.op}' requires 'from'")
+            from_tokens = parse_pointer(operation.from_)
+            if operation.op == "move" and tokens[:len(from_tokens)] == from_tokens and tokens != from_tokens:
+                raise JsonPatchError("Cannot move a value into one of its children")
+            value = copy.deepcopy(_resolve(result, from_tokens))
+            if operation.op == "move":
+                result = _remove(result, from_tokens)
+            result = _add(result, tokens, value)
+        elif operation.op == "test":
+            if _resolve(result, tokens) != operation.value:
+                raise JsonPatchError(f"Test failed at {operation.path}")
+    return result
+
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """
+    Apply an RFC 7396 merge patch.
+    
+    Args:
+        target: JSON document
+        patch: Merge patch
+    
+    Returns:
+        Any: Patched document (the target is not modified)
+    """
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+def _escape_token(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def merge_patch_to_operations(patch: dict, prefix: str = "") -> list[JsonPatchOperation] | None:
+    """
+    Express a merge patch as JSON Patch operations.
+    
+    Nested objects become per-key operations so that the compiled UPDATE
+    touches only the leaves that change. The translation assumes the target
+    already has matching objects along each path; ``compile_patch`` guards
+    that assumption with preconditions, and callers fall back to
+    ``apply_merge_patch`` when it does not hold.
+    
+    Args:
+        patch: Merge patch object
+        prefix: JSON pointer of the object being patched
+    
+    Returns:
+        list[JsonPatchOperation] | None: Equivalent operations, or None if the
+        patch cannot be expressed without knowing the target
+    """
+    operations = []
+    for key, value in patch.items():
+        path = f"{prefix}/{_escape_token(key)}"
+        if value is None:
+            operations.append(JsonPatchOperation(op="remove", path=path))
+        elif isinstance(value, dict):
+            # An empty object is a no-op on objects but a replacement otherwise
+            nested = merge_patch_to_operations(value, path) if value else None
+            if nested is None:
+                return None
+            operations.extend(nested)
+        else:
+            operations.append(JsonPatchOperation(op="add", path=path, value=value))
+    return operations
+
+
+def diff_documents(old: Any, new: Any, prefix: str = "") -> list[JsonPatchOperation]:
+    """
+    Compute JSON Patch operations that turn old into new.
+    
+    Objects are compared key by key so unchanged subtrees produce no
+    operations; any other changed value (including arrays) is replaced
+    whole.
+    
+    Args:
+        old: Original document
+        new: Updated document
+        prefix: JSON pointer of the documents being compared
+    
+    Returns:
+        list[JsonPatchOperation]: Operations (empty if the documents are equal)
+    """
+    if old == new:
+        return []
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        return [JsonPatchOperation(op="replace" if prefix else "add", path=prefix, value=new)]
+    
+    operations = []
+    for key in old:
+        if key not in new:
+            operations.append(JsonPatchOperation(op="remove", path=f"{prefix}/{_escape_token(key)}"))
+    for key, value in new.items():
+        path = f"{prefix}/{_escape_token(key)}"
+        if key not in old:
+            operations.append(JsonPatchOperation(op="add", path=path, value=value))
+        else:
+            operations.extend(diff_documents(old[key], value, path))
+    return operations
+
+
+@dataclass
+class CompiledPatch:
+    """Database-side form of a patch."""
+    expression: ColumnElement
+    preconditions: list[ColumnElement]
+
+
+def _is_index(token: str) -> bool:
+    return token.isdigit() and (token == "0" or not token.startswith("0"))
+
+
+def _sqlite_path(tokens: list[str]) -> str:
+    parts = ["$"]
+    for token in tokens:
+        if _is_index(token):
+            parts.append(f"[{token}]")
+        elif token == "-":
+            parts.append("[#]")
+        else:
+            parts.append(f'."{token}"')
+    return "".join(parts)
+
+
+def _json_type(column: ColumnElement, tokens: list[str], dialect: str) -> ColumnElement:
+    if dialect == "postgresql":
+        return func.jsonb_typeof(
+            cast(column, JSONB).op("#>")(literal(tokens, ARRAY(Text)))
+        )
+    return func.json_type(column, _sqlite_path(tokens))
+
+
+def compile_patch(
+    column: ColumnElement,
+    operations: list[JsonPatchOperation],
+    dialect: str,
+) -> CompiledPatch | None:
+    """
+    Compile simple patches into a native JSON update expression.
+    
+    Supported: ``add``, ``replace`` and ``remove`` on non-root paths whose
+    paths do not overlap. Numeric tokens are treated as array indexes and
+    other tokens as object keys, with preconditions asserting the container
+    types so the database rejects (rather than mis-applies) anything else.
+    
+    Args:
+        column: JSON column being patched
+        operations: Patch operations
+        dialect: SQLAlchemy dialect name
+    
+    Returns:
+        CompiledPatch | None: Compiled update, or None if unsupported
+    """
+    if dialect not in ("postgresql", "sqlite") or not operations:
+        return None
+    
+    parsed = []
+    for operation in operations:
+        if operation.op not in ("add", "replace", "remove"):
+            return None
+        tokens = parse_pointer(operation.path)
+        if not tokens:
+            return None
+        if any('"' in token or "." in token or token.startswith("$") for token in tokens):
+            return None
+        if "-" in tokens[:-1] or (tokens[-1] == "-" and operation.op != "add"):
+            return None
+        # Inserting into the middle of an array shifts siblings; leave that to Python
+        if operation.op == "add" and _is_index(tokens[-1]):
+            return None
+        parsed.append((operation, tokens))
+    
+    # Overlapping paths depend on each other's results; only compile independent edits
+    for i, (_, a) in enumerate(parsed):
+        for _, b in parsed[i + 1:]:
+            shorter = min(len(a), len(b))
+            if a[:shorter] == b[:shorter]:
+                return None
+    
+    expression: ColumnElement = cast(column, JSONB) if dialect == "postgresql" else column
+    preconditions: list[ColumnElement] = []
+    
+    for operation, tokens in parsed:
+        # Every container along the path must exist and have the expected type
+        for depth in range(len(tokens)):
+            expected = "array" if _is_index(tokens[depth]) or tokens[depth] == "-" else "object"
+            preconditions.append(_json_type(column, tokens[:depth], dialect) == expected)
+        if operation.op in ("replace", "remove"):
+            preconditions.append(_json_type(column, tokens, dialect).is_not(None))
+        
+        value = json.dumps(operation.value)
+        if dialect == "postgresql":
+            if operation.op == "remove":
+                expression = expression.op("#-")(literal(tokens, ARRAY(Text)))
+            elif tokens[-1] == "-":
+                parent = literal(tokens[:-1], ARRAY(Text))
+                expression = func.jsonb_set(
+                    expression,
+                    parent,
+                    expression.op("#>")(parent).op("||")(
+                        func.jsonb_build_array(cast(literal(value), JSONB))
+                    ),
+                )
+            else:
+                expression = func.jsonb_set(
+                    expression,
+                    literal(tokens, ARRAY(Text)),
+                    cast(literal(value), JSONB),
+                    operation.op == "add",
+                )
+        else:
+            path = _sqlite_path(tokens)
+            if operation.op == "remove":
+                expression = func.json_remove(expression, path)
+            elif operation.op == "replace":
+                expression = func.json_replace(expression, path, func.json(value))
+            elif tokens[-1] == "-":
+                expression = func.json_insert(expression, path, func.json(value))
+            else:
+                expression = func.json_set(expression, path, func.json(value))
+    
+    return CompiledPatch(expression=expression, preconditions=preconditions)
+
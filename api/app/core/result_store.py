@@ -0,0 +1,393 @@
+"""
+Content-addressed store for research job results.
+
+Background jobs append result items to a ``ResultWriter`` as they are
+produced. Items are buffered into segments of bounded size, serialized as
+NDJSON, gzip-compressed and written to a pluggable backend under the SHA-256
+of their uncompressed content, so identical segments are stored once. Only a
+small manifest (segment keys and item counts) is kept in
+``ResearchJob.result_data``.
+
+Readers page through a manifest with ``offset``/``limit`` or stream it, and
+only ever decompress the segments they need. Memory per job is bounded by
+the segment size rather than the job size.
+
+Jobs completed before the store existed keep their results inline in
+``result_data``; ``read_results`` and ``stream_results`` accept both forms.
+
+Because segments are shared between jobs, they are only deleted once no
+job's manifest references them and they have not been written for
+``RESULT_SEGMENT_GRACE_SECONDS`` (a running writer may reuse a segment
+before its manifest is saved). See ``app.services.result_gc``.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterable
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_FORMAT = "ndjson-gzip"
+
+
+class ResultStoreBackend(ABC):
+    """Byte storage for result segments, addressed by content hash."""
+    
+    @abstractmethod
+    async def put(self, key: str, data: bytes) -> None:
+        """Store data under key (a no-op if the key already exists)."""
+    
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        """Return the data stored under key."""
+    
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether key is stored."""
+    
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove key (a no-op if it is not stored)."""
+    
+    @abstractmethod
+    async def last_written(self, key: str) -> float | None:
+        """Unix time key was last put, or None if it is not stored."""
+    
+    @abstractmethod
+    async def keys(self) -> list[str]:
+        """All stored keys."""
+
+
+class LocalResultStoreBackend(ResultStoreBackend):
+    """Stores segments as files under a local directory."""
+    
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+    
+    def _path(self, key: str) -> Path:
+        # Fan out by hash prefix to keep directories small
+        return self.root / key[:2] / key[2:4] / f"{key}.ndjson.gz"
+    
+    def _put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        if path.exists():
+            # Reuse counts as a write, so the segment survives the GC grace period
+            os.utime(path)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so readers never see partial segments
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+    
+    async def put(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._put, key, data)
+    
+    async def get(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._path(key).read_bytes)
+    
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._path(key).exists)
+    
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+    
+    def _last_written(self, key: str) -> float | None:
+        try:
+            return self._path(key).stat().st_mtime
+        except FileNotFoundError:
+            return None
+    
+    async def last_written(self, key: str) -> float | None:
+        return await asyncio.to_thread(self._last_written, key)
+    
+    def _keys(self) -> list[str]:
+        return [path.name.split(".", 1)[0] for path in self.root.glob("*/*/*.ndjson.gz")]
+    
+    async def keys(self) -> list[str]:
+        return await asyncio.to_thread(self._keys)
+
+
+class ResultWriter:
+    """
+    Incrementally writes a job's results as compressed NDJSON segments.
+    """
+    
+    def __init__(
+        self,
+        backend: ResultStoreBackend,
+        segment_items: int,
+        segment_bytes: int,
+    ) -> None:
+        self.backend = backend
+        self.segment_items = max(1, segment_items)
+        self.segment_bytes = max(1, segment_bytes)
+        self.segments: list[dict[str, Any]] = []
+        self.total = 0
+        self._lines: list[bytes] = []
+        self._buffered = 0
+    
+    async def append(self, item: Any) -> None:
+        """
+        Append a result item, flushing a segment when the buffer is full.
+        
+        Args:
+            item: JSON-serializable result item
+        """
+        line = json.dumps(item, default=str, separators=(",", ":")).encode() + b"\n"
+        self._lines.append(line)
+        self._buffered += len(line)
+        self.total += 1
+        if len(self._lines) >= self.segment_items or self._buffered >= self.segment_bytes:
+            await self.flush()
+    
+    async def flush(self) -> None:
+        """Write buffered items as a segment."""
+        if not self._lines:
+            return
+        raw = b"".join(self._lines)
+        key = hashlib.sha256(raw).hexdigest()
+        compressed = await asyncio.to_thread(gzip.compress, raw, 6)
+        await self.backend.put(key, compressed)
+        self.segments.append({
+            "key": key,
+            "count": len(self._lines),
+            "bytes": len(raw),
+            "stored_bytes": len(compressed),
+        })
+        self._lines = []
+        self._buffered = 0
+    
+    async def checkpoint(self, summary: dict[str, Any] | None = None) -> dict[str, Any]:
+        """
+        Flush buffered items and build a manifest of everything written so far.
+        
+        The writer stays open; a writer created from the manifest with
+        ``ResultStore.writer(resume=...)`` continues after these items.
+        
+        Args:
+            summary: Job-level aggregates so far
+        
+        Returns:
+            dict: Manifest of the items written so far
+        """
+        return await self.close(summary)
+    
+    async def close(self, summary: dict[str, Any] | None = None) -> dict[str, Any]:
+        """
+        Flush remaining items and build the manifest.
+        
+        Args:
+            summary: Job-level aggregates to keep alongside the manifest
+        
+        Returns:
+            dict: Manifest to store in ``ResearchJob.result_data``
+        """
+        await self.flush()
+        return {
+            "format": MANIFEST_FORMAT,
+            "total": self.total,
+            "segments": list(self.segments),
+            "summary": summary or {},
+        }
+
+
+class ResultStore:
+    """
+    Entry point for writing and reading stored job results.
+    """
+    
+    def __init__(
+        self,
+        backend: ResultStoreBackend,
+        segment_items: int = 100,
+        segment_bytes: int = 1024 * 1024,
+    ) -> None:
+        self.backend = backend
+        self.segment_items = segment_items
+        self.segment_bytes = segment_bytes
+    
+    def writer(self, resume: Any = None) -> ResultWriter:
+        """
+        Create a writer for a new job.
+        
+        Args:
+            resume: Manifest from ``ResultWriter.checkpoint`` to continue after
+        
+        Returns:
+            ResultWriter: Writer using this store's backend and segment limits
+        """
+        writer = ResultWriter(self.backend, self.segment_items, self.segment_bytes)
+        if is_manifest(resume):
+            writer.segments = list(resume["segments"])
+            writer.total = resume["total"]
+        return writer
+    
+    async def _segment_items(self, key: str) -> list[Any]:
+        compressed = await self.backend.get(key)
+        raw = await asyncio.to_thread(gzip.decompress, compressed)
+        return [json.loads(line) for line in raw.splitlines() if line]
+    
+    async def iter_results(self, result_data: Any, offset: int = 0) -> AsyncIterator[Any]:
+        """
+        Iterate over result items, starting at offset.
+        
+        Args:
+            result_data: Manifest or legacy inline results
+            offset: Number of items to skip
+        
+        Yields:
+            Result items, one segment in memory at a time
+        """
+        if not is_manifest(result_data):
+            for item in _legacy_items(result_data)[offset:]:
+                yield item
+            return
+        
+        for segment in result_data["segments"]:
+            if offset >= segment["count"]:
+                offset -= segment["count"]
+                continue
+            items = await self._segment_items(segment["key"])
+            for item in items[offset:]:
+                yield item
+            offset = 0
+    
+    async def read_results(self, result_data: Any, offset: int = 0, limit: int | None = None) -> list[Any]:
+        """
+        Read one page of result items.
+        
+        Args:
+            result_data: Manifest or legacy inline results
+            offset: Number of items to skip
+            limit: Maximum number of items to return
+        
+        Returns:
+            list: Result items
+        """
+        items = []
+        if limit == 0:
+            return items
+        async for item in self.iter_results(result_data, offset):
+            items.append(item)
+            if limit is not None and len(items) >= limit:
+                break
+        return items
+    
+    async def delete_segments(
+        self,
+        keys: Iterable[str],
+        referenced: set[str],
+        grace_seconds: float,
+        dry_run: bool = False,
+    ) -> int:
+        """
+        Delete segments that no manifest references.
+        
+        Args:
+            keys: Candidate segment keys
+            referenced: Keys referenced by stored manifests (kept)
+            grace_seconds: Keep segments written more recently than this
+            dry_run: Count the segments without deleting them
+        
+        Returns:
+            int: Number of segments deleted
+        """
+        cutoff = time.time() - grace_seconds
+        deleted = 0
+        for key in set(keys) - referenced:
+            written = await self.backend.last_written(key)
+            if written is not None and written <= cutoff:
+                if not dry_run:
+                    await self.backend.delete(key)
+                deleted += 1
+        return deleted
+    
+    async def stream_results(self, result_data: Any, offset: int = 0) -> AsyncIterator[bytes]:
+        """
+        Stream result items as NDJSON.
+        
+        Args:
+            result_data: Manifest or legacy inline results
+            offset: Number of items to skip
+        
+        Yields:
+            bytes: One JSON document per line
+        """
+        async for item in self.iter_results(result_data, offset):
+            yield json.dumps(item, default=str).encode() + b"\n"
+
+
+def is_manifest(result_data: Any) -> bool:
+    """
+    Whether result_data is a result store manifest.
+    
+    Args:
+        result_data: Value of ``ResearchJob.result_data``
+    
+    Returns:
+        bool: True for manifests, False for legacy inline results
+    """
+    return isinstance(result_data, dict) and result_data.get("format") == MANIFEST_FORMAT
+
+
+def segment_keys(result_data: Any) -> set[str]:
+    """
+    Segment keys referenced by result_data.
+    
+    Args:
+        result_data: Value of ``ResearchJob.result_data``
+    
+    Returns:
+        set[str]: Keys of a manifest's segments (empty for legacy results)
+    """
+    if not is_manifest(result_data):
+        return set()
+    return {segment["key"] for segment in result_data["segments"]}
+
+
+def _legacy_items(result_data: Any) -> list[Any]:
+    if result_data is None:
+        return []
+    if isinstance(result_data, dict):
+        # Document jobs used to store a task -> output mapping
+        return [{"key": key, "value": value} for key, value in result_data.items()]
+    return list(result_data)
+
+
+def result_count(result_data: Any) -> int:
+    """
+    Count result items without reading any segments.
+    
+    Args:
+        result_data: Manifest or legacy inline results
+    
+    Returns:
+        int: Number of items
+    """
+    if is_manifest(result_data):
+        return result_data["total"]
+    return len(_legacy_items(result_data))
+
+
+# Global result store instance
+result_store = ResultStore(
+    LocalResultStoreBackend(settings.RESULT_STORE_DIR),
+    segment_items=settings.RESULT_SEGMENT_ITEMS,
+    segment_bytes=settings.RESULT_SEGMENT_BYTES,
+)
@@ -0,0 +1,53 @@
+"""
+Early size check for upload endpoints.
+
+Starlette parses a multipart body, spooling files to disk, before the
+endpoint runs, so a size check inside the handler only bounds the
+handler's own copy. This middleware rejects requests to the upload paths
+whose declared ``Content-Length`` exceeds the limit before any of the body
+is read. Bodies sent without a length (chunked) are still bounded by the
+handler's streaming check.
+"""
+
+from typing import Callable, Iterable
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Allowance for multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized uploads from their Content-Length header.
+    """
+    
+    def __init__(self, app: ASGIApp, paths: Iterable[str], max_size: Callable[[], int]) -> None:
+        """
+        Initialize the middleware.
+        
+        Args:
+            app: Wrapped application
+            paths: Request paths the limit applies to
+            max_size: Returns the largest accepted file in bytes (read per
+                request, so settings changes apply)
+        """
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_size = max_size
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.paths:
+            length = Headers(scope=scope).get("content-length", "")
+            max_size = self.max_size()
+            if length.isdigit() and int(length) > max_size + MULTIPART_OVERHEAD:
+                response = JSONResponse(
+                    {"detail": f"File exceeds {max_size} bytes"},
+                    status_code=413,
+                    headers={"Connection": "close"},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
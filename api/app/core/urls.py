@@ -0,0 +1,142 @@
+"""
+URL canonicalization.
+
+Different spellings of the same address should hash to the same
+``ProcessedUrl.url_hash``. The canonical form is only a key (for hashes,
+deduplication and crawl seen-sets): servers may treat the query order,
+``?flag`` versus ``?flag=``, tracking parameters or a trailing slash as
+significant, so requests and archival always use the URL as given (see
+``with_scheme``). ``canonicalize_url``:
+
+* adds ``https://`` when the scheme is missing and lowercases the scheme
+  and host (dropping a trailing dot on the host);
+* drops default ports, fragments and tracking parameters
+  (``URL_TRACKING_PARAMS``, where ``utm_*`` matches a prefix);
+* sorts the remaining query parameters;
+* resolves ``.``/``..`` segments, normalizes percent-escapes, and removes
+  trailing slashes from non-root paths (``URL_STRIP_TRAILING_SLASH``).
+"""
+
+import re
+import urllib.parse
+from typing import Iterable, Optional
+
+from app.core.config import settings
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_ESCAPE_RE = re.compile(r"%([0-9A-Fa-f]{2})")
+_UNRESERVED = frozenset(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~"
+)
+
+
+def _normalize_escapes(value: str) -> str:
+    """Decode escaped unreserved characters and uppercase the rest."""
+    def replace(match: re.Match) -> str:
+        char = chr(int(match.group(1), 16))
+        return char if char in _UNRESERVED else f"%{match.group(1).upper()}"
+    return _ESCAPE_RE.sub(replace, value)
+
+
+def _remove_dot_segments(path: str) -> str:
+    """Resolve ``.`` and ``..`` segments (RFC 3986, section 5.2.4)."""
+    output = []
+    segments = path.split("/")
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == ".":
+            if last:
+                output.append("")
+        elif segment == "..":
+            if len(output) > 1:
+                output.pop()
+            if last:
+                output.append("")
+        else:
+            output.append(segment)
+    return "/".join(output)
+
+
+def _is_tracking_param(name: str, patterns: Iterable[str]) -> bool:
+    name = name.lower()
+    for pattern in patterns:
+        pattern = pattern.lower()
+        if pattern.endswith("*") and name.startswith(pattern[:-1]):
+            return True
+        if name == pattern:
+            return True
+    return False
+
+
+def with_scheme(url: str) -> str:
+    """
+    Prepare a URL as given for fetching: strip whitespace and add
+    ``https://`` when the scheme is missing, leaving the rest untouched.
+    
+    Args:
+        url: URL, with or without a scheme
+    
+    Returns:
+        str: URL with a scheme
+    """
+    url = url.strip()
+    if not url.startswith(("http://", "https://")) and "://" not in url:
+        url = f"https://{url}"
+    return url
+
+
+def canonicalize_url(
+    url: str,
+    tracking_params: Optional[Iterable[str]] = None,
+    strip_trailing_slash: Optional[bool] = None,
+) -> str:
+    """
+    Canonicalize a URL so that equivalent spellings compare equal.
+    
+    Args:
+        url: URL, with or without a scheme
+        tracking_params: Query parameters to drop (default:
+            ``URL_TRACKING_PARAMS``)
+        strip_trailing_slash: Remove trailing slashes from non-root paths
+            (default: ``URL_STRIP_TRAILING_SLASH``)
+    
+    Returns:
+        str: Canonical URL
+    
+    Raises:
+        ValueError: If the URL cannot be parsed (e.g. an invalid port)
+    """
+    if tracking_params is None:
+        tracking_params = settings.URL_TRACKING_PARAMS
+    if strip_trailing_slash is None:
+        strip_trailing_slash = settings.URL_STRIP_TRAILING_SLASH
+    
+    parts = urllib.parse.urlsplit(with_scheme(url))
+    scheme = parts.scheme.lower()
+    
+    host = (parts.hostname or "").rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"
+    port = parts.port
+    netloc = host
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo = f"{userinfo}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+    
+    path = _remove_dot_segments(_normalize_escapes(parts.path)) or "/"
+    if strip_trailing_slash and len(path) > 1:
+        path = path.rstrip("/") or "/"
+    
+    query_pairs = [
+        (name, value)
+        for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name, tracking_params)
+    ]
+    query = urllib.parse.urlencode(sorted(query_pairs), quote_via=urllib.parse.quote)
+    
+    return urllib.parse.urlunsplit((scheme, netloc, path, query, ""))
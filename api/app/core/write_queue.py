@@ -0,0 +1,193 @@
+"""
+Single-writer queue for embedded (SQLite) deployments.
+
+SQLite allows one writer at a time. When many background jobs commit progress
+concurrently, each commit competes for the write lock and the losers either
+wait out the busy timeout or fail with "database is locked". The write queue
+funnels those writes through one long-lived session owned by a single worker
+task, which also groups queued writes into one transaction per batch so that
+N progress updates cost one fsync instead of N. Reads never go through the
+queue and stay parallel.
+
+When the queue is not running (PostgreSQL, tests, or the embedded profile
+disabled) ``submit`` simply runs the write in a fresh session and commits it,
+so callers do not need to care which mode is active.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.sql import Executable
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+WriteOperation = Callable[[AsyncSession], Awaitable[T]]
+
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    Serializes database writes through a single session.
+    """
+    
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch_size: int = 100,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._batches = 0
+        self._writes = 0
+        self._failures = 0
+    
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+    
+    async def start(self) -> None:
+        """Start the writer task (idempotent)."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run(), name="db-write-queue")
+        logger.info("Database write queue started")
+    
+    async def stop(self) -> None:
+        """Drain pending writes and stop the writer task."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._worker
+        self._worker = None
+        logger.info("Database write queue stopped")
+    
+    async def submit(self, operation: WriteOperation[T]) -> T:
+        """
+        Run a write operation and wait for it to be committed.
+        
+        The operation receives a session and must not commit or roll back
+        itself; the queue commits it, possibly together with other writes.
+        
+        Args:
+            operation: Coroutine function performing the write
+        
+        Returns:
+            Whatever the operation returned
+        
+        Raises:
+            Exception: Whatever the operation (or its commit) raised
+        """
+        if not self.running:
+            async with self.session_factory() as session:
+                result = await operation(session)
+                await session.commit()
+                return result
+        
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, future))
+        return await future
+    
+    async def execute(self, statement: Executable) -> int:
+        """
+        Execute a single DML statement through the queue.
+        
+        Args:
+            statement: INSERT/UPDATE/DELETE statement
+        
+        Returns:
+            int: Number of rows affected
+        """
+        async def operation(session: AsyncSession) -> int:
+            result = await session.execute(statement)
+            return result.rowcount
+        
+        return await self.submit(operation)
+    
+    def stats(self) -> dict[str, Any]:
+        """
+        Get queue statistics.
+        
+        Returns:
+            dict: Running flag, pending writes and lifetime counters
+        """
+        return {
+            "running": self.running,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self._batches,
+            "writes": self._writes,
+            "failures": self._failures,
+        }
+    
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: list[tuple[WriteOperation, asyncio.Future]] = []
+            try:
+                async with self.session_factory() as session:
+                    while not stopping:
+                        item = await self._queue.get()
+                        if item is _STOP:
+                            stopping = True
+                            break
+                        batch = [item]
+                        while len(batch) < self.batch_size:
+                            try:
+                                item = self._queue.get_nowait()
+                            except asyncio.QueueEmpty:
+                                break
+                            if item is _STOP:
+                                stopping = True
+                                break
+                            batch.append(item)
+                        await self._commit_batch(session, batch)
+                        batch = []
+            except Exception as e:
+                # The session itself broke (e.g. rollback on a dead connection):
+                # fail the writes in flight and carry on with a new session
+                pending = [future for _, future in batch if not future.done()]
+                self._failures += len(pending)
+                for future in pending:
+                    future.set_exception(e)
+                logger.error(f"Database write queue session failed, opening a new one: {e}")
+    
+    async def _commit_batch(
+        self,
+        session: AsyncSession,
+        batch: list[tuple[WriteOperation, asyncio.Future]],
+    ) -> None:
+        results = []
+        try:
+            for operation, _ in batch:
+                results.append(await operation(session))
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            session.expunge_all()
+            if len(batch) == 1:
+                self._failures += 1
+                future = batch[0][1]
+                if not future.done():
+                    future.set_exception(e)
+                return
+            # One bad write must not fail its neighbours; retry them one by one
+            logger.warning(f"Write batch of {len(batch)} failed, retrying individually: {e}")
+            for item in batch:
+                await self._commit_batch(session, [item])
+            return
+        
+        # Keep the long-lived session's identity map from growing unbounded
+        session.expunge_all()
+        self._batches += 1
+        self._writes += len(batch)
+        for (_, future), result in zip(batch, results, strict=True):
+            if not future.done():
+                future.set_result(result)
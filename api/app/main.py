@@ -11,9 +11,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 
 from app.api.v1.api import api_router
+from app.core.cache import cache
 from app.core.config import settings
-from app.core.database import init_db
+from app.core.database import close_db, init_db
+from app.core.http_client import http_clients
 from app.core.logging import setup_logging
+from app.core.upload_limit import UploadSizeLimitMiddleware
+from app.services.job_runner import job_runner
+from app.services.job_service import job_service
+from app.services.pdf_extractor import pdf_extractor
+from app.services.wayback_archiver import wayback_archiver
 
 
 @asynccontextmanager
@@ -25,12 +32,22 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # Startup
     setup_logging()
     await init_db()
+    await cache.connect()
+    if settings.JOB_RUNNER_IN_API:
+        await job_runner.start()
     
     yield
     
-    # Shutdown
-    # Add cleanup tasks here if needed
-    pass
+    # Shutdown: let running jobs finish or requeue them, finish the archival
+    # batch in progress and record unflushed job progress, then drain queued
+    # writes before disposing engines
+    await job_runner.stop()
+    pdf_extractor.shutdown()
+    await wayback_archiver.stop()
+    await job_service.flush_all()
+    await close_db()
+    await cache.close()
+    await http_clients.close()
 
 
 def create_application() -> FastAPI:
@@ -93,6 +110,13 @@ def create_application() -> FastAPI:
     #         allowed_hosts=settings.ALLOWED_HOSTS,
     #     )
 
+    # Reject oversized uploads before their body is spooled
+    app.add_middleware(
+        UploadSizeLimitMiddleware,
+        paths=[f"{settings.API_V1_STR}/tools/documents/upload"],
+        max_size=lambda: settings.DOCUMENT_MAX_UPLOAD_SIZE,
+    )
+
     # Include API router
     app.include_router(api_router, prefix=settings.API_V1_STR)
 
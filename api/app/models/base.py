@@ -5,11 +5,16 @@ Base model classes for SQLAlchemy models.
 from datetime import datetime, timezone
 from typing import Any
 
-from sqlalchemy import DateTime, Integer, func
+from sqlalchemy import JSON, DateTime, Integer, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
+# Native JSON storage: JSONB on PostgreSQL, JSON text on SQLite and others
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
 class Base(DeclarativeBase):
     """Base class for all database models."""
     
@@ -3,12 +3,12 @@ Framework analysis models.
 """
 
 from enum import Enum
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy import ForeignKey, Index, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.models.base import BaseModel
+from app.models.base import BaseModel, JSONType
 
 if TYPE_CHECKING:
     from app.models.user import User
@@ -85,9 +85,9 @@ class FrameworkSession(BaseModel):
     )
     
     # Analysis Data
-    data: Mapped[str] = mapped_column(
-        Text,  # JSON string containing framework analysis data
-        default="{}",
+    data: Mapped[dict[str, Any]] = mapped_column(
+        JSONType,  # Framework analysis data
+        default=dict,
         nullable=False,
     )
     
@@ -131,6 +131,41 @@ class FrameworkSession(BaseModel):
         )
 
 
+class FrameworkSessionChange(BaseModel):
+    """
+    One version's worth of changes to a framework session.
+    Lets polling clients catch up with a delta instead of the full session.
+    """
+    
+    __tablename__ = "framework_session_changes"
+    
+    session_id: Mapped[int] = mapped_column(
+        ForeignKey("framework_sessions.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    
+    # Session version produced by this change
+    version: Mapped[int] = mapped_column(
+        nullable=False,
+    )
+    
+    # JSON Patch operations against the session document
+    # ({"title", "description", "status", "data"})
+    operations: Mapped[list[dict[str, Any]]] = mapped_column(
+        JSONType,
+        nullable=False,
+    )
+    
+    def __repr__(self) -> str:
+        """String representation of framework session change."""
+        return (
+            f"<FrameworkSessionChange("
+            f"session_id={self.session_id}, "
+            f"version={self.version}"
+            f")>"
+        )
+
+
 class FrameworkTemplate(BaseModel):
     """
     Framework template model for reusable framework configurations.
@@ -244,4 +279,22 @@ class FrameworkExport(BaseModel):
             f"session_id={self.session_id}, "
             f"type='{self.export_type}'"
             f")>"
-        )
\ No newline at end of file
+        )
+
+
+# Database Indexes for Performance
+# Serves keyset pagination of a user's sessions ordered by (updated_at, id)
+Index(
+    "idx_framework_sessions_user_updated_id",
+    FrameworkSession.user_id,
+    FrameworkSession.updated_at,
+    FrameworkSession.id,
+)
+
+# Serves delta sync lookups of a session's changes after a given version
+Index(
+    "idx_framework_session_changes_session_version",
+    FrameworkSessionChange.session_id,
+    FrameworkSessionChange.version,
+    unique=True,
+)
@@ -5,12 +5,12 @@ Research tool models for OmniCore intelligence analysis platform.
 import json
 from datetime import datetime, timezone
 from enum import Enum
-from typing import TYPE_CHECKING, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-from sqlalchemy import ForeignKey, String, Text, DateTime, Index
+from sqlalchemy import Column, ForeignKey, String, Table, Text, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.models.base import BaseModel
+from app.models.base import Base, BaseModel, JSONType
 
 if TYPE_CHECKING:
     from app.models.user import User
@@ -102,6 +102,26 @@ class ProcessedUrl(BaseModel):
         nullable=True,
     )
     
+    # HTTP Cache Validators (for conditional revalidation)
+    etag: Mapped[str | None] = mapped_column(
+        String(255),
+        nullable=True,
+    )
+    
+    last_modified: Mapped[str | None] = mapped_column(
+        String(64),
+        nullable=True,
+    )
+    
+    max_age: Mapped[int | None] = mapped_column(
+        nullable=True,
+    )
+    
+    fetched_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    
     # Archive Information
     archived_url: Mapped[str | None] = mapped_column(
         Text,
@@ -114,8 +134,8 @@ class ProcessedUrl(BaseModel):
     )
     
     # Additional Metadata (JSON)
-    additional_metadata: Mapped[str | None] = mapped_column(
-        Text,  # JSON string
+    additional_metadata: Mapped[dict[str, Any] | None] = mapped_column(
+        JSONType,
         nullable=True,
     )
     
@@ -141,6 +161,21 @@ class ProcessedUrl(BaseModel):
         nullable=True,
     )
     
+    # Negative Cache (a failed fetch is not retried before retry_after)
+    error_class: Mapped[str | None] = mapped_column(
+        String(32),  # timeout, connect, network, not_found, gone, rate_limited, ...
+        nullable=True,
+    )
+    
+    failure_count: Mapped[int | None] = mapped_column(
+        nullable=True,  # Consecutive failed fetches
+    )
+    
+    retry_after: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    
     # Relationships
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id"),
@@ -161,6 +196,57 @@ class ProcessedUrl(BaseModel):
         )
 
 
+# Association between citations and their tags
+citation_tags = Table(
+    "citation_tags",
+    Base.metadata,
+    Column("citation_id", ForeignKey("citations.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag_id", ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+)
+
+
+class Tag(BaseModel):
+    """
+    Tag model for organizing citations.
+    
+    Tags are per user and stored normalized (trimmed, lower-cased), so
+    filtering by tag is an indexed equality lookup.
+    """
+    
+    __tablename__ = "tags"
+    __table_args__ = (
+        UniqueConstraint("user_id", "name", name="uq_tags_user_name"),
+    )
+    
+    name: Mapped[str] = mapped_column(
+        String(100),
+        nullable=False,
+    )
+    
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id"),
+        nullable=False,
+        index=True,
+    )
+    
+    @staticmethod
+    def normalize(name: str) -> str:
+        """
+        Normalize a tag name for storage and lookup.
+        
+        Args:
+            name: Raw tag name
+        
+        Returns:
+            str: Trimmed, lower-cased name with inner whitespace collapsed
+        """
+        return " ".join(name.split()).lower()[:100]
+    
+    def __repr__(self) -> str:
+        """String representation of tag."""
+        return f"<Tag(id={self.id}, name='{self.name}')>"
+
+
 class Citation(BaseModel):
     """
     Citation model for academic and source management.
@@ -174,8 +260,8 @@ class Citation(BaseModel):
         nullable=False,
     )
     
-    authors: Mapped[str | None] = mapped_column(
-        Text,  # JSON array of author names
+    authors: Mapped[list[str] | None] = mapped_column(
+        JSONType,  # Array of author names
         nullable=True,
     )
     
@@ -240,15 +326,17 @@ class Citation(BaseModel):
     )
     
     # Additional Data
-    citation_data: Mapped[str | None] = mapped_column(
-        Text,  # JSON string with additional fields
+    citation_data: Mapped[dict | None] = mapped_column(
+        JSONType,  # Additional fields
         nullable=True,
     )
     
     # Organization
-    tags: Mapped[str | None] = mapped_column(
-        Text,  # JSON array of tags
-        nullable=True,
+    tags: Mapped[list[Tag]] = relationship(
+        Tag,
+        secondary=citation_tags,
+        lazy="selectin",
+        order_by=Tag.name,
     )
     
     notes: Mapped[str | None] = mapped_column(
@@ -294,6 +382,52 @@ class Citation(BaseModel):
         )
 
 
+class CitationStat(BaseModel):
+    """
+    One counter of a user's citation statistics.
+    
+    Counters are keyed by dimension (``total``, ``source_type``, ``rating``,
+    ``tag`` or ``day``) and bucket, and adjusted in the same transaction as
+    every citation write, so reading a user's statistics never scans their
+    citations.
+    """
+    
+    __tablename__ = "citation_stats"
+    __table_args__ = (
+        UniqueConstraint("user_id", "dimension", "bucket", name="uq_citation_stats_bucket"),
+    )
+    
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    
+    dimension: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+    )
+    
+    bucket: Mapped[str] = mapped_column(
+        String(100),
+        nullable=False,
+    )
+    
+    count: Mapped[int] = mapped_column(
+        default=0,
+        nullable=False,
+    )
+    
+    def __repr__(self) -> str:
+        """String representation of citation stat."""
+        return (
+            f"<CitationStat("
+            f"user_id={self.user_id}, "
+            f"{self.dimension}='{self.bucket}', "
+            f"count={self.count}"
+            f")>"
+        )
+
+
 class ResearchJob(BaseModel):
     """
     Research job model for tracking async research operations.
@@ -319,13 +453,20 @@ class ResearchJob(BaseModel):
     )
     
     # Job Data
-    input_data: Mapped[str | None] = mapped_column(
-        Text,  # JSON string
+    input_data: Mapped[Any | None] = mapped_column(
+        JSONType,
+        nullable=True,
+    )
+    
+    result_data: Mapped[Any | None] = mapped_column(
+        JSONType,
         nullable=True,
     )
     
-    result_data: Mapped[str | None] = mapped_column(
-        Text,  # JSON string
+    # Progress saved by a running job (results so far and remaining work),
+    # used to resume after a crash or cancellation; cleared on completion
+    checkpoint: Mapped[Any | None] = mapped_column(
+        JSONType,
         nullable=True,
     )
     
@@ -372,6 +513,33 @@ class ResearchJob(BaseModel):
         nullable=True,
     )
     
+    # Job queue: higher priority runs first; a worker holds a job until its
+    # lease expires, renewing it with heartbeats while the job runs
+    priority: Mapped[int | None] = mapped_column(
+        default=0,
+        nullable=True,
+    )
+    
+    run_after: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    
+    lease_owner: Mapped[str | None] = mapped_column(
+        String(255),
+        nullable=True,
+    )
+    
+    lease_expires_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    
+    heartbeat_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    
     # Relationships
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id"),
@@ -408,4 +576,7 @@ class ResearchJob(BaseModel):
 Index("idx_processed_urls_domain_created", ProcessedUrl.domain, ProcessedUrl.created_at)
 Index("idx_citations_source_type_date", Citation.source_type, Citation.publication_date)
 Index("idx_research_jobs_status_type", ResearchJob.status, ResearchJob.job_type)
-Index("idx_research_jobs_user_status", ResearchJob.user_id, ResearchJob.status)
\ No newline at end of file
+Index("idx_research_jobs_user_status", ResearchJob.user_id, ResearchJob.status)
+Index("idx_research_jobs_queue", ResearchJob.status, ResearchJob.priority, ResearchJob.run_after)
+Index("idx_citation_tags_tag", citation_tags.c.tag_id, citation_tags.c.citation_id)
+Index("idx_citation_stats_user_dimension_count", CitationStat.user_id, CitationStat.dimension, CitationStat.count)
\ No newline at end of file
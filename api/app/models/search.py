@@ -0,0 +1,172 @@
+"""
+Full-text search index for citations.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers;
+PostgreSQL uses a stored generated ``tsvector`` column with a GIN index.
+Either way the index is maintained by the database itself on every insert,
+update and delete, so application code never writes to it directly.
+
+The DDL is installed when the ``citations`` table is created and, for
+databases created before the index existed, by ``install_citation_search``
+during startup. Both paths are idempotent.
+"""
+
+import re
+
+from sqlalchemy import (
+    Select,
+    column,
+    event,
+    false,
+    func,
+    inspect,
+    literal_column,
+    or_,
+    table,
+    text,
+)
+from sqlalchemy.engine import Connection
+
+from app.models.research_tool import Citation
+
+# Column weights: title matters most, then authors, then notes
+_WEIGHTS = (10.0, 5.0, 1.0)
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS citations_fts USING fts5(
+        title, authors, notes,
+        content='citations', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS citations_fts_insert AFTER INSERT ON citations BEGIN
+        INSERT INTO citations_fts(rowid, title, authors, notes)
+        VALUES (new.id, new.title, new.authors, new.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS citations_fts_delete AFTER DELETE ON citations BEGIN
+        INSERT INTO citations_fts(citations_fts, rowid, title, authors, notes)
+        VALUES ('delete', old.id, old.title, old.authors, old.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS citations_fts_update
+    AFTER UPDATE OF title, authors, notes ON citations BEGIN
+        INSERT INTO citations_fts(citations_fts, rowid, title, authors, notes)
+        VALUES ('delete', old.id, old.title, old.authors, old.notes);
+        INSERT INTO citations_fts(rowid, title, authors, notes)
+        VALUES (new.id, new.title, new.authors, new.notes);
+    END
+    """,
+]
+
+_POSTGRES_DDL = [
+    """
+    ALTER TABLE citations ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(authors::text, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_citations_search_vector
+    ON citations USING GIN (search_vector)
+    """,
+]
+
+
+def drop_citation_search(connection: Connection) -> None:
+    """
+    Drop the PostgreSQL search column so the columns it reads can change type.
+    
+    ``install_citation_search`` recreates it. SQLite's index copies the
+    text and needs no changes.
+    
+    Args:
+        connection: Synchronous connection (use ``run_sync`` from async code)
+    """
+    if connection.dialect.name == "postgresql":
+        # The GIN index goes with the column
+        connection.exec_driver_sql("ALTER TABLE citations DROP COLUMN IF EXISTS search_vector")
+
+
+def install_citation_search(connection: Connection) -> None:
+    """
+    Create the citation full-text index if it does not exist yet.
+    
+    Args:
+        connection: Synchronous connection (use ``run_sync`` from async code)
+    """
+    dialect = connection.dialect.name
+    if not inspect(connection).has_table(Citation.__tablename__):
+        return
+    
+    if dialect == "sqlite":
+        existed = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'citations_fts'")
+        ).first() is not None
+        for statement in _SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+        if not existed:
+            # Index rows written before the FTS table existed
+            connection.exec_driver_sql("INSERT INTO citations_fts(citations_fts) VALUES ('rebuild')")
+    elif dialect == "postgresql":
+        for statement in _POSTGRES_DDL:
+            connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Citation.__table__, "after_create")
+def _create_citation_search(target, connection, **kw):
+    install_citation_search(connection)
+
+
+def _search_terms(search: str) -> list[str]:
+    return re.findall(r"\w+", search.lower())
+
+
+def apply_citation_search(query: Select, search: str, dialect: str) -> Select:
+    """
+    Restrict a citation query to full-text matches, best matches first.
+    
+    Every word in the search must match, as a prefix so partially typed
+    words still match. Call this before adding other ordering; any
+    ``order_by`` added afterwards only breaks ties in relevance.
+    
+    Args:
+        query: ``select(Citation)`` query
+        search: User-supplied search string
+        dialect: SQLAlchemy dialect name
+    
+    Returns:
+        Select: Filtered and ranked query (no rows if the search has no words)
+    """
+    terms = _search_terms(search)
+    if not terms:
+        return query.where(false())
+    
+    if dialect == "sqlite":
+        fts = table("citations_fts", column("rowid"))
+        match = " ".join(f'"{term}"*' for term in terms)
+        return (
+            query.join(fts, fts.c.rowid == Citation.id)
+            .where(literal_column("citations_fts").op("MATCH")(match))
+            .order_by(func.bm25(literal_column("citations_fts"), *_WEIGHTS))
+        )
+    
+    if dialect == "postgresql":
+        vector = literal_column("citations.search_vector")
+        tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        return (
+            query.where(vector.op("@@")(tsquery))
+            .order_by(func.ts_rank_cd(vector, tsquery).desc())
+        )
+    
+    # Other backends have no index; fall back to substring matching
+    for term in terms:
+        pattern = f"%{term}%"
+        query = query.where(or_(Citation.title.ilike(pattern), Citation.notes.ilike(pattern)))
+    return query
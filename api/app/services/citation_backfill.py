@@ -0,0 +1,273 @@
+"""
+Convert citations stored before ``authors``/``citation_data`` became JSON
+columns and tags moved to the ``tags`` table.
+
+Older rows hold Python reprs (``str(list)``/``str(dict)``) in ``authors``
+and ``citation_data``, which fail to decode as JSON, and their tags as a
+stringified list in a legacy ``citations.tags`` text column. This
+migration rewrites the reprs as JSON, moves legacy tag strings into
+``tags``/``citation_tags`` (clearing the old column), converts the columns
+to JSONB on PostgreSQL and rebuilds the affected users' citation
+statistics.
+
+Until that is done every read of a legacy citation fails, so startup runs
+``upgrade_legacy_citations`` before the search index is installed; it
+only scans the table when a cheap check finds something left to convert.
+The migration is safe to run again, and can also be run by hand:
+    
+    python -m app.services.citation_backfill [--dry-run]
+"""
+
+import argparse
+import ast
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Connection, inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging import get_logger
+from app.models.research_tool import Tag, citation_tags
+from app.models.search import drop_citation_search, install_citation_search
+from app.services.citation_stats import rebuild_citation_stats
+
+logger = get_logger(__name__)
+
+JSON_COLUMNS = ("authors", "citation_data")
+ADVISORY_LOCK_KEY = 7301  # Serializes startup upgrades across PostgreSQL workers
+
+# Values the backfill would change: not JSON, or JSON of the wrong shape
+_PENDING_QUERIES = {
+    "sqlite": """
+        SELECT 1 FROM citations
+        WHERE (authors IS NOT NULL AND CASE WHEN json_valid(authors)
+                THEN json_type(authors) NOT IN ('array', 'null') ELSE 1 END)
+           OR (citation_data IS NOT NULL AND CASE WHEN json_valid(citation_data)
+                THEN json_type(citation_data) NOT IN ('object', 'null') ELSE 1 END)
+        LIMIT 1
+    """,
+    "postgresql": """
+        SELECT 1 FROM citations
+        WHERE jsonb_typeof(authors) NOT IN ('array', 'null')
+           OR jsonb_typeof(citation_data) NOT IN ('object', 'null')
+        LIMIT 1
+    """,
+}
+
+
+def _parse_legacy(raw: str) -> Tuple[Any, bool]:
+    """
+    Decode a stored value written as JSON or as a Python literal repr.
+    
+    Returns:
+        Tuple: (decoded value or None if unparseable, whether it was a repr)
+    """
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        try:
+            return ast.literal_eval(raw), True
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return None, True
+    if isinstance(value, str):
+        # A repr that was itself JSON-encoded as a string
+        try:
+            inner = ast.literal_eval(value)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return value, False
+        if isinstance(inner, (list, dict)):
+            return inner, True
+    return value, False
+
+
+def _convert(column: str, raw: str) -> Tuple[Any, bool]:
+    """Convert one stored value to its JSON column type."""
+    value, changed = _parse_legacy(raw)
+    if column == "authors":
+        if value is None:
+            # Unparseable: keep the text as a comma-separated author list
+            return [name.strip() for name in raw.split(",") if name.strip()], True
+        if isinstance(value, str):
+            return [value], True
+        if isinstance(value, (list, tuple)):
+            return [str(name) for name in value], changed or isinstance(value, tuple)
+        return [str(value)], True
+    if isinstance(value, dict):
+        return value, changed
+    # Unparseable or not a mapping: keep the original text alongside
+    return {"legacy": raw if value is None else value}, True
+
+
+def _tag_names(raw: str) -> List[str]:
+    value, _ = _parse_legacy(raw)
+    if value is None or isinstance(value, str):
+        value = (value or raw).split(",")
+    if not isinstance(value, (list, tuple, set)):
+        value = [value]
+    return [str(name) for name in value if str(name).strip()]
+
+
+def _has_citations(connection: Connection) -> bool:
+    return inspect(connection).has_table("citations")
+
+
+def _column_types(connection: Connection) -> Dict[str, str]:
+    return {
+        column["name"]: str(column["type"]).upper()
+        for column in inspect(connection).get_columns("citations")
+    }
+
+
+async def _tags_for(db: AsyncSession, user_id: int, names: List[str], cache: Dict) -> List[Tag]:
+    """Get or create a user's tags, reusing ones resolved earlier in the run."""
+    tags = []
+    for name in dict.fromkeys(Tag.normalize(name) for name in names):
+        key = (user_id, name)
+        if key not in cache:
+            tag = await db.scalar(select(Tag).where(Tag.user_id == user_id, Tag.name == name))
+            if tag is None:
+                tag = Tag(name=name, user_id=user_id)
+                db.add(tag)
+                await db.flush()
+            cache[key] = tag
+        tags.append(cache[key])
+    return tags
+
+
+async def backfill_legacy_citations(db: AsyncSession, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Rewrite legacy citation values and move legacy tags.
+    
+    Args:
+        db: Database session
+        dry_run: Report what would change without writing
+    
+    Returns:
+        Dict: Counts of rows scanned, values converted and tags moved
+    """
+    column_types = await (await db.connection()).run_sync(_column_types)
+    has_legacy_tags = "tags" in column_types
+    columns = [f"CAST({column} AS TEXT) AS {column}" for column in JSON_COLUMNS]
+    if has_legacy_tags:
+        columns.append("tags")
+    result = await db.execute(text(f"SELECT id, user_id, {', '.join(columns)} FROM citations ORDER BY id"))
+    rows = result.mappings().all()
+    
+    stats = {"scanned": len(rows), "converted": 0, "tags_moved": 0}
+    tag_cache: Dict = {}
+    affected_users = set()
+    for row in rows:
+        updates: Dict[str, Optional[str]] = {}
+        for column in JSON_COLUMNS:
+            raw = row[column]
+            if raw is None or raw == "null":
+                continue
+            value, changed = _convert(column, raw)
+            if changed:
+                updates[column] = json.dumps(value)
+        stats["converted"] += len(updates)
+        
+        legacy_tags = row["tags"] if has_legacy_tags else None
+        if legacy_tags is not None:
+            names = _tag_names(legacy_tags)
+            stats["tags_moved"] += len(names)
+            if names and not dry_run:
+                linked = set(await db.scalars(
+                    select(citation_tags.c.tag_id).where(citation_tags.c.citation_id == row["id"])
+                ))
+                for tag in await _tags_for(db, row["user_id"], names, tag_cache):
+                    if tag.id not in linked:
+                        await db.execute(citation_tags.insert().values(citation_id=row["id"], tag_id=tag.id))
+                        linked.add(tag.id)
+                affected_users.add(row["user_id"])
+        
+        if dry_run or (not updates and legacy_tags is None):
+            continue
+        assignments = [f"{column} = :{column}" for column in updates]
+        if legacy_tags is not None:
+            assignments.append("tags = NULL")
+        await db.execute(
+            text(f"UPDATE citations SET {', '.join(assignments)} WHERE id = :id"),
+            {**updates, "id": row["id"]},
+        )
+    
+    if not dry_run:
+        altered = [column for column in JSON_COLUMNS if "JSON" not in column_types[column]]
+        if altered and db.get_bind().dialect.name == "postgresql":
+            # The generated search column reads authors, which blocks the type change
+            connection = await db.connection()
+            await connection.run_sync(drop_citation_search)
+            for column in altered:
+                await db.execute(text(
+                    f"ALTER TABLE citations ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"
+                ))
+            await connection.run_sync(install_citation_search)
+        await db.commit()
+        for user_id in sorted(affected_users):
+            await rebuild_citation_stats(db, user_id)
+    
+    logger.info(
+        f"Backfilled legacy citations: {stats['scanned']} scanned, {stats['converted']} values "
+        f"converted, {stats['tags_moved']} tags moved" + (" (dry run)" if dry_run else "")
+    )
+    return stats
+
+
+async def _pending(db: AsyncSession, column_types: Dict[str, str]) -> bool:
+    """Tell whether any citation still needs the backfill, without scanning rows."""
+    if "tags" in column_types:
+        if await db.scalar(text("SELECT 1 FROM citations WHERE tags IS NOT NULL LIMIT 1")) is not None:
+            return True
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql" and any("JSON" not in column_types[column] for column in JSON_COLUMNS):
+        return True
+    query = _PENDING_QUERIES.get(dialect)
+    if query is None:
+        # No cheap check for this backend; the backfill is idempotent
+        return True
+    return await db.scalar(text(query)) is not None
+
+
+async def upgrade_legacy_citations(db: AsyncSession) -> bool:
+    """
+    Run the backfill at startup if any legacy citations are left.
+    
+    Must run before ``install_citation_search``: PostgreSQL cannot change
+    the type of ``authors`` while the generated search column reads it.
+    
+    Args:
+        db: Database session
+    
+    Returns:
+        bool: True if the backfill ran
+    """
+    connection = await db.connection()
+    if not await connection.run_sync(_has_citations):
+        return False
+    if db.get_bind().dialect.name == "postgresql":
+        # Workers start together: one converts, the others then find nothing left
+        await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+    column_types = await connection.run_sync(_column_types)
+    if not await _pending(db, column_types):
+        await db.commit()
+        return False
+    logger.info("Converting legacy citation values")
+    await backfill_legacy_citations(db)
+    return True
+
+
+async def _main(dry_run: bool) -> None:
+    from app.core.database import AsyncSessionLocal, close_db
+    
+    async with AsyncSessionLocal() as db:
+        stats = await backfill_legacy_citations(db, dry_run=dry_run)
+    await close_db()
+    print(stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert legacy citation authors, data and tags")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing")
+    args = parser.parse_args()
+    asyncio.run(_main(args.dry_run))
@@ -0,0 +1,526 @@
+"""
+Streaming parsers for citation library imports (BibTeX, RIS, CSL-JSON).
+
+Each parser is fed decoded text in arbitrary chunks and returns the records
+completed so far, so an upload can be imported without holding the whole
+file (or all parsed records) in memory. Records are normalized to the
+fields of ``CitationCreateRequest``.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class ParsedRecord:
+    """One record from an import file: normalized fields or a parse error."""
+    index: int
+    data: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+BIBTEX_TYPES = {
+    "article": "article",
+    "book": "book",
+    "inbook": "book",
+    "incollection": "book",
+    "booklet": "book",
+    "inproceedings": "conference",
+    "conference": "conference",
+    "proceedings": "conference",
+    "techreport": "report",
+    "report": "report",
+    "phdthesis": "thesis",
+    "mastersthesis": "thesis",
+    "thesis": "thesis",
+    "online": "website",
+    "electronic": "website",
+    "www": "website",
+}
+
+RIS_TYPES = {
+    "JOUR": "article",
+    "JFULL": "article",
+    "EJOUR": "article",
+    "BOOK": "book",
+    "EBOOK": "book",
+    "CHAP": "book",
+    "ECHAP": "book",
+    "CONF": "conference",
+    "CPAPER": "conference",
+    "RPRT": "report",
+    "THES": "thesis",
+    "ELEC": "website",
+    "WEB": "website",
+    "NEWS": "news",
+    "MGZN": "news",
+    "BLOG": "blog",
+    "GOVDOC": "government",
+}
+
+CSL_TYPES = {
+    "article-journal": "article",
+    "article": "article",
+    "book": "book",
+    "chapter": "book",
+    "paper-conference": "conference",
+    "report": "report",
+    "thesis": "thesis",
+    "webpage": "website",
+    "post": "social_media",
+    "post-weblog": "blog",
+    "article-newspaper": "news",
+    "article-magazine": "news",
+    "legislation": "government",
+    "legal_case": "government",
+}
+
+MONTHS = {
+    name: number
+    for number, names in enumerate(
+        [("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+         ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+         ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december")],
+        start=1,
+    )
+    for name in names
+}
+
+
+def normalize_doi(doi: Optional[str]) -> Optional[str]:
+    """
+    Normalize a DOI for storage and duplicate detection.
+    
+    Args:
+        doi: DOI, optionally as a doi.org URL or with a ``doi:`` prefix
+    
+    Returns:
+        Optional[str]: Lower-cased bare DOI, or None if empty
+    """
+    if not doi:
+        return None
+    doi = re.sub(r"^(https?://(dx\.)?doi\.org/|doi:)", "", doi.strip(), flags=re.IGNORECASE)
+    return doi.lower() or None
+
+
+def normalize_isbn(isbn: Optional[str]) -> Optional[str]:
+    """
+    Normalize an ISBN for storage and duplicate detection.
+    
+    Args:
+        isbn: ISBN-10 or ISBN-13 with any separators
+    
+    Returns:
+        Optional[str]: Digits (and a trailing X), or None if empty
+    """
+    if not isbn:
+        return None
+    # Only the first ISBN when several are listed
+    first = re.split(r"[;,\s](?=\d{9})", isbn.strip())[0]
+    digits = re.sub(r"[^0-9Xx]", "", first).upper()
+    return digits[:20] or None
+
+
+def _date(year: Any, month: Any = None, day: Any = None) -> Optional[datetime]:
+    try:
+        year = int(str(year).strip()[:4])
+    except (TypeError, ValueError):
+        return None
+    if month is not None and not str(month).strip().isdigit():
+        month = MONTHS.get(str(month).strip().lower()[:9].rstrip("."))
+    try:
+        return datetime(year, int(month or 1), int(day or 1))
+    except (TypeError, ValueError):
+        return datetime(year, 1, 1)
+
+
+def _clean(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    value = " ".join(value.split())
+    return value or None
+
+
+def _split_keywords(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+    return [keyword.strip() for keyword in re.split(r"[;,]", value) if keyword.strip()]
+
+
+_ENTRY_START = re.compile(r"@\s*(?:\w+)\s*([{(])")
+_PARTIAL_HEADER = re.compile(r"@\s*\w*\s*")
+
+
+class BibtexParser:
+    """
+    Incremental BibTeX parser.
+    
+    Supports ``{...}``, ``"..."`` and bare values, ``#`` concatenation and
+    ``@string`` macros. ``@comment`` and ``@preamble`` blocks are skipped.
+    """
+    
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._count = 0
+        self._macros: Dict[str, str] = {}
+    
+    def feed(self, chunk: str) -> List[ParsedRecord]:
+        """Parse every entry completed by chunk."""
+        self._buffer += chunk
+        records = []
+        while True:
+            start = self._buffer.find("@")
+            if start < 0:
+                self._buffer = ""
+                break
+            end = self._entry_end(start)
+            if end is None:
+                self._buffer = self._buffer[start:]
+                break
+            record = self._parse_entry(self._buffer[start:end])
+            self._buffer = self._buffer[end:]
+            if record is not None:
+                records.append(record)
+        return records
+    
+    def close(self) -> List[ParsedRecord]:
+        """Report a truncated trailing entry, if any."""
+        if self._buffer.strip():
+            self._count += 1
+            return [ParsedRecord(self._count, error="Unterminated BibTeX entry at end of file")]
+        return []
+    
+    def _entry_end(self, start: int) -> Optional[int]:
+        """Find the end of the entry starting at start, or None if incomplete."""
+        opening = _ENTRY_START.match(self._buffer, start)
+        if not opening:
+            if _PARTIAL_HEADER.fullmatch(self._buffer, start):
+                return None
+            # A stray "@" outside any entry; skip it
+            return start + 1
+        brace_delimited = opening.group(1) == "{"
+        depth = 0
+        for i in range(opening.end(), len(self._buffer)):
+            char = self._buffer[i]
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                if depth == 0 and brace_delimited:
+                    return i + 1
+                depth -= 1
+            elif char == ")" and depth == 0 and not brace_delimited:
+                return i + 1
+        return None
+    
+    def _parse_entry(self, text: str) -> Optional[ParsedRecord]:
+        header = re.match(r"@\s*(\w+)\s*[{(]", text)
+        if not header:
+            return None
+        entry_type = header.group(1).lower()
+        body = text[header.end():-1]
+        
+        if entry_type in ("comment", "preamble"):
+            return None
+        if entry_type == "string":
+            try:
+                self._macros.update(self._parse_fields(body))
+            except ValueError:
+                pass
+            return None
+        
+        self._count += 1
+        key, _, rest = body.partition(",")
+        try:
+            fields = self._parse_fields(rest)
+        except ValueError as e:
+            return ParsedRecord(self._count, error=f"Invalid BibTeX entry '{key.strip()}': {e}")
+        
+        authors = fields.get("author") or fields.get("editor")
+        data = {
+            "title": _clean(fields.get("title")),
+            "authors": [_clean(a) for a in re.split(r"\s+and\s+", authors) if _clean(a)] if authors else None,
+            "publication_date": _date(fields["year"], fields.get("month")) if fields.get("year") else None,
+            "source_type": BIBTEX_TYPES.get(entry_type, "website" if fields.get("url") else "other"),
+            "source_name": _clean(
+                fields.get("journal") or fields.get("journaltitle") or fields.get("booktitle")
+                or fields.get("publisher") or fields.get("institution") or fields.get("school")
+            ),
+            "url": _clean(fields.get("url")),
+            "doi": normalize_doi(fields.get("doi")),
+            "isbn": normalize_isbn(fields.get("isbn")),
+            "pmid": _clean(fields.get("pmid")),
+            "tags": _split_keywords(fields.get("keywords")),
+            "notes": _clean(fields.get("abstract") or fields.get("note") or fields.get("annote")),
+            "additional_data": {"bibtex_key": key.strip()} if key.strip() else None,
+        }
+        return ParsedRecord(self._count, data=data)
+    
+    def _parse_fields(self, body: str) -> Dict[str, str]:
+        fields: Dict[str, str] = {}
+        pos = 0
+        length = len(body)
+        while pos < length:
+            match = re.compile(r"\s*,?\s*([\w\-:.]+)\s*=\s*").match(body, pos)
+            if not match:
+                if body[pos:].strip(" \t\r\n,"):
+                    raise ValueError(f"unexpected text near {body[pos:pos + 20]!r}")
+                break
+            name = match.group(1).lower()
+            pos = match.end()
+            parts = []
+            while True:
+                value, pos = self._parse_value(body, pos)
+                parts.append(value)
+                hash_match = re.compile(r"\s*#\s*").match(body, pos)
+                if not hash_match:
+                    break
+                pos = hash_match.end()
+            fields[name] = "".join(parts)
+        return fields
+    
+    def _parse_value(self, body: str, pos: int) -> tuple[str, int]:
+        if pos >= len(body):
+            raise ValueError("missing value")
+        char = body[pos]
+        if char == "{":
+            depth = 0
+            for i in range(pos, len(body)):
+                if body[i] == "{":
+                    depth += 1
+                elif body[i] == "}":
+                    depth -= 1
+                    if depth == 0:
+                        return body[pos + 1:i].replace("{", "").replace("}", ""), i + 1
+            raise ValueError("unbalanced braces")
+        if char == '"':
+            depth = 0
+            for i in range(pos + 1, len(body)):
+                if body[i] == "{":
+                    depth += 1
+                elif body[i] == "}":
+                    depth -= 1
+                elif body[i] == '"' and depth == 0 and body[i - 1] != "\\":
+                    return body[pos + 1:i].replace("{", "").replace("}", ""), i + 1
+            raise ValueError("unterminated string")
+        match = re.compile(r"[\w\-:./]+").match(body, pos)
+        if not match:
+            raise ValueError(f"invalid value near {body[pos:pos + 20]!r}")
+        word = match.group(0)
+        return self._macros.get(word.lower(), word), match.end()
+
+
+class RisParser:
+    """
+    Incremental RIS parser.
+    """
+    
+    _line = re.compile(r"^([A-Z][A-Z0-9])  -(?: (.*))?$")
+    
+    def __init__(self) -> None:
+        self._partial = ""
+        self._count = 0
+        self._fields: Optional[Dict[str, List[str]]] = None
+        self._last_tag: Optional[str] = None
+    
+    def feed(self, chunk: str) -> List[ParsedRecord]:
+        """Parse every record completed by chunk."""
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        records = []
+        for line in lines:
+            record = self._parse_line(line.rstrip("\r"))
+            if record is not None:
+                records.append(record)
+        return records
+    
+    def close(self) -> List[ParsedRecord]:
+        """Flush the last line and report an unterminated record, if any."""
+        records = self.feed("\n") if self._partial else []
+        if self._fields is not None:
+            self._count += 1
+            self._fields = None
+            records.append(ParsedRecord(self._count, error="RIS record missing 'ER' terminator"))
+        return records
+    
+    def _parse_line(self, line: str) -> Optional[ParsedRecord]:
+        match = self._line.match(line)
+        if not match:
+            # Continuation of the previous field's value
+            if self._fields is not None and line.strip() and self._last_tag:
+                self._fields[self._last_tag][-1] += " " + line.strip()
+            return None
+        tag, value = match.group(1), (match.group(2) or "").strip()
+        if tag == "TY":
+            self._fields = {"TY": [value]}
+            self._last_tag = "TY"
+            return None
+        if self._fields is None:
+            return None
+        if tag == "ER":
+            fields, self._fields = self._fields, None
+            self._count += 1
+            return self._to_record(fields)
+        self._fields.setdefault(tag, []).append(value)
+        self._last_tag = tag
+        return None
+    
+    def _to_record(self, fields: Dict[str, List[str]]) -> ParsedRecord:
+        def first(*tags: str) -> Optional[str]:
+            for tag in tags:
+                for value in fields.get(tag, []):
+                    if value:
+                        return value
+            return None
+        
+        authors = [a for tag in ("AU", "A1", "A2") for a in fields.get(tag, []) if a]
+        date = first("PY", "Y1", "DA")
+        publication_date = None
+        if date:
+            parts = (re.split(r"[/\-]", date) + [None, None])[:3]
+            publication_date = _date(parts[0], parts[1] or None, parts[2] or None)
+        
+        data = {
+            "title": _clean(first("TI", "T1", "CT", "BT")),
+            "authors": authors or None,
+            "publication_date": publication_date,
+            "source_type": RIS_TYPES.get((first("TY") or "").upper(), "other"),
+            "source_name": _clean(first("T2", "JO", "JF", "JA", "PB")),
+            "url": _clean(first("UR", "L1")),
+            "doi": normalize_doi(first("DO")),
+            "isbn": normalize_isbn(first("SN")) if (first("TY") or "").upper() in ("BOOK", "EBOOK", "CHAP", "ECHAP") else None,
+            "pmid": None,
+            "tags": [kw for value in fields.get("KW", []) for kw in _split_keywords(value)],
+            "notes": _clean(first("AB", "N2", "N1")),
+            "additional_data": None,
+        }
+        return ParsedRecord(self._count, data=data)
+
+
+class CslJsonParser:
+    """
+    Incremental CSL-JSON parser for an array of items (or a single item).
+    """
+    
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._count = 0
+        self._started = False
+        self._done = False
+        self._decoder = json.JSONDecoder()
+    
+    def feed(self, chunk: str) -> List[ParsedRecord]:
+        """Parse every item completed by chunk."""
+        self._buffer += chunk
+        records = []
+        while not self._done:
+            self._buffer = self._buffer.lstrip(" \t\r\n,")
+            if not self._buffer:
+                break
+            if not self._started:
+                if self._buffer[0] == "[":
+                    self._buffer = self._buffer[1:]
+                self._started = True
+                continue
+            if self._buffer[0] == "]":
+                self._done = True
+                self._buffer = ""
+                break
+            try:
+                item, end = self._decoder.raw_decode(self._buffer)
+            except json.JSONDecodeError:
+                # Incomplete item; wait for more input
+                break
+            self._buffer = self._buffer[end:]
+            self._count += 1
+            records.append(self._to_record(item))
+        return records
+    
+    def close(self) -> List[ParsedRecord]:
+        """Report trailing garbage or a truncated item, if any."""
+        if self._buffer.strip(" \t\r\n,]"):
+            self._count += 1
+            return [ParsedRecord(self._count, error="Invalid or truncated CSL-JSON item")]
+        return []
+    
+    def _to_record(self, item: Any) -> ParsedRecord:
+        if not isinstance(item, dict):
+            return ParsedRecord(self._count, error="CSL-JSON item is not an object")
+        
+        authors = []
+        for person in item.get("author") or item.get("editor") or []:
+            if not isinstance(person, dict):
+                continue
+            if person.get("literal"):
+                authors.append(person["literal"])
+            elif person.get("family"):
+                given = person.get("given")
+                authors.append(f"{person['family']}, {given}" if given else person["family"])
+        
+        publication_date = None
+        parts = ((item.get("issued") or {}).get("date-parts") or [[]])[0]
+        if parts:
+            publication_date = _date(*(list(parts) + [None, None])[:3])
+        
+        keywords = item.get("keyword")
+        isbn = item.get("ISBN")
+        data = {
+            "title": _clean(item.get("title")),
+            "authors": authors or None,
+            "publication_date": publication_date,
+            "source_type": CSL_TYPES.get(item.get("type", ""), "other"),
+            "source_name": _clean(item.get("container-title") or item.get("publisher")),
+            "url": _clean(item.get("URL")),
+            "doi": normalize_doi(item.get("DOI")),
+            "isbn": normalize_isbn(isbn if isinstance(isbn, str) else None),
+            "pmid": _clean(str(item["PMID"])) if item.get("PMID") else None,
+            "tags": _split_keywords(keywords) if isinstance(keywords, str) else [],
+            "notes": _clean(item.get("abstract") or item.get("note")),
+            "additional_data": {"csl_id": str(item["id"])} if item.get("id") is not None else None,
+        }
+        return ParsedRecord(self._count, data=data)
+
+
+PARSERS = {
+    "bibtex": BibtexParser,
+    "ris": RisParser,
+    "csl-json": CslJsonParser,
+}
+
+EXTENSIONS = {
+    ".bib": "bibtex",
+    ".bibtex": "bibtex",
+    ".ris": "ris",
+    ".json": "csl-json",
+}
+
+
+def detect_format(filename: Optional[str], sample: str) -> Optional[str]:
+    """
+    Guess the import format from the file name or its first bytes.
+    
+    Args:
+        filename: Uploaded file name
+        sample: Beginning of the decoded file
+    
+    Returns:
+        Optional[str]: Format name, or None if unknown
+    """
+    if filename:
+        for extension, name in EXTENSIONS.items():
+            if filename.lower().endswith(extension):
+                return name
+    stripped = sample.lstrip()
+    if stripped.startswith(("[", "{")):
+        return "csl-json"
+    if stripped.startswith("@") or re.search(r"^\s*@\w+\s*[{(]", sample, re.MULTILINE):
+        return "bibtex"
+    if re.search(r"^TY  - ", sample, re.MULTILINE):
+        return "ris"
+    return None
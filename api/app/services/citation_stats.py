@@ -0,0 +1,286 @@
+"""
+Incrementally maintained citation statistics.
+
+Every citation write adjusts a handful of per-user counters
+(``CitationStat`` rows) in the same transaction, so reading a user's
+statistics touches a bounded number of rows no matter how many citations
+they have. ``rebuild_citation_stats`` recomputes the counters from the
+citations table for backfills and repairs:
+    
+    python -m app.services.citation_stats [--user-id ID]
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging import get_logger
+from app.models.research_tool import Citation, CitationStat, Tag, citation_tags
+
+logger = get_logger(__name__)
+
+RECENT_DAYS = 30
+TOP_TAGS = 10
+
+
+def citation_stat_deltas(citation: Citation, sign: int = 1) -> Counter:
+    """
+    Counter adjustments for adding (or, with sign=-1, removing) a citation.
+    
+    Args:
+        citation: Citation with its tags loaded
+        sign: 1 when the citation is added, -1 when it is removed
+    
+    Returns:
+        Counter: Deltas keyed by (dimension, bucket)
+    """
+    created_at = citation.created_at or datetime.now(timezone.utc)
+    deltas: Counter = Counter({
+        ("total", "all"): sign,
+        ("source_type", citation.source_type): sign,
+        ("day", created_at.date().isoformat()): sign,
+    })
+    if citation.reliability_rating is not None:
+        deltas[("rating", str(citation.reliability_rating))] += sign
+    for tag in citation.tags or []:
+        deltas[("tag", tag.name)] += sign
+    return deltas
+
+
+async def apply_citation_stats(db: AsyncSession, user_id: int, deltas: Counter) -> None:
+    """
+    Add deltas to a user's counters within the caller's transaction.
+    
+    Uses a single atomic upsert on PostgreSQL and SQLite, so concurrent
+    writers never lose updates.
+    
+    Args:
+        db: Database session
+        user_id: Owner of the citations
+        deltas: Adjustments keyed by (dimension, bucket)
+    """
+    # Sorted so concurrent transactions lock rows in the same order
+    changes = sorted((key, delta) for key, delta in deltas.items() if delta)
+    if not changes:
+        return
+    
+    now = datetime.now(timezone.utc)
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        statement = insert(CitationStat).values([
+            {
+                "user_id": user_id,
+                "dimension": dimension,
+                "bucket": bucket,
+                "count": delta,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for (dimension, bucket), delta in changes
+        ])
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["user_id", "dimension", "bucket"],
+                set_={
+                    "count": CitationStat.count + statement.excluded.count,
+                    "updated_at": now,
+                },
+            )
+        )
+        return
+    
+    for (dimension, bucket), delta in changes:
+        result = await db.execute(
+            update(CitationStat)
+            .where(
+                CitationStat.user_id == user_id,
+                CitationStat.dimension == dimension,
+                CitationStat.bucket == bucket,
+            )
+            .values(count=CitationStat.count + delta, updated_at=now)
+        )
+        if result.rowcount == 0:
+            db.add(CitationStat(user_id=user_id, dimension=dimension, bucket=bucket, count=delta))
+
+
+async def read_citation_stats(db: AsyncSession, user_id: int) -> Dict[str, Any]:
+    """
+    Read a user's citation statistics from their counters.
+    
+    Args:
+        db: Database session
+        user_id: User ID
+    
+    Returns:
+        Dict: total_citations, by_source_type, by_rating, recent_citations
+        and top_tags
+    """
+    since = (datetime.now(timezone.utc) - timedelta(days=RECENT_DAYS)).date().isoformat()
+    result = await db.execute(
+        select(CitationStat.dimension, CitationStat.bucket, CitationStat.count).where(
+            CitationStat.user_id == user_id,
+            CitationStat.count > 0,
+            (CitationStat.dimension.in_(("total", "source_type", "rating")))
+            | ((CitationStat.dimension == "day") & (CitationStat.bucket >= since)),
+        )
+    )
+    stats: Dict[str, Any] = {
+        "total_citations": 0,
+        "by_source_type": {},
+        "by_rating": {},
+        "recent_citations": 0,
+    }
+    for dimension, bucket, count in result:
+        if dimension == "total":
+            stats["total_citations"] = count
+        elif dimension == "source_type":
+            stats["by_source_type"][bucket] = count
+        elif dimension == "rating":
+            stats["by_rating"][f"rating_{bucket}"] = count
+        else:
+            stats["recent_citations"] += count
+    
+    tags_result = await db.execute(
+        select(CitationStat.bucket, CitationStat.count)
+        .where(
+            CitationStat.user_id == user_id,
+            CitationStat.dimension == "tag",
+            CitationStat.count > 0,
+        )
+        .order_by(CitationStat.count.desc(), CitationStat.bucket)
+        .limit(TOP_TAGS)
+    )
+    stats["top_tags"] = [{"tag": tag, "count": count} for tag, count in tags_result]
+    return stats
+
+
+async def rebuild_citation_stats(
+    db: AsyncSession,
+    user_id: Optional[int] = None,
+    replace: bool = True,
+) -> int:
+    """
+    Recompute counters from the citations table and commit.
+    
+    Args:
+        db: Database session
+        user_id: Only rebuild this user's counters (default: every user)
+        replace: Delete existing counters first. When False, counters that
+            already exist are left as they are (on PostgreSQL and SQLite the
+            insert skips them), so concurrent backfills cannot conflict.
+    
+    Returns:
+        int: Number of counters computed
+    """
+    def scoped(query, column=Citation.user_id):
+        return query.where(column == user_id) if user_id is not None else query
+    
+    day = func.date(Citation.created_at)
+    queries: Iterable = [
+        ("total", scoped(select(Citation.user_id, func.count(Citation.id)).group_by(Citation.user_id))),
+        ("source_type", scoped(
+            select(Citation.user_id, Citation.source_type, func.count(Citation.id))
+            .group_by(Citation.user_id, Citation.source_type)
+        )),
+        ("rating", scoped(
+            select(Citation.user_id, Citation.reliability_rating, func.count(Citation.id))
+            .where(Citation.reliability_rating.is_not(None))
+            .group_by(Citation.user_id, Citation.reliability_rating)
+        )),
+        ("day", scoped(
+            select(Citation.user_id, day, func.count(Citation.id))
+            .group_by(Citation.user_id, day)
+        )),
+        ("tag", scoped(
+            select(Tag.user_id, Tag.name, func.count(citation_tags.c.citation_id))
+            .join(citation_tags, citation_tags.c.tag_id == Tag.id)
+            .group_by(Tag.user_id, Tag.name),
+            Tag.user_id,
+        )),
+    ]
+    
+    if replace:
+        await db.execute(scoped(delete(CitationStat), CitationStat.user_id))
+    dialect = db.get_bind().dialect.name
+    now = datetime.now(timezone.utc)
+    written = 0
+    for dimension, query in queries:
+        rows = []
+        for row in await db.execute(query):
+            owner, count = row[0], row[-1]
+            bucket = "all" if dimension == "total" else str(row[1])
+            rows.append({
+                "user_id": owner,
+                "dimension": dimension,
+                "bucket": bucket,
+                "count": count,
+                "created_at": now,
+                "updated_at": now,
+            })
+        written += len(rows)
+        if not rows:
+            continue
+        if not replace and dialect in ("postgresql", "sqlite"):
+            insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            await db.execute(
+                insert(CitationStat).values(rows).on_conflict_do_nothing(
+                    index_elements=["user_id", "dimension", "bucket"]
+                )
+            )
+        else:
+            db.add_all(CitationStat(**row) for row in rows)
+    await db.commit()
+    
+    logger.info(
+        f"Rebuilt {written} citation counters"
+        + (f" for user {user_id}" if user_id is not None else "")
+    )
+    return written
+
+
+async def backfill_citation_stats(db: AsyncSession) -> None:
+    """
+    Build counters once for databases created before they existed.
+    
+    Runs at startup in every worker, so it only ever fills an empty
+    counters table and never deletes: workers that race each insert the
+    same counts and skip the ones already written.
+    
+    Args:
+        db: Database session
+    """
+    has_stats = await db.scalar(select(CitationStat.id).limit(1))
+    has_citations = await db.scalar(select(Citation.id).limit(1))
+    if has_stats is not None or has_citations is None:
+        return
+    try:
+        await rebuild_citation_stats(db, replace=False)
+    except IntegrityError:
+        # Dialects without an upsert: another worker got there first
+        await db.rollback()
+        logger.info("Citation counters were backfilled by another worker")
+
+
+async def _main(user_id: Optional[int]) -> None:
+    from app.core.database import AsyncSessionLocal, close_db
+    
+    async with AsyncSessionLocal() as db:
+        written = await rebuild_citation_stats(db, user_id)
+    await close_db()
+    print(f"Rebuilt {written} citation counters")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild citation statistics counters")
+    parser.add_argument("--user-id", type=int, help="Only rebuild this user's counters")
+    args = parser.parse_args()
+    asyncio.run(_main(args.user_id))
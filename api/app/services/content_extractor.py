@@ -0,0 +1,438 @@
+"""
+Main-content extraction for scraped pages.
+
+A Readability-style extractor that walks the lxml tree once:
+
+* Text, link text, descendant tags and commas are totalled bottom-up for
+  every element. ``script``/``style`` and similar subtrees contribute no
+  text, and boilerplate (``nav``, ``aside``, ``footer``, ``form``, ARIA
+  navigation roles, and class/id names such as "sidebar" or "comments"
+  that do not also look like content) is left out of every total.
+* Each paragraph-like block with enough text, a reasonable text density
+  (characters per descendant tag) and a low link density adds a score of
+  ``1 + commas + min(3, chars / 100)``, scaled by its non-link share, to
+  its parent and half of that to its grandparent.
+* The best candidate is the highest score (plus class/id and tag weights)
+  times one minus its link density; well-scoring siblings are included,
+  for articles split across several containers.
+* Title, byline, publish date, meta tags, links and images are collected
+  in the same pass; JSON-LD and meta tags win over DOM guesses for the
+  byline and date.
+
+Pages with no scoring block fall back to all non-boilerplate body text.
+"""
+
+import codecs
+import json
+import re
+import urllib.parse
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from lxml import etree, html
+
+# Subtrees whose text is never content
+SKIP_TAGS = frozenset({
+    "head", "script", "style", "noscript", "template", "svg", "math",
+    "iframe", "object", "embed", "canvas", "select", "button",
+})
+BOILERPLATE_TAGS = frozenset({"nav", "aside", "footer", "form", "dialog"})
+BOILERPLATE_ROLES = frozenset({"navigation", "banner", "contentinfo", "complementary", "search", "dialog"})
+# Never dropped for their class/id alone
+STRUCTURAL_TAGS = frozenset({"html", "body", "article", "main"})
+# Break lines before and after these
+BLOCK_TAGS = frozenset({
+    "address", "article", "blockquote", "br", "dd", "div", "dl", "dt",
+    "figcaption", "figure", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "ol", "p", "pre", "section", "table", "td", "th",
+    "tr", "ul",
+})
+PARAGRAPH_TAGS = frozenset({"p", "pre", "blockquote", "td"})
+# Containers that count as a paragraph when they hold enough text directly
+DIV_TAGS = frozenset({"div", "section", "article", "main"})
+TAG_WEIGHTS = {
+    "article": 10, "main": 10, "div": 5, "section": 3, "pre": 3, "td": 3, "blockquote": 3,
+    "form": -3, "ol": -3, "ul": -3, "dl": -3, "li": -3, "th": -5, "header": -5,
+    "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5,
+}
+CLASS_WEIGHT = 25
+
+_POSITIVE = re.compile(
+    r"(?:^|[\s_-])(?:article|body|content|entry|hentry|main|post|story|text|blog)", re.I
+)
+_NEGATIVE = re.compile(
+    r"(?:^|[\s_-])(?:comment|share|sharing|social|related|sidebar|footer|masthead|menu|"
+    r"promo|sponsor|advert|ads?(?:$|[\s_-])|banner|cookie|newsletter|subscribe|breadcrumb|"
+    r"widget|popup|modal|skip|disqus|outbrain|taboola)",
+    re.I,
+)
+_BYLINE = re.compile(r"(?:^|[\s_-])(?:byline|author|writtenby|p-author|dateline)", re.I)
+_BY_PREFIX = re.compile(r"^\s*by[\s:]+", re.I)
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+_CONTENT_TYPE_CHARSET = re.compile(r"charset=[\"']?([\w-]+)", re.I)
+_SPACE = re.compile(r"\s+")
+
+MIN_PARAGRAPH_CHARS = 25
+MIN_TEXT_DENSITY = 10  # Characters per descendant tag; lower is markup-heavy chrome
+MAX_PARAGRAPH_LINK_DENSITY = 0.5
+MAX_BYLINE_CHARS = 100
+
+# Meta names and properties holding the publish date, most specific first
+DATE_META = (
+    "article:published_time", "og:published_time", "datepublished", "pubdate",
+    "publishdate", "publish-date", "publish_date", "parsely-pub-date",
+    "sailthru.date", "dc.date.issued", "dcterms.created", "dc.date", "date",
+)
+AUTHOR_META = ("author", "article:author", "parsely-author", "sailthru.author", "dc.creator")
+
+
+@dataclass
+class ExtractedContent:
+    """Main content and page-level data found by ``extract_content``."""
+    title: Optional[str] = None
+    text: str = ""
+    byline: Optional[str] = None
+    published: Optional[str] = None  # ISO 8601 when parseable
+    metadata: Dict[str, str] = field(default_factory=dict)  # Meta tags by name or property
+    links: List[Tuple[str, str]] = field(default_factory=list)  # (absolute URL, link text)
+    images: List[str] = field(default_factory=list)  # Absolute image URLs
+
+
+class _Frame:
+    """Totals of an element whose subtree is being walked."""
+    __slots__ = ("element", "start", "chars", "direct", "link_chars", "tags", "commas", "boilerplate")
+    
+    def __init__(self, element: Any, start: int, boilerplate: bool):
+        self.element = element
+        self.start = start
+        self.chars = 0
+        self.direct = 0  # Text not inside a child element
+        self.link_chars = 0
+        self.tags = 0
+        self.commas = 0
+        self.boilerplate = boilerplate
+
+
+@dataclass
+class _Block:
+    start: int
+    end: int
+    chars: int
+    link_chars: int
+    boilerplate: bool
+    
+    @property
+    def link_density(self) -> float:
+        return self.link_chars / self.chars if self.chars else 0.0
+
+
+def _iso_date(value: Optional[str]) -> Optional[str]:
+    if not value or not value.strip():
+        return None
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).isoformat()
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).isoformat()
+    except (TypeError, ValueError):
+        return value
+
+
+def _encoding(content: bytes, declared: Optional[str]) -> str:
+    for candidate in (declared, *_META_CHARSET.findall(content[:4096])):
+        if not candidate:
+            continue
+        if isinstance(candidate, bytes):
+            candidate = candidate.decode("ascii", errors="ignore")
+        try:
+            codecs.lookup(candidate)
+        except LookupError:
+            continue
+        return candidate
+    return "utf-8"
+
+
+def content_type_charset(content_type: Optional[str]) -> Optional[str]:
+    """Charset declared in a Content-Type header, if any."""
+    match = _CONTENT_TYPE_CHARSET.search(content_type or "")
+    return match.group(1) if match else None
+
+
+def _json_ld_objects(data: Any) -> Iterable[Dict[str, Any]]:
+    if isinstance(data, list):
+        for item in data:
+            yield from _json_ld_objects(item)
+    elif isinstance(data, dict):
+        yield data
+        yield from _json_ld_objects(data.get("@graph"))
+
+
+def _json_ld_author(author: Any) -> Optional[str]:
+    if isinstance(author, list):
+        names = [_json_ld_author(item) for item in author]
+        return ", ".join(name for name in names if name) or None
+    if isinstance(author, dict):
+        author = author.get("name")
+    return author.strip() if isinstance(author, str) and author.strip() else None
+
+
+class _Extraction:
+    """State of one pass over a parsed document."""
+    
+    def __init__(self, url: str):
+        self.url = url
+        # Text runs in document order, each flagged as boilerplate or not; None breaks a line
+        self.pieces: List[Optional[Tuple[str, bool]]] = []
+        self.stack: List[_Frame] = []
+        self.skip_depth = 0
+        self.scores: Dict[Any, float] = {}
+        self.blocks: Dict[Any, _Block] = {}
+        self.body: Optional[_Block] = None
+        self.result = ExtractedContent()
+        self.title: Optional[str] = None
+        self.h1: Optional[str] = None
+        self.dom_byline: Optional[str] = None
+        self.dom_date: Optional[str] = None
+        self.ld_author: Optional[str] = None
+        self.ld_date: Optional[str] = None
+    
+    def walk(self, root: Any) -> None:
+        for event, element in etree.iterwalk(root, events=("start", "end")):
+            tag = element.tag
+            if not isinstance(tag, str):
+                continue
+            tag = tag.lower()
+            if event == "start":
+                self._start(element, tag)
+            else:
+                self._end(element, tag)
+    
+    def _add_text(self, text: Optional[str]) -> None:
+        if not text or self.skip_depth or not self.stack:
+            return
+        frame = self.stack[-1]
+        self.pieces.append((text, frame.boilerplate))
+        if not frame.boilerplate:
+            length = len(text.strip())
+            frame.chars += length
+            frame.direct += length
+            frame.commas += text.count(",")
+    
+    def _is_boilerplate(self, element: Any, tag: str) -> bool:
+        if tag in BOILERPLATE_TAGS:
+            return True
+        if (element.get("role") or "").lower() in BOILERPLATE_ROLES:
+            return True
+        if tag in STRUCTURAL_TAGS:
+            return False
+        names = f"{element.get('class') or ''} {element.get('id') or ''}"
+        return bool(_NEGATIVE.search(names)) and not _POSITIVE.search(names)
+    
+    def _start(self, element: Any, tag: str) -> None:
+        self._collect(element, tag)
+        if self.skip_depth or tag in SKIP_TAGS:
+            self.skip_depth += 1
+            return
+        if tag in BLOCK_TAGS:
+            self.pieces.append(None)
+        parent = self.stack[-1] if self.stack else None
+        boilerplate = (parent is not None and parent.boilerplate) or self._is_boilerplate(element, tag)
+        self.stack.append(_Frame(element, len(self.pieces), boilerplate))
+        self._add_text(element.text)
+    
+    def _end(self, element: Any, tag: str) -> None:
+        if self.skip_depth:
+            self.skip_depth -= 1
+            if tag == "script" and (element.get("type") or "").lower() == "application/ld+json":
+                self._json_ld(element.text)
+            elif tag == "title" and self.title is None:
+                self.title = _SPACE.sub(" ", element.text_content()).strip() or None
+            if self.skip_depth == 0:
+                self._add_text(element.tail)
+            return
+        
+        frame = self.stack.pop()
+        if tag in BLOCK_TAGS:
+            self.pieces.append(None)
+        if tag == "a":
+            frame.link_chars = frame.chars
+            href = element.get("href")
+            if href:
+                self.result.links.append((urllib.parse.urljoin(self.url, href.strip()), self._text(frame.start)))
+        self._observe(element, tag, frame)
+        
+        block = _Block(frame.start, len(self.pieces), frame.chars, frame.link_chars, frame.boilerplate)
+        self._score(element, tag, frame, block)
+        if tag == "body":
+            self.body = block
+        
+        if self.stack:
+            parent = self.stack[-1]
+            if not frame.boilerplate:
+                parent.chars += frame.chars
+                parent.link_chars += frame.link_chars
+                parent.commas += frame.commas
+            parent.tags += frame.tags + 1
+        self._add_text(element.tail)
+    
+    def _score(self, element: Any, tag: str, frame: _Frame, block: _Block) -> None:
+        if element in self.scores:
+            self.blocks[element] = block
+        if frame.boilerplate or frame.chars < MIN_PARAGRAPH_CHARS:
+            return
+        if tag not in PARAGRAPH_TAGS and not (tag in DIV_TAGS and frame.direct >= MIN_PARAGRAPH_CHARS):
+            return
+        if frame.chars / (frame.tags + 1) < MIN_TEXT_DENSITY or block.link_density > MAX_PARAGRAPH_LINK_DENSITY:
+            return
+        self.blocks[element] = block
+        
+        score = (1 + frame.commas + min(3, frame.chars // 100)) * (1 - block.link_density)
+        if tag in DIV_TAGS:
+            # Text held directly, e.g. paragraphs separated by <br>
+            self.scores[element] = self.scores.get(element, 0.0) + score
+        parent = element.getparent()
+        if parent is not None:
+            self.scores[parent] = self.scores.get(parent, 0.0) + score
+            grandparent = parent.getparent()
+            if grandparent is not None:
+                self.scores[grandparent] = self.scores.get(grandparent, 0.0) + score / 2
+    
+    def _collect(self, element: Any, tag: str) -> None:
+        """Page-level data read from attributes, wherever the element is."""
+        if tag == "meta":
+            name = element.get("name") or element.get("property")
+            value = element.get("content")
+            if name and value:
+                self.result.metadata[name] = value
+        elif tag == "img":
+            src = element.get("src")
+            if src:
+                self.result.images.append(urllib.parse.urljoin(self.url, src.strip()))
+        elif tag == "time" and self.dom_date is None and element.get("datetime"):
+            self.dom_date = element.get("datetime")
+        if element.get("itemprop") == "datePublished":
+            self.dom_date = element.get("content") or element.get("datetime") or self.dom_date
+    
+    def _observe(self, element: Any, tag: str, frame: _Frame) -> None:
+        """Byline and heading guesses from the element's own text."""
+        if tag == "h1" and self.h1 is None:
+            self.h1 = self._text(frame.start) or None
+        if self.dom_byline is not None or frame.boilerplate or not 0 < frame.chars <= MAX_BYLINE_CHARS:
+            return
+        names = f"{element.get('class') or ''} {element.get('id') or ''}"
+        if element.get("rel") == "author" or element.get("itemprop") == "author" or _BYLINE.search(names):
+            byline = _BY_PREFIX.sub("", self._text(frame.start)).strip()
+            if byline:
+                self.dom_byline = byline
+    
+    def _json_ld(self, text: Optional[str]) -> None:
+        try:
+            data = json.loads(text or "")
+        except ValueError:
+            return
+        for item in _json_ld_objects(data):
+            if self.ld_author is None:
+                self.ld_author = _json_ld_author(item.get("author"))
+            if self.ld_date is None and isinstance(item.get("datePublished"), str):
+                self.ld_date = item["datePublished"]
+    
+    def _text(self, start: int, end: Optional[int] = None, skip_boilerplate: bool = False) -> str:
+        lines = []
+        run: List[str] = []
+        for piece in self.pieces[start:end]:
+            if piece is None:
+                line = _SPACE.sub(" ", "".join(run)).strip()
+                if line:
+                    lines.append(line)
+                run = []
+            elif not (skip_boilerplate and piece[1]):
+                run.append(piece[0])
+        line = _SPACE.sub(" ", "".join(run)).strip()
+        if line:
+            lines.append(line)
+        return "\n".join(lines)
+    
+    def _final_score(self, element: Any) -> float:
+        names = f"{element.get('class') or ''} {element.get('id') or ''}"
+        weight = TAG_WEIGHTS.get(element.tag.lower(), 0)
+        if _POSITIVE.search(names):
+            weight += CLASS_WEIGHT
+        if _NEGATIVE.search(names):
+            weight -= CLASS_WEIGHT
+        return (self.scores[element] + weight) * (1 - self.blocks[element].link_density)
+    
+    def main_text(self) -> str:
+        candidates = [
+            element for element in self.scores
+            if element in self.blocks and not self.blocks[element].boilerplate
+        ]
+        if not candidates:
+            body = self.body
+            return self._text(body.start, body.end, True) if body else self._text(0, None, True)
+        
+        scored = {element: self._final_score(element) for element in candidates}
+        best = max(candidates, key=scored.__getitem__)
+        parts = [best]
+        parent = best.getparent()
+        if parent is not None:
+            threshold = max(10.0, scored[best] * 0.2)
+            parts = []
+            for sibling in parent:
+                block = self.blocks.get(sibling)
+                if sibling is best:
+                    parts.append(sibling)
+                elif block is None or block.boilerplate:
+                    continue
+                elif scored.get(sibling, 0.0) >= threshold or (
+                    sibling.tag == "p" and block.chars > 80 and block.link_density < 0.25
+                ):
+                    parts.append(sibling)
+        return "\n".join(
+            text for text in (
+                self._text(self.blocks[part].start, self.blocks[part].end, True) for part in parts
+            ) if text
+        )
+    
+    def finish(self) -> ExtractedContent:
+        result = self.result
+        metadata = {name.lower(): value for name, value in result.metadata.items()}
+        result.title = self.title or metadata.get("og:title") or self.h1
+        result.text = self.main_text()
+        meta_author = next(
+            (metadata[name] for name in AUTHOR_META if metadata.get(name) and "://" not in metadata[name]), None
+        )
+        result.byline = self.ld_author or meta_author or self.dom_byline
+        meta_date = next((metadata[name] for name in DATE_META if metadata.get(name)), None)
+        result.published = _iso_date(self.ld_date or meta_date or self.dom_date)
+        return result
+
+
+def extract_content(content: bytes, url: str = "", encoding: Optional[str] = None) -> ExtractedContent:
+    """
+    Extract the main content and page data from an HTML document.
+    
+    Args:
+        content: Raw HTML
+        url: Page URL, for resolving relative links and images
+        encoding: Declared charset (e.g. from Content-Type); otherwise a
+            ``<meta charset>`` is used, then UTF-8
+    
+    Returns:
+        ExtractedContent: Title, main text, byline, publish date, meta
+        tags, links and images
+    """
+    if not content or not content.strip():
+        return ExtractedContent()
+    parser = html.HTMLParser(encoding=_encoding(content, encoding), remove_comments=True, remove_pis=True)
+    try:
+        root = html.document_fromstring(content, parser=parser)
+    except (etree.ParserError, ValueError):
+        return ExtractedContent()
+    
+    extraction = _Extraction(url)
+    extraction.walk(root)
+    return extraction.finish()
@@ -0,0 +1,587 @@
+"""
+Breadth-first crawl engine for the web scraping tool.
+
+A crawl starts from seed URLs and follows links up to ``max_depth``
+levels (1 fetches only the seeds):
+
+* The frontier keeps one FIFO queue per host. Hosts whose politeness delay
+  has passed are served shallowest head first, so pages are fetched in
+  breadth-first order without one slow host holding up the others.
+* Each host gets one request at a time, spaced by the larger of the
+  requested delay and its robots.txt ``Crawl-delay``; at most
+  ``concurrency`` pages are fetched at once overall.
+* Discovered URLs are deduplicated on their canonical form in a Bloom
+  filter, so the seen set stays a fixed size however many links are found
+  (a false positive skips a URL, never fetches one twice). URLs are
+  fetched as linked, since servers may not treat canonical spellings the
+  same. The frontier is capped at ``CRAWL_MAX_FRONTIER`` URLs.
+* robots.txt is fetched once per origin and cached for
+  ``CRAWL_ROBOTS_TTL`` seconds (RFC 9309: a 4xx means no rules, a 5xx or
+  unreachable file means nothing may be fetched).
+* The crawl stops when the frontier is exhausted, after ``max_pages``
+  fetches or ``max_bytes`` of response bodies, or when ``stop`` is called.
+* ``checkpoint`` captures the pages done and the URLs still to fetch; a
+  crawl started with ``run(..., resume=checkpoint)`` continues from there
+  without fetching the finished pages again.
+
+Pages are handed to a callback as they are fetched, which returns the
+links to follow, so the caller parses each page once.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import math
+import re
+import time
+import urllib.parse
+import urllib.robotparser
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+)
+
+import httpx
+
+from app.core.config import settings
+from app.core.http_client import http_clients
+from app.core.logging import get_logger
+from app.core.urls import canonicalize_url, with_scheme
+
+logger = get_logger(__name__)
+
+ROBOTS_MAX_BYTES = 500 * 1024  # Larger files are truncated, as RFC 9309 allows
+ROBOTS_ERROR_TTL = 5 * 60  # Retry an unreachable robots.txt sooner than a good one
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic set of strings.
+
+    Sized for ``capacity`` items at ``error_rate`` false positives; it
+    never reports an added item as missing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> List[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item: str) -> bool:
+        """Add an item; returns False if it was (probably) already present."""
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+
+class RobotsCache:
+    """robots.txt rules per origin, fetched on first use and cached."""
+
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        ttl: Optional[float] = None,
+        max_origins: int = 1000,
+    ):
+        self._client = client
+        self.ttl = ttl
+        self.max_origins = max_origins
+        self._rules: "OrderedDict[str, Tuple[float, urllib.robotparser.RobotFileParser]]" = OrderedDict()
+        self._fetches: Dict[str, asyncio.Future] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or http_clients.get("scraping")
+
+    async def check(self, url: str, user_agent: Optional[str] = None) -> Tuple[bool, Optional[float]]:
+        """
+        Check whether a URL may be fetched.
+
+        Args:
+            url: Absolute URL
+            user_agent: User-Agent the page will be fetched with
+
+        Returns:
+            Tuple: (allowed, Crawl-delay in seconds or None)
+        """
+        parts = urllib.parse.urlsplit(url)
+        rules = await self._rules_for(f"{parts.scheme}://{parts.netloc}")
+        agent = user_agent or settings.HTTP_USER_AGENT
+        delay = rules.crawl_delay(agent)
+        return rules.can_fetch(agent, url), float(delay) if delay is not None else None
+
+    async def _rules_for(self, origin: str) -> urllib.robotparser.RobotFileParser:
+        cached = self._rules.get(origin)
+        if cached and cached[0] > time.monotonic():
+            self._rules.move_to_end(origin)
+            return cached[1]
+        # Concurrent checks for one origin share a single fetch
+        fetch = self._fetches.get(origin)
+        if fetch is None:
+            fetch = self._fetches[origin] = asyncio.ensure_future(self._fetch(origin))
+            fetch.add_done_callback(lambda _: self._fetches.pop(origin, None))
+        return await asyncio.shield(fetch)
+
+    async def _fetch(self, origin: str) -> urllib.robotparser.RobotFileParser:
+        rules = urllib.robotparser.RobotFileParser(f"{origin}/robots.txt")
+        ttl = self.ttl if self.ttl is not None else settings.CRAWL_ROBOTS_TTL
+        try:
+            async with self.client.stream("GET", f"{origin}/robots.txt", follow_redirects=True) as response:
+                if response.status_code >= 500:
+                    rules.disallow_all = True
+                    ttl = min(ttl, ROBOTS_ERROR_TTL)
+                elif response.status_code >= 400:
+                    rules.allow_all = True
+                else:
+                    body = b""
+                    async for chunk in response.aiter_bytes():
+                        body += chunk
+                        if len(body) >= ROBOTS_MAX_BYTES:
+                            break
+                    rules.parse(body[:ROBOTS_MAX_BYTES].decode("utf-8", errors="replace").splitlines())
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not fetch {origin}/robots.txt, not crawling it for now: {e}")
+            rules.disallow_all = True
+            ttl = min(ttl, ROBOTS_ERROR_TTL)
+
+        self._rules[origin] = (time.monotonic() + ttl, rules)
+        self._rules.move_to_end(origin)
+        while len(self._rules) > self.max_origins:
+            self._rules.popitem(last=False)
+        return rules
+
+
+@dataclass
+class CrawlConfig:
+    """Limits and filters for one crawl; None falls back to the CRAWL_* settings."""
+    max_depth: int = 1
+    max_pages: Optional[int] = None
+    max_bytes: Optional[int] = None
+    concurrency: Optional[int] = None
+    per_host_delay: float = 1.0
+    include_patterns: List[str] = field(default_factory=list)
+    exclude_patterns: List[str] = field(default_factory=list)
+    same_host: bool = True  # Only follow links to the seeds' hosts
+    respect_robots: bool = True
+    user_agent: Optional[str] = None
+
+
+@dataclass
+class CrawlPage:
+    """A fetched (or skipped) page handed to the page callback."""
+    url: str
+    depth: int
+    referrer: Optional[str] = None
+    requested_url: Optional[str] = None  # URL before redirects
+    status_code: Optional[int] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    content: bytes = b""
+    truncated: bool = False
+    error: Optional[str] = None
+    skipped: Optional[str] = None  # Why the page was not fetched
+
+    @property
+    def is_html(self) -> bool:
+        content_type = self.headers.get("content-type", "")
+        return not content_type or "html" in content_type
+
+
+PageHandler = Callable[[CrawlPage], Awaitable[Iterable[str]]]
+
+
+@dataclass
+class _Request:
+    url: str
+    depth: int
+    referrer: Optional[str]
+
+
+@dataclass
+class _Host:
+    delay: float
+    queue: Deque[_Request] = field(default_factory=deque)
+    next_start: float = 0.0
+    busy: bool = False
+    scheduled: bool = False
+
+
+class Crawler:
+    """
+    Breadth-first crawler with per-host politeness.
+    """
+
+    def __init__(
+        self,
+        config: CrawlConfig,
+        client: Optional[httpx.AsyncClient] = None,
+        robots: Optional[RobotsCache] = None,
+    ):
+        """
+        Initialize a crawl.
+
+        Args:
+            config: Crawl limits and filters
+            client: HTTP client instead of the shared "scraping" client
+            robots: robots.txt cache (defaults to the shared one)
+
+        Raises:
+            ValueError: If an include or exclude pattern is not a valid regex
+        """
+        self.config = config
+        self._client = client
+        self.robots = robots or robots_cache
+        self.max_pages = min(config.max_pages or settings.CRAWL_MAX_PAGES, settings.CRAWL_MAX_PAGES)
+        self.max_bytes = min(config.max_bytes or settings.CRAWL_MAX_BYTES, settings.CRAWL_MAX_BYTES)
+        self.concurrency = max(1, min(config.concurrency or settings.CRAWL_CONCURRENCY, settings.CRAWL_CONCURRENCY))
+        self._include = self._compile(config.include_patterns)
+        self._exclude = self._compile(config.exclude_patterns)
+
+        self._seen = BloomFilter(settings.CRAWL_SEEN_CAPACITY)
+        self._seed_hosts: set[str] = set()
+        self._hosts: Dict[str, _Host] = {}
+        # Hosts with queued URLs: ready ones by (head depth, order), the rest by start time
+        self._ready: List[Tuple[int, int, str]] = []
+        self._waiting: List[Tuple[float, str]] = []
+        self._order = 0
+        self._queued = 0
+        self._in_flight = 0
+        self._active: Dict[int, _Request] = {}  # Taken but not yet handed to on_page
+        self._visited: List[str] = []
+        self._changed: Optional[asyncio.Condition] = None
+        self._wake: Optional[asyncio.Task] = None
+        self.stop_reason: Optional[str] = None
+        self.stats = {"pages": 0, "failed": 0, "skipped": 0, "bytes": 0, "dropped": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or http_clients.get("scraping")
+
+    @property
+    def pending(self) -> int:
+        """URLs queued or being fetched."""
+        return self._queued + self._in_flight
+
+    @staticmethod
+    def _compile(patterns: List[str]) -> List[Pattern]:
+        try:
+            return [re.compile(pattern) for pattern in patterns]
+        except re.error as e:
+            raise ValueError(f"Invalid URL pattern: {e}") from e
+
+    async def run(
+        self,
+        seeds: Iterable[str],
+        on_page: PageHandler,
+        resume: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Crawl from the seeds until the frontier is exhausted or a limit is hit.
+
+        Seeds are always fetched (subject to robots.txt); include/exclude
+        patterns and the same-host rule apply to discovered links.
+
+        Args:
+            seeds: Start URLs
+            on_page: Callback for every fetched, failed or skipped page;
+                returns the links found on it
+            resume: Checkpoint of an earlier crawl to continue instead of
+                starting from the seeds
+
+        Returns:
+            Dict: Pages fetched, failed and skipped, body bytes read, URLs
+            dropped from a full frontier and the stop reason
+        """
+        self._changed = asyncio.Condition()
+        if resume:
+            seeds = []
+            self._restore(resume)
+        for seed in seeds:
+            try:
+                key = canonicalize_url(seed)
+            except ValueError as e:
+                await on_page(CrawlPage(url=seed, depth=1, error=str(e)))
+                self.stats["failed"] += 1
+                continue
+            self._seed_hosts.add(urllib.parse.urlsplit(key).hostname)
+            if self._seen.add(key):
+                self._enqueue(_Request(urllib.parse.urldefrag(with_scheme(seed)).url, 1, None))
+
+        workers = [asyncio.create_task(self._work(on_page)) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+        logger.info(
+            f"Crawl finished ({self.stop_reason}): {self.stats['pages']} pages, "
+            f"{self.stats['failed']} failed, {self.stats['skipped']} skipped, {self.stats['bytes']} bytes"
+        )
+        return {**self.stats, "stop_reason": self.stop_reason}
+
+    def checkpoint(self, current: Optional[CrawlPage] = None, links: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Capture the crawl's progress so it can be resumed.
+
+        Pages count as done once their ``on_page`` call returned, so a
+        checkpoint taken from ``on_page`` is consistent with the results
+        the callbacks recorded so far.
+
+        Args:
+            current: Page whose ``on_page`` call is taking the checkpoint,
+                counted as done
+            links: Links found on the current page
+
+        Returns:
+            Dict: JSON-serializable visited URLs, pending requests, links
+            still to be filtered, seed hosts and stats
+        """
+        visited = list(self._visited)
+        follow = []
+        current_url = None
+        if current is not None:
+            current_url = current.requested_url or current.url
+            visited.append(current_url)
+            if current.url != current_url:
+                visited.append(current.url)
+            if current.depth < self.config.max_depth:
+                follow = [[link, current.depth + 1, current.url] for link in links]
+
+        requests = [request for host in self._hosts.values() for request in host.queue]
+        requests += [request for request in self._active.values() if request.url != current_url]
+        return {
+            "visited": visited,
+            "pending": [[request.url, request.depth, request.referrer] for request in requests],
+            "links": follow,
+            "seed_hosts": sorted(host for host in self._seed_hosts if host),
+            "stats": dict(self.stats),
+        }
+
+    def _restore(self, checkpoint: Dict[str, Any]) -> None:
+        self._seed_hosts.update(checkpoint.get("seed_hosts", []))
+        self.stats.update(checkpoint.get("stats", {}))
+        for url in checkpoint.get("visited", []):
+            self._seen.add(self._key(url))
+        for url, depth, referrer in checkpoint.get("pending", []):
+            if self._seen.add(self._key(url)):
+                self._enqueue(_Request(url, depth, referrer))
+        for link, depth, referrer in checkpoint.get("links", []):
+            self._discover(link, depth, referrer)
+
+    def stop(self, reason: str) -> None:
+        """
+        Stop taking new pages; pages being fetched are still handed to on_page.
+
+        Args:
+            reason: Stop reason reported by ``run`` (the first one wins)
+        """
+        if self.stop_reason is None:
+            self.stop_reason = reason
+            if self._changed is not None:
+                # Workers waiting for a host's delay or an in-flight page see
+                # the reason once woken; stop() may be called outside them
+                self._wake = asyncio.ensure_future(self._notify())
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        """Seen-set key of a URL: its canonical form."""
+        try:
+            return canonicalize_url(url)
+        except ValueError:
+            return url
+
+    def _enqueue(self, request: _Request) -> None:
+        key = urllib.parse.urlsplit(request.url).netloc.lower()
+        host = self._hosts.get(key)
+        if host is None:
+            host = self._hosts[key] = _Host(delay=self.config.per_host_delay)
+        host.queue.append(request)
+        self._queued += 1
+        if not host.busy and not host.scheduled:
+            self._schedule(key, host)
+
+    def _schedule(self, key: str, host: _Host) -> None:
+        host.scheduled = True
+        if host.next_start <= asyncio.get_running_loop().time():
+            self._order += 1
+            heapq.heappush(self._ready, (host.queue[0].depth, self._order, key))
+        else:
+            heapq.heappush(self._waiting, (host.next_start, key))
+
+    def _take(self) -> Optional[Tuple[str, _Host, _Request]]:
+        now = asyncio.get_running_loop().time()
+        while self._waiting and self._waiting[0][0] <= now:
+            _, key = heapq.heappop(self._waiting)
+            self._order += 1
+            heapq.heappush(self._ready, (self._hosts[key].queue[0].depth, self._order, key))
+        if not self._ready:
+            return None
+        _, _, key = heapq.heappop(self._ready)
+        host = self._hosts[key]
+        host.scheduled = False
+        host.busy = True
+        self._queued -= 1
+        return key, host, host.queue.popleft()
+
+    async def _work(self, on_page: PageHandler) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            async with self._changed:
+                while True:
+                    if self.stop_reason:
+                        return
+                    taken = self._take()
+                    if taken:
+                        self._in_flight += 1
+                        self._active[id(taken[2])] = taken[2]
+                        break
+                    if not self._waiting and self._in_flight == 0:
+                        self.stop_reason = "exhausted"
+                        self._changed.notify_all()
+                        return
+                    timeout = self._waiting[0][0] - loop.time() if self._waiting else None
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+
+            key, host, request = taken
+            try:
+                await self._visit(host, request, on_page)
+            finally:
+                self._active.pop(id(request), None)
+                async with self._changed:
+                    self._in_flight -= 1
+                    host.busy = False
+                    host.next_start = loop.time() + host.delay
+                    if host.queue:
+                        self._schedule(key, host)
+                    self._changed.notify_all()
+
+    async def _visit(self, host: _Host, request: _Request, on_page: PageHandler) -> None:
+        page = CrawlPage(url=request.url, depth=request.depth, referrer=request.referrer, requested_url=request.url)
+        if self.config.respect_robots:
+            allowed, crawl_delay = await self.robots.check(request.url, self.config.user_agent)
+            if crawl_delay is not None:
+                host.delay = max(host.delay, crawl_delay)
+            if not allowed:
+                page.skipped = "Disallowed by robots.txt"
+                self.stats["skipped"] += 1
+                await on_page(page)
+                self._done(request, page)
+                return
+
+        if self.stats["pages"] >= self.max_pages:
+            self.stop("max_pages")
+            return
+        self.stats["pages"] += 1
+        await self._fetch(page)
+
+        links = await on_page(page)
+        # No await between on_page returning and the page counting as done,
+        # so checkpoints taken from other callbacks stay consistent
+        self._done(request, page)
+        if self.stats["pages"] >= self.max_pages:
+            self.stop("max_pages")
+        elif self.stats["bytes"] >= self.max_bytes:
+            self.stop("max_bytes")
+        elif request.depth < self.config.max_depth and links:
+            for link in links:
+                self._discover(link, request.depth + 1, page.url)
+            async with self._changed:
+                self._changed.notify_all()
+
+    def _done(self, request: _Request, page: CrawlPage) -> None:
+        self._active.pop(id(request), None)
+        self._visited.append(request.url)
+        if page.url != request.url:
+            self._visited.append(page.url)
+
+    async def _fetch(self, page: CrawlPage) -> None:
+        headers = {"User-Agent": self.config.user_agent} if self.config.user_agent else None
+        budget = min(settings.CRAWL_MAX_PAGE_BYTES, self.max_bytes - self.stats["bytes"])
+        try:
+            async with self.client.stream("GET", page.url, headers=headers, follow_redirects=True) as response:
+                page.status_code = response.status_code
+                page.headers = dict(response.headers)
+                final_url = str(response.url)
+                if final_url != page.url:
+                    # Links are relative to where the redirect ended up
+                    page.url = final_url
+                    self._seen.add(self._key(final_url))
+                chunks = []
+                received = 0
+                async for chunk in response.aiter_bytes():
+                    if received + len(chunk) > budget:
+                        chunk = chunk[:budget - received]
+                        page.truncated = True
+                    chunks.append(chunk)
+                    received += len(chunk)
+                    if page.truncated:
+                        break
+                page.content = b"".join(chunks)
+                self.stats["bytes"] += received
+            if page.status_code >= 400:
+                page.error = f"HTTP {page.status_code}"
+        except httpx.HTTPError as e:
+            page.error = str(e) or type(e).__name__
+        if page.error:
+            self.stats["failed"] += 1
+
+    def _discover(self, link: str, depth: int, referrer: str) -> None:
+        try:
+            key = canonicalize_url(link)
+        except ValueError:
+            return
+        parts = urllib.parse.urlsplit(key)
+        if parts.scheme not in ("http", "https"):
+            return
+        if self.config.same_host and parts.hostname not in self._seed_hosts:
+            return
+        if self._include and not any(pattern.search(key) for pattern in self._include):
+            return
+        if any(pattern.search(key) for pattern in self._exclude):
+            return
+        if not self._seen.add(key):
+            return
+        if self._queued >= settings.CRAWL_MAX_FRONTIER:
+            self.stats["dropped"] += 1
+            return
+        self._enqueue(_Request(urllib.parse.urldefrag(link.strip()).url, depth, referrer))
+
+
+
+# Shared robots.txt cache
+robots_cache = RobotsCache()
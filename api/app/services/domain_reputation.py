@@ -0,0 +1,315 @@
+"""
+Domain reputation lookups backed by local allow/deny lists.
+
+Lists are plain text files (one domain per line, ``#`` comments, hosts-file
+lines accepted) in ``DOMAIN_REPUTATION_DIR``:
+
+* ``trusted.txt``, ``suspicious.txt``, ``malicious.txt``
+* ``public_suffix_list.dat`` (the format published at publicsuffix.org)
+
+Entries are held in hash indexes keyed by domain, so a lookup probes one
+key per label of the host (``a.b.example.com`` -> ``a.b.example.com``,
+``b.example.com``, ``example.com``, ``com``) regardless of list size. An
+entry covers the domain and its subdomains, and the most specific entry
+wins. Trust never crosses a private public suffix: listing ``github.io``
+as trusted does not vouch for ``someone.github.io``.
+
+Files are checked for changes at most every
+``DOMAIN_REPUTATION_RELOAD_SECONDS``; a changed set is rebuilt in a
+background thread and swapped in once complete, so lookups never wait on
+a reload.
+"""
+
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+CATEGORIES = ("trusted", "suspicious", "malicious")
+PUBLIC_SUFFIX_FILE = "public_suffix_list.dat"
+
+# Used for any list file that does not exist
+DEFAULT_ENTRIES = {
+    "trusted": [
+        "gov", "edu", "mil", "wikipedia.org", "arxiv.org",
+        "nature.com", "science.org", "ieee.org", "acm.org",
+    ],
+    "suspicious": ["tk", "ml", "cf", "ga"],
+    "malicious": [],
+}
+
+# Minimal stand-in for the public suffix list; unknown TLDs fall back to "*"
+DEFAULT_PUBLIC_SUFFIXES = """
+com
+org
+net
+gov
+edu
+mil
+int
+uk
+ac.uk
+co.uk
+gov.uk
+org.uk
+au
+com.au
+gov.au
+// ===BEGIN PRIVATE DOMAINS===
+blogspot.com
+github.io
+herokuapp.com
+// ===END PRIVATE DOMAINS===
+"""
+
+
+@dataclass(frozen=True)
+class DomainScore:
+    """Reputation of a single domain."""
+    domain: str
+    reputation: str  # trusted, neutral, suspicious, malicious
+    registrable_domain: Optional[str]
+    public_suffix: Optional[str]
+    matched_entry: Optional[str]
+    source: str  # list, heuristic or default
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class PublicSuffixList:
+    """Public suffix rules with O(labels) lookups."""
+    
+    def __init__(self, lines: Iterable[str]):
+        self.rules: Dict[str, bool] = {}  # suffix -> is private
+        self.wildcards: Dict[str, bool] = {}  # parent of "*." rules -> is private
+        self.exceptions: set = set()
+        private = False
+        for raw in lines:
+            line = raw.strip()
+            if "===BEGIN PRIVATE DOMAINS===" in line:
+                private = True
+            elif "===END PRIVATE DOMAINS===" in line:
+                private = False
+            if not line or line.startswith("//"):
+                continue
+            rule = line.split()[0].lower()
+            if rule.startswith("!"):
+                self.exceptions.add(rule[1:])
+            elif rule.startswith("*."):
+                self.wildcards[rule[2:]] = private
+            else:
+                self.rules[rule] = private
+    
+    def split(self, domain: str) -> Tuple[str, Optional[str], bool]:
+        """
+        Find the public suffix of a domain.
+        
+        Args:
+            domain: Lowercase domain name
+        
+        Returns:
+            Tuple: (public suffix, registrable domain or None, whether the
+            suffix comes from the private section)
+        """
+        labels = domain.split(".")
+        for i in range(len(labels)):
+            candidate = ".".join(labels[i:])
+            if candidate in self.exceptions:
+                suffix, private = ".".join(labels[i + 1:]), False
+                break
+            if candidate in self.rules:
+                suffix, private = candidate, self.rules[candidate]
+                break
+            parent = ".".join(labels[i + 1:])
+            if i + 1 < len(labels) and parent in self.wildcards:
+                suffix, private = candidate, self.wildcards[parent]
+                break
+        else:
+            suffix, private = labels[-1], False
+        
+        suffix_labels = suffix.count(".") + 1
+        registrable = ".".join(labels[-suffix_labels - 1:]) if len(labels) > suffix_labels else None
+        return suffix, registrable, private
+
+
+def _normalize_domain(value: str) -> str:
+    domain = value.strip().lower().rstrip(".")
+    if "://" in domain:
+        domain = domain.split("://", 1)[1]
+    domain = domain.split("/", 1)[0].split("@")[-1]
+    if not domain.startswith("["):
+        domain = domain.split(":", 1)[0]
+    if domain.startswith("*."):
+        domain = domain[2:]
+    return domain.lstrip(".")
+
+
+def _read_entries(lines: Iterable[str]) -> List[str]:
+    entries = []
+    for raw in lines:
+        line = raw.split("#", 1)[0].strip()
+        if line:
+            # Hosts-file lines ("0.0.0.0 example.com") list the domain last
+            entries.append(_normalize_domain(line.split()[-1]))
+    return entries
+
+
+class ReputationIndex:
+    """Immutable snapshot of the reputation lists."""
+    
+    def __init__(self, entries: Dict[str, Iterable[str]], public_suffixes: PublicSuffixList):
+        self.public_suffixes = public_suffixes
+        self.categories: Dict[str, str] = {}
+        # Later categories are worse and win when a domain is listed twice
+        for category in CATEGORIES:
+            for domain in entries.get(category, ()):
+                if domain:
+                    self.categories[domain] = category
+    
+    def __len__(self) -> int:
+        return len(self.categories)
+    
+    def score(self, domain: str) -> DomainScore:
+        """
+        Score one domain.
+        
+        Args:
+            domain: Domain name, host:port or URL
+        
+        Returns:
+            DomainScore: Reputation and how it was decided
+        """
+        host = _normalize_domain(domain)
+        suffix, registrable, private_suffix = self.public_suffixes.split(host)
+        
+        labels = host.split(".")
+        for i in range(len(labels)):
+            candidate = ".".join(labels[i:])
+            category = self.categories.get(candidate)
+            if category is None:
+                continue
+            crosses_private_suffix = private_suffix and i > 0 and len(candidate) <= len(suffix)
+            if category == "trusted" and crosses_private_suffix:
+                continue
+            return DomainScore(host, category, registrable, suffix, candidate, "list")
+        
+        # Heuristics apply to the part of the name its owner chose
+        owned = host[:-len(suffix)].rstrip(".") if host.endswith(suffix) else host
+        if len(owned.replace(".", "")) > 50 or owned.count("-") > 3:
+            return DomainScore(host, "suspicious", registrable, suffix, None, "heuristic")
+        return DomainScore(host, "neutral", registrable, suffix, None, "default")
+
+
+class DomainReputation:
+    """Reputation lookups over hot-reloaded list files."""
+    
+    def __init__(self, directory: str, reload_seconds: float):
+        self.directory = Path(directory)
+        self.reload_seconds = reload_seconds
+        self._index = self._build()
+        self._fingerprint = self._files_fingerprint()
+        self._checked_at = time.monotonic()
+        self._reloading = threading.Lock()
+    
+    @property
+    def index(self) -> ReputationIndex:
+        """Current index, scheduling a reload if the files changed."""
+        self._maybe_reload()
+        return self._index
+    
+    def assess(self, domain: str) -> str:
+        """
+        Classify a domain.
+        
+        Args:
+            domain: Domain name, host:port or URL
+        
+        Returns:
+            str: trusted, neutral, suspicious or malicious
+        """
+        return self.index.score(domain).reputation
+    
+    def score_domains(self, domains: Iterable[str]) -> List[DomainScore]:
+        """
+        Score a batch of domains against one snapshot of the lists.
+        
+        Args:
+            domains: Domain names, host:port values or URLs
+        
+        Returns:
+            List[DomainScore]: Scores in input order
+        """
+        index = self.index
+        return [index.score(domain) for domain in domains]
+    
+    def reload(self) -> None:
+        """Rebuild the index from disk now."""
+        fingerprint = self._files_fingerprint()
+        self._index = self._build()
+        self._fingerprint = fingerprint
+    
+    def _paths(self) -> List[Path]:
+        return [self.directory / f"{category}.txt" for category in CATEGORIES] + [
+            self.directory / PUBLIC_SUFFIX_FILE
+        ]
+    
+    def _files_fingerprint(self) -> Tuple:
+        fingerprint = []
+        for path in self._paths():
+            try:
+                stat = path.stat()
+                fingerprint.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                fingerprint.append(None)
+        return tuple(fingerprint)
+    
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_seconds:
+            return
+        self._checked_at = now
+        if self._files_fingerprint() == self._fingerprint:
+            return
+        if self._reloading.acquire(blocking=False):
+            threading.Thread(target=self._reload_in_background, daemon=True).start()
+    
+    def _reload_in_background(self) -> None:
+        try:
+            self.reload()
+            logger.info(f"Reloaded domain reputation lists ({len(self._index)} entries)")
+        except Exception as e:
+            logger.error(f"Failed to reload domain reputation lists: {e}")
+        finally:
+            self._reloading.release()
+    
+    def _build(self) -> ReputationIndex:
+        entries = {}
+        for category in CATEGORIES:
+            path = self.directory / f"{category}.txt"
+            if path.exists():
+                with path.open(encoding="utf-8", errors="replace") as lines:
+                    entries[category] = _read_entries(lines)
+            else:
+                entries[category] = DEFAULT_ENTRIES[category]
+        
+        suffix_path = self.directory / PUBLIC_SUFFIX_FILE
+        if suffix_path.exists():
+            with suffix_path.open(encoding="utf-8", errors="replace") as lines:
+                public_suffixes = PublicSuffixList(lines)
+        else:
+            public_suffixes = PublicSuffixList(DEFAULT_PUBLIC_SUFFIXES.splitlines())
+        return ReputationIndex(entries, public_suffixes)
+
+
+# Global reputation lookups
+domain_reputation = DomainReputation(
+    settings.DOMAIN_REPUTATION_DIR,
+    settings.DOMAIN_REPUTATION_RELOAD_SECONDS,
+)
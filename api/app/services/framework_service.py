@@ -5,15 +5,26 @@ Handles business logic for all intelligence analysis frameworks.
 
 import json
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.json_patch import (
+    JsonPatchOperation,
+    apply_json_patch,
+    apply_merge_patch,
+    compile_patch,
+    diff_documents,
+    merge_patch_to_operations,
+)
 from app.core.logging import get_logger
 from app.models.framework import (
     FrameworkSession,
+    FrameworkSessionChange,
     FrameworkStatus,
     FrameworkTemplate,
     FrameworkType,
@@ -23,6 +34,56 @@ from app.services.ai_service import ai_service
 
 logger = get_logger(__name__)
 
+PATCH_ATTEMPTS = 3  # Loads of a session patched in Python before giving up on concurrent writers
+
+
+class VersionConflictError(Exception):
+    """Raised when an update targets a stale session version."""
+
+
+def session_document(session: FrameworkSession) -> Dict[str, Any]:
+    """
+    The client-visible part of a session that change records describe.
+    
+    Args:
+        session: Framework session
+    
+    Returns:
+        Dict: Title, description, status and data
+    """
+    return {
+        "title": session.title,
+        "description": session.description,
+        "status": FrameworkStatus(session.status).value,
+        "data": session.data or {},
+    }
+
+
+def session_cache_tag(session_id: int) -> str:
+    """
+    Cache tag for everything derived from a session.
+    
+    Args:
+        session_id: Session ID
+    
+    Returns:
+        str: Tag to invalidate whenever the session is written
+    """
+    return f"framework_session:{session_id}"
+
+
+def _dump_operations(operations: List[JsonPatchOperation], prefix: str = "") -> List[Dict[str, Any]]:
+    """Serialize patch operations, re-rooting their paths under prefix."""
+    dumped = []
+    for operation in operations:
+        item: Dict[str, Any] = {"op": operation.op, "path": prefix + operation.path}
+        if operation.from_ is not None:
+            item["from"] = prefix + operation.from_
+        if operation.op in ("add", "replace", "test"):
+            item["value"] = operation.value
+        dumped.append(item)
+    return dumped
+
 
 class FrameworkData(BaseModel):
     """Generic framework data model."""
@@ -113,7 +174,7 @@ class FrameworkAnalysisService:
             framework_type=framework_data.framework_type,
             status=FrameworkStatus.DRAFT,
             user_id=user.id,
-            data=json.dumps(framework_data.data),
+            data=framework_data.data,
             config=json.dumps(framework_data.config) if framework_data.config else None,
             tags=json.dumps(framework_data.tags) if framework_data.tags else None,
         )
@@ -160,10 +221,12 @@ class FrameworkAnalysisService:
         if not session:
             raise ValueError(f"Framework session {session_id} not found")
         
+        before = session_document(session)
+        
         # Apply updates
         for key, value in updates.items():
             if key == "data":
-                session.data = json.dumps(value)
+                session.data = value
             elif key == "config":
                 session.config = json.dumps(value)
             elif key == "tags":
@@ -175,13 +238,250 @@ class FrameworkAnalysisService:
         session.version += 1
         session.updated_at = datetime.now(timezone.utc)
         
+        await self.record_change(
+            db, session_id, session.version,
+            diff_documents(before, session_document(session)),
+        )
         await db.commit()
         await db.refresh(session)
+        await cache.invalidate(session_cache_tag(session_id))
         
         logger.info(f"Updated framework session {session_id} to version {session.version}")
         
         return session
     
+    async def patch_session_data(
+        self,
+        db: AsyncSession,
+        session_id: int,
+        user: User,
+        operations: Optional[List[JsonPatchOperation]] = None,
+        merge_patch: Optional[Dict[str, Any]] = None,
+        expected_version: Optional[int] = None,
+        framework_type: Optional[FrameworkType] = None,
+    ) -> Tuple[int, datetime]:
+        """
+        Apply a JSON Patch or merge patch to a session's data.
+        
+        Simple edits are compiled into a single UPDATE using the database's
+        native JSON functions, so the document is never loaded. Anything the
+        compiler cannot express (or whose preconditions fail) is applied in
+        Python against the loaded document instead, and written only if the
+        session is still at the loaded version; if another writer got there
+        first the patch is applied again to the new document.
+        
+        Args:
+            db: Database session
+            session_id: Session ID
+            user: User updating the session
+            operations: RFC 6902 operations (mutually exclusive with merge_patch)
+            merge_patch: RFC 7396 merge patch
+            expected_version: Reject the patch unless the session is at this version
+            framework_type: Only patch sessions of this framework type
+        
+        Returns:
+            Tuple[int, datetime]: New version and updated_at
+        
+        Raises:
+            ValueError: If the session does not exist (or is of another type)
+            VersionConflictError: If expected_version does not match, or the
+                session kept changing concurrently
+            JsonPatchError: If the patch cannot be applied
+        """
+        if merge_patch is not None:
+            compiled_operations = merge_patch_to_operations(merge_patch)
+        else:
+            compiled_operations = operations or []
+        
+        now = datetime.now(timezone.utc)
+        ownership = [
+            FrameworkSession.id == session_id,
+            FrameworkSession.user_id == user.id,
+        ]
+        if framework_type is not None:
+            ownership.append(FrameworkSession.framework_type == framework_type)
+        if expected_version is not None:
+            ownership.append(FrameworkSession.version == expected_version)
+        
+        compiled = None
+        if compiled_operations is not None:
+            compiled = compile_patch(
+                FrameworkSession.data,
+                compiled_operations,
+                db.get_bind().dialect.name,
+            )
+        
+        if compiled is not None:
+            result = await db.execute(
+                update(FrameworkSession)
+                .where(*ownership, *compiled.preconditions)
+                .values(
+                    data=compiled.expression,
+                    version=FrameworkSession.version + 1,
+                    updated_at=now,
+                )
+                .returning(FrameworkSession.version)
+                .execution_options(synchronize_session=False)
+            )
+            new_version = result.scalar_one_or_none()
+            if new_version is not None:
+                await self.record_change(
+                    db, session_id, new_version,
+                    compiled_operations, prefix="/data",
+                )
+                await db.commit()
+                await cache.invalidate(session_cache_tag(session_id))
+                logger.info(
+                    f"Patched framework session {session_id} in place "
+                    f"to version {new_version}"
+                )
+                return new_version, now
+            # Preconditions failed (or no such session); let the Python path decide
+            await db.rollback()
+        
+        for _ in range(PATCH_ATTEMPTS):
+            result = await db.execute(
+                select(
+                    FrameworkSession.framework_type,
+                    FrameworkSession.version,
+                    FrameworkSession.data,
+                ).where(
+                    FrameworkSession.id == session_id,
+                    FrameworkSession.user_id == user.id
+                )
+            )
+            session = result.one_or_none()
+            
+            if not session or (framework_type is not None and session.framework_type != framework_type):
+                raise ValueError(f"Framework session {session_id} not found")
+            if expected_version is not None and session.version != expected_version:
+                raise VersionConflictError(
+                    f"Framework session {session_id} is at version {session.version}, "
+                    f"expected {expected_version}"
+                )
+            
+            before = session.data or {}
+            if merge_patch is not None:
+                data = apply_merge_patch(before, merge_patch)
+            else:
+                data = apply_json_patch(before, operations or [])
+            
+            # Only written if nobody else changed the session since it was loaded
+            new_version = session.version + 1
+            written = await db.execute(
+                update(FrameworkSession)
+                .where(
+                    FrameworkSession.id == session_id,
+                    FrameworkSession.version == session.version,
+                )
+                .values(data=data, version=new_version, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if written.rowcount:
+                await self.record_change(
+                    db, session_id, new_version,
+                    diff_documents(before, data), prefix="/data",
+                )
+                await db.commit()
+                await cache.invalidate(session_cache_tag(session_id))
+                
+                logger.info(f"Patched framework session {session_id} to version {new_version}")
+                
+                return new_version, now
+            # Lost a race with another writer: reload and apply the patch again
+            await db.rollback()
+        
+        raise VersionConflictError(
+            f"Framework session {session_id} kept changing while it was being patched"
+        )
+    
+    async def record_change(
+        self,
+        db: AsyncSession,
+        session_id: int,
+        version: int,
+        operations: List[JsonPatchOperation],
+        prefix: str = "",
+    ) -> None:
+        """
+        Record the changes that produced a session version.
+        
+        Runs in the caller's transaction, which must also bump the session
+        version. Changes older than ``FRAMEWORK_CHANGE_HISTORY`` versions are
+        pruned; clients further behind than that get the full session.
+        
+        Args:
+            db: Database session
+            session_id: Session ID
+            version: New session version
+            operations: Operations that produced the version
+            prefix: JSON pointer of the patched document within
+                ``session_document`` (``/data`` for data patches)
+        """
+        db.add(FrameworkSessionChange(
+            session_id=session_id,
+            version=version,
+            operations=_dump_operations(operations, prefix),
+        ))
+        await db.execute(
+            delete(FrameworkSessionChange).where(
+                FrameworkSessionChange.session_id == session_id,
+                FrameworkSessionChange.version <= version - settings.FRAMEWORK_CHANGE_HISTORY,
+            )
+        )
+    
+    async def get_changes(
+        self,
+        db: AsyncSession,
+        session_id: int,
+        user: User,
+        since_version: int,
+    ) -> Tuple[int, Optional[List[FrameworkSessionChange]]]:
+        """
+        Load the changes a client at since_version needs to catch up.
+        
+        Args:
+            db: Database session
+            session_id: Session ID
+            user: User reading the session
+            since_version: Version the client already has
+        
+        Returns:
+            Tuple: Current version, and the changes after since_version in
+            order (empty if the client is current), or None if the retained
+            history does not cover the gap
+        
+        Raises:
+            ValueError: If the session does not exist
+        """
+        result = await db.execute(
+            select(FrameworkSession.version).where(
+                FrameworkSession.id == session_id,
+                FrameworkSession.user_id == user.id
+            )
+        )
+        version = result.scalar_one_or_none()
+        if version is None:
+            raise ValueError(f"Framework session {session_id} not found")
+        if since_version == version:
+            return version, []
+        if since_version > version:
+            return version, None
+        
+        result = await db.execute(
+            select(FrameworkSessionChange)
+            .where(
+                FrameworkSessionChange.session_id == session_id,
+                FrameworkSessionChange.version > since_version,
+                FrameworkSessionChange.version <= version,
+            )
+            .order_by(FrameworkSessionChange.version)
+        )
+        changes = list(result.scalars())
+        if len(changes) != version - since_version:
+            return version, None
+        return version, changes
+    
     async def analyze_with_ai(
         self,
         framework_type: FrameworkType,
@@ -0,0 +1,453 @@
+"""
+Durable runner for long research jobs.
+
+Endpoints only insert a PENDING ``ResearchJob``; runners in the API process
+(``JOB_RUNNER_IN_API``) or in separate worker processes
+(``python -m app.worker``) pick jobs up from the table:
+
+* Jobs are claimed highest ``priority`` first, then oldest, with a
+  compare-and-set update, so any number of runners can share the table.
+* A claimed job is leased to its runner for ``JOB_LEASE_SECONDS`` and the
+  lease is renewed by a heartbeat every ``JOB_HEARTBEAT_SECONDS``. If the
+  lease cannot be renewed (the job was cancelled or taken over) the job's
+  ``JobControl`` is cancelled so it can stop between items and checkpoint,
+  and after ``JOB_CANCEL_GRACE`` seconds it is stopped outright.
+* A job whose handler raises is retried after an exponential backoff while
+  ``retry_count < max_retries``, and marked FAILED after that.
+* A job left IN_PROGRESS by a crashed or restarted process stops being
+  heartbeated; once its lease lapses it is recovered the same way, at
+  startup and periodically while runners are up. Jobs started before the
+  runner existed have no lease and are recovered at startup.
+* A cancelled or failed job can be queued again with ``resume``; handlers
+  continue from the job's last checkpoint.
+* On shutdown running jobs get ``JOB_SHUTDOWN_GRACE`` seconds to finish;
+  the rest go back to PENDING without using up a retry.
+
+Each job type has one handler, registered by the module that implements it.
+"""
+
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, write_queue
+from app.core.logging import get_logger
+from app.models.research_tool import ResearchJob, ResearchJobStatus, ResearchJobType
+from app.services.job_service import job_service
+
+logger = get_logger(__name__)
+
+JobHandler = Callable[[ResearchJob], Awaitable[None]]
+
+# Queue priorities: interactive single-item jobs ahead of bulk ones
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def retry_delay(retry_count: int) -> float:
+    """Seconds to wait before retry number ``retry_count + 1``."""
+    return min(settings.JOB_RETRY_MAX_DELAY, settings.JOB_RETRY_BASE_DELAY * 2 ** retry_count)
+
+
+class JobRunner:
+    """
+    Leases queued research jobs and runs them with a bounded worker pool.
+    """
+    
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+        workers: Optional[int] = None,
+        worker_id: Optional[str] = None,
+    ):
+        """
+        Initialize the runner.
+        
+        Args:
+            session_factory: Sessions for reading the queue
+            workers: Jobs run at once (default ``JOB_WORKERS``)
+            worker_id: Lease owner name (default host, PID and a random suffix)
+        """
+        self.session_factory = session_factory
+        self.workers = max(1, workers or settings.JOB_WORKERS)
+        self.worker_id = worker_id or _default_worker_id()
+        self._own_worker_id = worker_id is None
+        self._handlers: Dict[ResearchJobType, JobHandler] = {}
+        self._running: Dict[int, asyncio.Task] = {}
+        self._loop: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._claimed = 0
+        self._completed = 0
+        self._retried = 0
+        self._failed = 0
+        self._recovered = 0
+    
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and not self._loop.done()
+    
+    def register(self, job_type: ResearchJobType, handler: JobHandler) -> None:
+        """
+        Register the handler that runs jobs of a type.
+        
+        The handler gets the leased job and records its own progress and
+        completion; raising marks the attempt as failed.
+        
+        Args:
+            job_type: Job type handled
+            handler: Coroutine function taking the job
+        """
+        self._handlers[job_type] = handler
+    
+    def notify(self) -> None:
+        """Wake the runner after a job was queued, instead of waiting for the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+    
+    async def start(self) -> None:
+        """Recover orphaned jobs and start taking jobs from the queue (idempotent)."""
+        if self.running:
+            return
+        if self._own_worker_id:
+            # Worker processes forked from one parent must not share lease names
+            self.worker_id = _default_worker_id()
+        self._stopping = False
+        self._wake = asyncio.Event()
+        try:
+            await self.recover_orphans(include_unleased=True)
+        except Exception as e:
+            logger.error(f"Failed to recover orphaned jobs: {e}")
+        self._loop = asyncio.create_task(self._poll(), name="job-runner")
+        logger.info(f"Job runner {self.worker_id} started with {self.workers} workers")
+    
+    async def stop(self) -> None:
+        """Stop taking jobs and give running ones a grace period to finish."""
+        if not self.running:
+            return
+        self._stopping = True
+        self._loop.cancel()
+        try:
+            await self._loop
+        except asyncio.CancelledError:
+            pass
+        self._loop = None
+        
+        if self._running:
+            _, pending = await asyncio.wait(list(self._running.values()), timeout=settings.JOB_SHUTDOWN_GRACE)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+        logger.info(f"Job runner {self.worker_id} stopped")
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get runner statistics.
+        
+        Returns:
+            dict: Running flag, worker ID, jobs in progress and lifetime counters
+        """
+        return {
+            "running": self.running,
+            "worker_id": self.worker_id,
+            "workers": self.workers,
+            "active": len(self._running),
+            "claimed": self._claimed,
+            "completed": self._completed,
+            "retried": self._retried,
+            "failed": self._failed,
+            "recovered": self._recovered,
+        }
+    
+    async def resume(self, job_id: int) -> bool:
+        """
+        Queue a cancelled or failed job again with a fresh set of retries.
+        
+        Its handler continues from the job's last checkpoint. A job whose
+        previous run still holds its lease (it is still stopping) is left
+        alone.
+        
+        Args:
+            job_id: Research job ID
+        
+        Returns:
+            bool: True if the job was queued
+        """
+        resumed = await job_service.update_job(
+            job_id,
+            ResearchJob.status.in_([ResearchJobStatus.CANCELLED, ResearchJobStatus.FAILED]),
+            or_(ResearchJob.lease_owner.is_(None), ResearchJob.lease_expires_at < _now()),
+            status=ResearchJobStatus.PENDING,
+            retry_count=0,
+            run_after=None,
+            lease_owner=None,
+            lease_expires_at=None,
+            completed_at=None,
+            error_message=None,
+            current_step="Queued to resume",
+        )
+        if resumed:
+            self.notify()
+        return resumed
+    
+    async def recover_orphans(self, include_unleased: bool = False) -> int:
+        """
+        Requeue or fail IN_PROGRESS jobs whose runner is gone.
+        
+        Args:
+            include_unleased: Also recover jobs that never had a lease
+                (started by an older version); only safe at startup
+        
+        Returns:
+            int: Number of jobs recovered
+        """
+        now = _now()
+        orphaned = ResearchJob.lease_expires_at < now
+        if include_unleased:
+            orphaned = or_(orphaned, and_(ResearchJob.lease_expires_at.is_(None), ResearchJob.lease_owner.is_(None)))
+        
+        async with self.session_factory() as session:
+            rows = (await session.execute(
+                select(ResearchJob.id, ResearchJob.retry_count, ResearchJob.max_retries, ResearchJob.lease_owner)
+                .where(ResearchJob.status == ResearchJobStatus.IN_PROGRESS, orphaned)
+            )).all()
+        
+        recovered = 0
+        for job_id, retry_count, max_retries, owner in rows:
+            # Only if nobody renewed or recovered the job in the meantime
+            still_orphaned = (
+                ResearchJob.status == ResearchJobStatus.IN_PROGRESS,
+                ResearchJob.lease_owner.is_(None) if owner is None else ResearchJob.lease_owner == owner,
+                or_(ResearchJob.lease_expires_at.is_(None), ResearchJob.lease_expires_at < now),
+            )
+            if retry_count < max_retries:
+                updated = await job_service.update_job(
+                    job_id,
+                    *still_orphaned,
+                    status=ResearchJobStatus.PENDING,
+                    retry_count=retry_count + 1,
+                    run_after=None,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    current_step="Requeued after its worker stopped",
+                )
+            else:
+                updated = await job_service.update_job(
+                    job_id,
+                    *still_orphaned,
+                    status=ResearchJobStatus.FAILED,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    completed_at=now,
+                    error_message="Worker stopped and no retries remain",
+                    current_step="Job failed",
+                )
+            recovered += int(updated)
+        
+        if recovered:
+            logger.warning(f"Recovered {recovered} orphaned research jobs")
+            self._recovered += recovered
+        return recovered
+    
+    async def _poll(self) -> None:
+        next_recovery = asyncio.get_running_loop().time() + settings.JOB_LEASE_SECONDS
+        while True:
+            try:
+                loop_time = asyncio.get_running_loop().time()
+                if loop_time >= next_recovery:
+                    next_recovery = loop_time + settings.JOB_LEASE_SECONDS
+                    await self.recover_orphans()
+                
+                free = self.workers - len(self._running)
+                if free > 0 and self._handlers:
+                    for job in await self._claim(free):
+                        task = asyncio.create_task(self._run(job), name=f"research-job-{job.id}")
+                        self._running[job.id] = task
+                        task.add_done_callback(lambda _, job_id=job.id: self._finished(job_id))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job runner poll failed: {e}")
+            
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    
+    def _finished(self, job_id: int) -> None:
+        self._running.pop(job_id, None)
+        # A slot is free; look for the next job straight away
+        self.notify()
+    
+    async def _claim(self, limit: int) -> List[ResearchJob]:
+        """Lease up to ``limit`` queued jobs to this runner."""
+        now = _now()
+        async with self.session_factory() as session:
+            candidates = (await session.execute(
+                select(ResearchJob.id)
+                .where(
+                    ResearchJob.status == ResearchJobStatus.PENDING,
+                    ResearchJob.job_type.in_(list(self._handlers)),
+                    or_(ResearchJob.run_after.is_(None), ResearchJob.run_after <= now),
+                )
+                .order_by(func.coalesce(ResearchJob.priority, 0).desc(), ResearchJob.id)
+                # Extra candidates in case other runners win some of them
+                .limit(limit * 2)
+            )).scalars().all()
+        
+        claimed = []
+        for job_id in candidates:
+            if len(claimed) >= limit:
+                break
+            won = await write_queue.execute(
+                update(ResearchJob)
+                .where(ResearchJob.id == job_id, ResearchJob.status == ResearchJobStatus.PENDING)
+                .values(
+                    status=ResearchJobStatus.IN_PROGRESS,
+                    lease_owner=self.worker_id,
+                    lease_expires_at=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                    heartbeat_at=now,
+                    started_at=func.coalesce(ResearchJob.started_at, now),
+                    error_message=None,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if won:
+                claimed.append(job_id)
+        if not claimed:
+            return []
+        
+        self._claimed += len(claimed)
+        async with self.session_factory() as session:
+            jobs = (await session.execute(
+                select(ResearchJob).where(ResearchJob.id.in_(claimed))
+            )).scalars().all()
+        return sorted(jobs, key=lambda job: claimed.index(job.id))
+    
+    def _leased(self) -> tuple:
+        return (
+            ResearchJob.status == ResearchJobStatus.IN_PROGRESS,
+            ResearchJob.lease_owner == self.worker_id,
+        )
+    
+    async def _run(self, job: ResearchJob) -> None:
+        handler = self._handlers[job.job_type]
+        control = job_service.control(job.id, self.worker_id)
+        work = asyncio.create_task(handler(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job.id, work))
+        try:
+            await asyncio.shield(work)
+        except asyncio.CancelledError:
+            # Either the heartbeat lost the lease and cancelled the job, or
+            # the runner is stopping and cancelled us
+            lost = work.cancelled()
+            work.cancel()
+            await asyncio.gather(work, return_exceptions=True)
+            if lost:
+                # Cancelled or recovered elsewhere; only drop our lease so a
+                # cancelled job can be resumed straight away
+                logger.info(f"Research job {job.id} stopped: its lease was lost")
+                await job_service.update_job(
+                    job.id, ResearchJob.lease_owner == self.worker_id, lease_owner=None, lease_expires_at=None
+                )
+            elif self._stopping:
+                # Hand the job back without using up a retry
+                await job_service.update_job(
+                    job.id,
+                    *self._leased(),
+                    status=ResearchJobStatus.PENDING,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    current_step="Requeued at shutdown",
+                )
+            return
+        except Exception as e:
+            await self._failed_attempt(job, e)
+            return
+        finally:
+            heartbeat.cancel()
+            job_service.release_control(job.id)
+        
+        if control.cancelled:
+            logger.info(f"Research job {job.id} stopped after cancellation")
+        else:
+            self._completed += 1
+        await job_service.update_job(job.id, ResearchJob.lease_owner == self.worker_id, lease_owner=None, lease_expires_at=None)
+    
+    async def _failed_attempt(self, job: ResearchJob, error: Exception) -> None:
+        logger.error(f"Research job {job.id} attempt {job.retry_count + 1} failed: {error}")
+        if job.retry_count < job.max_retries:
+            delay = retry_delay(job.retry_count)
+            self._retried += 1
+            await job_service.update_job(
+                job.id,
+                *self._leased(),
+                status=ResearchJobStatus.PENDING,
+                retry_count=job.retry_count + 1,
+                run_after=_now() + timedelta(seconds=delay),
+                lease_owner=None,
+                lease_expires_at=None,
+                error_message=str(error),
+                current_step=f"Retrying in {delay:.0f}s (attempt {job.retry_count + 2} of {job.max_retries + 1})",
+            )
+        else:
+            self._failed += 1
+            await job_service.update_job(
+                job.id,
+                *self._leased(),
+                status=ResearchJobStatus.FAILED,
+                lease_owner=None,
+                lease_expires_at=None,
+                completed_at=_now(),
+                error_message=str(error),
+                current_step="Job failed",
+            )
+    
+    async def _heartbeat(self, job_id: int, work: asyncio.Task) -> None:
+        """Renew the lease until the job ends; stop the job if the lease is lost."""
+        while not work.done():
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+            now = _now()
+            try:
+                renewed = await write_queue.execute(
+                    update(ResearchJob)
+                    .where(ResearchJob.id == job_id, *self._leased())
+                    .values(
+                        lease_expires_at=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                        heartbeat_at=now,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            except Exception as e:
+                # Keep running; the lease only lapses if renewals keep failing
+                logger.warning(f"Heartbeat for research job {job_id} failed: {e}")
+                continue
+            if not renewed and not work.done():
+                # Let the job stop between items and checkpoint, then force it
+                job_service.cancel(job_id)
+                done, _ = await asyncio.wait({work}, timeout=settings.JOB_CANCEL_GRACE)
+                if not done:
+                    work.cancel()
+                return
+
+
+# Global runner; handlers are registered by the tool modules
+job_runner = JobRunner()
@@ -0,0 +1,376 @@
+"""
+Research job bookkeeping shared by the background tool processors.
+
+Per-item progress (``progress_percentage`` and ``current_step``) is kept in
+memory and written to ``ResearchJob`` at most every
+``JOB_PROGRESS_FLUSH_SECONDS`` or ``JOB_PROGRESS_FLUSH_ITEMS`` reports, so
+a job costs a handful of database writes however many items it has. Every
+report is also published to local subscribers and to the cache (Redis when
+configured), which is what the ``/jobs/{id}/events`` streams and status
+endpoints read.
+
+Running jobs get a ``JobControl``: a cancellation flag checked between
+items, and pacing for checkpoints of the completed items and remaining
+work, which the job saves to ``ResearchJob.checkpoint`` so it can be
+resumed after a crash or cancellation.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+from sqlalchemy import update
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import write_queue
+from app.core.logging import get_logger
+from app.models.research_tool import ResearchJob, ResearchJobStatus
+
+logger = get_logger(__name__)
+
+TERMINAL_STATUSES = {
+    ResearchJobStatus.COMPLETED,
+    ResearchJobStatus.FAILED,
+    ResearchJobStatus.CANCELLED,
+}
+
+PROGRESS_FIELDS = ("status", "progress_percentage", "current_step")
+
+
+@dataclass
+class _JobProgress:
+    """In-memory progress of a job running in this process."""
+    snapshot: Dict[str, Any]
+    pending: Dict[str, Any] = field(default_factory=dict)  # Not yet written to the database
+    reports: int = 0
+    flushed_at: float = field(default_factory=time.monotonic)
+    version: int = 0
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class JobControl:
+    """
+    Cancellation flag and checkpoint pacing for one running job.
+    
+    The flag is set by ``ResearchJobService.cancel`` in the process running
+    the job, and by the job runner when the job's lease cannot be renewed
+    (it was cancelled from another process).
+    
+    When the job runner hands the job over it records its ``lease_owner``;
+    checkpoints and the completion are then only written while that lease
+    is still held, so a run that lost its job cannot overwrite the state
+    written by whoever took it over.
+    """
+    
+    def __init__(self, job_id: int, lease_owner: Optional[str] = None) -> None:
+        self.job_id = job_id
+        self.lease_owner = lease_owner
+        self._cancelled = asyncio.Event()
+        self._items = 0
+        self._saved_at = time.monotonic()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+    
+    def cancel(self) -> None:
+        """Ask the job to stop after the item in progress."""
+        self._cancelled.set()
+    
+    async def wait_cancelled(self) -> None:
+        """Wait until the job is asked to stop."""
+        await self._cancelled.wait()
+    
+    def checkpoint_due(self, items: int = 1) -> bool:
+        """
+        Count finished items and tell whether a checkpoint should be saved.
+        
+        Args:
+            items: Items finished since the last call
+        
+        Returns:
+            bool: True every ``JOB_CHECKPOINT_ITEMS`` items or
+            ``JOB_CHECKPOINT_SECONDS`` seconds
+        """
+        self._items += items
+        return (
+            self._items >= settings.JOB_CHECKPOINT_ITEMS
+            or time.monotonic() - self._saved_at >= settings.JOB_CHECKPOINT_SECONDS
+        )
+    
+    def _owned(self) -> tuple:
+        if self.lease_owner is None:
+            return ()
+        return (ResearchJob.lease_owner == self.lease_owner,)
+    
+    async def save_checkpoint(self, checkpoint: Dict[str, Any], *conditions: Any) -> bool:
+        """
+        Save the job's checkpoint.
+        
+        Args:
+            checkpoint: JSON-serializable state; a ``results`` manifest in it
+                keeps its segments from being garbage collected
+            *conditions: Extra WHERE clauses for the update
+        
+        Returns:
+            bool: True if the checkpoint was saved
+        """
+        self._items = 0
+        self._saved_at = time.monotonic()
+        return await job_service.update_job(self.job_id, *conditions, *self._owned(), checkpoint=checkpoint)
+    
+    async def complete(self, **values: Any) -> bool:
+        """
+        Mark the job completed and clear its checkpoint.
+        
+        The write only applies while the job is still in progress under this
+        run's lease. If it was cancelled or taken over meanwhile nothing is
+        written and the control is cancelled, so the runner does not count
+        the job as completed.
+        
+        Args:
+            **values: Other columns to set, such as ``result_data``
+        
+        Returns:
+            bool: True if the job was marked completed
+        """
+        done = await job_service.update_job(
+            self.job_id,
+            ResearchJob.status == ResearchJobStatus.IN_PROGRESS,
+            *self._owned(),
+            status=ResearchJobStatus.COMPLETED,
+            checkpoint=None,
+            **values,
+        )
+        if not done:
+            self.cancel()
+        return done
+
+
+def _progress_key(job_id: int) -> str:
+    return f"job-progress:{job_id}"
+
+
+class ResearchJobService:
+    """Service for recording research job state from background tasks."""
+    
+    def __init__(self) -> None:
+        self._progress: Dict[int, _JobProgress] = {}
+        self._controls: Dict[int, JobControl] = {}
+    
+    async def update_job(self, job_id: int, *conditions: Any, **values: Any) -> bool:
+        """
+        Update research job columns.
+        
+        Writes go through the database write queue, so on embedded SQLite
+        concurrent jobs share a single writer connection instead of racing
+        for the database lock. Progress reported since the last flush is
+        written along with the values; a terminal status ends tracking.
+        
+        Args:
+            job_id: Research job ID
+            *conditions: Extra WHERE clauses (e.g. the job is still leased)
+            **values: Column values to set
+        
+        Returns:
+            bool: True if the job exists and matched the conditions
+        """
+        state = self._progress.get(job_id)
+        if state is not None:
+            values = {**state.pending, **values}
+            state.pending = {}
+            state.reports = 0
+            state.flushed_at = time.monotonic()
+        
+        updated = await write_queue.execute(
+            update(ResearchJob)
+            .where(ResearchJob.id == job_id, *conditions)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if not updated:
+            return False
+        
+        if any(name in values for name in PROGRESS_FIELDS):
+            await self._publish(job_id, {k: v for k, v in values.items() if k in PROGRESS_FIELDS})
+        if values.get("status") in TERMINAL_STATUSES or values.get("status") == ResearchJobStatus.PENDING:
+            # The job is finished or back in the queue for any runner to take
+            self._progress.pop(job_id, None)
+        return updated > 0
+    
+    async def report_progress(
+        self,
+        job_id: int,
+        progress_percentage: Optional[int] = None,
+        current_step: Optional[str] = None,
+    ) -> None:
+        """
+        Record per-item progress without writing to the database every time.
+        
+        Args:
+            job_id: Research job ID
+            progress_percentage: Percent complete
+            current_step: Description of the item being processed
+        """
+        values = {}
+        if progress_percentage is not None:
+            values["progress_percentage"] = progress_percentage
+        if current_step is not None:
+            values["current_step"] = current_step
+        state = await self._publish(job_id, values)
+        state.pending.update(values)
+        state.reports += 1
+        
+        if (
+            state.reports >= settings.JOB_PROGRESS_FLUSH_ITEMS
+            or time.monotonic() - state.flushed_at >= settings.JOB_PROGRESS_FLUSH_SECONDS
+        ):
+            await self.flush_progress(job_id)
+    
+    async def flush_progress(self, job_id: int) -> None:
+        """Write progress reported since the last flush to the database."""
+        state = self._progress.get(job_id)
+        if state is None or not state.pending:
+            return
+        try:
+            await self.update_job(job_id)
+        except Exception as e:
+            # Progress is advisory; the next flush or the final update catches up
+            logger.warning(f"Failed to flush progress for job {job_id}: {e}")
+    
+    async def flush_all(self) -> None:
+        """Flush progress of every job tracked by this process (on shutdown)."""
+        for job_id in list(self._progress):
+            await self.flush_progress(job_id)
+    
+    def control(self, job_id: int, lease_owner: Optional[str] = None) -> JobControl:
+        """
+        Get the control of a job running in this process, creating it if needed.
+        
+        Args:
+            job_id: Research job ID
+            lease_owner: Runner holding the job's lease, when creating the control
+        
+        Returns:
+            JobControl: Cancellation flag and checkpoint pacing
+        """
+        control = self._controls.get(job_id)
+        if control is None:
+            control = self._controls[job_id] = JobControl(job_id, lease_owner)
+        return control
+    
+    def release_control(self, job_id: int) -> None:
+        """Forget a job's control once it stopped running."""
+        self._controls.pop(job_id, None)
+    
+    def cancel(self, job_id: int) -> bool:
+        """
+        Ask a job running in this process to stop.
+        
+        Jobs running in other processes notice the cancelled status at
+        their next heartbeat.
+        
+        Args:
+            job_id: Research job ID
+        
+        Returns:
+            bool: True if the job runs in this process
+        """
+        control = self._controls.get(job_id)
+        if control is None:
+            return False
+        control.cancel()
+        return True
+    
+    async def get_progress(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get the latest progress snapshot of a job.
+        
+        Jobs running in this process are answered from memory; others from
+        the snapshot their process shared through the cache.
+        
+        Args:
+            job_id: Research job ID
+        
+        Returns:
+            Optional[Dict]: Status, progress_percentage, current_step and
+            updated_at, or None if no recent progress is known
+        """
+        state = self._progress.get(job_id)
+        if state is not None:
+            return dict(state.snapshot)
+        return await cache.get(_progress_key(job_id))
+    
+    async def progress_events(self, job_id: int, initial: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Stream a job's progress as Server-Sent Events.
+        
+        Sends the current state, then every change until the job reaches a
+        terminal status. Changes from this process are pushed immediately;
+        jobs run elsewhere are polled from the cache every
+        ``JOB_EVENTS_POLL_SECONDS``. A comment line is sent every
+        ``JOB_EVENTS_KEEPALIVE_SECONDS`` to keep proxies from closing the
+        connection.
+        
+        Args:
+            job_id: Research job ID
+            initial: Job state read from the database
+        
+        Yields:
+            str: ``progress`` events with a JSON snapshot
+        """
+        state = self._progress.get(job_id)
+        seen = state.version if state else 0
+        last = {**initial, **(await self.get_progress(job_id) or {})}
+        yield self._event(last)
+        idle_since = time.monotonic()
+        
+        while last.get("status") not in TERMINAL_STATUSES:
+            state = self._progress.get(job_id)
+            try:
+                if state is None:
+                    await asyncio.sleep(settings.JOB_EVENTS_POLL_SECONDS)
+                elif state.version == seen:
+                    await asyncio.wait_for(state.changed.wait(), settings.JOB_EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            state = self._progress.get(job_id)
+            seen = state.version if state else seen
+            
+            current = {**last, **(await self.get_progress(job_id) or {})}
+            if current != last:
+                last = current
+                yield self._event(last)
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since >= settings.JOB_EVENTS_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                idle_since = time.monotonic()
+    
+    @staticmethod
+    def _event(snapshot: Dict[str, Any]) -> str:
+        return f"event: progress\ndata: {json.dumps(snapshot, default=str)}\n\n"
+    
+    async def _publish(self, job_id: int, values: Dict[str, Any]) -> _JobProgress:
+        """Apply values to the job's snapshot and wake its subscribers."""
+        state = self._progress.get(job_id)
+        if state is None:
+            state = self._progress[job_id] = _JobProgress(snapshot={"job_id": job_id})
+        for name, value in values.items():
+            state.snapshot[name] = getattr(value, "value", value)
+        state.snapshot["updated_at"] = datetime.utcnow().isoformat()
+        state.version += 1
+        
+        # Wake current subscribers; later ones wait on a fresh event
+        state.changed.set()
+        state.changed = asyncio.Event()
+        
+        await cache.set(_progress_key(job_id), state.snapshot, ttl=settings.JOB_PROGRESS_TTL)
+        return state
+
+
+# Global service instance
+job_service = ResearchJobService()
@@ -0,0 +1,299 @@
+"""
+Page-level PDF text extraction in worker processes.
+
+Text extraction with pypdf is CPU-bound Python, so documents are split into
+ranges of ``PDF_PAGES_PER_TASK`` pages extracted by a ``ProcessPoolExecutor``
+of ``PDF_WORKERS`` processes shared by all jobs. ``iter_pages`` yields pages
+in order as their ranges finish, with at most two ranges per worker in
+flight (one for previews), so a long document is never held in memory as
+a whole.
+
+Every page carries its character offset in the document text (pages joined
+by ``PAGE_SEPARATOR``), so quotes can be cited by page.
+
+Workers are capped so one malformed file cannot stall the job queue:
+
+* their address space is limited to ``PDF_WORKER_MEMORY_MB``, so runaway
+  allocations fail with MemoryError instead of exhausting the host;
+* a range running longer than ``PDF_TASK_TIMEOUT`` seconds is interrupted,
+  and a worker still burning CPU past that (stuck in native code) is killed
+  and the pool replaced;
+* workers are recycled after ``PDF_WORKER_MAX_TASKS`` ranges.
+
+Pages of a range that fails are yielded with an ``error`` and no text, so
+page numbers and offsets stay aligned with the document. Scanned pages
+without a text layer come back empty; OCR is out of scope here. The worker
+caps use POSIX resource limits and timers and are skipped where those are
+unavailable.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+    import signal
+except ImportError:  # Not available on Windows
+    resource = None
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+PAGE_SEPARATOR = "\n\n"  # Between pages of the document text that offsets refer to
+POOL_ATTEMPTS = 2  # Ranges lost to a worker crash are retried once on a new pool
+CPU_GRACE_SECONDS = 5  # CPU time past the timeout before a stuck worker is killed
+
+
+@dataclass
+class PdfPage:
+    """Text of one PDF page."""
+    number: int  # 1-based
+    offset: int  # Character offset of the page in the document text
+    text: str
+    error: Optional[str] = None
+
+
+# Worker side: these run in the pool's processes
+
+def _init_worker(memory_bytes: int) -> None:
+    if resource is None:
+        return
+    if memory_bytes:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            memory_bytes = min(memory_bytes, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, hard))
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def _on_alarm(signum, frame) -> None:
+    raise TimeoutError("PDF page range timed out")
+
+
+@contextmanager
+def _time_limit(seconds: float) -> Iterator[None]:
+    """
+    Interrupt the block after ``seconds``; kill the process if it keeps
+    using CPU without returning to Python (SIGXCPU terminates it).
+    """
+    if resource is None or seconds <= 0:
+        yield
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    cpu_limit = int(usage.ru_utime + usage.ru_stime + seconds + CPU_GRACE_SECONDS) + 1
+    if hard != resource.RLIM_INFINITY:
+        cpu_limit = min(cpu_limit, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, hard))
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _open(path: str):
+    from pypdf import PdfReader
+    
+    reader = PdfReader(path, strict=False)
+    if reader.is_encrypted:
+        # Many PDFs are encrypted with an empty user password
+        reader.decrypt("")
+    return reader
+
+
+def _document_info(path: str, timeout: float) -> Dict[str, Any]:
+    with _time_limit(timeout):
+        reader = _open(path)
+        info = reader.metadata or {}
+        fields = {
+            name: getattr(info, name, None)
+            for name in ("title", "author", "subject", "creator", "producer")
+        }
+        return {
+            "pages": len(reader.pages),
+            "encrypted": reader.is_encrypted,
+            **{name: str(value) if value else None for name, value in fields.items()},
+        }
+
+
+def _extract_range(path: str, start: int, stop: int, timeout: float) -> List[Tuple[str, Optional[str]]]:
+    """Extract ``(text, error)`` for pages ``start`` to ``stop`` (0-based, exclusive)."""
+    pages: List[Tuple[str, Optional[str]]] = []
+    try:
+        with _time_limit(timeout):
+            reader = _open(path)
+            for index in range(start, stop):
+                try:
+                    pages.append((reader.pages[index].extract_text() or "", None))
+                except (TimeoutError, MemoryError):
+                    raise
+                except Exception as e:
+                    pages.append(("", f"{type(e).__name__}: {e}"))
+    except TimeoutError:
+        pages.extend(("", "Page extraction timed out") for _ in range(stop - start - len(pages)))
+    except MemoryError:
+        pages.extend(("", "Page extraction ran out of memory") for _ in range(stop - start - len(pages)))
+    return pages
+
+
+# API side
+
+class PdfExtractor:
+    """Shared worker pool for PDF text extraction."""
+    
+    def __init__(self) -> None:
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    @property
+    def workers(self) -> int:
+        return settings.PDF_WORKERS or os.cpu_count() or 1
+    
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned workers never inherit the event loop or open
+            # connections of this process
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(settings.PDF_WORKER_MEMORY_MB * 1024 * 1024,),
+                max_tasks_per_child=settings.PDF_WORKER_MAX_TASKS or None,
+            )
+        return self._pool
+    
+    async def _run(self, func, *args):
+        """Run a function in the pool, replacing the pool if a worker died."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(POOL_ATTEMPTS):
+            pool = self._executor()
+            try:
+                return await loop.run_in_executor(pool, func, *args)
+            except BrokenProcessPool:
+                if self._pool is pool:
+                    logger.warning("PDF worker died; replacing the worker pool")
+                    self._pool = None
+                    pool.shutdown(wait=False, cancel_futures=True)
+                if attempt + 1 == POOL_ATTEMPTS:
+                    raise
+    
+    async def document_info(self, path: Path) -> Dict[str, Any]:
+        """
+        Read a PDF's page count and document information.
+        
+        Args:
+            path: PDF file
+        
+        Returns:
+            Dict: pages, encrypted, title, author, subject, creator, producer
+        """
+        return await self._run(_document_info, str(path), settings.PDF_TASK_TIMEOUT)
+    
+    async def iter_pages(
+        self,
+        path: Path,
+        start_page: int = 1,
+        offset: int = 0,
+        page_count: Optional[int] = None,
+        prefetch: Optional[int] = None,
+    ) -> AsyncIterator[PdfPage]:
+        """
+        Extract a PDF's text page by page.
+        
+        Args:
+            path: PDF file
+            start_page: First page to extract (1-based), to resume extraction
+            offset: Document text offset of ``start_page``
+            page_count: Pages in the document, if already known
+            prefetch: Page ranges extracted ahead of the consumer (defaults
+                to two per worker); use 1 when only the first pages may be read
+        
+        Yields:
+            PdfPage: Pages in order, with their text offsets
+        """
+        if page_count is None:
+            page_count = (await self.document_info(path))["pages"]
+        size = max(1, settings.PDF_PAGES_PER_TASK)
+        starts = iter(range(start_page - 1, page_count, size))
+        in_flight: Deque[Tuple[int, int, asyncio.Future]] = deque()
+        
+        def submit() -> None:
+            start = next(starts, None)
+            if start is not None:
+                stop = min(start + size, page_count)
+                task = asyncio.ensure_future(
+                    self._run(_extract_range, str(path), start, stop, settings.PDF_TASK_TIMEOUT)
+                )
+                in_flight.append((start, stop, task))
+        
+        try:
+            for _ in range(max(1, prefetch or self.workers * 2)):
+                submit()
+            while in_flight:
+                start, stop, task = in_flight.popleft()
+                try:
+                    pages = await task
+                except Exception as e:
+                    logger.warning(f"Failed to extract pages {start + 1}-{stop} of {path.name}: {e}")
+                    pages = [("", f"{type(e).__name__}: {e}")] * (stop - start)
+                submit()
+                
+                for number, (text, error) in enumerate(pages, start + 1):
+                    yield PdfPage(number=number, offset=offset, text=text, error=error)
+                    offset += len(text) + len(PAGE_SEPARATOR)
+        finally:
+            # Ranges already running finish in the background within the timeout
+            for _, _, task in in_flight:
+                task.cancel()
+    
+    async def extract_text(self, path: Path, max_chars: Optional[int] = None) -> str:
+        """
+        Extract a PDF's text, stopping once ``max_chars`` are collected.
+        
+        Args:
+            path: PDF file
+            max_chars: Maximum characters to return
+        
+        Returns:
+            str: Page texts joined by ``PAGE_SEPARATOR``
+        """
+        parts: List[str] = []
+        length = 0
+        # One range at a time: a preview usually stops within the first
+        pages = self.iter_pages(path, prefetch=1)
+        try:
+            async for page in pages:
+                parts.append(page.text)
+                length += len(page.text) + len(PAGE_SEPARATOR)
+                if max_chars is not None and length >= max_chars:
+                    break
+        finally:
+            await pages.aclose()
+        text = PAGE_SEPARATOR.join(parts)
+        return text[:max_chars] if max_chars is not None else text
+    
+    def shutdown(self, wait: bool = False) -> None:
+        """
+        Stop the worker processes (on shutdown).
+        
+        Args:
+            wait: Wait for the workers to exit
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+
+# Global extractor instance
+pdf_extractor = PdfExtractor()
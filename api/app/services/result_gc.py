@@ -0,0 +1,148 @@
+"""
+Garbage collection for job result segments.
+
+Result segments are content-addressed and shared between jobs, so deleting
+a job cannot simply delete its segments. ``release_job_results`` runs when
+a job is deleted and removes the segments no other job references;
+``sweep_result_segments`` removes every unreferenced segment (e.g. from
+jobs deleted directly in the database, or released during the grace
+period) and can be scheduled:
+    
+    python -m app.services.result_gc [--dry-run]
+"""
+
+import argparse
+import asyncio
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.result_store import ResultStore, result_store, segment_keys
+from app.models.research_tool import ResearchJob
+
+logger = get_logger(__name__)
+
+
+def checkpoint_results(checkpoint: Any) -> Any:
+    """
+    Manifest of the results saved in a job checkpoint.
+    
+    Args:
+        checkpoint: Value of ``ResearchJob.checkpoint``
+    
+    Returns:
+        Any: Manifest, or None if the checkpoint has no results
+    """
+    return checkpoint.get("results") if isinstance(checkpoint, dict) else None
+
+
+async def referenced_segment_keys(db: AsyncSession) -> set[str]:
+    """
+    Collect the segment keys referenced by any job's manifest or checkpoint.
+    
+    Args:
+        db: Database session
+    
+    Returns:
+        set[str]: Referenced segment keys
+    """
+    referenced: set[str] = set()
+    result = await db.stream(
+        select(ResearchJob.result_data, ResearchJob.checkpoint).where(
+            (ResearchJob.result_data.is_not(None)) | (ResearchJob.checkpoint.is_not(None))
+        )
+    )
+    async for result_data, checkpoint in result:
+        referenced |= segment_keys(result_data)
+        referenced |= segment_keys(checkpoint_results(checkpoint))
+    return referenced
+
+
+async def release_job_results(
+    db: AsyncSession,
+    result_data: Any,
+    store: Optional[ResultStore] = None,
+) -> int:
+    """
+    Delete a deleted job's segments that no remaining job references.
+    
+    Call after the job's deletion is committed. Failures are logged rather
+    than raised, since the sweep removes anything left behind.
+    
+    Args:
+        db: Database session
+        result_data: The deleted job's ``result_data``
+        store: Result store (defaults to the global store)
+    
+    Returns:
+        int: Number of segments deleted
+    """
+    keys = segment_keys(result_data)
+    if not keys:
+        return 0
+    store = store or result_store
+    try:
+        deleted = await store.delete_segments(
+            keys,
+            await referenced_segment_keys(db),
+            settings.RESULT_SEGMENT_GRACE_SECONDS,
+        )
+    except Exception as e:
+        logger.warning(f"Failed to release job result segments: {e}")
+        return 0
+    logger.info(f"Released {deleted} of {len(keys)} job result segments")
+    return deleted
+
+
+async def sweep_result_segments(
+    db: AsyncSession,
+    store: Optional[ResultStore] = None,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    Delete every stored segment that no job references.
+    
+    Args:
+        db: Database session
+        store: Result store (defaults to the global store)
+        dry_run: Report what would be deleted without deleting
+    
+    Returns:
+        Dict: Counts of stored, referenced and deleted segments
+    """
+    store = store or result_store
+    # Listed before collecting references, so segments of jobs saved
+    # meanwhile are either referenced or inside the grace period
+    stored = await store.backend.keys()
+    referenced = await referenced_segment_keys(db)
+    stats = {
+        "stored": len(stored),
+        "referenced": len(referenced),
+        "deleted": await store.delete_segments(
+            stored, referenced, settings.RESULT_SEGMENT_GRACE_SECONDS, dry_run=dry_run
+        ),
+    }
+    logger.info(
+        f"Swept result segments: {stats['stored']} stored, {stats['referenced']} referenced, "
+        f"{stats['deleted']} deleted" + (" (dry run)" if dry_run else "")
+    )
+    return stats
+
+
+async def _main(dry_run: bool) -> None:
+    from app.core.database import AsyncSessionLocal, close_db
+    
+    async with AsyncSessionLocal() as db:
+        stats = await sweep_result_segments(db, dry_run=dry_run)
+    await close_db()
+    print(stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete job result segments no job references")
+    parser.add_argument("--dry-run", action="store_true", help="Report without deleting")
+    args = parser.parse_args()
+    asyncio.run(_main(args.dry_run))
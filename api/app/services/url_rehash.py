@@ -0,0 +1,147 @@
+"""
+Re-hash stored URLs after canonicalization rules change.
+
+Rows processed before (or under different) canonicalization rules are
+keyed by the hash of their old spelling, so lookups of the canonical form
+miss them and equivalent spellings sit in separate rows. This migration
+recomputes every ``ProcessedUrl.url_hash`` from the canonical form of its
+``url`` (which keeps the spelling that was fetched) and merges rows that
+now share a hash, keeping the best copy (completed over failed, then most
+recently fetched) and pointing citations at it.
+
+A row can hold, under the old rules, the new hash of a row in another
+group, so changed hashes are first parked on temporary values and only
+then set:
+    
+    python -m app.services.url_rehash [--dry-run]
+"""
+
+import argparse
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging import get_logger
+from app.core.urls import canonicalize_url
+from app.models.research_tool import Citation, ProcessedUrl
+
+logger = get_logger(__name__)
+
+BATCH_SIZE = 500
+PARKED_PREFIX = "rehash-"  # Temporary url_hash of rows between the two phases
+
+
+def _keeper_rank(row) -> tuple:
+    seen = row.fetched_at or row.updated_at or datetime.min
+    if seen.tzinfo is not None:
+        seen = seen.astimezone(timezone.utc).replace(tzinfo=None)
+    return (row.processing_status == "completed", seen, row.id)
+
+
+async def rehash_processed_urls(db: AsyncSession, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Recompute URL hashes from canonical URLs, merging duplicates.
+    
+    Rows parked by an interrupted run are picked up again, since their
+    temporary hash never matches the recomputed one.
+    
+    Args:
+        db: Database session
+        dry_run: Report what would change without writing
+    
+    Returns:
+        Dict: Counts of rows scanned, rehashed and merged away
+    """
+    result = await db.execute(
+        select(
+            ProcessedUrl.id,
+            ProcessedUrl.url,
+            ProcessedUrl.url_hash,
+            ProcessedUrl.processing_status,
+            ProcessedUrl.fetched_at,
+            ProcessedUrl.updated_at,
+        ).order_by(ProcessedUrl.id)
+    )
+    groups: Dict[str, List] = {}
+    scanned = 0
+    for row in result:
+        scanned += 1
+        try:
+            url = canonicalize_url(row.url)
+        except ValueError:
+            url = row.url
+        url_hash = hashlib.sha256(url.encode()).hexdigest()
+        groups.setdefault(url_hash, []).append(row)
+    
+    stats = {"scanned": scanned, "rehashed": 0, "merged": 0}
+    rehashed: Dict[int, str] = {}
+    pending = 0
+    
+    # Phase 1: merge duplicates and park changed hashes, freeing every new hash
+    for url_hash, rows in groups.items():
+        keeper = max(rows, key=_keeper_rank)
+        duplicates = [row.id for row in rows if row.id != keeper.id]
+        changed = keeper.url_hash != url_hash
+        if not duplicates and not changed:
+            continue
+        stats["merged"] += len(duplicates)
+        stats["rehashed"] += int(changed)
+        if dry_run:
+            continue
+        
+        if duplicates:
+            await db.execute(
+                update(Citation)
+                .where(Citation.processed_url_id.in_(duplicates))
+                .values(processed_url_id=keeper.id)
+            )
+            await db.execute(delete(ProcessedUrl).where(ProcessedUrl.id.in_(duplicates)))
+        if changed:
+            # Not hex, so it cannot collide with a real hash
+            await db.execute(
+                update(ProcessedUrl)
+                .where(ProcessedUrl.id == keeper.id)
+                .values(url_hash=f"{PARKED_PREFIX}{keeper.id}")
+            )
+            rehashed[keeper.id] = url_hash
+        pending += 1
+        if pending >= BATCH_SIZE:
+            await db.commit()
+            pending = 0
+    
+    # Phase 2: give parked rows their new hashes
+    for row_id, url_hash in rehashed.items():
+        await db.execute(update(ProcessedUrl).where(ProcessedUrl.id == row_id).values(url_hash=url_hash))
+        pending += 1
+        if pending >= BATCH_SIZE:
+            await db.commit()
+            pending = 0
+    
+    if not dry_run:
+        await db.commit()
+    logger.info(
+        f"Rehashed processed URLs: {stats['scanned']} scanned, "
+        f"{stats['rehashed']} rehashed, {stats['merged']} merged"
+        + (" (dry run)" if dry_run else "")
+    )
+    return stats
+
+
+async def _main(dry_run: bool) -> None:
+    from app.core.database import AsyncSessionLocal, close_db
+    
+    async with AsyncSessionLocal() as db:
+        stats = await rehash_processed_urls(db, dry_run=dry_run)
+    await close_db()
+    print(stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-hash processed URLs under the current canonicalization rules")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing")
+    args = parser.parse_args()
+    asyncio.run(_main(args.dry_run))
@@ -2,83 +2,473 @@
 URL processing service for web content analysis and archival.
 """
 
+import asyncio
+import codecs
 import hashlib
 import json
 import re
 import urllib.parse
-from datetime import datetime, timezone
-from typing import Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 import httpx
 from bs4 import BeautifulSoup
+from sqlalchemy import and_, case, inspect, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
+from app.core.config import settings
+from app.core.http_client import http_clients
 from app.core.logging import get_logger
+from app.core.urls import canonicalize_url, with_scheme
 from app.models.research_tool import ProcessedUrl
 from app.models.user import User
+from app.services.domain_reputation import domain_reputation
+from app.services.wayback_archiver import WaybackError, save_snapshot
 
 logger = get_logger(__name__)
 
+# Columns refreshed when a URL is re-processed
+_RESULT_COLUMNS = (
+    "url", "title", "description", "author", "domain", "content_type",
+    "language", "word_count", "status_code", "response_time",
+    "additional_metadata", "reliability_score", "domain_reputation",
+    "processing_status", "error_message", "user_id",
+    "etag", "last_modified", "max_age", "fetched_at",
+    "error_class", "failure_count", "retry_after",
+)
+
+# Columns a failed refresh updates on a completed row (content is kept)
+_FAILURE_COLUMNS = ("error_message", "fetched_at", "error_class", "failure_count", "retry_after")
+
+# Failure classes cached for URL_PERMANENT_FAILURE_TTL instead of backing off
+PERMANENT_ERRORS = frozenset({"not_found", "gone"})
+
+
+def classify_failure(error: Optional[Exception] = None, status_code: Optional[int] = None) -> str:
+    """
+    Classify a failed fetch for the negative cache.
+    
+    Args:
+        error: Exception raised by the fetch or analysis
+        status_code: HTTP error status the origin answered with
+    
+    Returns:
+        str: Error class (``PERMANENT_ERRORS`` are not worth retrying soon)
+    """
+    if status_code is not None:
+        if status_code == 404:
+            return "not_found"
+        if status_code == 410:
+            return "gone"
+        if status_code == 429:
+            return "rate_limited"
+        return "server_error" if status_code >= 500 else "client_error"
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, httpx.ConnectError):
+        return "connect"
+    if isinstance(error, httpx.HTTPError):
+        return "network"
+    return "processing"
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Read a Retry-After header given in seconds or as an HTTP date."""
+    value = response.headers.get("retry-after", "").strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _known_encoding(charset: Optional[str]) -> str:
+    """A declared charset Python can decode, or utf-8 if it is unknown."""
+    if charset:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+_WORD_RE = re.compile(r'\b\w+\b')
+_WORD_CHAR_RE = re.compile(r'\w')
+
+
+class _HeadMetadataParser(HTMLParser):
+    """
+    Incremental parser for the metadata ``_extract_metadata`` reads.
+    
+    Collects the title, description, author, language, Open Graph tags and
+    JSON-LD from whatever has been fed so far, and optionally counts words
+    in text outside scripts and styles in the same pass.
+    """
+    
+    def __init__(self, count_words: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.count_words = count_words
+        self.head_closed = False
+        self.word_count = 0
+        self._fields: Dict = {}
+        self._open_graph: Dict[str, str] = {}
+        self._schema_org: List = []
+        self._capture: Optional[str] = None
+        self._buffer: List[str] = []
+        self._skip_depth = 0
+        self._in_word = False
+    
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = {name: value or "" for name, value in attrs}
+        if tag == "html" and attributes.get("lang"):
+            self._fields.setdefault("language", attributes["lang"])
+        elif tag == "title" and "title" not in self._fields:
+            self._capture, self._buffer = "title", []
+        elif tag == "meta":
+            name = attributes.get("name", "").lower()
+            prop = attributes.get("property", "")
+            content = attributes.get("content", "").strip()
+            if name in ("description", "author"):
+                self._fields.setdefault(name, content)
+            elif prop == "article:author":
+                self._fields.setdefault("article_author", content)
+            elif prop.startswith("og:") and prop[3:] and content:
+                self._open_graph.setdefault(prop[3:], content)
+        elif tag == "script" and attributes.get("type") == "application/ld+json":
+            self._capture, self._buffer = "script", []
+        elif tag in ("script", "style"):
+            self._skip_depth += 1
+        elif tag == "body":
+            # Documents may omit </head>
+            self.head_closed = True
+    
+    def handle_endtag(self, tag: str) -> None:
+        if self._capture == tag:
+            text = "".join(self._buffer)
+            if tag == "title":
+                self._fields["title"] = text.strip()
+            else:
+                try:
+                    self._schema_org.append(json.loads(text))
+                except json.JSONDecodeError:
+                    pass
+            self._capture = None
+        elif tag in ("script", "style") and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "head":
+            self.head_closed = True
+    
+    def handle_data(self, data: str) -> None:
+        if self._capture:
+            self._buffer.append(data)
+            if self._capture == "script":
+                return
+        if not self.count_words or self._skip_depth or not data:
+            return
+        words = len(_WORD_RE.findall(data))
+        # A word split across two chunks of text is one word
+        if words and self._in_word and _WORD_CHAR_RE.match(data[0]):
+            words -= 1
+        self.word_count += words
+        self._in_word = bool(_WORD_CHAR_RE.match(data[-1]))
+    
+    def result(self) -> Dict:
+        """Metadata collected so far."""
+        metadata = {
+            key: self._fields[key] for key in ("title", "language") if key in self._fields
+        }
+        description = self._fields.get("description") or self._open_graph.get("description")
+        if description:
+            metadata["description"] = description
+        author = self._fields.get("author") or self._fields.get("article_author")
+        if author:
+            metadata["author"] = author
+        if self.count_words:
+            metadata["word_count"] = self.word_count
+        if self._open_graph:
+            metadata["open_graph"] = self._open_graph
+        if self._schema_org:
+            metadata["schema_org"] = self._schema_org
+        return metadata
+
+
+class _HostThrottle:
+    """Per-host concurrency and request spacing for one batch."""
+    
+    def __init__(self, concurrency: int, delay: float):
+        self._concurrency = max(1, concurrency)
+        self._delay = max(0.0, delay)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+    
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        """Hold one of the host's slots, waiting out its request spacing."""
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self._concurrency))
+        async with semaphore:
+            # Reserve a start time before sleeping so waiters queue in order
+            now = asyncio.get_running_loop().time()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self._delay
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
 
 class UrlProcessingService:
     """Service for processing and analyzing URLs."""
     
-    def __init__(self):
-        """Initialize URL processing service."""
-        self.client = httpx.AsyncClient(
-            timeout=30.0,
-            headers={
-                "User-Agent": "OmniCore Intelligence Analysis Platform/1.0 (+https://omnicore.intelligence)"
-            }
-        )
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        """
+        Initialize URL processing service.
+        
+        Args:
+            client: HTTP client to use instead of the shared "metadata"
+                client (owned by the service and closed with it)
+        """
+        self._client = client
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """HTTP client for fetching URLs."""
+        return self._client or http_clients.get("metadata")
     
     async def process_url(
         self,
         url: str,
         db: AsyncSession,
         user: User,
-        force_refresh: bool = False
+        force_refresh: bool = False,
+        metadata_only: bool = False,
+        count_words: bool = False
     ) -> ProcessedUrl:
         """
         Process a URL and extract metadata.
         
+        A URL whose last fetch failed is served from the stored failure
+        until its ``retry_after`` passes, then fetched again.
+        
         Args:
             url: URL to process
             db: Database session
             user: User requesting the processing
-            force_refresh: Force re-processing even if cached
+            force_refresh: Fetch even if the stored copy is still fresh (or
+                the stored failure is not yet due for a retry)
+            metadata_only: Stream the page and parse only its head
+            count_words: With metadata_only, also count words in the body
             
         Returns:
             ProcessedUrl: Processed URL object
         """
         logger.info(f"Processing URL: {url} for user {user.username}")
         
-        # Normalize and validate URL
-        normalized_url = self._normalize_url(url)
-        url_hash = self._generate_url_hash(normalized_url)
+        # The canonical form keys the cache; the URL as given is what gets fetched
+        url_hash = self._generate_url_hash(self._normalize_url(url))
+        url = with_scheme(url)
+        
+        # Check if already processed (or failed recently)
+        existing = await self._get_existing_processed_url(db, url_hash)
+        if existing and not force_refresh and self._is_fresh(existing):
+            logger.info(f"Using cached URL data for {url}")
+            return existing
+        
+        fetched = await self._fetch_and_analyze(
+            url,
+            url_hash,
+            user,
+            existing,
+            metadata_only=metadata_only,
+            count_words=count_words,
+        )
+        # Upserted, so a row stored meanwhile by another request is updated
+        return (await self._save_results(db, [fetched]))[url_hash]
+    
+    async def batch_process_urls(
+        self,
+        urls: List[str],
+        db: AsyncSession,
+        user: User,
+        force_refresh: bool = False,
+        metadata_only: bool = False,
+        count_words: bool = False
+    ) -> List[ProcessedUrl]:
+        """
+        Process multiple URLs in batch.
+        
+        URLs that normalize to the same address are processed once. Fetches
+        run concurrently up to ``URL_BATCH_CONCURRENCY``, with at most
+        ``URL_PER_HOST_CONCURRENCY`` requests in flight per host and
+        ``URL_PER_HOST_DELAY`` seconds between request starts to one host.
+        Results are upserted and committed in groups of
+        ``URL_BATCH_COMMIT_SIZE``.
+        Stored URLs that are still fresh are returned as is; stale ones are
+        revalidated with conditional requests. Stored failures are returned
+        as is until their ``retry_after``.
         
-        # Check if already processed
-        if not force_refresh:
-            existing = await self._get_existing_processed_url(db, url_hash)
-            if existing:
-                logger.info(f"Using cached URL data for {normalized_url}")
-                return existing
+        Args:
+            urls: List of URLs to process
+            db: Database session
+            user: User requesting the processing
+            force_refresh: Revalidate even if the stored copies are still fresh
+            metadata_only: Stream each page and parse only its head
+            count_words: With metadata_only, also count words in the body
+        
+        Returns:
+            List[ProcessedUrl]: One processed URL per distinct normalized URL,
+            in the order first requested
+        """
+        logger.info(f"Batch processing {len(urls)} URLs for user {user.username}")
+        
+        # Deduplicate on the normalized form, keeping first-seen order and
+        # fetching the first spelling given
+        targets: Dict[str, str] = {}
+        for url in urls:
+            try:
+                normalized_url = self._normalize_url(url)
+            except ValueError as e:
+                logger.error(f"Failed to process URL {url} in batch: {e}")
+                continue
+            targets.setdefault(self._generate_url_hash(normalized_url), with_scheme(url))
+        
+        existing: Dict[str, ProcessedUrl] = {}
+        if targets:
+            result = await db.execute(
+                select(ProcessedUrl).where(ProcessedUrl.url_hash.in_(list(targets)))
+            )
+            existing = {row.url_hash: row for row in result.scalars()}
+        
+        results: Dict[str, ProcessedUrl] = {}
+        pending = {}
+        for url_hash, url in targets.items():
+            if url_hash in existing and not force_refresh and self._is_fresh(existing[url_hash]):
+                results[url_hash] = existing[url_hash]
+            else:
+                pending[url_hash] = url
+        
+        if pending:
+            limit = asyncio.Semaphore(max(1, settings.URL_BATCH_CONCURRENCY))
+            throttle = _HostThrottle(settings.URL_PER_HOST_CONCURRENCY, settings.URL_PER_HOST_DELAY)
+            
+            async def fetch(url_hash: str, url: str) -> ProcessedUrl:
+                # Wait out host spacing before taking a global slot
+                async with throttle.slot(urllib.parse.urlparse(url).netloc.lower()), limit:
+                    return await self._fetch_and_analyze(
+                        url,
+                        url_hash,
+                        user,
+                        existing.get(url_hash),
+                        metadata_only=metadata_only,
+                        count_words=count_words,
+                    )
+            
+            tasks = [asyncio.create_task(fetch(h, u)) for h, u in pending.items()]
+            unflushed = []
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    unflushed.append(await next_done)
+                    if len(unflushed) >= settings.URL_BATCH_COMMIT_SIZE:
+                        results.update(await self._save_results(db, unflushed))
+                        unflushed = []
+                if unflushed:
+                    results.update(await self._save_results(db, unflushed))
+            finally:
+                for task in tasks:
+                    task.cancel()
+        
+        ordered = [results[url_hash] for url_hash in targets if url_hash in results]
+        logger.info(f"Batch processing completed: {len(ordered)}/{len(urls)} URLs processed")
+        return ordered
+    
+    async def _fetch_and_analyze(
+        self,
+        url: str,
+        url_hash: str,
+        user: User,
+        stored: Optional[ProcessedUrl] = None,
+        metadata_only: bool = False,
+        count_words: bool = False
+    ) -> ProcessedUrl:
+        """
+        Fetch and analyze a URL without touching the database.
+        
+        When a previously completed copy is given, its validators are sent
+        as a conditional request; on 304 Not Modified only that copy's
+        freshness is updated and the body is neither downloaded nor parsed.
+        
+        Args:
+            url: URL to fetch, as given
+            url_hash: Hash of the normalized URL
+            user: User requesting the processing
+            stored: Stored copy of the URL, if any
+            metadata_only: Stream the page and parse only its head
+            count_words: With metadata_only, also count words in the body
+        
+        Returns:
+            ProcessedUrl: The revalidated stored copy, or an unsaved record
+            (marked failed, with its error class and retry time, if the
+            origin answered with an error status or the fetch or analysis
+            raised)
+        """
+        headers = {}
+        if stored is not None and stored.processing_status == "completed":
+            if stored.etag:
+                headers["If-None-Match"] = stored.etag
+            if stored.last_modified:
+                headers["If-Modified-Since"] = stored.last_modified
         
         try:
             # Fetch URL content
-            response = await self.client.get(normalized_url, follow_redirects=True)
-            
-            # Extract metadata
-            metadata = await self._extract_metadata(response, normalized_url)
+            async with self.client.stream(
+                "GET", url, headers=headers, follow_redirects=True
+            ) as response:
+                if response.status_code == 304 and headers:
+                    logger.info(f"Not modified since last fetch: {url}")
+                    validators = self._cache_validators(response)
+                    # A 304 may omit validators that are still in force
+                    stored.etag = validators["etag"] or stored.etag
+                    stored.last_modified = validators["last_modified"] or stored.last_modified
+                    stored.max_age = validators["max_age"]
+                    stored.fetched_at = validators["fetched_at"]
+                    stored.error_message = stored.error_class = stored.retry_after = None
+                    stored.failure_count = 0
+                    return stored
+                
+                if response.status_code >= 400:
+                    logger.warning(f"Fetching {url} failed with status {response.status_code}")
+                    return self._failed_result(
+                        url,
+                        url_hash,
+                        user,
+                        stored,
+                        classify_failure(status_code=response.status_code),
+                        f"HTTP {response.status_code} {response.reason_phrase}".strip(),
+                        status_code=response.status_code,
+                        retry_after=_retry_after_seconds(response),
+                    )
+                
+                # Extract metadata
+                if metadata_only:
+                    metadata = await self._extract_head_metadata(response, url, count_words)
+                else:
+                    await response.aread()
+                    metadata = await self._extract_metadata(response, url)
             
             # Assess reliability
             reliability_score = self._assess_reliability(metadata, response)
             domain_reputation = self._assess_domain_reputation(metadata["domain"])
             
-            # Create or update processed URL
-            processed_url = ProcessedUrl(
-                url=normalized_url,
+            logger.info(f"Successfully processed URL: {url}")
+            return ProcessedUrl(
+                url=url,
                 url_hash=url_hash,
                 title=metadata.get("title"),
                 description=metadata.get("description"),
@@ -89,114 +479,241 @@ class UrlProcessingService:
                 word_count=metadata.get("word_count"),
                 status_code=response.status_code,
                 response_time=metadata.get("response_time"),
-                metadata=json.dumps(metadata),
+                additional_metadata=metadata,
                 reliability_score=reliability_score,
                 domain_reputation=domain_reputation,
                 processing_status="completed",
-                user_id=user.id
+                user_id=user.id,
+                failure_count=0,
+                **self._cache_validators(response)
             )
             
-            db.add(processed_url)
-            await db.commit()
-            await db.refresh(processed_url)
-            
-            logger.info(f"Successfully processed URL: {normalized_url}")
-            return processed_url
-            
         except Exception as e:
-            logger.error(f"Failed to process URL {normalized_url}: {e}")
-            
-            # Create failed processing record
-            processed_url = ProcessedUrl(
-                url=normalized_url,
-                url_hash=url_hash,
-                domain=urllib.parse.urlparse(normalized_url).netloc,
-                processing_status="failed",
-                error_message=str(e),
-                user_id=user.id
+            logger.error(f"Failed to process URL {url}: {e}")
+            return self._failed_result(
+                url, url_hash, user, stored, classify_failure(error=e), str(e)
             )
-            
-            db.add(processed_url)
-            await db.commit()
-            await db.refresh(processed_url)
-            
-            return processed_url
     
-    async def batch_process_urls(
+    def _failed_result(
         self,
-        urls: List[str],
-        db: AsyncSession,
+        url: str,
+        url_hash: str,
         user: User,
-        force_refresh: bool = False
-    ) -> List[ProcessedUrl]:
+        stored: Optional[ProcessedUrl],
+        error_class: str,
+        error_message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ) -> ProcessedUrl:
         """
-        Process multiple URLs in batch.
+        Build the negative cache record for a failed fetch.
+        
+        Transient failures are retried after ``URL_FAILURE_RETRY_BASE``
+        seconds, doubling with each consecutive failure up to
+        ``URL_FAILURE_RETRY_MAX`` (or later if the origin sent
+        Retry-After); ``PERMANENT_ERRORS`` are kept for
+        ``URL_PERMANENT_FAILURE_TTL``.
         
         Args:
-            urls: List of URLs to process
-            db: Database session
+            url: URL that failed, as given
+            url_hash: Hash of the normalized URL
             user: User requesting the processing
-            force_refresh: Force re-processing even if cached
-            
+            stored: Stored copy of the URL, if any
+            error_class: Result of ``classify_failure``
+            error_message: Error to record
+            status_code: HTTP status, if the origin answered
+            retry_after: Seconds the origin asked to wait, if any
+        
         Returns:
-            List[ProcessedUrl]: List of processed URL objects
+            ProcessedUrl: Unsaved record marked failed
         """
-        logger.info(f"Batch processing {len(urls)} URLs for user {user.username}")
+        failure_count = ((stored.failure_count or 0) if stored is not None else 0) + 1
+        if error_class in PERMANENT_ERRORS:
+            delay = settings.URL_PERMANENT_FAILURE_TTL
+        else:
+            delay = min(
+                settings.URL_FAILURE_RETRY_BASE * 2 ** (failure_count - 1),
+                settings.URL_FAILURE_RETRY_MAX,
+            )
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, settings.URL_FAILURE_RETRY_MAX))
         
-        results = []
-        for url in urls:
-            try:
-                processed_url = await self.process_url(url, db, user, force_refresh)
-                results.append(processed_url)
-            except Exception as e:
-                logger.error(f"Failed to process URL {url} in batch: {e}")
-                # Continue with other URLs
-                continue
+        now = datetime.now(timezone.utc)
+        return ProcessedUrl(
+            url=url,
+            url_hash=url_hash,
+            domain=urllib.parse.urlparse(url).netloc,
+            status_code=status_code,
+            processing_status="failed",
+            error_message=error_message,
+            error_class=error_class,
+            failure_count=failure_count,
+            retry_after=now + timedelta(seconds=delay),
+            user_id=user.id,
+            fetched_at=now
+        )
+    
+    def _store_result(
+        self,
+        db: AsyncSession,
+        existing: Optional[ProcessedUrl],
+        fresh: ProcessedUrl
+    ) -> ProcessedUrl:
+        """
+        Add a fresh result, or copy it onto the stored row for the same URL.
         
-        logger.info(f"Batch processing completed: {len(results)}/{len(urls)} successful")
-        return results
+        A failed refresh of a completed row only records the failure
+        (``_FAILURE_COLUMNS``), so a transient outage does not discard
+        cached content.
+        """
+        if fresh is existing:
+            return existing
+        if existing is None:
+            db.add(fresh)
+            return fresh
+        if fresh.processing_status == "failed" and existing.processing_status == "completed":
+            logger.warning(f"Keeping cached copy of {existing.url} after failed refresh")
+            for column in _FAILURE_COLUMNS:
+                setattr(existing, column, getattr(fresh, column))
+            return existing
+        for column in _RESULT_COLUMNS:
+            setattr(existing, column, getattr(fresh, column))
+        return existing
+    
+    async def _save_results(
+        self,
+        db: AsyncSession,
+        fetched: List[ProcessedUrl]
+    ) -> Dict[str, ProcessedUrl]:
+        """
+        Store and commit a group of batch results.
+        
+        New results are written with one upsert on the URL hash, so a row
+        inserted meanwhile by a concurrent request is updated instead of
+        failing the group. As in ``_store_result``, a failed result only
+        records its failure on a completed row.
+        
+        Args:
+            db: Database session
+            fetched: Results from ``_fetch_and_analyze``
+        
+        Returns:
+            Dict[str, ProcessedUrl]: Stored rows keyed by URL hash
+        """
+        # Revalidated rows (304) were updated in place and only need the commit
+        fresh = [row for row in fetched if not inspect(row).persistent]
+        dialect = db.get_bind().dialect.name
+        if fresh and dialect in ("postgresql", "sqlite"):
+            now = datetime.now(timezone.utc)
+            insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            statement = insert(ProcessedUrl).values([
+                {
+                    "url_hash": row.url_hash,
+                    "created_at": now,
+                    "updated_at": now,
+                    **{column: getattr(row, column) for column in _RESULT_COLUMNS},
+                }
+                for row in fresh
+            ])
+            excluded = statement.excluded
+            keep_cached = and_(
+                excluded.processing_status == "failed",
+                ProcessedUrl.processing_status == "completed",
+            )
+            set_ = {
+                column: case((keep_cached, getattr(ProcessedUrl, column)), else_=getattr(excluded, column))
+                for column in _RESULT_COLUMNS
+                if column not in _FAILURE_COLUMNS
+            }
+            set_.update({column: getattr(excluded, column) for column in _FAILURE_COLUMNS}, updated_at=now)
+            await db.execute(statement.on_conflict_do_update(index_elements=["url_hash"], set_=set_))
+        else:
+            for row in fresh:
+                self._store_result(db, await self._get_existing_processed_url(db, row.url_hash), row)
+        await db.commit()
+        
+        result = await db.execute(
+            select(ProcessedUrl)
+            .where(ProcessedUrl.url_hash.in_([row.url_hash for row in fetched]))
+            .execution_options(populate_existing=True)
+        )
+        return {row.url_hash: row for row in result.scalars()}
     
     async def archive_with_wayback(self, url: str) -> Optional[str]:
         """
-        Archive URL with Wayback Machine.
+        Archive URL with Wayback Machine and wait for the capture.
+        
+        Captures can take minutes; request handlers should queue URLs with
+        ``wayback_archiver`` instead.
         
         Args:
             url: URL to archive
             
         Returns:
-            str: Wayback Machine URL if successful
+            str: Snapshot URL reported by the Wayback Machine, if successful
         """
         logger.info(f"Archiving URL with Wayback Machine: {url}")
         
         try:
-            # Submit to Wayback Machine
-            archive_url = f"https://web.archive.org/save/{url}"
-            response = await self.client.get(archive_url)
-            
-            if response.status_code == 200:
-                # Extract wayback URL from response
-                wayback_url = f"https://web.archive.org/web/{datetime.now().strftime('%Y%m%d%H%M%S')}/{url}"
-                logger.info(f"Successfully archived: {wayback_url}")
-                return wayback_url
-            else:
-                logger.warning(f"Wayback archival failed with status {response.status_code}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Failed to archive with Wayback Machine: {e}")
+            wayback_url = await save_snapshot(self._client or http_clients.get("archive"), url)
+        except WaybackError as e:
+            logger.warning(f"Failed to archive with Wayback Machine: {e}")
             return None
+        
+        logger.info(f"Successfully archived: {wayback_url}")
+        return wayback_url
     
-    def _normalize_url(self, url: str) -> str:
-        """Normalize URL for consistent processing."""
-        # Add protocol if missing
-        if not url.startswith(('http://', 'https://')):
-            url = f"https://{url}"
+    def _cache_validators(self, response: httpx.Response) -> Dict:
+        """Read the validators and freshness lifetime from a response."""
+        max_age = None
+        directives = [d.strip().lower() for d in response.headers.get("cache-control", "").split(",")]
+        if "no-store" in directives or "no-cache" in directives:
+            max_age = 0
+        else:
+            for directive in directives:
+                name, _, value = directive.partition("=")
+                if name == "max-age" and value.strip('"').isdigit():
+                    max_age = int(value.strip('"'))
+        
+        return {
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "max_age": max_age,
+            "fetched_at": datetime.now(timezone.utc),
+        }
+    
+    def _is_fresh(self, processed_url: ProcessedUrl) -> bool:
+        """
+        Check whether a stored URL can be served without revalidation.
         
-        # Parse and rebuild for normalization
-        parsed = urllib.parse.urlparse(url)
-        normalized = urllib.parse.urlunparse(parsed)
+        The origin's max-age is used when it sent one, ``URL_CACHE_TTL``
+        otherwise. Rows stored before fetch times were recorded age from
+        their last update. A failure (or a completed row whose refresh
+        failed) is served until its ``retry_after``; failed rows without
+        one predate the negative cache and are retried.
+        """
+        now = datetime.now(timezone.utc)
+        retry_after = processed_url.retry_after
+        if retry_after is not None and retry_after.tzinfo is None:
+            retry_after = retry_after.replace(tzinfo=timezone.utc)
+        if processed_url.processing_status == "failed":
+            return retry_after is not None and now < retry_after
+        if retry_after is not None and now < retry_after:
+            return True
         
-        return normalized
+        fetched_at = processed_url.fetched_at or processed_url.updated_at
+        if fetched_at is None:
+            return False
+        if fetched_at.tzinfo is None:
+            fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+        lifetime = processed_url.max_age
+        if lifetime is None:
+            lifetime = settings.URL_CACHE_TTL
+        return now - fetched_at < timedelta(seconds=lifetime)
+    
+    def _normalize_url(self, url: str) -> str:
+        """Canonicalize URL for cache keys (never fetched)."""
+        return canonicalize_url(url)
     
     def _generate_url_hash(self, url: str) -> str:
         """Generate SHA-256 hash for URL."""
@@ -285,6 +802,61 @@ class UrlProcessingService:
         
         return metadata
     
+    async def _extract_head_metadata(
+        self,
+        response: httpx.Response,
+        url: str,
+        count_words: bool = False
+    ) -> Dict:
+        """
+        Extract metadata from a streamed response, reading as little as possible.
+        
+        The body is parsed incrementally and reading stops at ``</head>``,
+        or, when counting words, at the end of the document. Either way
+        at most ``URL_HEAD_MAX_BYTES`` are read.
+        
+        Args:
+            response: Open streaming response
+            url: Normalized URL
+            count_words: Keep reading the body to count its words
+        
+        Returns:
+            Dict: Metadata in the same shape as ``_extract_metadata``
+        """
+        start_time = datetime.now()
+        content_type = response.headers.get("content-type", "")
+        metadata = {
+            "url": url,
+            "domain": urllib.parse.urlparse(url).netloc,
+            "content_type": content_type.split(";")[0],
+            "extraction": "head",
+        }
+        
+        received = 0
+        truncated = False
+        if "text/html" in content_type:
+            parser = _HeadMetadataParser(count_words)
+            # Servers declare all sorts of charsets; an unknown one must not fail the fetch
+            decoder = codecs.getincrementaldecoder(_known_encoding(response.charset_encoding))(errors="replace")
+            max_bytes = settings.URL_HEAD_MAX_BYTES
+            async for chunk in response.aiter_bytes():
+                if received + len(chunk) > max_bytes:
+                    chunk = chunk[:max_bytes - received]
+                    truncated = True
+                received += len(chunk)
+                parser.feed(decoder.decode(chunk))
+                if truncated or (parser.head_closed and not count_words):
+                    break
+            parser.close()
+            metadata.update(parser.result())
+        
+        declared_length = response.headers.get("content-length", "")
+        metadata["content_length"] = int(declared_length) if declared_length.isdigit() else received
+        metadata["bytes_read"] = received
+        metadata["truncated"] = truncated
+        metadata["response_time"] = (datetime.now() - start_time).total_seconds()
+        return metadata
+    
     def _assess_reliability(self, metadata: Dict, response: httpx.Response) -> float:
         """
         Assess reliability of the URL/content.
@@ -326,42 +898,12 @@ class UrlProcessingService:
         
         Returns: trusted, neutral, suspicious, malicious
         """
-        # Basic domain reputation assessment
-        # In production, this would integrate with threat intelligence APIs
-        
-        trusted_domains = {
-            'gov', 'edu', 'mil', 'wikipedia.org', 'arxiv.org',
-            'nature.com', 'science.org', 'ieee.org', 'acm.org'
-        }
-        
-        suspicious_tlds = {
-            'tk', 'ml', 'cf', 'ga'
-        }
-        
-        domain_lower = domain.lower()
-        
-        # Check for trusted domains/TLDs
-        for trusted in trusted_domains:
-            if domain_lower.endswith(trusted):
-                return "trusted"
-        
-        # Check for suspicious TLDs
-        for suspicious in suspicious_tlds:
-            if domain_lower.endswith(f".{suspicious}"):
-                return "suspicious"
-        
-        # Check for suspicious patterns
-        if len(domain.replace('.', '')) > 50:  # Very long domain
-            return "suspicious"
-        
-        if domain.count('-') > 3:  # Many hyphens
-            return "suspicious"
-        
-        return "neutral"
+        return domain_reputation.assess(domain)
     
     async def close(self):
-        """Close HTTP client."""
-        await self.client.aclose()
+        """Close the injected HTTP client; shared clients close with the app."""
+        if self._client is not None:
+            await self._client.aclose()
 
 
 # Global service instance
@@ -0,0 +1,521 @@
+"""
+Background archival of URLs with the Wayback Machine.
+
+Save Page Now captures take from seconds to minutes and are rate limited,
+so request handlers queue URLs here instead of waiting on them. The
+archiver:
+
+* skips URLs already queued, and URLs with a snapshot newer than
+  ``WAYBACK_RECENT_SECONDS`` (in memory or in ``ProcessedUrl.wayback_url``);
+* takes up to ``WAYBACK_BATCH_SIZE`` URLs at a time and submits them with
+  at most ``WAYBACK_CONCURRENCY`` captures in flight, starting one every
+  ``WAYBACK_SUBMIT_INTERVAL`` seconds;
+* retries rate limits, server errors and timeouts with exponential backoff
+  (honouring ``Retry-After``) up to ``WAYBACK_MAX_ATTEMPTS`` attempts;
+* stores the snapshot URL the Wayback Machine reports, one transaction per
+  batch, and keeps per-request status for the status endpoint.
+
+The queue and batch status are held in memory of the process that took
+the request: with several API processes, a batch can only be polled
+through the process it was submitted to. On shutdown the batch in flight
+is finished; URLs still queued behind it are marked failed and can be
+submitted again.
+"""
+
+import asyncio
+import hashlib
+import random
+import re
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import httpx
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.http_client import http_clients
+from app.core.logging import get_logger
+from app.core.urls import canonicalize_url, with_scheme
+from app.models.research_tool import ProcessedUrl
+
+logger = get_logger(__name__)
+
+_SNAPSHOT_RE = re.compile(r"/web/(\d{14})[a-z_]*/(.+)$")
+_STOP = object()
+MAX_TRACKED_BATCHES = 1000
+MAX_RECENT_ENTRIES = 10000
+
+
+class WaybackError(Exception):
+    """A capture that did not produce a snapshot."""
+    
+    def __init__(self, message: str, retryable: bool, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def snapshot_time(wayback_url: Optional[str]) -> Optional[datetime]:
+    """Capture time encoded in a snapshot URL, or None if it has none."""
+    match = _SNAPSHOT_RE.search(wayback_url or "")
+    if not match:
+        return None
+    try:
+        return datetime.strptime(match.group(1), "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def _snapshot_url(api_url: str, location: Optional[str]) -> Optional[str]:
+    match = _SNAPSHOT_RE.match(httpx.URL(location).raw_path.decode("ascii") if location else "")
+    if not match:
+        return None
+    return f"{api_url}/web/{match.group(1)}/{match.group(2)}"
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after", "")
+    return float(value) if value.isdigit() else None
+
+
+async def save_snapshot(
+    client: httpx.AsyncClient,
+    url: str,
+    api_url: Optional[str] = None
+) -> str:
+    """
+    Capture a URL with Save Page Now and return the snapshot URL.
+    
+    The snapshot is read from where the capture redirected to or its
+    ``Content-Location``; if the response names neither, the availability
+    API is asked for a snapshot taken since the submission.
+    
+    Args:
+        client: HTTP client to submit with
+        url: URL to capture
+        api_url: Wayback Machine base URL (defaults to ``WAYBACK_MACHINE_API_URL``)
+    
+    Returns:
+        str: Snapshot URL (``<api_url>/web/<timestamp>/<url>``)
+    
+    Raises:
+        WaybackError: If the capture failed; ``retryable`` tells whether
+            trying again later may succeed
+    """
+    api_url = (api_url or settings.WAYBACK_MACHINE_API_URL).rstrip("/")
+    submitted = datetime.now(timezone.utc).replace(microsecond=0)
+    try:
+        response = await client.get(f"{api_url}/save/{url}", follow_redirects=True)
+    except httpx.HTTPError as e:
+        raise WaybackError(f"Capture request failed: {e}", retryable=True) from e
+    
+    if response.status_code == 429 or response.status_code >= 500:
+        raise WaybackError(
+            f"Capture failed with status {response.status_code}",
+            retryable=True,
+            retry_after=_retry_after(response),
+        )
+    if response.status_code >= 400:
+        raise WaybackError(f"Capture refused with status {response.status_code}", retryable=False)
+    
+    for location in (str(response.url), response.headers.get("content-location")):
+        snapshot = _snapshot_url(api_url, location)
+        if snapshot:
+            return snapshot
+    
+    try:
+        availability = await client.get(
+            f"{api_url}/wayback/available",
+            params={"url": url, "timestamp": submitted.strftime("%Y%m%d%H%M%S")},
+        )
+        closest = availability.json().get("archived_snapshots", {}).get("closest") or {}
+    except (httpx.HTTPError, ValueError, AttributeError) as e:
+        raise WaybackError(f"Snapshot lookup failed: {e}", retryable=True) from e
+    captured = snapshot_time(closest.get("url"))
+    if closest.get("available") and captured and captured >= submitted:
+        return _snapshot_url(api_url, closest["url"])
+    raise WaybackError("Capture accepted but no snapshot was reported", retryable=True)
+
+
+@dataclass
+class ArchiveEntry:
+    """Archival state of one URL."""
+    url: str
+    url_hash: str
+    status: str = "queued"  # queued, submitting, retrying, archived, failed
+    attempts: int = 0
+    wayback_url: Optional[str] = None
+    error: Optional[str] = None
+    reused: bool = False  # A recent snapshot was found, nothing was submitted
+    finished_at: Optional[datetime] = None
+    
+    @property
+    def pending(self) -> bool:
+        return self.status in ("queued", "submitting", "retrying")
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "status": self.status,
+            "attempts": self.attempts,
+            "wayback_url": self.wayback_url,
+            "error": self.error,
+            "reused": self.reused,
+        }
+
+
+@dataclass
+class ArchiveBatch:
+    """URLs submitted together, tracked for the status endpoint."""
+    id: str
+    user_id: Optional[int]
+    entries: List[ArchiveEntry]
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        counts = {"pending": 0, "archived": 0, "failed": 0}
+        for entry in self.entries:
+            counts["pending" if entry.pending else entry.status] += 1
+        return {
+            "batch_id": self.id,
+            "created_at": self.created_at,
+            "total": len(self.entries),
+            **counts,
+            "done": counts["pending"] == 0,
+            "urls": [entry.to_dict() for entry in self.entries],
+        }
+
+
+class WaybackArchiver:
+    """
+    In-process queue that archives URLs in the background.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Optional[async_sessionmaker[AsyncSession]] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        api_url: Optional[str] = None,
+    ) -> None:
+        """
+        Initialize the archiver.
+        
+        Args:
+            session_factory: Sessions for recording snapshots (defaults to
+                the application's)
+            client: HTTP client instead of the shared "archive" client
+            api_url: Wayback Machine base URL (defaults to ``WAYBACK_MACHINE_API_URL``)
+        """
+        self.session_factory = session_factory or AsyncSessionLocal
+        self._client = client
+        self.api_url = api_url
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._stopping = False
+        self._slots: asyncio.Semaphore | None = None
+        self._next_start = 0.0
+        self._retries: set[asyncio.TimerHandle] = set()
+        # In flight by URL hash, and finished captures reused for new requests
+        self._entries: Dict[str, ArchiveEntry] = {}
+        self._recent: "OrderedDict[str, ArchiveEntry]" = OrderedDict()
+        self._batches: "OrderedDict[str, ArchiveBatch]" = OrderedDict()
+        self._submitted = 0
+        self._archived = 0
+        self._failed = 0
+        self._deduplicated = 0
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or http_clients.get("archive")
+    
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+    
+    async def start(self) -> None:
+        """Start the archival worker (idempotent)."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        self._slots = asyncio.Semaphore(max(1, settings.WAYBACK_CONCURRENCY))
+        self._worker = asyncio.create_task(self._run(), name="wayback-archiver")
+        logger.info("Wayback archival queue started")
+    
+    async def stop(self) -> None:
+        """Finish the batch in progress and stop the worker."""
+        if not self.running:
+            return
+        # The worker checks the flag between batches; the sentinel only
+        # wakes it if it is waiting on an empty queue
+        self._stopping = True
+        self._queue.put_nowait(_STOP)
+        await self._worker
+        self._worker = None
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        if self._entries:
+            logger.warning(f"Dropped {len(self._entries)} pending Wayback archival requests")
+            for entry in self._entries.values():
+                entry.status = "failed"
+                entry.error = "Archival queue stopped"
+            self._entries.clear()
+        logger.info("Wayback archival queue stopped")
+    
+    async def submit(
+        self,
+        urls: Iterable[str],
+        user_id: Optional[int] = None,
+        db: Optional[AsyncSession] = None,
+    ) -> ArchiveBatch:
+        """
+        Queue URLs for archival.
+        
+        URLs already queued share the queued capture, and URLs with a
+        recent snapshot reuse it without submitting anything.
+        
+        Args:
+            urls: URLs to archive
+            user_id: Owner of the returned batch
+            db: Session for looking up stored snapshots (a new one if None)
+        
+        Returns:
+            ArchiveBatch: One entry per distinct normalized URL, in the
+            order first requested
+        """
+        targets: Dict[str, str] = {}
+        invalid = []
+        for url in urls:
+            try:
+                normalized_url = canonicalize_url(url)
+            except ValueError as e:
+                invalid.append(ArchiveEntry(url, "", status="failed", error=str(e)))
+                continue
+            # Deduplicated on the normalized form; the URL as given is captured
+            targets.setdefault(hashlib.sha256(normalized_url.encode()).hexdigest(), with_scheme(url))
+        
+        self._expire_recent()
+        entries: Dict[str, ArchiveEntry] = {}
+        for url_hash in targets:
+            entry = self._entries.get(url_hash) or self._recent.get(url_hash)
+            if entry is not None:
+                entries[url_hash] = entry
+                self._deduplicated += 1
+        
+        unknown = [url_hash for url_hash in targets if url_hash not in entries]
+        stored = await self._stored_snapshots(unknown, db) if unknown else {}
+        queued = []
+        for url_hash in unknown:
+            if url_hash in stored:
+                entry = ArchiveEntry(
+                    targets[url_hash],
+                    url_hash,
+                    status="archived",
+                    wayback_url=stored[url_hash],
+                    reused=True,
+                    finished_at=snapshot_time(stored[url_hash]),
+                )
+                self._remember(entry)
+                self._deduplicated += 1
+            else:
+                entry = ArchiveEntry(targets[url_hash], url_hash)
+                self._entries[url_hash] = entry
+                queued.append(entry)
+            entries[url_hash] = entry
+        
+        if queued:
+            await self.start()
+            for entry in queued:
+                self._queue.put_nowait(entry)
+            self._submitted += len(queued)
+            logger.info(f"Queued {len(queued)} URLs for Wayback archival")
+        
+        batch = ArchiveBatch(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            entries=[entries[url_hash] for url_hash in targets] + invalid,
+        )
+        self._batches[batch.id] = batch
+        while len(self._batches) > MAX_TRACKED_BATCHES:
+            self._batches.popitem(last=False)
+        return batch
+    
+    def get_batch(self, batch_id: str) -> Optional[ArchiveBatch]:
+        """
+        Get a tracked batch by ID.
+        
+        Args:
+            batch_id: ID returned by ``submit``
+        
+        Returns:
+            Optional[ArchiveBatch]: The batch, or None if unknown or expired
+        """
+        return self._batches.get(batch_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue statistics.
+        
+        Returns:
+            dict: Running flag, pending captures and lifetime counters
+        """
+        return {
+            "running": self.running,
+            "pending": len(self._entries),
+            "retrying": len(self._retries),
+            "submitted": self._submitted,
+            "archived": self._archived,
+            "failed": self._failed,
+            "deduplicated": self._deduplicated,
+        }
+    
+    async def _stored_snapshots(
+        self,
+        url_hashes: List[str],
+        db: Optional[AsyncSession]
+    ) -> Dict[str, str]:
+        """Recent snapshot URLs already stored on processed URLs."""
+        statement = select(ProcessedUrl.url_hash, ProcessedUrl.wayback_url).where(
+            ProcessedUrl.url_hash.in_(url_hashes),
+            ProcessedUrl.wayback_url.is_not(None),
+        )
+        if db is None:
+            async with self.session_factory() as session:
+                rows = (await session.execute(statement)).all()
+        else:
+            rows = (await db.execute(statement)).all()
+        
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.WAYBACK_RECENT_SECONDS)
+        return {
+            url_hash: wayback_url
+            for url_hash, wayback_url in rows
+            if (snapshot_time(wayback_url) or cutoff) > cutoff
+        }
+    
+    def _remember(self, entry: ArchiveEntry) -> None:
+        self._recent[entry.url_hash] = entry
+        self._recent.move_to_end(entry.url_hash)
+        while len(self._recent) > MAX_RECENT_ENTRIES:
+            self._recent.popitem(last=False)
+    
+    def _expire_recent(self) -> None:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.WAYBACK_RECENT_SECONDS)
+        # Oldest first, since entries are appended as they finish
+        while self._recent:
+            url_hash, entry = next(iter(self._recent.items()))
+            if entry.finished_at is not None and entry.finished_at > cutoff:
+                break
+            del self._recent[url_hash]
+    
+    async def _run(self) -> None:
+        while not self._stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            while len(batch) < settings.WAYBACK_BATCH_SIZE:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _STOP:
+                    break
+                batch.append(item)
+            
+            await asyncio.gather(*(self._archive(entry) for entry in batch))
+            await self._record([entry for entry in batch if entry.status == "archived"])
+    
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        """Hold a capture slot, waiting out the spacing between submissions."""
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            # Reserve a start time before sleeping so waiters go in order
+            now = loop.time()
+            start = max(now, self._next_start)
+            self._next_start = start + settings.WAYBACK_SUBMIT_INTERVAL
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+    
+    async def _archive(self, entry: ArchiveEntry) -> None:
+        async with self._slot():
+            entry.status = "submitting"
+            entry.attempts += 1
+            try:
+                entry.wayback_url = await save_snapshot(self.client, entry.url, self.api_url)
+            except WaybackError as e:
+                entry.error = str(e)
+                if e.retryable and entry.attempts < settings.WAYBACK_MAX_ATTEMPTS and not self._stopping:
+                    self._retry_later(entry, e.retry_after)
+                else:
+                    logger.warning(f"Wayback archival of {entry.url} failed: {e}")
+                    self._finish(entry, "failed")
+                return
+        
+        logger.info(f"Archived {entry.url} as {entry.wayback_url}")
+        entry.error = None
+        self._finish(entry, "archived")
+    
+    def _retry_later(self, entry: ArchiveEntry, retry_after: Optional[float]) -> None:
+        delay = min(
+            settings.WAYBACK_RETRY_BASE_DELAY * 2 ** (entry.attempts - 1),
+            settings.WAYBACK_RETRY_MAX_DELAY,
+        )
+        # Jitter so captures that failed together do not retry together
+        delay *= random.uniform(0.5, 1.0)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+            # A rate limit applies to every capture, not just this one
+            loop = asyncio.get_running_loop()
+            self._next_start = max(self._next_start, loop.time() + retry_after)
+        entry.status = "retrying"
+        logger.info(f"Retrying Wayback archival of {entry.url} in {delay:.1f}s: {entry.error}")
+        
+        def requeue() -> None:
+            self._retries.discard(handle)
+            self._queue.put_nowait(entry)
+        
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retries.add(handle)
+    
+    def _finish(self, entry: ArchiveEntry, status: str) -> None:
+        entry.status = status
+        entry.finished_at = datetime.now(timezone.utc)
+        self._entries.pop(entry.url_hash, None)
+        if status == "archived":
+            self._archived += 1
+            self._remember(entry)
+        else:
+            self._failed += 1
+    
+    async def _record(self, entries: List[ArchiveEntry]) -> None:
+        """Store snapshot URLs on their processed URLs in one transaction."""
+        if not entries:
+            return
+        table = ProcessedUrl.__table__
+        statement = (
+            update(table)
+            .where(table.c.url_hash == bindparam("snapshot_hash"))
+            .values(wayback_url=bindparam("snapshot_url"))
+        )
+        try:
+            async with self.session_factory() as session:
+                await session.execute(statement, [
+                    {"snapshot_hash": entry.url_hash, "snapshot_url": entry.wayback_url}
+                    for entry in entries
+                ])
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to record {len(entries)} Wayback snapshots: {e}")
+
+
+# Global archiver instance
+wayback_archiver = WaybackArchiver()
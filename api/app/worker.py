@@ -0,0 +1,94 @@
+"""
+Standalone research job worker.
+
+Runs the job runner outside the API process, so long jobs survive API
+restarts and do not compete with request handling:
+
+    python -m app.worker [--processes N] [--workers N]
+
+Set ``JOB_RUNNER_IN_API=false`` on the API when dedicated workers run.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import signal
+from typing import Optional
+
+# Importing the tool endpoints registers their job handlers
+import app.api.v1.api  # noqa: F401
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import close_db, init_db
+from app.core.http_client import http_clients
+from app.core.logging import get_logger, setup_logging
+from app.services.job_runner import job_runner
+from app.services.job_service import job_service
+from app.services.pdf_extractor import pdf_extractor
+
+logger = get_logger(__name__)
+
+
+async def run_worker(workers: Optional[int] = None) -> None:
+    """
+    Run a job runner until SIGINT or SIGTERM.
+    
+    Args:
+        workers: Jobs run at once (default ``JOB_WORKERS``)
+    """
+    setup_logging()
+    await init_db()
+    await cache.connect()
+    
+    if workers:
+        job_runner.workers = max(1, workers)
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    await job_runner.start()
+    await stop.wait()
+    
+    await job_runner.stop()
+    pdf_extractor.shutdown()
+    await job_service.flush_all()
+    await close_db()
+    await cache.close()
+    await http_clients.close()
+
+
+def _process_main(workers: Optional[int]) -> None:
+    asyncio.run(run_worker(workers))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run research jobs from the job queue")
+    parser.add_argument(
+        "--processes", type=int, default=settings.JOB_WORKER_PROCESSES,
+        help="Worker processes to start (default JOB_WORKER_PROCESSES)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Jobs run at once per process (default JOB_WORKERS)",
+    )
+    args = parser.parse_args()
+    
+    if args.processes <= 1:
+        _process_main(args.workers)
+    else:
+        processes = [
+            multiprocessing.Process(target=_process_main, args=(args.workers,), name=f"job-worker-{i}")
+            for i in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        logger.info(f"Started {len(processes)} job worker processes")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # Each child got the SIGINT too and shuts down on its own
+            for process in processes:
+                process.join()
@@ -0,0 +1,149 @@
+"""
+Benchmark main-content extraction for scraped pages.
+
+Runs every saved page in a corpus directory through:
+
+* baseline: the text extraction the scraper used before the content
+  extractor (BeautifulSoup with ``html.parser``, ``script``/``style``
+  removed, ``get_text()`` split into lines), plus its title, link and
+  meta tag collection;
+* extractor: ``extract_content`` (one lxml pass for the same data plus
+  byline and publish date).
+
+Each ``<name>.html`` page is scored against ``<name>.json``, which holds
+the page's main ``text`` and its ``byline`` and ``published`` date (null
+when the page has none). Quality is token precision, recall and F1 of the
+extracted text against that text; speed is pages per second. Saved pages
+of your own can be added to the corpus, or another directory given with
+``--corpus``.
+
+Usage (from the ``api`` directory):
+
+    python -m benchmarks.content_extraction [--iterations 20] [--corpus DIR]
+"""
+
+import argparse
+import json
+import re
+import time
+import urllib.parse
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from bs4 import BeautifulSoup
+
+from app.services.content_extractor import extract_content
+
+CORPUS = Path(__file__).parent / "corpus"
+_TOKEN = re.compile(r"\w+")
+
+
+def _baseline(content: bytes, url: str) -> Dict:
+    soup = BeautifulSoup(content, "html.parser")
+    title = soup.find("title")
+    links = [
+        (urllib.parse.urljoin(url, link.get("href")), link.get_text().strip())
+        for link in soup.find_all("a") if link.get("href")
+    ]
+    for script in soup(["script", "style"]):
+        script.decompose()
+    lines = (line.strip() for line in soup.get_text().splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    metadata = {
+        meta.get("name") or meta.get("property"): meta.get("content")
+        for meta in soup.find_all("meta") if (meta.get("name") or meta.get("property")) and meta.get("content")
+    }
+    return {
+        "title": title.get_text().strip() if title else None,
+        "text": "\n".join(chunk for chunk in chunks if chunk),
+        "byline": None,
+        "published": None,
+        "links": links,
+        "metadata": metadata,
+    }
+
+
+def _extractor(content: bytes, url: str) -> Dict:
+    extracted = extract_content(content, url)
+    return {
+        "title": extracted.title,
+        "text": extracted.text,
+        "byline": extracted.byline,
+        "published": extracted.published,
+        "links": extracted.links,
+        "metadata": extracted.metadata,
+    }
+
+
+def _scores(text: str, expected: str) -> Tuple[float, float, float]:
+    got = Counter(token.lower() for token in _TOKEN.findall(text))
+    want = Counter(token.lower() for token in _TOKEN.findall(expected))
+    overlap = sum((got & want).values())
+    precision = overlap / sum(got.values()) if got else 0.0
+    recall = overlap / sum(want.values()) if want else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if overlap else 0.0
+    return precision, recall, f1
+
+
+def _load(corpus: Path) -> List[Tuple[str, bytes, Dict]]:
+    return [
+        (path.stem, path.read_bytes(), json.loads(path.with_suffix(".json").read_text(encoding="utf-8")))
+        for path in sorted(corpus.glob("*.html"))
+    ]
+
+
+def _run(name: str, extract: Callable[[bytes, str], Dict], pages, iterations: int) -> Dict:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for stem, content, _ in pages:
+            extract(content, f"https://corpus.example/{stem}")
+    elapsed = time.perf_counter() - started
+
+    per_page = []
+    for stem, content, expected in pages:
+        result = extract(content, f"https://corpus.example/{stem}")
+        precision, recall, f1 = _scores(result["text"], expected["text"])
+        per_page.append({
+            "page": stem,
+            "precision": round(precision, 3),
+            "recall": round(recall, 3),
+            "f1": round(f1, 3),
+            "byline": result["byline"] == expected.get("byline"),
+            "published": result["published"] == expected.get("published"),
+        })
+
+    count = len(per_page)
+    return {
+        "mode": name,
+        "pages_per_second": round(iterations * count / elapsed, 1),
+        "mean_kb": round(sum(len(content) for _, content, _ in pages) / count / 1024, 1),
+        "precision": round(sum(page["precision"] for page in per_page) / count, 3),
+        "recall": round(sum(page["recall"] for page in per_page) / count, 3),
+        "f1": round(sum(page["f1"] for page in per_page) / count, 3),
+        "byline_accuracy": round(sum(page["byline"] for page in per_page) / count, 3),
+        "date_accuracy": round(sum(page["published"] for page in per_page) / count, 3),
+        "pages": per_page,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--corpus", type=Path, default=CORPUS, help="Directory of <name>.html and <name>.json pages")
+    parser.add_argument("--iterations", type=int, default=20, help="Passes over the corpus per mode")
+    parser.add_argument("--verbose", action="store_true", help="Print per-page scores")
+    args = parser.parse_args()
+
+    pages = _load(args.corpus)
+    if not pages:
+        parser.error(f"No pages in {args.corpus}")
+    print(f"corpus: {len(pages)} pages from {args.corpus}")
+    for name, extract in (("baseline", _baseline), ("extractor", _extractor)):
+        result = _run(name, extract, pages, args.iterations)
+        if not args.verbose:
+            result.pop("pages")
+        print(json.dumps(result, indent=2 if args.verbose else None))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark PDF text extraction throughput.
+
+Extracts every PDF in a corpus directory with:
+
+* sequential: pypdf in this process, one page after another, joining the
+  text of each document into one string;
+* pool: ``PdfExtractor.iter_pages`` with ``--workers`` processes and
+  ``--pages-per-task`` pages per task, streaming pages with their offsets.
+
+Without ``--corpus`` a synthetic corpus of ``--documents`` text-only PDFs of
+``--pages`` pages is generated with fpdf2. Point ``--corpus`` at a
+directory of real documents (scanned and born-digital) for representative
+numbers; pages with no text layer are counted separately.
+
+Usage (from the ``api`` directory):
+
+    python -m benchmarks.pdf_extraction [--corpus DIR] [--workers 4] [--pages-per-task 8]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from fpdf import FPDF
+from pypdf import PdfReader
+
+from app.core.config import settings
+from app.services.pdf_extractor import PdfExtractor
+
+PARAGRAPH = (
+    "The committee reviewed shipping volumes, port congestion and labour costs for the quarter, "
+    "and noted that delays at the two largest terminals account for most of the backlog. "
+)
+
+
+def _generate(directory: Path, documents: int, pages: int) -> List[Path]:
+    paths = []
+    for d in range(documents):
+        pdf = FPDF()
+        pdf.set_font("helvetica", size=10)
+        for p in range(pages):
+            pdf.add_page()
+            pdf.multi_cell(0, 5, text=f"Document {d}, page {p + 1}. " + PARAGRAPH * 20)
+        path = directory / f"synthetic-{d}.pdf"
+        pdf.output(str(path))
+        paths.append(path)
+    return paths
+
+
+def _sequential(paths: List[Path]) -> Dict:
+    pages = empty = chars = 0
+    for path in paths:
+        reader = PdfReader(path, strict=False)
+        texts = [page.extract_text() or "" for page in reader.pages]
+        text = "\n\n".join(texts)
+        pages += len(texts)
+        empty += sum(1 for t in texts if not t.strip())
+        chars += len(text)
+    return {"pages": pages, "empty_pages": empty, "chars": chars, "errors": 0}
+
+
+async def _pool(extractor: PdfExtractor, paths: List[Path]) -> Dict:
+    pages = empty = chars = errors = 0
+    for path in paths:
+        async for page in extractor.iter_pages(path):
+            pages += 1
+            empty += not page.text.strip()
+            chars += len(page.text)
+            errors += page.error is not None
+    return {"pages": pages, "empty_pages": empty, "chars": chars, "errors": errors}
+
+
+def _report(mode: str, result: Dict, elapsed: float, megabytes: float) -> Dict:
+    return {
+        "mode": mode,
+        **result,
+        "seconds": round(elapsed, 2),
+        "pages_per_second": round(result["pages"] / elapsed, 1),
+        "mb_per_second": round(megabytes / elapsed, 2),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--corpus", type=Path, default=None, help="Directory of PDF files")
+    parser.add_argument("--documents", type=int, default=8, help="Synthetic documents without --corpus")
+    parser.add_argument("--pages", type=int, default=50, help="Pages per synthetic document")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--pages-per-task", type=int, default=settings.PDF_PAGES_PER_TASK, help="Pages per worker task")
+    parser.add_argument("--skip-sequential", action="store_true", help="Only run the worker pool")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            paths = sorted(args.corpus.glob("*.pdf"))
+            if not paths:
+                parser.error(f"No PDF files in {args.corpus}")
+        else:
+            paths = _generate(Path(tmp), args.documents, args.pages)
+        megabytes = sum(path.stat().st_size for path in paths) / (1024 * 1024)
+        print(f"corpus: {len(paths)} documents, {megabytes:.1f}MB")
+
+        if not args.skip_sequential:
+            started = time.perf_counter()
+            result = _sequential(paths)
+            print(json.dumps(_report("sequential", result, time.perf_counter() - started, megabytes)))
+
+        settings.PDF_WORKERS = args.workers
+        settings.PDF_PAGES_PER_TASK = args.pages_per_task
+        extractor = PdfExtractor()
+        try:
+            started = time.perf_counter()
+            result = await _pool(extractor, paths)
+            report = _report("pool", result, time.perf_counter() - started, megabytes)
+        finally:
+            extractor.shutdown(wait=True)
+        report["workers"] = args.workers
+        report["pages_per_task"] = args.pages_per_task
+        # Peak RSS of this process and of the largest worker (kilobytes on Linux)
+        report["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        report["max_worker_rss_mb"] = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+        print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
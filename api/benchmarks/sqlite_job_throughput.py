@@ -0,0 +1,198 @@
+"""
+Benchmark background job write throughput on SQLite.
+
+Simulates concurrent research jobs that record progress after every item,
+the way the web scraping, document processing and social media processors
+do, and compares:
+
+* default: SQLite with only foreign keys enabled and every job committing
+  progress through its own session (the behaviour before the embedded
+  profile);
+* embedded: WAL, busy timeout, ``synchronous=NORMAL``, cache/mmap sizing and
+  all job writes funneled through the single-writer queue.
+
+Meanwhile a set of readers polls job status, as the status endpoints do.
+
+Usage (from the ``api`` directory):
+    
+    python -m benchmarks.sqlite_job_throughput --jobs 50 --steps 20
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.core.database import Base, set_sqlite_pragma
+from app.core.write_queue import WriteQueue
+from app.models.research_tool import ResearchJob, ResearchJobStatus, ResearchJobType
+from app.models.user import User
+
+
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+async def _setup(url: str, jobs: int) -> list[int]:
+    engine = create_async_engine(url)
+    event.listen(engine.sync_engine, "connect", _enable_foreign_keys)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        user = User(
+            username="bench",
+            email="bench@example.com",
+            full_name="Benchmark",
+            hashed_password="x",
+        )
+        session.add(user)
+        await session.flush()
+        rows = [
+            ResearchJob(
+                job_type=ResearchJobType.WEB_SCRAPING,
+                job_name=f"bench-{i}",
+                user_id=user.id,
+            )
+            for i in range(jobs)
+        ]
+        session.add_all(rows)
+        await session.commit()
+        ids = [row.id for row in rows]
+    await engine.dispose()
+    return ids
+
+
+def _progress(job_id: int, step: int, steps: int):
+    return (
+        update(ResearchJob)
+        .where(ResearchJob.id == job_id)
+        .values(
+            status=ResearchJobStatus.IN_PROGRESS,
+            progress_percentage=int(step / steps * 100),
+            current_step=f"Processing item {step}",
+        )
+    )
+
+
+def _complete(job_id: int, steps: int):
+    return (
+        update(ResearchJob)
+        .where(ResearchJob.id == job_id)
+        .values(
+            status=ResearchJobStatus.COMPLETED,
+            progress_percentage=100,
+            completed_at=datetime.utcnow(),
+            result_data=[{"item": i, "status": "ok"} for i in range(steps)],
+        )
+    )
+
+
+async def _reader(factory: async_sessionmaker, job_ids: list[int], stop: asyncio.Event, counts: dict) -> None:
+    while not stop.is_set():
+        try:
+            async with factory() as session:
+                await session.execute(
+                    select(ResearchJob.status, ResearchJob.progress_percentage)
+                    .where(ResearchJob.id == job_ids[counts["reads"] % len(job_ids)])
+                )
+            counts["reads"] += 1
+        except OperationalError:
+            counts["read_errors"] += 1
+        await asyncio.sleep(0.005)
+
+
+async def _run(profile: str, jobs: int, steps: int, readers: int, work_ms: float) -> dict:
+    directory = tempfile.mkdtemp(prefix="omnicore-bench-")
+    url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+    job_ids = await _setup(url, jobs)
+    
+    if profile == "embedded":
+        engine = create_async_engine(
+            url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            connect_args={"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        )
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragma)
+    else:
+        engine = create_async_engine(url)
+        event.listen(engine.sync_engine, "connect", _enable_foreign_keys)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    
+    queue = WriteQueue(factory, settings.SQLITE_WRITE_BATCH_SIZE)
+    if profile == "embedded":
+        await queue.start()
+    
+    counts = {"reads": 0, "read_errors": 0, "write_errors": 0}
+    
+    async def write(statement) -> None:
+        try:
+            await queue.execute(statement)
+        except OperationalError:
+            counts["write_errors"] += 1
+    
+    async def job(job_id: int) -> None:
+        for step in range(steps):
+            await write(_progress(job_id, step, steps))
+            # Simulated fetch/parse work between progress updates
+            await asyncio.sleep(work_ms / 1000)
+        await write(_complete(job_id, steps))
+    
+    stop = asyncio.Event()
+    reader_tasks = [
+        asyncio.create_task(_reader(factory, job_ids, stop, counts))
+        for _ in range(readers)
+    ]
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(job(job_id) for job_id in job_ids))
+    elapsed = time.perf_counter() - started
+    
+    stop.set()
+    await asyncio.gather(*reader_tasks)
+    await queue.stop()
+    
+    async with factory() as session:
+        completed = await session.scalar(
+            select(func.count()).where(ResearchJob.status == ResearchJobStatus.COMPLETED)
+        )
+    await engine.dispose()
+    
+    return {
+        "profile": profile,
+        "elapsed_s": round(elapsed, 3),
+        "jobs_per_s": round(jobs / elapsed, 2),
+        "writes_per_s": round(jobs * (steps + 1) / elapsed, 1),
+        "completed": completed,
+        "write_errors": counts["write_errors"],
+        "reads": counts["reads"],
+        "read_errors": counts["read_errors"],
+        "queue": queue.stats(),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--jobs", type=int, default=50, help="Concurrent jobs")
+    parser.add_argument("--steps", type=int, default=20, help="Progress updates per job")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent status pollers")
+    parser.add_argument("--work-ms", type=float, default=1.0, help="Simulated work per step")
+    args = parser.parse_args()
+    
+    for profile in ("default", "embedded"):
+        result = await _run(profile, args.jobs, args.steps, args.readers, args.work_ms)
+        print(result)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
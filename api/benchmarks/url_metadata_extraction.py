@@ -0,0 +1,127 @@
+"""
+Benchmark metadata extraction for processed URLs.
+
+Serves a synthetic large news page (a head with the usual meta, Open Graph
+and JSON-LD tags followed by a long article with inline scripts) through a mock transport that streams it in chunks at a fixed
+bandwidth, and compares:
+
+* full: download the whole body, build a BeautifulSoup tree and walk it
+  (the behaviour before metadata-only mode);
+* head: stream and stop parsing at ``</head>``;
+* head+words: stream the whole page (up to ``URL_HEAD_MAX_BYTES``),
+  counting words in the same single pass.
+
+Usage (from the ``api`` directory):
+    
+    python -m benchmarks.url_metadata_extraction --page-kb 2048 --mbps 50
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from app.core import database  # noqa: F401  (registers every mapped model)
+from app.core.config import settings
+from app.services.url_service import UrlProcessingService
+
+CHUNK_BYTES = 16 * 1024
+
+
+def _page(page_kb: int) -> bytes:
+    head = [
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">',
+        "<title>Markets rally as central bank holds rates</title>",
+        '<meta name="description" content="Stocks rose after the decision.">',
+        '<meta name="author" content="Staff Reporter">',
+    ]
+    head += [f'<meta property="og:field{i}" content="value {i}">' for i in range(40)]
+    head.append('<script type="application/ld+json">%s</script>' % json.dumps({
+        "@context": "https://schema.org",
+        "@type": "NewsArticle",
+        "headline": "Markets rally as central bank holds rates",
+        "author": [{"@type": "Person", "name": "Staff Reporter"}],
+    }))
+    head += ["<style>%s</style>" % ("body{margin:0}" * 200), "</head><body>"]
+    
+    paragraph = "<p>" + "Analysts said the decision was widely expected by markets. " * 8 + "</p>\n"
+    script = "<script>window.__state = %s;</script>\n" % json.dumps({"items": list(range(300))})
+    body = []
+    size = sum(len(part) for part in head)
+    while size < page_kb * 1024:
+        block = paragraph * 5 + script
+        body.append(block)
+        size += len(block)
+    return ("".join(head) + "".join(body) + "</body></html>").encode()
+
+
+def _transport(page: bytes, mbps: float) -> httpx.MockTransport:
+    chunk_delay = CHUNK_BYTES * 8 / (mbps * 1_000_000) if mbps else 0
+    
+    async def body():
+        for offset in range(0, len(page), CHUNK_BYTES):
+            await asyncio.sleep(chunk_delay)
+            yield page[offset:offset + CHUNK_BYTES]
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            headers={"Content-Type": "text/html; charset=utf-8", "Content-Length": str(len(page))},
+            content=body(),
+        )
+    
+    return httpx.MockTransport(handler)
+
+
+async def _run(mode: str, page: bytes, mbps: float, iterations: int) -> dict:
+    service = UrlProcessingService(httpx.AsyncClient(transport=_transport(page, mbps)))
+    user = SimpleNamespace(id=1, username="benchmark")
+    options = {
+        "full": {},
+        "head": {"metadata_only": True},
+        "head+words": {"metadata_only": True, "count_words": True},
+    }[mode]
+    
+    timings = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        result = await service._fetch_and_analyze(
+            f"https://news.example/{i}", str(i), user, **options
+        )
+        timings.append(time.perf_counter() - started)
+    await service.close()
+    
+    timings.sort()
+    metadata = result.additional_metadata or {}
+    return {
+        "mode": mode,
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 1),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 1),
+        "bytes_read": metadata.get("bytes_read", metadata.get("content_length")),
+        "truncated": metadata.get("truncated", False),
+        "word_count": result.word_count,
+        "title": result.title,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--page-kb", type=int, default=2048, help="Size of the synthetic page")
+    parser.add_argument("--mbps", type=float, default=50.0, help="Simulated bandwidth (0 = unlimited)")
+    parser.add_argument("--iterations", type=int, default=10, help="Fetches per mode")
+    parser.add_argument("--max-bytes", type=int, default=None, help="Override URL_HEAD_MAX_BYTES")
+    args = parser.parse_args()
+    
+    if args.max_bytes is not None:
+        settings.URL_HEAD_MAX_BYTES = args.max_bytes
+    page = _page(args.page_kb)
+    print(f"page: {len(page)} bytes, head cap: {settings.URL_HEAD_MAX_BYTES} bytes")
+    for mode in ("full", "head", "head+words"):
+        print(await _run(mode, page, args.mbps, args.iterations))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
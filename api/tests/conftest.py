@@ -10,7 +10,8 @@ from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
-from app.core.database import Base, get_db
+from app.core.cache import cache
+from app.core.database import Base, get_db, get_read_db
 from app.main import app
 
 
@@ -67,6 +68,10 @@ async def client(test_db: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield test_db
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    
+    # Each test gets a fresh database, so cached responses must not carry over
+    await cache.clear()
     
     async with AsyncClient(app=app, base_url="http://test") as ac:
         yield ac
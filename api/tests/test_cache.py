@@ -0,0 +1,96 @@
+"""
+Tests for the response and object cache.
+"""
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.cache import Cache, MemoryCacheBackend, RedisCacheBackend
+
+
+class _Model:
+    def __init__(self, id: int) -> None:
+        self.id = id
+
+
+async def _exercise(cache: Cache) -> None:
+    calls = []
+    
+    @cache.cached(tags=("items:user:{user.id}",))
+    async def load(user: _Model, page: int, db: object = None) -> dict:
+        calls.append((user.id, page))
+        return {"user": user.id, "page": page}
+    
+    alice, bob = _Model(1), _Model(2)
+    assert await load(alice, 1, db=object()) == {"user": 1, "page": 1}
+    assert await load(alice, 1, db=object()) == {"user": 1, "page": 1}
+    await load(bob, 1)
+    await load(alice, 2)
+    assert calls == [(1, 1), (2, 1), (1, 2)]
+    
+    # Invalidating one user's tag leaves the other's entries alone
+    await cache.invalidate("items:user:1")
+    await load(alice, 1)
+    await load(bob, 1)
+    assert calls == [(1, 1), (2, 1), (1, 2), (1, 1)]
+    
+    await cache.set("plain", [1, 2], tags=("t",))
+    assert await cache.get("plain", tags=("t",)) == [1, 2]
+    await cache.invalidate("t")
+    assert await cache.get("plain", tags=("t",)) is None
+    
+    await cache.set("gone", 1)
+    await cache.clear()
+    assert await cache.get("gone") is None
+
+
+@pytest.mark.asyncio
+async def test_memory_cache():
+    """Test caching and tag invalidation with the in-process backend."""
+    await _exercise(Cache(MemoryCacheBackend(), prefix="test"))
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_lru_and_ttl():
+    """Test LRU eviction and expiry."""
+    backend = MemoryCacheBackend(max_entries=2)
+    await backend.set("a", b"1", ttl=60)
+    await backend.set("b", b"2", ttl=60)
+    await backend.get_many(["a"])
+    await backend.set("c", b"3", ttl=60)
+    assert await backend.get_many(["a", "b", "c"]) == [b"1", None, b"3"]
+    
+    await backend.set("d", b"4", ttl=0)
+    assert await backend.get_many(["d"]) == [None]
+
+
+@pytest.mark.asyncio
+async def test_redis_cache():
+    """Test caching and tag invalidation against a fake Redis."""
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = RedisCacheBackend(fakeredis.FakeAsyncRedis())
+    await _exercise(Cache(backend, prefix="test"))
+    await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_citation_stats_invalidated_on_write(client: AsyncClient):
+    """Test that citation writes evict the cached stats."""
+    login_response = await client.post(
+        "/api/v1/auth/login",
+        data={"username": "test", "password": "test"}
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['tokens']['access_token']}"}
+    
+    response = await client.get("/api/v1/tools/citations/stats/overview", headers=headers)
+    assert response.json()["total_citations"] == 0
+    
+    response = await client.post(
+        "/api/v1/tools/citations/",
+        json={"title": "Cached", "source_type": "article"},
+        headers=headers
+    )
+    assert response.status_code == 201
+    
+    response = await client.get("/api/v1/tools/citations/stats/overview", headers=headers)
+    assert response.json()["total_citations"] == 1
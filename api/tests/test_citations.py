@@ -0,0 +1,308 @@
+"""
+Tests for citation management endpoints.
+"""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import database
+from app.core.config import settings
+from app.models.base import Base
+from app.models.research_tool import Citation
+from app.services.citation_backfill import backfill_legacy_citations
+from app.services.citation_stats import (
+    backfill_citation_stats,
+    read_citation_stats,
+    rebuild_citation_stats,
+)
+
+
+async def _login(client: AsyncClient) -> dict:
+    """Log in as the test user and return auth headers."""
+    login_response = await client.post(
+        "/api/v1/auth/login",
+        data={
+            "username": "test",
+            "password": "test"
+        }
+    )
+    access_token = login_response.json()["tokens"]["access_token"]
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+async def _create_citation(client: AsyncClient, headers: dict, **fields) -> dict:
+    """Create a citation and return the response body."""
+    response = await client.post(
+        "/api/v1/tools/citations/",
+        json={"source_type": "article", **fields},
+        headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_search_citations_ranked(client: AsyncClient):
+    """Test prefix matching and relevance ranking of citation search."""
+    headers = await _login(client)
+    in_notes = await _create_citation(
+        client, headers, title="Regional trade report", notes="Mentions disinformation once"
+    )
+    in_title = await _create_citation(
+        client, headers, title="Disinformation campaigns in practice", authors=["Jane Analyst"]
+    )
+    await _create_citation(client, headers, title="Unrelated survey")
+    
+    response = await client.get(
+        "/api/v1/tools/citations/",
+        params={"search": "disinfo"},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert [c["id"] for c in response.json()] == [in_title["id"], in_notes["id"]]
+    
+    response = await client.get(
+        "/api/v1/tools/citations/",
+        params={"search": "jane"},
+        headers=headers
+    )
+    assert [c["id"] for c in response.json()] == [in_title["id"]]
+
+
+@pytest.mark.asyncio
+async def test_search_index_follows_updates_and_deletes(client: AsyncClient):
+    """Test that edits and deletions are reflected in search results."""
+    headers = await _login(client)
+    citation = await _create_citation(client, headers, title="Original heading")
+    
+    response = await client.put(
+        f"/api/v1/tools/citations/{citation['id']}",
+        json={"title": "Revised heading"},
+        headers=headers
+    )
+    assert response.status_code == 200
+    
+    async def search(term: str):
+        return await client.get(
+            "/api/v1/tools/citations/", params={"search": term}, headers=headers
+        )
+    
+    assert (await search("original")).json() == []
+    assert len((await search("revised")).json()) == 1
+    
+    await client.delete(f"/api/v1/tools/citations/{citation['id']}", headers=headers)
+    assert (await search("revised")).json() == []
+
+
+@pytest.mark.asyncio
+async def test_citation_tags(client: AsyncClient):
+    """Test that tags are normalized and filterable."""
+    headers = await _login(client)
+    tagged = await _create_citation(
+        client, headers, title="Tagged", tags=["OSINT", " Open  Source ", "osint"]
+    )
+    await _create_citation(client, headers, title="Untagged")
+    
+    assert tagged["tags"] == ["open source", "osint"]
+    
+    response = await client.get(
+        "/api/v1/tools/citations/",
+        params={"tag": "Osint"},
+        headers=headers
+    )
+    assert [c["id"] for c in response.json()] == [tagged["id"]]
+    
+    response = await client.put(
+        f"/api/v1/tools/citations/{tagged['id']}",
+        json={"tags": ["analysis"]},
+        headers=headers
+    )
+    assert response.json()["tags"] == ["analysis"]
+    
+    stats = (await client.get("/api/v1/tools/citations/stats/overview", headers=headers)).json()
+    assert stats["top_tags"] == [{"tag": "analysis", "count": 1}]
+
+
+@pytest.mark.asyncio
+async def test_import_citations(client: AsyncClient):
+    """Test bulk import with duplicates and per-record errors."""
+    headers = await _login(client)
+    await _create_citation(client, headers, title="Existing", doi="10.1000/existing")
+    await _create_citation(client, headers, title="Existing page", url="https://example.com/report")
+    
+    bibtex = """
+@article{one, title = {First imported}, author = {Smith, John and Doe, Jane},
+  journal = {Journal}, year = 2020, doi = {10.1000/ONE}, keywords = {osint, imports}}
+@book{two, title = {Second imported}, isbn = {978-3-16-148410-0}, year = 2019}
+@misc{dup, title = {Duplicate in file}, doi = {https://doi.org/10.1000/one}}
+@article{old, title = {Already stored}, doi = {10.1000/existing}}
+@article{notitle, author = {Nobody}}
+@misc{web, title = {Same page}, url = {https://EXAMPLE.com/report/?utm_source=feed}}
+"""
+    response = await client.post(
+        "/api/v1/tools/citations/import",
+        params={"batch_size": 2},
+        files={"file": ("library.bib", bibtex.encode(), "application/x-bibtex")},
+        headers=headers
+    )
+    
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["format"] == "bibtex"
+    assert report["total_records"] == 6
+    assert report["imported"] == 2
+    assert report["duplicates"] == 3
+    assert report["failed"] == 1
+    assert report["errors"][0]["index"] == 5
+    
+    response = await client.get(
+        "/api/v1/tools/citations/",
+        params={"search": "imported"},
+        headers=headers
+    )
+    imported = {c["title"]: c for c in response.json()}
+    assert imported["First imported"]["authors"] == ["Smith, John", "Doe, Jane"]
+    assert imported["First imported"]["tags"] == ["imports", "osint"]
+    assert imported["First imported"]["bibtex_citation"].startswith("@article{citation")
+    assert imported["Second imported"]["isbn"] == "9783161484100"
+
+
+@pytest.mark.asyncio
+async def test_import_citations_ris_and_csl_json(client: AsyncClient):
+    """Test RIS and CSL-JSON imports."""
+    headers = await _login(client)
+    ris = "TY  - JOUR\nTI  - From RIS\nAU  - Roe, R.\nPY  - 2018\nER  - \n"
+    csl = '[{"type": "webpage", "title": "From CSL", "URL": "https://example.com/a"}]'
+    
+    for name, content in (("refs.ris", ris), ("refs.json", csl)):
+        response = await client.post(
+            "/api/v1/tools/citations/import",
+            files={"file": (name, content.encode(), "text/plain")},
+            headers=headers
+        )
+        assert response.status_code == 200, response.text
+        assert response.json()["imported"] == 1
+
+
+@pytest.mark.asyncio
+async def test_citation_stats_maintained_on_write(client: AsyncClient, test_db: AsyncSession):
+    """Test that counters follow creates, updates, deletes and imports."""
+    headers = await _login(client)
+    first = await _create_citation(client, headers, title="One", tags=["osint", "geo"], reliability_rating=4)
+    await _create_citation(client, headers, title="Two", source_type="book", tags=["osint"])
+    third = await _create_citation(client, headers, title="Three", tags=["geo"])
+    
+    await client.put(
+        f"/api/v1/tools/citations/{first['id']}",
+        json={"source_type": "report", "tags": ["osint"], "reliability_rating": 2},
+        headers=headers
+    )
+    await client.delete(f"/api/v1/tools/citations/{third['id']}", headers=headers)
+    await client.post(
+        "/api/v1/tools/citations/import",
+        files={"file": ("refs.ris", b"TY  - JOUR\nTI  - Imported\nKW  - osint\nER  - \n", "text/plain")},
+        headers=headers
+    )
+    
+    stats = (await client.get("/api/v1/tools/citations/stats/overview", headers=headers)).json()
+    assert stats["total_citations"] == 3
+    assert stats["recent_citations"] == 3
+    assert stats["by_source_type"] == {"report": 1, "book": 1, "article": 1}
+    assert stats["by_rating"] == {"rating_2": 1}
+    assert stats["top_tags"] == [{"tag": "osint", "count": 3}]
+    
+    # A rebuild from the citations table yields the same numbers
+    await rebuild_citation_stats(test_db)
+    await client.post("/api/v1/tools/citations/", json={"title": "Bust cache", "source_type": "article"}, headers=headers)
+    rebuilt = (await client.get("/api/v1/tools/citations/stats/overview", headers=headers)).json()
+    assert rebuilt["total_citations"] == 4
+    assert rebuilt["by_source_type"] == {"report": 1, "book": 1, "article": 2}
+    assert rebuilt["top_tags"] == stats["top_tags"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_stats_backfills_do_not_conflict(test_db: AsyncSession):
+    """Test that overlapping startup backfills skip counters another worker wrote."""
+    test_db.add(Citation(title="Boot", source_type="article", user_id=2))
+    await test_db.commit()
+    
+    await backfill_citation_stats(test_db)
+    # A second worker that checked the table before the first one committed
+    await rebuild_citation_stats(test_db, replace=False)
+    
+    stats = await read_citation_stats(test_db, 2)
+    assert stats["total_citations"] == 1
+    assert stats["by_source_type"] == {"article": 1}
+
+@pytest.mark.asyncio
+async def test_backfill_legacy_citations(test_db: AsyncSession):
+    """Test that repr-encoded values and legacy tag strings are converted."""
+    await test_db.execute(text("ALTER TABLE citations ADD COLUMN tags TEXT"))
+    await test_db.execute(
+        text(
+            "INSERT INTO citations (title, authors, citation_data, tags, source_type, user_id, created_at, updated_at) "
+            "VALUES (:title, :authors, :data, :tags, 'article', 2, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        ),
+        [
+            {
+                "title": "Legacy",
+                "authors": "['Ada Lovelace', 'Charles Babbage']",
+                "data": "{'volume': 3, 'issue': None}",
+                "tags": "['History', ' computing ']",
+            },
+            {"title": "Current", "authors": '["Grace Hopper"]', "data": None, "tags": None},
+        ],
+    )
+    await test_db.commit()
+    
+    stats = await backfill_legacy_citations(test_db)
+    assert stats == {"scanned": 2, "converted": 2, "tags_moved": 2}
+    
+    legacy, current = (await test_db.scalars(select(Citation).order_by(Citation.id))).all()
+    assert legacy.authors == ["Ada Lovelace", "Charles Babbage"]
+    assert legacy.citation_data == {"volume": 3, "issue": None}
+    assert [tag.name for tag in legacy.tags] == ["computing", "history"]
+    assert current.authors == ["Grace Hopper"]
+    assert await test_db.scalar(text("SELECT tags FROM citations WHERE title = 'Legacy'")) is None
+    
+    top_tags = (await read_citation_stats(test_db, 2))["top_tags"]
+    assert {tag["tag"] for tag in top_tags} == {"computing", "history"}
+    
+    # Running again finds nothing left to convert
+    assert await backfill_legacy_citations(test_db) == {"scanned": 2, "converted": 0, "tags_moved": 0}
+
+
+@pytest.mark.asyncio
+async def test_startup_converts_legacy_citations(tmp_path, monkeypatch):
+    """Test that repr-encoded citations read back after startup."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            text(
+                "INSERT INTO citations (title, authors, citation_data, source_type, user_id, created_at, updated_at) "
+                "VALUES ('Legacy', :authors, :data, 'article', 2, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+            ),
+            {"authors": "['Ada Lovelace']", "data": "{'volume': 3}"},
+        )
+    
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "read_engine", engine)
+    monkeypatch.setattr(database, "AsyncSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    try:
+        await database.init_db()
+        
+        async with database.AsyncSessionLocal() as session:
+            citation = await session.scalar(select(Citation))
+            assert citation.authors == ["Ada Lovelace"]
+            assert citation.citation_data == {"volume": 3}
+            # The search index follows the converted authors
+            search_hits = await session.scalar(
+                text("SELECT COUNT(*) FROM citations_fts WHERE citations_fts MATCH 'lovelace'")
+            )
+            assert search_hits == 1
+    finally:
+        await engine.dispose()
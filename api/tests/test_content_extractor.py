@@ -0,0 +1,124 @@
+"""
+Tests for main-content extraction from scraped pages.
+"""
+
+import json
+
+from app.services.content_extractor import content_type_charset, extract_content
+
+ARTICLE = """<!DOCTYPE html>
+<html><head>
+<meta charset="utf-8">
+<title>Port strike enters second week</title>
+<meta name="description" content="Dock workers stay out.">
+<script type="application/ld+json">%s</script>
+<style>body { margin: 0 }</style>
+</head><body class="has-sidebar">
+<header><nav><a href="/">Home</a> <a href="/world">World</a> <a href="/business">Business</a></nav></header>
+<div id="page">
+  <article>
+    <h1>Port strike enters second week</h1>
+    <div class="byline">By <a rel="author" href="/staff/lee">Dana Lee</a></div>
+    <time datetime="2024-03-04T08:30:00Z">March 4</time>
+    <div class="article-body">
+      <p>Dock workers at the country's largest port stayed off the job on Monday, extending a strike that has
+      stranded hundreds of containers, delayed exports and rattled importers.</p>
+      <p>Union leaders said talks with the port authority, which resumed on Friday, had made little progress
+      on pay, shift lengths or automation, the three issues at the centre of the dispute.</p>
+      <div class="share-tools"><a href="/share/x">Share</a> <a href="/share/y">Post</a></div>
+      <p>Shipping lines have begun diverting vessels to smaller ports along the coast, adding days to delivery
+      times, according to three logistics firms contacted for this story.</p>
+    </div>
+  </article>
+  <aside class="related"><h2>Related</h2><ul>
+    <li><a href="/a">Ports brace for a long dispute over automation</a></li>
+    <li><a href="/b">Exporters count the cost of delays</a></li>
+  </ul></aside>
+  <section class="comments"><p>First comment, with an opinion, about the strike, and more words.</p></section>
+</div>
+<footer><p>Copyright 2024 Example News, all rights reserved, terms and privacy apply.</p></footer>
+<script>window.tracking = {"page": "article"};</script>
+</body></html>
+""" % json.dumps({
+    "@context": "https://schema.org",
+    "@type": "NewsArticle",
+    "author": [{"@type": "Person", "name": "Dana Lee"}],
+    "datePublished": "2024-03-04T08:30:00Z",
+})
+
+
+def test_extracts_main_article_text():
+    """Test that the article is kept and navigation, widgets, comments and scripts are dropped."""
+    extracted = extract_content(ARTICLE.encode(), "https://news.example/world/strike")
+
+    assert extracted.title == "Port strike enters second week"
+    assert "stayed off the job on Monday" in extracted.text
+    assert "three issues at the centre of the dispute" in extracted.text
+    assert "diverting vessels to smaller ports" in extracted.text
+    for boilerplate in ("Business", "Share", "Exporters count", "First comment", "Copyright", "tracking", "margin"):
+        assert boilerplate not in extracted.text
+    # One line per paragraph
+    assert len(extracted.text.splitlines()) == 3
+
+
+def test_extracts_byline_date_and_page_data():
+    """Test the byline, publish date, meta tags, links and images."""
+    page = ARTICLE.replace("<article>", '<article><img src="/img/port.jpg">')
+    extracted = extract_content(page.encode(), "https://news.example/world/strike")
+
+    assert extracted.byline == "Dana Lee"
+    assert extracted.published == "2024-03-04T08:30:00+00:00"
+    assert extracted.metadata["description"] == "Dock workers stay out."
+    assert ("https://news.example/world", "World") in extracted.links
+    assert "https://news.example/staff/lee" in [url for url, _ in extracted.links]
+    assert extracted.images == ["https://news.example/img/port.jpg"]
+
+
+def test_byline_and_date_from_the_dom():
+    """Test that DOM bylines and <time> dates are used without structured data."""
+    page = """<html><head><title>Notes</title></head><body>
+    <div class="post"><span class="author-name">By Sam Ortiz</span><time datetime="2023-11-02">Nov 2</time>
+    <div class="entry-content"><p>A long enough paragraph about the subject, with commas, to be scored as content.</p>
+    <p>Another paragraph that keeps going for a while so the container wins, clearly and comfortably.</p></div>
+    </div></body></html>"""
+    extracted = extract_content(page.encode())
+
+    assert extracted.byline == "Sam Ortiz"
+    assert extracted.published == "2023-11-02T00:00:00"
+    assert extracted.text.startswith("A long enough paragraph")
+
+
+def test_text_separated_by_line_breaks():
+    """Test that text held directly in a container, split by <br>, is found."""
+    body = "<br><br>".join(
+        f"Paragraph {i} of the report goes on for a little while, with a comma or two, as reports do."
+        for i in range(4)
+    )
+    page = f"""<html><body><table><tr>
+    <td class="menu"><a href="/1">One</a><br><a href="/2">Two</a><br><a href="/3">Three</a></td>
+    <td><div>{body}</div></td></tr></table></body></html>"""
+    extracted = extract_content(page.encode())
+
+    assert extracted.text.splitlines()[0].startswith("Paragraph 0")
+    assert "Paragraph 3" in extracted.text
+    assert "Three" not in extracted.text
+
+
+def test_falls_back_to_body_text_and_handles_empty_pages():
+    """Test short pages without scoring blocks and documents with no content."""
+    extracted = extract_content(b"<html><body><nav>Menu</nav><h1>Hello</h1><span>world</span></body></html>")
+    assert extracted.title == "Hello"
+    assert extracted.text == "Hello\nworld"
+
+    assert extract_content(b"").text == ""
+    assert extract_content(b"   ").title is None
+
+
+def test_declared_encoding():
+    """Test that the Content-Type charset is used to decode the page."""
+    page = "<html><body><p>Café crème, served hot, with a pastry and a glass of water on the side.</p></body></html>"
+    assert content_type_charset("text/html; charset=ISO-8859-1") == "ISO-8859-1"
+    assert content_type_charset("text/html") is None
+
+    extracted = extract_content(page.encode("latin-1"), encoding="ISO-8859-1")
+    assert extracted.text.startswith("Café crème")
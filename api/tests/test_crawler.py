@@ -0,0 +1,253 @@
+"""
+Tests for the breadth-first crawl engine.
+"""
+
+import asyncio
+import re
+import urllib.parse
+
+import httpx
+import pytest
+
+from app.services.crawler import BloomFilter, CrawlConfig, Crawler, RobotsCache
+
+SITE = "https://site.test"
+
+
+class _Site:
+    """Fixture site: a small link graph plus robots.txt, served in-process."""
+
+    def __init__(self, robots: str = "", robots_status: int = 200, delay: float = 0.0):
+        self.pages = {
+            "/": ["/a", "/b", "/private/x", "https://other.test/"],
+            "/a": ["/a/1", "/a/2", "/"],
+            "/b": ["/b/1", "/a"],
+            "/a/1": ["/deep"],
+            "/a/2": [],
+            "/b/1": [],
+            "/deep": [],
+            "/private/x": [],
+        }
+        self.robots = robots
+        self.robots_status = robots_status
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests.append(str(request.url))
+        if path == "/robots.txt":
+            return httpx.Response(self.robots_status, text=self.robots)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if request.url.host != "site.test" or path not in self.pages:
+            return httpx.Response(404, text="missing")
+        links = "".join(f'<a href="{link}">{link}</a>' for link in self.pages[path])
+        return httpx.Response(200, html=f"<title>{path}</title>{links}")
+
+
+def _crawler(site: _Site, **config) -> Crawler:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(site))
+    config.setdefault("per_host_delay", 0.0)
+    return Crawler(CrawlConfig(**config), client=client, robots=RobotsCache(client=client))
+
+
+def _links(page):
+    hrefs = re.findall(r'href="([^"]+)"', page.content.decode())
+    return [urllib.parse.urljoin(page.url, href) for href in hrefs]
+
+
+async def _crawl(crawler: Crawler, seeds=(SITE + "/",), resume=None):
+    pages = []
+
+    async def on_page(page):
+        pages.append(page)
+        return _links(page)
+
+    stats = await crawler.run(list(seeds), on_page, resume=resume)
+    return pages, stats
+
+
+def _paths(pages):
+    return [page.url[len(SITE):] for page in pages if not page.skipped]
+
+
+def test_bloom_filter():
+    """Test that added items are always found and repeats are reported."""
+    bloom = BloomFilter(1000, error_rate=0.01)
+    items = [f"https://example.com/{i}" for i in range(1000)]
+    assert all(bloom.add(item) for item in items[:500])
+    assert all(item in bloom for item in items[:500])
+    assert not bloom.add(items[0])
+    assert bloom.count == 500
+    false_positives = sum(item in bloom for item in items[500:])
+    assert false_positives < 25
+
+
+@pytest.mark.asyncio
+async def test_breadth_first_with_depth_limit():
+    """Test that pages are fetched level by level, once each, up to max_depth."""
+    site = _Site()
+    pages, stats = await _crawl(_crawler(site, max_depth=3))
+
+    paths = _paths(pages)
+    assert paths[0] == "/"
+    assert set(paths[1:4]) == {"/a", "/b", "/private/x"}
+    assert set(paths[4:]) == {"/a/1", "/a/2", "/b/1"}
+    # /deep is at depth 4; other.test is off-host; "/" and "/a" are not refetched
+    assert len(paths) == len(set(paths)) == 7
+    assert not any("other.test" in url for url in site.requests)
+    assert stats["pages"] == 7
+    assert stats["stop_reason"] == "exhausted"
+    assert {page.url: page.depth for page in pages}[SITE + "/a/1"] == 3
+
+
+@pytest.mark.asyncio
+async def test_links_fetched_as_written_and_deduplicated_canonically():
+    """Test that links are requested as written and equivalent spellings are fetched once."""
+    site = _Site()
+    site.pages["/"] = ["/b/?z=1&flag", "/b?flag=&z=1#top"]
+    site.pages["/b/"] = []
+    pages, _ = await _crawl(_crawler(site, max_depth=2))
+
+    fetched = [url for url in site.requests if not url.endswith("/robots.txt")]
+    assert fetched == [SITE + "/", SITE + "/b/?z=1&flag"]
+    assert [page.status_code for page in pages] == [200, 200]
+
+
+@pytest.mark.asyncio
+async def test_include_and_exclude_patterns():
+    """Test that discovered links are filtered by the URL patterns."""
+    site = _Site()
+    pages, _ = await _crawl(_crawler(site, max_depth=3, include_patterns=[r"/a"], exclude_patterns=[r"/a/2$"]))
+
+    assert sorted(_paths(pages)) == ["/", "/a", "/a/1"]
+
+
+@pytest.mark.asyncio
+async def test_robots_rules_are_respected_and_cached():
+    """Test that disallowed pages are skipped and robots.txt is fetched once."""
+    site = _Site(robots="User-agent: *\nDisallow: /private/\n")
+    pages, stats = await _crawl(_crawler(site, max_depth=2))
+
+    skipped = [page for page in pages if page.skipped]
+    assert [page.url for page in skipped] == [SITE + "/private/x"]
+    assert stats["skipped"] == 1
+    assert SITE + "/private/x" not in site.requests
+    assert site.requests.count(SITE + "/robots.txt") == 1
+
+
+@pytest.mark.asyncio
+async def test_robots_server_error_blocks_host():
+    """Test that an unavailable robots.txt means nothing is fetched."""
+    site = _Site(robots_status=503)
+    pages, stats = await _crawl(_crawler(site, max_depth=2))
+
+    assert [page.skipped for page in pages] == ["Disallowed by robots.txt"]
+    assert stats["pages"] == 0
+
+    # Without robots checks the crawl goes ahead
+    site = _Site(robots_status=503)
+    pages, stats = await _crawl(_crawler(site, max_depth=2, respect_robots=False))
+    assert stats["pages"] == 4
+
+
+@pytest.mark.asyncio
+async def test_stops_at_page_and_byte_limits():
+    """Test that the crawl stops once a page or byte budget is spent."""
+    pages, stats = await _crawl(_crawler(_Site(), max_depth=3, max_pages=3))
+    assert len(_paths(pages)) == 3
+    assert stats["stop_reason"] == "max_pages"
+
+    pages, stats = await _crawl(_crawler(_Site(), max_depth=3, max_bytes=150))
+    assert stats["stop_reason"] == "max_bytes"
+    assert stats["bytes"] <= 150
+    assert len(_paths(pages)) < 7
+
+
+@pytest.mark.asyncio
+async def test_per_host_politeness():
+    """Test that one host gets one request at a time, spaced by the delay."""
+    site = _Site(delay=0.01)
+    crawler = _crawler(site, max_depth=2, per_host_delay=0.05, concurrency=4)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    pages, _ = await _crawl(crawler)
+
+    assert site.peak == 1
+    # Four pages: three gaps of at least the per-host delay
+    assert len(_paths(pages)) == 4
+    assert loop.time() - started >= 0.15
+
+
+@pytest.mark.asyncio
+async def test_hosts_are_fetched_concurrently():
+    """Test that different hosts do not wait for each other."""
+    site = _Site(delay=0.05)
+    seeds = [f"https://host{i}.test/" for i in range(4)]
+    crawler = _crawler(site, max_depth=1, per_host_delay=1.0, concurrency=4, respect_robots=False)
+    pages, stats = await _crawl(crawler, seeds)
+
+    assert stats["pages"] == 4
+    assert site.peak == 4
+    # Off-site hosts answer 404 in the fixture
+    assert all(page.error == "HTTP 404" for page in pages)
+    assert stats["failed"] == 4
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_resumes_without_refetching():
+    """Test that a stopped crawl resumes from its checkpoint without refetching finished pages."""
+    site = _Site()
+    crawler = _crawler(site, max_depth=3)
+    done = []
+    checkpoint = {}
+
+    async def on_page(page):
+        links = _links(page)
+        if not checkpoint:
+            done.append(page.url[len(SITE):])
+            if len(done) == 3:
+                checkpoint.update(crawler.checkpoint(page, links))
+                crawler.stop("cancelled")
+        return links
+
+    stats = await crawler.run([SITE + "/"], on_page)
+    assert stats["stop_reason"] == "cancelled"
+    assert checkpoint["stats"]["pages"] == 3
+
+    site.requests.clear()
+    pages, stats = await _crawl(_crawler(site, max_depth=3), resume=checkpoint)
+
+    resumed = _paths(pages)
+    assert not set(done) & set(resumed)
+    assert sorted(done + resumed) == ["/", "/a", "/a/1", "/a/2", "/b", "/b/1", "/private/x"]
+    assert not any(url[len(SITE):] in done for url in site.requests)
+    assert stats["pages"] == 7
+    assert stats["stop_reason"] == "exhausted"
+
+
+@pytest.mark.asyncio
+async def test_stop_wakes_waiting_workers():
+    """Test that stopping does not wait out a host's crawl delay."""
+    site = _Site()
+    crawler = _crawler(site, max_depth=2, per_host_delay=10.0, respect_robots=False)
+    fetched = asyncio.Event()
+
+    async def on_page(page):
+        fetched.set()
+        return _links(page)
+
+    run = asyncio.create_task(crawler.run([SITE + "/"], on_page))
+    await asyncio.wait_for(fetched.wait(), 2.0)
+    crawler.stop("cancelled")
+    stats = await asyncio.wait_for(run, 1.0)
+
+    assert stats["stop_reason"] == "cancelled"
+    assert stats["pages"] == 1
@@ -0,0 +1,70 @@
+"""
+Tests for streaming document uploads.
+"""
+
+import hashlib
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from httpx import AsyncClient
+
+from app.api.v1.endpoints.tools.document_processing import DocumentProcessingService
+from app.core.config import settings
+
+
+def _service(tmp_path) -> DocumentProcessingService:
+    service = DocumentProcessingService()
+    service.upload_dir = tmp_path
+    return service
+
+
+@pytest.mark.asyncio
+async def test_upload_is_streamed_and_content_addressed(tmp_path, monkeypatch):
+    """Test that uploads are hashed in chunks and re-uploads reuse the stored file."""
+    monkeypatch.setattr(settings, "DOCUMENT_UPLOAD_CHUNK_BYTES", 1000)
+    content = b"%PDF-1.7\n" + b"x" * 5000
+    service = _service(tmp_path)
+
+    first = await service.save_uploaded_file(UploadFile(io.BytesIO(content), filename="Report.PDF"))
+    assert first.file_id == hashlib.sha256(content).hexdigest()
+    assert first.path == tmp_path / f"{first.file_id}.pdf"
+    assert first.path.read_bytes() == content
+    assert first.size == len(content)
+    assert not first.duplicate
+
+    again = await service.save_uploaded_file(UploadFile(io.BytesIO(content), filename="copy.pdf"))
+    assert again.file_id == first.file_id
+    assert again.duplicate
+    # Same content under another extension: still one file per ID
+    renamed = await service.save_uploaded_file(UploadFile(io.BytesIO(content), filename="copy.txt"))
+    assert renamed.duplicate
+    assert renamed.path == first.path
+    assert sorted(path.name for path in tmp_path.iterdir()) == [first.path.name]
+
+
+@pytest.mark.asyncio
+async def test_upload_size_limit_enforced_while_streaming(tmp_path, monkeypatch):
+    """Test that an oversized upload is rejected and leaves nothing behind."""
+    monkeypatch.setattr(settings, "DOCUMENT_UPLOAD_CHUNK_BYTES", 100)
+    monkeypatch.setattr(settings, "DOCUMENT_MAX_UPLOAD_SIZE", 250)
+    service = _service(tmp_path)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.save_uploaded_file(UploadFile(io.BytesIO(b"x" * 300), filename="big.txt"))
+
+    assert exc_info.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_oversized_upload_rejected_before_reading_body(client: AsyncClient, monkeypatch):
+    """Test that a declared Content-Length over the limit is refused up front."""
+    monkeypatch.setattr(settings, "DOCUMENT_MAX_UPLOAD_SIZE", 1000)
+    
+    response = await client.post(
+        "/api/v1/tools/documents/upload",
+        files={"file": ("big.txt", b"x" * 200_000, "text/plain")},
+    )
+    
+    assert response.status_code == 413
@@ -0,0 +1,93 @@
+"""
+Tests for domain reputation lookups.
+"""
+
+import os
+
+import pytest
+from httpx import AsyncClient
+
+from app.services.domain_reputation import DomainReputation
+
+PUBLIC_SUFFIXES = """
+com
+org
+io
+*.ck
+!www.ck
+// ===BEGIN PRIVATE DOMAINS===
+github.io
+// ===END PRIVATE DOMAINS===
+"""
+
+
+def _write_lists(directory, trusted="", suspicious="", malicious=""):
+    (directory / "trusted.txt").write_text(trusted)
+    (directory / "suspicious.txt").write_text(suspicious)
+    (directory / "malicious.txt").write_text(malicious)
+    (directory / "public_suffix_list.dat").write_text(PUBLIC_SUFFIXES)
+
+
+def test_score_domains_matches_on_label_boundaries(tmp_path):
+    """Test list matching, specificity and public suffix handling."""
+    _write_lists(
+        tmp_path,
+        trusted="# research\nwikipedia.org\ngithub.io\nteam.github.io\n",
+        suspicious="*.free-hosting.com\n",
+        malicious="0.0.0.0 evil.wikipedia.org\n",
+    )
+    reputation = DomainReputation(str(tmp_path), reload_seconds=60)
+    scores = reputation.score_domains([
+        "en.wikipedia.org",
+        "notwikipedia.org",
+        "https://Evil.Wikipedia.org:443/path",
+        "someone.github.io",
+        "team.github.io",
+        "a.free-hosting.com",
+        "x.y.ck",
+        "this-is-a-very-long-name-with-many-hyphens.com",
+    ])
+    
+    assert [score.reputation for score in scores] == [
+        "trusted", "neutral", "malicious", "neutral",
+        "trusted", "suspicious", "neutral", "suspicious",
+    ]
+    assert scores[0].matched_entry == "wikipedia.org"
+    assert scores[2].domain == "evil.wikipedia.org"
+    assert scores[3].registrable_domain == "someone.github.io"
+    assert (scores[6].public_suffix, scores[6].registrable_domain) == ("y.ck", "x.y.ck")
+    assert reputation.score_domains(["www.ck"])[0].registrable_domain == "www.ck"
+
+
+def test_reputation_lists_hot_reload(tmp_path):
+    """Test that edited lists are picked up without blocking lookups."""
+    _write_lists(tmp_path)
+    reputation = DomainReputation(str(tmp_path), reload_seconds=0)
+    assert reputation.assess("example.com") == "neutral"
+    
+    (tmp_path / "malicious.txt").write_text("example.com\n")
+    stat = (tmp_path / "malicious.txt").stat()
+    os.utime(tmp_path / "malicious.txt", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    reputation.assess("example.com")
+    # The rebuild runs in the background; wait for it to release its lock
+    with reputation._reloading:
+        pass
+    assert reputation.assess("example.com") == "malicious"
+
+
+@pytest.mark.asyncio
+async def test_reputation_endpoint(client: AsyncClient):
+    """Test batch scoring over the API."""
+    login_response = await client.post(
+        "/api/v1/auth/login",
+        data={"username": "test", "password": "test"}
+    )
+    headers = {"Authorization": f"Bearer {login_response.json()['tokens']['access_token']}"}
+    
+    response = await client.post(
+        "/api/v1/tools/url/reputation",
+        json={"domains": ["arxiv.org", "notwikipedia.org"]},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert [r["reputation"] for r in response.json()] == ["trusted", "neutral"]
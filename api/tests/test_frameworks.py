@@ -0,0 +1,283 @@
+"""
+Tests for generic framework session endpoints.
+"""
+
+import pytest
+from httpx import AsyncClient
+
+
+async def _login(client: AsyncClient) -> dict:
+    """Log in as the test user and return auth headers."""
+    login_response = await client.post(
+        "/api/v1/auth/login",
+        data={
+            "username": "test",
+            "password": "test"
+        }
+    )
+    access_token = login_response.json()["tokens"]["access_token"]
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+async def _create_sessions(client: AsyncClient, headers: dict, count: int) -> list[int]:
+    """Create framework sessions and return their IDs."""
+    ids = []
+    for idx in range(count):
+        response = await client.post(
+            "/api/v1/frameworks/",
+            json={
+                "title": f"Session {idx}",
+                "framework_type": "swot",
+                "data": {"strengths": [f"Strength {idx}"]},
+            },
+            headers=headers
+        )
+        assert response.status_code == 200
+        ids.append(response.json()["id"])
+    return ids
+
+
+@pytest.mark.asyncio
+async def test_list_framework_sessions_cursor_pagination(client: AsyncClient):
+    """Test that keyset pagination walks every session exactly once."""
+    headers = await _login(client)
+    created = await _create_sessions(client, headers, 5)
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/v1/frameworks/", params=params, headers=headers)
+        assert response.status_code == 200
+        seen.extend(item["id"] for item in response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert sorted(seen) == sorted(created)
+    assert len(seen) == len(set(seen))
+
+
+@pytest.mark.asyncio
+async def test_list_framework_sessions_summary(client: AsyncClient):
+    """Test that summary mode omits the analysis data."""
+    headers = await _login(client)
+    await _create_sessions(client, headers, 2)
+
+    response = await client.get(
+        "/api/v1/frameworks/",
+        params={"fields": "summary"},
+        headers=headers
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 2
+    assert all("data" not in item for item in data)
+    assert all("title" in item for item in data)
+
+
+@pytest.mark.asyncio
+async def test_list_framework_sessions_invalid_cursor(client: AsyncClient):
+    """Test that a malformed cursor is rejected."""
+    headers = await _login(client)
+
+    response = await client.get(
+        "/api/v1/frameworks/",
+        params={"cursor": "not-a-cursor"},
+        headers=headers
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_json_patch_framework_session(client: AsyncClient):
+    """Test applying a JSON Patch to session data."""
+    headers = await _login(client)
+    (session_id,) = await _create_sessions(client, headers, 1)
+    
+    response = await client.patch(
+        f"/api/v1/frameworks/{session_id}",
+        json=[
+            {"op": "replace", "path": "/strengths/0", "value": "Edited strength"},
+            {"op": "add", "path": "/threats", "value": ["New threat"]},
+        ],
+        headers={**headers, "Content-Type": "application/json-patch+json"}
+    )
+    
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    
+    session = (await client.get(f"/api/v1/frameworks/{session_id}", headers=headers)).json()
+    assert session["data"]["strengths"] == ["Edited strength"]
+    assert session["data"]["threats"] == ["New threat"]
+    assert session["version"] == 2
+
+
+@pytest.mark.asyncio
+async def test_merge_patch_framework_session(client: AsyncClient):
+    """Test applying a JSON Merge Patch to session data."""
+    headers = await _login(client)
+    (session_id,) = await _create_sessions(client, headers, 1)
+    
+    response = await client.patch(
+        f"/api/v1/frameworks/{session_id}",
+        json={"strengths": None, "context": {"region": "north"}},
+        headers={**headers, "Content-Type": "application/merge-patch+json"}
+    )
+    
+    assert response.status_code == 200
+    
+    session = (await client.get(f"/api/v1/frameworks/{session_id}", headers=headers)).json()
+    assert session["data"] == {"context": {"region": "north"}}
+
+
+@pytest.mark.asyncio
+async def test_patch_framework_session_errors(client: AsyncClient):
+    """Test version conflicts and unappliable patches."""
+    headers = await _login(client)
+    (session_id,) = await _create_sessions(client, headers, 1)
+    
+    response = await client.patch(
+        f"/api/v1/frameworks/{session_id}",
+        json=[{"op": "add", "path": "/weaknesses/-", "value": "x"}],
+        headers={**headers, "If-Match": '"7"'}
+    )
+    assert response.status_code == 412
+    
+    response = await client.patch(
+        f"/api/v1/frameworks/{session_id}",
+        json=[{"op": "remove", "path": "/missing"}],
+        headers=headers
+    )
+    assert response.status_code == 422
+    
+    response = await client.patch(
+        "/api/v1/frameworks/99999",
+        json={"title": "x"},
+        headers=headers
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_framework_session_conditional(client: AsyncClient):
+    """Test ETag and If-None-Match handling on session reads."""
+    headers = await _login(client)
+    (session_id,) = await _create_sessions(client, headers, 1)
+    
+    response = await client.get(f"/api/v1/frameworks/{session_id}", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag == '"1"'
+    
+    response = await client.get(
+        f"/api/v1/frameworks/{session_id}",
+        headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    
+    response = await client.patch(
+        f"/api/v1/frameworks/{session_id}",
+        json={"context": "updated"},
+        headers={**headers, "If-Match": etag}
+    )
+    assert response.headers["ETag"] == '"2"'
+    
+    response = await client.get(
+        f"/api/v1/frameworks/{session_id}",
+        headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+    
+    # Mock framework reads have no session version, so no validator either
+    response = await client.get(
+        "/api/v1/frameworks/swot/1",
+        headers={**headers, "If-None-Match": '"1"'}
+    )
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_framework_session_changes(client: AsyncClient):
+    """Test delta sync with since_version."""
+    headers = await _login(client)
+    (session_id,) = await _create_sessions(client, headers, 1)
+    url = f"/api/v1/frameworks/{session_id}/changes"
+    
+    # Up to date: an empty delta, or 304 only for a conditional request
+    response = await client.get(url, params={"since_version": 1}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"1"'
+    assert response.json()["changes"] == []
+    response = await client.get(
+        url, params={"since_version": 1}, headers={**headers, "If-None-Match": '"1"'}
+    )
+    assert response.status_code == 304
+    
+    await client.patch(
+        f"/api/v1/frameworks/{session_id}",
+        json=[{"op": "add", "path": "/strengths/-", "value": "Strength B"}],
+        headers=headers
+    )
+    await client.put(
+        f"/api/v1/frameworks/{session_id}",
+        json={"title": "Renamed", "data": {"strengths": ["Strength 0", "Strength B"], "threats": ["T"]}},
+        headers=headers
+    )
+    
+    response = await client.get(url, params={"since_version": 1}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"3"'
+    delta = response.json()
+    assert delta["version"] == 3
+    assert delta["reset"] is False
+    assert [change["version"] for change in delta["changes"]] == [2, 3]
+    assert delta["changes"][0]["operations"] == [
+        {"op": "add", "path": "/data/strengths/-", "value": "Strength B"}
+    ]
+    assert {"op": "replace", "path": "/title", "value": "Renamed"} in delta["changes"][1]["operations"]
+    assert {"op": "add", "path": "/data/threats", "value": ["T"]} in delta["changes"][1]["operations"]
+    
+    response = await client.get(url, params={"since_version": 2}, headers=headers)
+    assert [change["version"] for change in response.json()["changes"]] == [3]
+    
+    # A client ahead of the server (or beyond the retained history) gets the full session
+    response = await client.get(url, params={"since_version": 9}, headers=headers)
+    delta = response.json()
+    assert delta["reset"] is True
+    assert delta["session"]["title"] == "Renamed"
+    
+    response = await client.get("/api/v1/frameworks/99999/changes", params={"since_version": 1}, headers=headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_framework_item_endpoints_patch_errors(client: AsyncClient):
+    """Test that item endpoints report unappliable patches and wrong framework types."""
+    headers = await _login(client)
+    (swot_id,) = await _create_sessions(client, headers, 1)
+    hypothesis = {"id": "h1", "description": "Insider leak"}
+    
+    # A session of another framework is not an ACH analysis
+    response = await client.post(f"/api/v1/frameworks/ach/{swot_id}/hypothesis", json=hypothesis, headers=headers)
+    assert response.status_code == 404
+    
+    response = await client.post(
+        "/api/v1/frameworks/",
+        json={"title": "ACH", "framework_type": "ach", "data": {}},
+        headers=headers
+    )
+    ach_id = response.json()["id"]
+    response = await client.post(f"/api/v1/frameworks/ach/{ach_id}/hypothesis", json=hypothesis, headers=headers)
+    assert response.status_code == 422
+    assert "/hypotheses" in response.json()["detail"]
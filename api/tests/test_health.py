@@ -39,4 +39,6 @@ async def test_detailed_health_check(client: AsyncClient):
     assert "status" in data
     assert "database" in data
     assert "service" in data
-    assert data["service"] == "omnicore-api"
\ No newline at end of file
+    assert data["service"] == "omnicore-api"
+    assert "write" in data["pools"]
+    assert "read" in data["pools"]
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""
+Tests for the shared outbound HTTP clients.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.http_client import (
+    TIMEOUT_PROFILES,
+    CachingResolverBackend,
+    HttpClientRegistry,
+    ManagedTransport,
+)
+
+
+@pytest.mark.asyncio
+async def test_per_host_cap_and_stats(monkeypatch):
+    """Test that concurrent requests to one host are capped and timed per host."""
+    active = {}
+    peak = {}
+    
+    async def fake_send(self, request):
+        host = request.url.host
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.02)
+        active[host] -= 1
+        return httpx.Response(200, content=b"ok", request=request)
+    
+    monkeypatch.setattr(httpx.AsyncHTTPTransport, "handle_async_request", fake_send)
+    transport = ManagedTransport(per_host=2, dns_cache_ttl=0)
+    async with httpx.AsyncClient(transport=transport) as client:
+        urls = [f"https://a.example/{i}" for i in range(6)] + ["https://b.example/"]
+        responses = await asyncio.gather(*(client.get(url) for url in urls))
+    
+    assert all(response.text == "ok" for response in responses)
+    assert peak == {"a.example": 2, "b.example": 1}
+    hosts = transport.stats()["hosts"]
+    assert hosts["a.example"]["requests"] == 6
+    assert hosts["a.example"]["in_flight"] == 0
+    assert hosts["a.example"]["avg_ms"] >= 20
+    # Idle hosts do not keep a semaphore around
+    assert transport._slots == {}
+
+
+class _Body(httpx.AsyncByteStream):
+    """Unread response body, as a network transport returns it."""
+    
+    def __init__(self, content: bytes):
+        self.content = content
+    
+    async def __aiter__(self):
+        yield self.content
+
+
+@pytest.mark.asyncio
+async def test_read_response_frees_slot(monkeypatch):
+    """Test that non-streamed requests free their host slot, read or pre-read."""
+    bodies = iter([
+        httpx.Response(200, content=b"pre-read"),
+        httpx.Response(200, stream=_Body(b"streamed")),
+        httpx.Response(200, content=b"again"),
+    ])
+    
+    async def fake_send(self, request):
+        return next(bodies)
+    
+    monkeypatch.setattr(httpx.AsyncHTTPTransport, "handle_async_request", fake_send)
+    transport = ManagedTransport(per_host=1, dns_cache_ttl=0)
+    async with httpx.AsyncClient(transport=transport) as client:
+        texts = [
+            (await asyncio.wait_for(client.get(f"https://a.example/{i}"), 1)).text
+            for i in range(3)
+        ]
+    
+    assert texts == ["pre-read", "streamed", "again"]
+    assert transport.stats()["hosts"]["a.example"]["in_flight"] == 0
+    assert transport._slots == {}
+
+
+@pytest.mark.asyncio
+async def test_streamed_response_holds_slot_until_closed(monkeypatch):
+    """Test that a streamed response keeps its host slot until the body is closed."""
+    async def fake_send(self, request):
+        return httpx.Response(200, stream=_Body(b"body"))
+    
+    monkeypatch.setattr(httpx.AsyncHTTPTransport, "handle_async_request", fake_send)
+    transport = ManagedTransport(per_host=1, dns_cache_ttl=0)
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with client.stream("GET", "https://a.example/") as response:
+            assert transport.stats()["hosts"]["a.example"]["in_flight"] == 1
+            second = asyncio.create_task(client.get("https://a.example/next"))
+            await asyncio.sleep(0.01)
+            assert not second.done()
+            await response.aread()
+        assert (await asyncio.wait_for(second, 1)).status_code == 200
+    
+    assert transport.stats()["hosts"]["a.example"]["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_resolver_cache():
+    """Test that name resolution is cached until the TTL expires."""
+    resolver = CachingResolverBackend(ttl=60)
+    first = await resolver._resolve("localhost", 80)
+    second = await resolver._resolve("localhost", 80)
+    
+    assert first == second
+    assert resolver.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_registry_profiles_share_one_pool():
+    """Test that profile clients share a transport and close with the registry."""
+    registry = HttpClientRegistry()
+    assert registry.stats() == {}
+    
+    metadata = registry.get("metadata")
+    archive = registry.get("archive")
+    assert metadata is registry.get("metadata")
+    assert metadata.timeout == TIMEOUT_PROFILES["metadata"]
+    assert archive.timeout == TIMEOUT_PROFILES["archive"]
+    assert metadata._transport is archive._transport
+    assert registry.stats()["pool"]["connections"] == 0
+    with pytest.raises(KeyError):
+        registry.get("unknown")
+    
+    await registry.close()
+    assert metadata.is_closed and archive.is_closed
+    assert registry.get("metadata") is not metadata
+    await registry.close()
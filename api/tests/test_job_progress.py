@@ -0,0 +1,102 @@
+"""
+Tests for batched research job progress and the progress event stream.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.models.research_tool import ResearchJobStatus
+from app.services import job_service as job_service_module
+from app.services.job_service import ResearchJobService
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Record job updates instead of writing them to the database."""
+    recorded = []
+    
+    async def execute(statement):
+        recorded.append(statement.compile().params)
+        return 1
+    
+    monkeypatch.setattr(job_service_module.write_queue, "execute", execute)
+    return recorded
+
+
+def _events(chunks):
+    return [json.loads(chunk.split("data: ", 1)[1]) for chunk in chunks if chunk.startswith("event: progress")]
+
+
+@pytest.mark.asyncio
+async def test_progress_is_flushed_in_batches(writes, monkeypatch):
+    """Test that per-item progress costs O(flushes) database writes, not O(items)."""
+    monkeypatch.setattr(settings, "JOB_PROGRESS_FLUSH_ITEMS", 100)
+    monkeypatch.setattr(settings, "JOB_PROGRESS_FLUSH_SECONDS", 60.0)
+    service = ResearchJobService()
+    
+    await service.update_job(1, status=ResearchJobStatus.IN_PROGRESS)
+    for i in range(250):
+        await service.report_progress(1, progress_percentage=i * 100 // 250, current_step=f"Item {i}")
+    
+    # The start, then one flush per 100 reports
+    assert len(writes) == 3
+    assert writes[-1]["current_step"] == "Item 199"
+    live = await service.get_progress(1)
+    assert live["current_step"] == "Item 249"
+    assert live["status"] == "in_progress"
+    
+    # The final update carries the unflushed progress and ends tracking
+    await service.update_job(1, status=ResearchJobStatus.COMPLETED, progress_percentage=100)
+    assert len(writes) == 4
+    assert writes[-1]["current_step"] == "Item 249"
+    assert writes[-1]["progress_percentage"] == 100
+    assert 1 not in service._progress
+    
+    # Other processes see the finished state through the cache
+    assert (await service.get_progress(1))["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_flush_interval(writes, monkeypatch):
+    """Test that progress is also flushed once the interval has passed."""
+    monkeypatch.setattr(settings, "JOB_PROGRESS_FLUSH_SECONDS", 0.05)
+    service = ResearchJobService()
+    
+    await service.report_progress(2, progress_percentage=10)
+    await service.report_progress(2, progress_percentage=20)
+    assert writes == []
+    await asyncio.sleep(0.06)
+    await service.report_progress(2, progress_percentage=30)
+    assert [write["progress_percentage"] for write in writes] == [30]
+    
+    await service.report_progress(2, current_step="Last item")
+    await service.flush_all()
+    assert writes[-1]["current_step"] == "Last item"
+    assert "progress_percentage" not in writes[-1]
+
+
+@pytest.mark.asyncio
+async def test_progress_events_stream_until_terminal(writes):
+    """Test that subscribers get every change and the stream ends with the job."""
+    service = ResearchJobService()
+    await service.update_job(3, status=ResearchJobStatus.IN_PROGRESS)
+    initial = {"job_id": 3, "status": ResearchJobStatus.IN_PROGRESS, "progress_percentage": 0, "current_step": None}
+    
+    async def collect():
+        return [chunk async for chunk in service.progress_events(3, initial)]
+    
+    subscriber = asyncio.create_task(collect())
+    await asyncio.sleep(0.01)
+    for i in range(1, 4):
+        await service.report_progress(3, progress_percentage=i * 25, current_step=f"Item {i}")
+        await asyncio.sleep(0.01)
+    await service.update_job(3, status=ResearchJobStatus.COMPLETED, progress_percentage=100)
+    
+    events = _events(await asyncio.wait_for(subscriber, 1.0))
+    assert events[0]["progress_percentage"] == 0
+    assert [event["progress_percentage"] for event in events[1:]] == [25, 50, 75, 100]
+    assert events[-1]["status"] == "completed"
+    assert events[-1]["current_step"] == "Item 3"
@@ -0,0 +1,285 @@
+"""
+Tests for the durable research job runner.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.core.database import Base, write_queue
+from app.models.research_tool import ResearchJob, ResearchJobStatus, ResearchJobType
+from app.services.job_runner import PRIORITY_HIGH, PRIORITY_LOW, JobRunner
+from app.services.job_service import job_service
+
+
+@pytest.fixture
+async def factory(tmp_path, monkeypatch):
+    """Session factory over a file-backed database that job writes also go to."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(write_queue, "session_factory", session_factory)
+    monkeypatch.setattr(settings, "JOB_POLL_SECONDS", 0.02)
+    monkeypatch.setattr(settings, "JOB_RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(settings, "JOB_SHUTDOWN_GRACE", 0.1)
+    yield session_factory
+    await engine.dispose()
+
+
+async def _add(factory, **values) -> int:
+    values.setdefault("job_type", ResearchJobType.WEB_SCRAPING)
+    values.setdefault("user_id", 1)
+    async with factory() as session:
+        job = ResearchJob(**values)
+        session.add(job)
+        await session.commit()
+        return job.id
+
+
+async def _job(factory, job_id: int) -> ResearchJob:
+    async with factory() as session:
+        return (await session.execute(select(ResearchJob).where(ResearchJob.id == job_id))).scalar_one()
+
+
+async def _wait_for(factory, job_id: int, status: ResearchJobStatus, timeout: float = 2.0) -> ResearchJob:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = await _job(factory, job_id)
+        if job.status == status:
+            return job
+        assert asyncio.get_running_loop().time() < deadline, f"job {job_id} is {job.status}"
+        await asyncio.sleep(0.02)
+
+
+def _runner(factory, handler, workers: int = 1) -> JobRunner:
+    runner = JobRunner(session_factory=factory, workers=workers, worker_id="test-worker")
+    runner.register(ResearchJobType.WEB_SCRAPING, handler)
+    return runner
+
+
+async def _complete(job: ResearchJob) -> None:
+    async with write_queue.session_factory() as session:
+        row = await session.get(ResearchJob, job.id)
+        row.status = ResearchJobStatus.COMPLETED
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_in_priority_order(factory):
+    """Test that queued jobs are leased highest priority first and the lease is released."""
+    order = []
+    
+    async def handler(job):
+        order.append(job.id)
+        await _complete(job)
+    
+    low = await _add(factory, priority=PRIORITY_LOW)
+    normal = await _add(factory)
+    high = await _add(factory, priority=PRIORITY_HIGH)
+    # Other job types are left for runners that handle them
+    other = await _add(factory, job_type=ResearchJobType.DOCUMENT_PROCESSING)
+    
+    runner = _runner(factory, handler)
+    await runner.start()
+    try:
+        job = await _wait_for(factory, low, ResearchJobStatus.COMPLETED)
+    finally:
+        await runner.stop()
+    
+    assert order == [high, normal, low]
+    assert job.lease_owner is None
+    assert job.started_at is not None
+    assert (await _job(factory, other)).status == ResearchJobStatus.PENDING
+    assert runner.stats()["completed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_attempts_are_retried_then_failed(factory):
+    """Test that a raising handler is retried until max_retries is used up."""
+    attempts = []
+    
+    async def handler(job):
+        attempts.append(job.retry_count)
+        raise RuntimeError("origin unavailable")
+    
+    job_id = await _add(factory, max_retries=2)
+    runner = _runner(factory, handler)
+    await runner.start()
+    try:
+        job = await _wait_for(factory, job_id, ResearchJobStatus.FAILED)
+    finally:
+        await runner.stop()
+    
+    assert attempts == [0, 1, 2]
+    assert job.retry_count == 2
+    assert job.error_message == "origin unavailable"
+    assert job.lease_owner is None
+
+
+@pytest.mark.asyncio
+async def test_orphaned_jobs_are_recovered(factory):
+    """Test that jobs whose runner is gone are requeued or failed, and live leases are kept."""
+    now = datetime.now(timezone.utc)
+    legacy = await _add(factory, status=ResearchJobStatus.IN_PROGRESS)
+    expired = await _add(
+        factory, status=ResearchJobStatus.IN_PROGRESS, lease_owner="dead-worker",
+        lease_expires_at=now - timedelta(seconds=5), retry_count=3, max_retries=3,
+    )
+    live = await _add(
+        factory, status=ResearchJobStatus.IN_PROGRESS, lease_owner="live-worker",
+        lease_expires_at=now + timedelta(minutes=5),
+    )
+    runner = _runner(factory, _complete)
+    
+    assert await runner.recover_orphans() == 1
+    assert await runner.recover_orphans(include_unleased=True) == 1
+    
+    job = await _job(factory, legacy)
+    assert job.status == ResearchJobStatus.PENDING
+    assert job.retry_count == 1
+    job = await _job(factory, expired)
+    assert job.status == ResearchJobStatus.FAILED
+    assert job.lease_owner is None
+    job = await _job(factory, live)
+    assert job.status == ResearchJobStatus.IN_PROGRESS
+    assert job.lease_owner == "live-worker"
+
+
+@pytest.mark.asyncio
+async def test_lost_lease_stops_the_job(factory, monkeypatch):
+    """Test that a job cancelled in the database is stopped at the next heartbeat."""
+    monkeypatch.setattr(settings, "JOB_HEARTBEAT_SECONDS", 0.02)
+    # The handler ignores its cancellation flag, so it is stopped after the grace period
+    monkeypatch.setattr(settings, "JOB_CANCEL_GRACE", 0.05)
+    started = asyncio.Event()
+    stopped = asyncio.Event()
+    
+    async def handler(job):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            stopped.set()
+            raise
+    
+    job_id = await _add(factory)
+    runner = _runner(factory, handler)
+    await runner.start()
+    try:
+        await asyncio.wait_for(started.wait(), 2.0)
+        async with factory() as session:
+            row = await session.get(ResearchJob, job_id)
+            row.status = ResearchJobStatus.CANCELLED
+            await session.commit()
+        await asyncio.wait_for(stopped.wait(), 2.0)
+    finally:
+        await runner.stop()
+    
+    assert (await _job(factory, job_id)).status == ResearchJobStatus.CANCELLED
+
+
+@pytest.mark.asyncio
+async def test_cancelled_job_checkpoints_and_resumes(factory, monkeypatch):
+    """Test that a cancelled job stops between items and resumes from its checkpoint."""
+    monkeypatch.setattr(settings, "JOB_HEARTBEAT_SECONDS", 0.02)
+    started = asyncio.Event()
+    resumed_from = []
+    
+    async def handler(job):
+        if job.checkpoint:
+            resumed_from.append(job.checkpoint["done"])
+            await _complete(job)
+            return
+        control = job_service.control(job.id)
+        done = 0
+        while not control.cancelled:
+            started.set()
+            done += 1
+            await asyncio.sleep(0.005)
+        await control.save_checkpoint({"done": done})
+    
+    job_id = await _add(factory)
+    runner = _runner(factory, handler)
+    await runner.start()
+    try:
+        await asyncio.wait_for(started.wait(), 2.0)
+        async with factory() as session:
+            row = await session.get(ResearchJob, job_id)
+            row.status = ResearchJobStatus.CANCELLED
+            await session.commit()
+        
+        deadline = asyncio.get_running_loop().time() + 2.0
+        while (job := await _job(factory, job_id)).lease_owner is not None:
+            assert asyncio.get_running_loop().time() < deadline
+            await asyncio.sleep(0.02)
+        assert job.status == ResearchJobStatus.CANCELLED
+        assert job.checkpoint["done"] > 0
+        
+        assert await runner.resume(job_id)
+        job = await _wait_for(factory, job_id, ResearchJobStatus.COMPLETED)
+    finally:
+        await runner.stop()
+    
+    assert resumed_from == [job.checkpoint["done"]]
+    assert job.retry_count == 0
+    # Only cancelled or failed jobs can be resumed
+    assert not await runner.resume(job_id)
+
+
+@pytest.mark.asyncio
+async def test_completion_needs_the_lease(factory):
+    """Test that a run whose job was taken over cannot mark it completed."""
+    finished = []
+    
+    async def handler(job):
+        async with factory() as session:
+            row = await session.get(ResearchJob, job.id)
+            row.lease_owner = "other-worker"
+            row.lease_expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+            await session.commit()
+        control = job_service.control(job.id)
+        finished.append(await control.complete(result_data={"pages": 1}))
+    
+    job_id = await _add(factory)
+    runner = _runner(factory, handler)
+    await runner.start()
+    try:
+        deadline = asyncio.get_running_loop().time() + 2.0
+        while not finished:
+            assert asyncio.get_running_loop().time() < deadline
+            await asyncio.sleep(0.02)
+    finally:
+        await runner.stop()
+    
+    job = await _job(factory, job_id)
+    assert finished == [False]
+    assert job.status == ResearchJobStatus.IN_PROGRESS
+    assert job.lease_owner == "other-worker"
+    assert job.result_data is None
+    assert runner.stats()["completed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_requeues_running_jobs(factory):
+    """Test that jobs still running at shutdown go back to the queue without using a retry."""
+    started = asyncio.Event()
+    
+    async def handler(job):
+        started.set()
+        await asyncio.sleep(10)
+    
+    job_id = await _add(factory)
+    runner = _runner(factory, handler)
+    await runner.start()
+    await asyncio.wait_for(started.wait(), 2.0)
+    await runner.stop()
+    
+    job = await _job(factory, job_id)
+    assert job.status == ResearchJobStatus.PENDING
+    assert job.retry_count == 0
+    assert job.lease_owner is None
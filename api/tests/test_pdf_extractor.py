@@ -0,0 +1,83 @@
+"""
+Tests for page-level PDF text extraction.
+"""
+
+import pytest
+from fpdf import FPDF
+from pypdf.errors import PdfReadError
+
+from app.core.config import settings
+from app.services.pdf_extractor import PAGE_SEPARATOR, PdfExtractor
+
+
+def _write_pdf(path, pages):
+    pdf = FPDF()
+    pdf.set_font("helvetica", size=12)
+    pdf.set_title("Quarterly report")
+    pdf.set_author("Dana Lee")
+    for text in pages:
+        pdf.add_page()
+        pdf.cell(text=text)
+    pdf.output(str(path))
+    return path
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_WORKERS", 2)
+    monkeypatch.setattr(settings, "PDF_PAGES_PER_TASK", 2)
+    extractor = PdfExtractor()
+    yield extractor
+    extractor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pages_stream_in_order_with_offsets(tmp_path, extractor):
+    """Test that pages split across workers come back in order with document offsets."""
+    path = _write_pdf(tmp_path / "report.pdf", [f"Page {n} findings" for n in range(1, 8)])
+
+    info = await extractor.document_info(path)
+    assert info["pages"] == 7
+    assert info["title"] == "Quarterly report"
+    assert info["author"] == "Dana Lee"
+
+    pages = [page async for page in extractor.iter_pages(path)]
+    assert [page.number for page in pages] == list(range(1, 8))
+    assert all(page.error is None for page in pages)
+
+    document = PAGE_SEPARATOR.join(page.text for page in pages)
+    for page in pages:
+        assert f"Page {page.number} findings" in page.text
+        assert document[page.offset:page.offset + len(page.text)] == page.text
+
+
+@pytest.mark.asyncio
+async def test_resume_and_text_limit(tmp_path, extractor):
+    """Test extraction from a later page and the character cap on joined text."""
+    path = _write_pdf(tmp_path / "report.pdf", [f"Page {n} findings" for n in range(1, 6)])
+    pages = [page async for page in extractor.iter_pages(path)]
+
+    resumed = [page async for page in extractor.iter_pages(path, start_page=4, offset=pages[3].offset)]
+    assert [(page.number, page.offset) for page in resumed] == [(4, pages[3].offset), (5, pages[4].offset)]
+
+    text = await extractor.extract_text(path, max_chars=20)
+    assert len(text) == 20
+    assert text.startswith("Page 1 findings")
+    
+    # Previews extract one range ahead and may stop after any page
+    first = extractor.iter_pages(path, prefetch=1)
+    assert (await first.__anext__()).number == 1
+    await first.aclose()
+
+
+@pytest.mark.asyncio
+async def test_unreadable_file(tmp_path, extractor):
+    """Test that a file that is not a PDF fails without breaking the pool."""
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.7\nnot really a pdf")
+
+    with pytest.raises(PdfReadError):
+        await extractor.document_info(broken)
+
+    path = _write_pdf(tmp_path / "report.pdf", ["Still working"])
+    assert "Still working" in await extractor.extract_text(path)
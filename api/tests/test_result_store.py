@@ -0,0 +1,122 @@
+"""
+Tests for the job result store.
+"""
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.result_store import LocalResultStoreBackend, ResultStore, result_count
+from app.models.research_tool import ResearchJob, ResearchJobType
+from app.services.result_gc import release_job_results, sweep_result_segments
+
+
+@pytest.mark.asyncio
+async def test_result_store_pages_across_segments(tmp_path):
+    """Test that pages and streams span segment boundaries."""
+    store = ResultStore(LocalResultStoreBackend(tmp_path), segment_items=4)
+    writer = store.writer()
+    for i in range(10):
+        await writer.append({"url": f"https://example.com/{i}", "status": "success"})
+    manifest = await writer.close(summary={"failed_scrapes": 0})
+    
+    assert result_count(manifest) == 10
+    assert [segment["count"] for segment in manifest["segments"]] == [4, 4, 2]
+    
+    page = await store.read_results(manifest, offset=3, limit=5)
+    assert [item["url"][-1] for item in page] == ["3", "4", "5", "6", "7"]
+    
+    lines = [line async for line in store.stream_results(manifest, offset=8)]
+    assert len(lines) == 2
+
+
+@pytest.mark.asyncio
+async def test_result_writer_resumes_from_checkpoint(tmp_path):
+    """Test that a writer resumed from a checkpoint continues after its items."""
+    store = ResultStore(LocalResultStoreBackend(tmp_path), segment_items=4)
+    writer = store.writer()
+    for i in range(5):
+        await writer.append({"n": i})
+    checkpoint = await writer.checkpoint(summary={"failed": 0})
+    assert result_count(checkpoint) == 5
+    
+    writer = store.writer(resume=checkpoint)
+    for i in range(5, 8):
+        await writer.append({"n": i})
+    manifest = await writer.close()
+    
+    assert result_count(manifest) == 8
+    assert manifest["segments"][:2] == checkpoint["segments"]
+    assert [item["n"] for item in await store.read_results(manifest, offset=0, limit=10)] == list(range(8))
+
+
+@pytest.mark.asyncio
+async def test_result_store_deduplicates_segments(tmp_path):
+    """Test that identical segments are stored once."""
+    store = ResultStore(LocalResultStoreBackend(tmp_path), segment_items=2)
+    manifests = []
+    for _ in range(2):
+        writer = store.writer()
+        await writer.append({"value": 1})
+        await writer.append({"value": 2})
+        manifests.append(await writer.close())
+    
+    assert manifests[0]["segments"] == manifests[1]["segments"]
+    assert len(list(tmp_path.rglob("*.ndjson.gz"))) == 1
+
+
+@pytest.mark.asyncio
+async def test_result_store_reads_legacy_results(tmp_path):
+    """Test that inline results from older jobs are still readable."""
+    store = ResultStore(LocalResultStoreBackend(tmp_path))
+    
+    assert await store.read_results([1, 2, 3], offset=1, limit=1) == [2]
+    assert await store.read_results({"summary": "text"}) == [{"key": "summary", "value": "text"}]
+    assert result_count(None) == 0
+
+
+async def _manifest(store: ResultStore, *values: int) -> dict:
+    writer = store.writer()
+    for value in values:
+        await writer.append({"value": value})
+    return await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_deleting_jobs_releases_unshared_segments(tmp_path, test_db: AsyncSession, monkeypatch):
+    """Test that a deleted job's segments are removed unless another job still uses them."""
+    monkeypatch.setattr(settings, "RESULT_SEGMENT_GRACE_SECONDS", 0)
+    store = ResultStore(LocalResultStoreBackend(tmp_path), segment_items=2)
+    shared = await _manifest(store, 1, 2, 3)  # segments [1, 2] and [3]
+    kept = await _manifest(store, 1, 2)  # reuses segment [1, 2]
+    jobs = [
+        ResearchJob(job_type=ResearchJobType.WEB_SCRAPING, user_id=2, result_data=manifest)
+        for manifest in (shared, kept)
+    ]
+    test_db.add_all(jobs)
+    await test_db.commit()
+    
+    await test_db.delete(jobs[0])
+    await test_db.commit()
+    assert await release_job_results(test_db, shared, store) == 1
+    assert await store.read_results(kept) == [{"value": 1}, {"value": 2}]
+    assert len(list(tmp_path.rglob("*.ndjson.gz"))) == 1
+    
+    # Orphans left behind (e.g. rows deleted directly) are swept
+    orphan = await _manifest(store, 4)
+    stats = await sweep_result_segments(test_db, store, dry_run=True)
+    assert stats == {"stored": 2, "referenced": 1, "deleted": 1}
+    await sweep_result_segments(test_db, store)
+    assert not await store.backend.exists(orphan["segments"][0]["key"])
+    assert len(list(tmp_path.rglob("*.ndjson.gz"))) == 1
+
+
+@pytest.mark.asyncio
+async def test_sweep_keeps_recent_segments(tmp_path, test_db: AsyncSession):
+    """Test that segments inside the grace period survive a sweep."""
+    store = ResultStore(LocalResultStoreBackend(tmp_path))
+    await _manifest(store, 1)
+    
+    stats = await sweep_result_segments(test_db, store)
+    assert stats["deleted"] == 0
+    assert len(list(tmp_path.rglob("*.ndjson.gz"))) == 1
@@ -0,0 +1,350 @@
+"""
+Tests for the URL processing service.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.research_tool import ProcessedUrl
+from app.services.url_service import UrlProcessingService
+
+USER = SimpleNamespace(id=2, username="test")
+
+
+def _service(handler) -> UrlProcessingService:
+    return UrlProcessingService(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+@pytest.mark.asyncio
+async def test_batch_process_urls_concurrent_and_deduplicated(test_db: AsyncSession, monkeypatch):
+    """Test that batches fetch concurrently, respect per-host limits and skip duplicates."""
+    monkeypatch.setattr(settings, "URL_BATCH_CONCURRENCY", 10)
+    monkeypatch.setattr(settings, "URL_PER_HOST_CONCURRENCY", 2)
+    monkeypatch.setattr(settings, "URL_PER_HOST_DELAY", 0)
+    monkeypatch.setattr(settings, "URL_BATCH_COMMIT_SIZE", 3)
+    in_flight = {}
+    peaks = {}
+    fetched = []
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peaks[host] = max(peaks.get(host, 0), in_flight[host])
+        fetched.append(str(request.url))
+        await asyncio.sleep(0.05)
+        in_flight[host] -= 1
+        if request.url.path == "/broken":
+            raise httpx.ConnectError("refused")
+        return httpx.Response(200, html=f"<title>{request.url.path}</title>")
+    
+    service = _service(handler)
+    urls = [f"https://{host}.example/{i}" for host in ("a", "b", "c") for i in range(4)]
+    urls += ["a.example/0", "https://a.example/0", "https://c.example/broken"]
+    
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    results = await service.batch_process_urls(urls, test_db, USER)
+    elapsed = loop.time() - started
+    await service.close()
+    
+    assert len(fetched) == 13
+    assert max(peaks.values()) == 2
+    assert elapsed < 13 * 0.05
+    assert [r.url for r in results] == urls[:12] + ["https://c.example/broken"]
+    assert results[0].title == "/0"
+    assert results[-1].processing_status == "failed"
+    assert await test_db.scalar(select(func.count(ProcessedUrl.id))) == 13
+
+
+@pytest.mark.asyncio
+async def test_batch_process_urls_reuses_and_refreshes(test_db: AsyncSession, monkeypatch):
+    """Test that stored URLs are reused, and updated in place on refresh."""
+    monkeypatch.setattr(settings, "URL_PER_HOST_DELAY", 0)
+    titles = iter(["First", "Second"])
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, html=f"<title>{next(titles)}</title>")
+    
+    service = _service(handler)
+    first = await service.batch_process_urls(["https://example.com/"], test_db, USER)
+    again = await service.batch_process_urls(["https://example.com/"], test_db, USER)
+    assert again[0].id == first[0].id
+    assert again[0].title == "First"
+    
+    refreshed = await service.batch_process_urls(
+        ["https://example.com/"], test_db, USER, force_refresh=True
+    )
+    await service.close()
+    
+    assert refreshed[0].id == first[0].id
+    assert refreshed[0].title == "Second"
+    assert await test_db.scalar(select(func.count(ProcessedUrl.id))) == 1
+
+
+@pytest.mark.asyncio
+async def test_process_url_revalidates_with_conditional_requests(test_db: AsyncSession):
+    """Test that fresh copies are served as is and stale ones revalidated."""
+    requests = []
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        headers = {"ETag": '"v1"', "Cache-Control": "max-age=60"}
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers=headers)
+        return httpx.Response(200, html="<title>Watched</title>", headers=headers)
+    
+    service = _service(handler)
+    stored = await service.process_url("https://example.com/feed", test_db, USER)
+    assert (stored.etag, stored.max_age) == ('"v1"', 60)
+    
+    await service.process_url("https://example.com/feed", test_db, USER)
+    assert len(requests) == 1
+    
+    # Once stale, a 304 only moves the fetch time forward
+    stored.fetched_at = datetime.now(timezone.utc) - timedelta(seconds=120)
+    stored.title = "Kept"
+    await test_db.commit()
+    revalidated = await service.process_url("https://example.com/feed", test_db, USER)
+    await service.close()
+    
+    assert len(requests) == 2
+    assert requests[1].headers["if-none-match"] == '"v1"'
+    assert revalidated.id == stored.id
+    assert revalidated.title == "Kept"
+    assert service._is_fresh(revalidated)
+
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_cached_content(test_db: AsyncSession):
+    """Test that a failed revalidation records the error without wiping the stored copy."""
+    responses = iter([
+        httpx.Response(200, html="<title>Good copy</title>", headers={"Cache-Control": "max-age=60"}),
+        httpx.Response(503),
+    ])
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        response = next(responses)
+        if response.status_code >= 500:
+            raise httpx.ConnectTimeout("timed out", request=request)
+        return response
+    
+    service = _service(handler)
+    stored = await service.process_url("https://example.com/page", test_db, USER)
+    stored.fetched_at = datetime.now(timezone.utc) - timedelta(seconds=120)
+    await test_db.commit()
+    
+    retried = await service.process_url("https://example.com/page", test_db, USER)
+    await service.close()
+    
+    assert retried.id == stored.id
+    assert retried.processing_status == "completed"
+    assert retried.title == "Good copy"
+    assert retried.reliability_score is not None
+    assert "timed out" in retried.error_message
+    assert await test_db.scalar(select(func.count(ProcessedUrl.id))) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_upserts_rows_stored_concurrently(test_db: AsyncSession, monkeypatch):
+    """Test that a URL stored by another request mid-batch is updated, not a conflict."""
+    monkeypatch.setattr(settings, "URL_PER_HOST_DELAY", 0)
+    service = _service(None)
+    racy_url = service._normalize_url("https://a.example/racy")
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/racy":
+            # Another request finishes storing this URL while ours is in flight
+            test_db.add(ProcessedUrl(
+                url=racy_url,
+                url_hash=service._generate_url_hash(racy_url),
+                domain="a.example",
+                title="Concurrent copy",
+                processing_status="completed",
+                user_id=USER.id,
+            ))
+            await test_db.commit()
+            raise httpx.ConnectError("connection reset", request=request)
+        return httpx.Response(200, html="<title>Fresh</title>")
+    
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    results = await service.batch_process_urls(
+        ["https://a.example/racy", "https://b.example/"], test_db, USER
+    )
+    await service.close()
+    
+    assert [r.processing_status for r in results] == ["completed", "completed"]
+    assert results[0].title == "Concurrent copy"
+    assert "connection reset" in results[0].error_message
+    assert results[1].title == "Fresh"
+    assert await test_db.scalar(select(func.count(ProcessedUrl.id))) == 2
+
+
+@pytest.mark.asyncio
+async def test_failures_are_negatively_cached(test_db: AsyncSession, monkeypatch):
+    """Test that failures back off exponentially and permanent ones are kept longer."""
+    monkeypatch.setattr(settings, "URL_FAILURE_RETRY_BASE", 60)
+    monkeypatch.setattr(settings, "URL_PERMANENT_FAILURE_TTL", 7 * 24 * 60 * 60)
+    requests = []
+    outcomes = {
+        "/flaky": [httpx.ConnectTimeout("timed out"), httpx.ConnectError("refused"), 200],
+        "/missing": [404],
+        "/busy": [httpx.Response(429, headers={"Retry-After": "600"})],
+    }
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        outcome = outcomes[request.url.path].pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, httpx.Response):
+            return outcome
+        return httpx.Response(outcome, html="<title>Back</title>")
+    
+    def expires_in(row) -> float:
+        # SQLite hands back naive UTC datetimes
+        return (row.retry_after.replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)).total_seconds()
+    
+    service = _service(handler)
+    failed = await service.process_url("https://example.com/flaky", test_db, USER)
+    assert (failed.processing_status, failed.error_class, failed.failure_count) == ("failed", "timeout", 1)
+    assert 55 < expires_in(failed) <= 60
+    
+    # Served from the negative cache until the retry time passes
+    assert (await service.process_url("https://example.com/flaky", test_db, USER)).id == failed.id
+    assert requests == ["/flaky"]
+    
+    failed.retry_after = datetime.now(timezone.utc) - timedelta(seconds=1)
+    await test_db.commit()
+    again = await service.process_url("https://example.com/flaky", test_db, USER)
+    assert (again.id, again.error_class, again.failure_count) == (failed.id, "connect", 2)
+    assert 115 < expires_in(again) <= 120
+    
+    # A forced refresh skips the wait, and success clears the failure
+    recovered = await service.process_url("https://example.com/flaky", test_db, USER, force_refresh=True)
+    assert (recovered.processing_status, recovered.title) == ("completed", "Back")
+    assert (recovered.error_class, recovered.failure_count, recovered.retry_after) == (None, 0, None)
+    
+    missing = await service.process_url("https://example.com/missing", test_db, USER)
+    assert (missing.error_class, missing.status_code) == ("not_found", 404)
+    assert expires_in(missing) > 6 * 24 * 60 * 60
+    busy = await service.process_url("https://example.com/busy", test_db, USER)
+    await service.close()
+    assert busy.error_class == "rate_limited"
+    assert 595 < expires_in(busy) <= 600
+    assert await test_db.scalar(select(func.count(ProcessedUrl.id))) == 3
+
+
+@pytest.mark.asyncio
+async def test_process_url_upserts_row_stored_concurrently(test_db: AsyncSession, monkeypatch):
+    """Test that a refresh racing another request updates its row instead of conflicting."""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("refused", request=request)
+    
+    service = _service(handler)
+    stored = await service.process_url("https://example.com/down", test_db, USER)
+    
+    async def not_found_yet(db, url_hash):
+        return None
+    
+    # As if another request stored the row after this one looked it up
+    monkeypatch.setattr(service, "_get_existing_processed_url", not_found_yet)
+    retried = await service.process_url("https://example.com/down", test_db, USER, force_refresh=True)
+    await service.close()
+    
+    assert retried.id == stored.id
+    assert retried.processing_status == "failed"
+    assert await test_db.scalar(select(func.count(ProcessedUrl.id))) == 1
+
+
+PAGE_HEAD = (
+    '<html lang="en"><head><title> Breaking story </title>'
+    '<meta name="description" content="What happened">'
+    '<meta property="article:author" content="A. Reporter">'
+    '<meta property="og:type" content="article">'
+    '<script type="application/ld+json">{"@type": "NewsArticle"}</script>'
+    '</head>'
+)
+
+
+@pytest.mark.asyncio
+async def test_metadata_only_stops_after_head(test_db: AsyncSession):
+    """Test that metadata-only extraction matches the full parse without reading the body."""
+    body_chunks = ["<body>" + "<p>lorem ipsum dolor</p>\n" * 1000, "<p>sit amet</p></body></html>"]
+    served = []
+    
+    async def stream():
+        for chunk in [PAGE_HEAD] + body_chunks:
+            served.append(chunk)
+            yield chunk.encode()
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/full":
+            return httpx.Response(200, html=PAGE_HEAD + "".join(body_chunks))
+        return httpx.Response(200, headers={"Content-Type": "text/html"}, content=stream())
+    
+    service = _service(handler)
+    full = await service.process_url("https://news.example/full", test_db, USER)
+    head = await service.process_url("https://news.example/head", test_db, USER, metadata_only=True)
+    
+    assert served == [PAGE_HEAD]
+    for field in ("title", "description", "author", "language"):
+        assert getattr(head, field) == getattr(full, field)
+    for key in ("open_graph", "schema_org"):
+        assert head.additional_metadata[key] == full.additional_metadata[key]
+    assert head.word_count is None
+    
+    served.clear()
+    counted = await service.process_url(
+        "https://news.example/counted", test_db, USER, metadata_only=True, count_words=True
+    )
+    await service.close()
+    assert len(served) == 3
+    assert counted.word_count == 2 + 3 * 1000 + 2
+
+
+@pytest.mark.asyncio
+async def test_metadata_only_with_unknown_charset(test_db: AsyncSession):
+    """Test that an unknown declared charset falls back to UTF-8 instead of failing."""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            headers={"Content-Type": "text/html; charset=x-made-up"},
+            content=PAGE_HEAD.encode(),
+        )
+    
+    service = _service(handler)
+    processed = await service.process_url("https://news.example/odd", test_db, USER, metadata_only=True)
+    await service.close()
+    
+    assert processed.processing_status == "completed"
+    assert processed.title == "Breaking story"
+
+
+@pytest.mark.asyncio
+async def test_process_url_fetches_url_as_given(test_db: AsyncSession):
+    """Test that the URL is fetched as given while the canonical form keys the cache."""
+    requested = []
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(str(request.url))
+        return httpx.Response(200, html="<title>Signed</title>")
+    
+    service = _service(handler)
+    url = "https://example.com/files/?sig=abc&expires=1&flag"
+    processed = await service.process_url(url, test_db, USER)
+    # A different spelling of the same canonical URL is a cache hit
+    again = await service.process_url("https://example.com/files?expires=1&flag=&sig=abc", test_db, USER)
+    await service.close()
+    
+    assert requested == [url]
+    assert processed.url == url
+    assert processed.url_hash == service._generate_url_hash(service._normalize_url(url))
+    assert again.id == processed.id
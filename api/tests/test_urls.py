@@ -0,0 +1,94 @@
+"""
+Tests for URL canonicalization and re-hashing stored URLs.
+"""
+
+import hashlib
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.urls import canonicalize_url
+from app.models.research_tool import Citation, ProcessedUrl
+from app.services.url_rehash import rehash_processed_urls
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://Example.com/a?utm_source=x#top", "https://example.com/a"),
+    ("example.com", "https://example.com/"),
+    ("HTTP://EXAMPLE.com:80/%7euser/./b/../c/?b=2&a=1&fbclid=z", "http://example.com/~user/c?a=1&b=2"),
+    ("https://example.com:8443/x/?q=a+b&UTM_Medium=y", "https://example.com:8443/x?q=a%20b"),
+    ("https://Example.COM./path%2f", "https://example.com/path%2F"),
+])
+def test_canonicalize_url(url, expected):
+    """Test that equivalent spellings canonicalize to one URL."""
+    assert canonicalize_url(url) == expected
+    assert canonicalize_url(expected) == expected
+
+
+def test_canonicalize_url_options():
+    """Test configurable tracking parameters and trailing slashes."""
+    assert canonicalize_url("https://a.example/p/?ref=x&id=1", tracking_params=["ref"]) == "https://a.example/p?id=1"
+    assert canonicalize_url("https://a.example/p/", strip_trailing_slash=False) == "https://a.example/p/"
+
+
+def _row(url: str, status: str = "completed") -> ProcessedUrl:
+    return ProcessedUrl(
+        url=url,
+        url_hash=hashlib.sha256(url.encode()).hexdigest(),
+        domain="example.com",
+        processing_status=status,
+        user_id=2,
+    )
+
+
+@pytest.mark.asyncio
+async def test_rehash_processed_urls_merges_duplicates(test_db: AsyncSession):
+    """Test that stored spellings of one URL merge into a single row."""
+    failed = _row("https://Example.com/a/", status="failed")
+    tracked = _row("https://example.com/a?utm_source=mail")
+    other = _row("https://example.com/b#top")
+    test_db.add_all([failed, tracked, other])
+    await test_db.flush()
+    citation = Citation(title="Cites", source_type="website", user_id=2, processed_url_id=failed.id)
+    test_db.add(citation)
+    await test_db.commit()
+    tracked_id, other_id, citation_id = tracked.id, other.id, citation.id
+    
+    assert await rehash_processed_urls(test_db, dry_run=True) == {"scanned": 3, "rehashed": 2, "merged": 1}
+    stats = await rehash_processed_urls(test_db)
+    assert stats == {"scanned": 3, "rehashed": 2, "merged": 1}
+    
+    rows = (await test_db.execute(
+        select(ProcessedUrl.id, ProcessedUrl.url, ProcessedUrl.url_hash).order_by(ProcessedUrl.url)
+    )).all()
+    # The fetched spelling is kept; only the hash is canonical
+    assert [(row.id, row.url) for row in rows] == [
+        (tracked_id, "https://example.com/a?utm_source=mail"),
+        (other_id, "https://example.com/b#top"),
+    ]
+    assert rows[0].url_hash == hashlib.sha256(b"https://example.com/a").hexdigest()
+    assert await test_db.scalar(
+        select(Citation.processed_url_id).where(Citation.id == citation_id)
+    ) == tracked_id
+    assert (await rehash_processed_urls(test_db))["rehashed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rehash_processed_urls_swapped_hashes(test_db: AsyncSession):
+    """Test that rows holding each other's new hash are rehashed without a conflict."""
+    first = _row("https://example.com/a/")
+    second = _row("https://example.com/b/")
+    first.url_hash, second.url_hash = (
+        hashlib.sha256(b"https://example.com/b").hexdigest(),
+        hashlib.sha256(b"https://example.com/a").hexdigest(),
+    )
+    test_db.add_all([first, second])
+    await test_db.commit()
+    
+    assert await rehash_processed_urls(test_db) == {"scanned": 2, "rehashed": 2, "merged": 0}
+    rows = (await test_db.execute(select(ProcessedUrl.url, ProcessedUrl.url_hash).order_by(ProcessedUrl.url))).all()
+    assert [row.url_hash for row in rows] == [
+        hashlib.sha256(b"https://example.com/a").hexdigest(),
+        hashlib.sha256(b"https://example.com/b").hexdigest(),
+    ]
@@ -0,0 +1,231 @@
+"""
+Tests for the background Wayback Machine archival queue.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.v1.endpoints.tools import url_processing
+from app.core.config import settings
+from app.models.research_tool import ProcessedUrl
+from app.services.wayback_archiver import WaybackArchiver, WaybackError, save_snapshot
+
+API = "https://wayback.test"
+
+
+class _StandIn:
+    """Minimal Save Page Now stand-in that redirects captures to snapshots."""
+    
+    def __init__(self, failures=None, delay: float = 0.0):
+        # URL -> responses to send before a capture succeeds
+        self.failures = failures or {}
+        self.delay = delay
+        self.captures = []
+        self.in_flight = 0
+        self.peak = 0
+    
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.raw_path.decode()
+        if path.startswith("/web/"):
+            return httpx.Response(200, html="<title>Snapshot</title>")
+        url = path[len("/save/"):]
+        self.captures.append(url)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        pending = self.failures.get(url)
+        if pending:
+            return pending.pop(0)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        return httpx.Response(302, headers={"Location": f"{API}/web/{stamp}/{url}"})
+
+
+def _archiver(test_db: AsyncSession, stand_in) -> WaybackArchiver:
+    return WaybackArchiver(
+        session_factory=async_sessionmaker(test_db.bind, expire_on_commit=False),
+        client=httpx.AsyncClient(transport=httpx.MockTransport(stand_in)),
+        api_url=API,
+    )
+
+
+async def _wait(batch, timeout: float = 2.0) -> None:
+    async def done():
+        while not batch.to_dict()["done"]:
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(done(), timeout)
+
+
+@pytest.fixture
+def fast_queue(monkeypatch):
+    monkeypatch.setattr(settings, "WAYBACK_SUBMIT_INTERVAL", 0)
+    monkeypatch.setattr(settings, "WAYBACK_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(settings, "WAYBACK_CONCURRENCY", 2)
+
+
+@pytest.mark.asyncio
+async def test_save_snapshot_reads_reported_snapshot():
+    """Test that the snapshot URL comes from the capture response, not the clock."""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.raw_path.decode()
+        if path == "/save/https://example.com/a":
+            return httpx.Response(200, headers={"Content-Location": "/web/20240102030405/https://example.com/a"})
+        if path == "/save/https://example.com/gone":
+            return httpx.Response(403)
+        if path == "/save/https://example.com/busy":
+            return httpx.Response(429, headers={"Retry-After": "7"})
+        if path.startswith("/save/"):
+            return httpx.Response(200)
+        stamp = request.url.params["timestamp"]
+        return httpx.Response(200, json={"archived_snapshots": {"closest": {
+            "available": True, "url": f"http://wayback.test/web/{stamp}/https://example.com/b",
+        }}})
+    
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        assert await save_snapshot(client, "https://example.com/a", API) == (
+            f"{API}/web/20240102030405/https://example.com/a"
+        )
+        # Nothing reported: the availability API must know a capture since submission
+        assert (await save_snapshot(client, "https://example.com/b", API)).endswith("/https://example.com/b")
+        with pytest.raises(WaybackError) as refused:
+            await save_snapshot(client, "https://example.com/gone", API)
+        with pytest.raises(WaybackError) as limited:
+            await save_snapshot(client, "https://example.com/busy", API)
+    
+    assert not refused.value.retryable
+    assert limited.value.retryable and limited.value.retry_after == 7
+
+
+@pytest.mark.asyncio
+async def test_archiver_batches_dedupes_and_records(test_db: AsyncSession, fast_queue):
+    """Test that queued URLs are captured concurrently once and stored."""
+    for path in ("a", "b"):
+        test_db.add(ProcessedUrl(
+            url=f"https://example.com/{path}",
+            url_hash=url_processing.url_service._generate_url_hash(f"https://example.com/{path}"),
+            domain="example.com",
+            processing_status="completed",
+            user_id=2,
+        ))
+    await test_db.commit()
+    stand_in = _StandIn(delay=0.05)
+    archiver = _archiver(test_db, stand_in)
+    
+    urls = [f"https://example.com/{path}" for path in ("a", "b", "c", "d")]
+    first = await archiver.submit(urls + ["example.com/a"], user_id=2)
+    # Already queued: shares the pending captures
+    second = await archiver.submit(["https://example.com/c"], user_id=2)
+    await _wait(first)
+    await archiver.stop()
+    
+    assert sorted(stand_in.captures) == urls
+    assert stand_in.peak == 2
+    status = first.to_dict()
+    assert (status["total"], status["archived"], status["pending"]) == (4, 4, 0)
+    assert second.entries[0] is first.entries[2]
+    
+    stored = (await test_db.execute(
+        select(ProcessedUrl.url, ProcessedUrl.wayback_url).order_by(ProcessedUrl.url)
+    )).all()
+    assert [url for url, _ in stored] == urls[:2]
+    assert all(wayback_url.startswith(f"{API}/web/") for _, wayback_url in stored)
+    assert stored[0][1] == status["urls"][0]["wayback_url"]
+    
+    # Recently archived, in memory or in the database: nothing is resubmitted
+    again = await archiver.submit(["https://example.com/d"])
+    fresh = _archiver(test_db, stand_in)
+    from_db = await fresh.submit(["https://example.com/a"])
+    assert again.entries[0].reused is False and again.to_dict()["done"]
+    assert from_db.entries[0].reused and from_db.entries[0].wayback_url == stored[0][1]
+    assert len(stand_in.captures) == 4
+    assert not fresh.running
+
+
+@pytest.mark.asyncio
+async def test_archiver_retries_with_backoff(test_db: AsyncSession, fast_queue, monkeypatch):
+    """Test that transient failures are retried and permanent ones are not."""
+    monkeypatch.setattr(settings, "WAYBACK_MAX_ATTEMPTS", 3)
+    stand_in = _StandIn(failures={
+        "https://example.com/flaky": [httpx.Response(503), httpx.Response(429)],
+        "https://example.com/down": [httpx.Response(503)] * 3,
+        "https://example.com/blocked": [httpx.Response(403)],
+    })
+    archiver = _archiver(test_db, stand_in)
+    batch = await archiver.submit([
+        "https://example.com/flaky",
+        "https://example.com/down",
+        "https://example.com/blocked",
+    ])
+    await _wait(batch)
+    stats = archiver.stats()
+    await archiver.stop()
+    
+    flaky, down, blocked = batch.to_dict()["urls"]
+    assert (flaky["status"], flaky["attempts"], flaky["error"]) == ("archived", 3, None)
+    assert (down["status"], down["attempts"]) == ("failed", 3)
+    assert (blocked["status"], blocked["attempts"]) == ("failed", 1)
+    assert (stats["archived"], stats["failed"], stats["pending"]) == (1, 2, 0)
+    
+    # Failures are not remembered, so a later request tries again
+    retry = await archiver.submit(["https://example.com/blocked"])
+    await _wait(retry)
+    await archiver.stop()
+    assert retry.entries[0].status == "archived"
+
+
+@pytest.mark.asyncio
+async def test_stop_finishes_only_the_batch_in_flight(test_db: AsyncSession, fast_queue, monkeypatch):
+    """Test that stopping drops the queued URLs instead of capturing them first."""
+    monkeypatch.setattr(settings, "WAYBACK_BATCH_SIZE", 2)
+    stand_in = _StandIn(delay=0.1)
+    archiver = _archiver(test_db, stand_in)
+    batch = await archiver.submit([f"https://example.com/{n}" for n in range(6)])
+    
+    async def started():
+        while len(stand_in.captures) < 2:
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(started(), 2.0)
+    await archiver.stop()
+    
+    urls = batch.to_dict()["urls"]
+    assert len(stand_in.captures) == 2
+    assert [url["status"] for url in urls] == ["archived"] * 2 + ["failed"] * 4
+    assert all(url["error"] == "Archival queue stopped" for url in urls[2:])
+    assert archiver.stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_archive_endpoints(client: AsyncClient, test_db: AsyncSession, fast_queue, monkeypatch):
+    """Test queueing URLs and polling their archival status."""
+    archiver = _archiver(test_db, _StandIn())
+    monkeypatch.setattr(url_processing, "wayback_archiver", archiver)
+    response = await client.post("/api/v1/auth/login", data={"username": "test", "password": "test"})
+    headers = {"Authorization": f"Bearer {response.json()['tokens']['access_token']}"}
+    
+    response = await client.post(
+        "/api/v1/tools/url/archive",
+        json={"urls": ["https://example.com/x", "https://example.com/x"]},
+        headers=headers
+    )
+    assert response.status_code == 202
+    batch_id = response.json()["batch_id"]
+    assert response.json()["total"] == 1
+    
+    await _wait(archiver.get_batch(batch_id))
+    response = await client.get(f"/api/v1/tools/url/archive/jobs/{batch_id}", headers=headers)
+    await archiver.stop()
+    assert response.status_code == 200
+    status = response.json()
+    assert status["done"] and status["archived"] == 1
+    assert status["urls"][0]["wayback_url"].startswith(f"{API}/web/")
+    
+    response = await client.get("/api/v1/tools/url/archive/jobs/unknown", headers=headers)
+    assert response.status_code == 404
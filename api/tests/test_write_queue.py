@@ -0,0 +1,97 @@
+"""
+Tests for the single-writer database queue.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.write_queue import WriteQueue
+
+
+@pytest.fixture
+async def queue(tmp_path):
+    """Create a running write queue over a file-backed SQLite database."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'queue.db'}")
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE)"))
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    write_queue = WriteQueue(factory, batch_size=10)
+    await write_queue.start()
+    yield write_queue
+    await write_queue.stop()
+    await engine.dispose()
+
+
+async def _count(write_queue: WriteQueue) -> int:
+    async with write_queue.session_factory() as session:
+        return (await session.execute(text("SELECT COUNT(*) FROM items"))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_write_queue_batches_concurrent_writes(queue: WriteQueue):
+    """Test that concurrent writes are committed in shared batches."""
+    results = await asyncio.gather(*(
+        queue.execute(text(f"INSERT INTO items (name) VALUES ('item-{i}')"))
+        for i in range(25)
+    ))
+    
+    assert results == [1] * 25
+    assert await _count(queue) == 25
+    stats = queue.stats()
+    assert stats["writes"] == 25
+    assert stats["batches"] < 25
+
+
+@pytest.mark.asyncio
+async def test_write_queue_isolates_failed_write(queue: WriteQueue):
+    """Test that one failing write does not roll back its batch neighbours."""
+    statements = [
+        text("INSERT INTO items (name) VALUES ('a')"),
+        text("INSERT INTO items (name) VALUES ('a')"),
+        text("INSERT INTO items (name) VALUES ('b')"),
+    ]
+    results = await asyncio.gather(
+        *(queue.execute(statement) for statement in statements),
+        return_exceptions=True,
+    )
+    
+    assert isinstance(results[1], IntegrityError)
+    assert results[0] == 1 and results[2] == 1
+    assert await _count(queue) == 2
+
+
+@pytest.mark.asyncio
+async def test_write_queue_replaces_broken_session(tmp_path):
+    """Test that the queue keeps serving writes after its session breaks."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'queue.db'}")
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE)"))
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    sessions = []
+    
+    def session_factory() -> AsyncSession:
+        session = factory()
+        if not sessions:
+            async def rollback():
+                raise RuntimeError("connection lost")
+            session.rollback = rollback
+        sessions.append(session)
+        return session
+    
+    write_queue = WriteQueue(session_factory)
+    await write_queue.start()
+    try:
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(write_queue.execute(text("INSERT INTO missing (name) VALUES ('a')")), 2.0)
+        assert await asyncio.wait_for(write_queue.execute(text("INSERT INTO items (name) VALUES ('a')")), 2.0) == 1
+        assert write_queue.running
+    finally:
+        await write_queue.stop()
+        await engine.dispose()
+    
+    assert len(sessions) == 2
+    assert write_queue.stats()["failures"] == 1
@@ -16,7 +16,7 @@ import time
 import concurrent.futures
 import re
 from typing import List, Union, Dict, Any, Optional
-from urllib.parse import urlparse
+from urllib.parse import parse_qsl, quote, urlencode, urlparse, urlsplit, urlunsplit
 import validators
 from xhtml2pdf import pisa
 import subprocess
@@ -766,6 +766,88 @@ def main():
 if __name__ == "__main__":
     main()
 
+# Query parameters dropped by canonicalize_url ("utm_*" matches a prefix).
+# Keep in step with URL_TRACKING_PARAMS in the API settings.
+TRACKING_PARAMS = [
+    "utm_*", "gclid", "dclid", "gbraid", "wbraid", "fbclid", "msclkid",
+    "yclid", "igshid", "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc",
+    "_hsmi", "mkt_tok", "ref_src", "ref_url",
+]
+DEFAULT_PORTS = {"http": 80, "https": 443}
+UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+
+def _is_tracking_param(name: str, patterns: List[str]) -> bool:
+    name = name.lower()
+    return any(
+        name.startswith(pattern[:-1]) if pattern.endswith("*") else name == pattern
+        for pattern in patterns
+    )
+
+
+def _remove_dot_segments(path: str) -> str:
+    output = []
+    segments = path.split("/")
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == ".":
+            if last:
+                output.append("")
+        elif segment == "..":
+            if len(output) > 1:
+                output.pop()
+            if last:
+                output.append("")
+        else:
+            output.append(segment)
+    return "/".join(output)
+
+
+def canonicalize_url(url: str, tracking_params: Optional[List[str]] = None,
+                     strip_trailing_slash: bool = True) -> str:
+    """
+    Canonicalize a URL so equivalent spellings compare equal.
+    
+    Same rules as the API's app.core.urls.canonicalize_url: lowercase scheme
+    and host, no default port or fragment, tracking parameters dropped and
+    the rest sorted, dot segments and percent-escapes normalized, and
+    trailing slashes removed from non-root paths.
+    """
+    if tracking_params is None:
+        tracking_params = TRACKING_PARAMS
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')) and "://" not in url:
+        url = f'https://{url}'
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    
+    host = (parts.hostname or "").rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"
+    netloc = host
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+    
+    def unescape(match):
+        char = chr(int(match.group(1), 16))
+        return char if char in UNRESERVED else f"%{match.group(1).upper()}"
+    
+    path = _remove_dot_segments(re.sub(r"%([0-9A-Fa-f]{2})", unescape, parts.path)) or "/"
+    if strip_trailing_slash and len(path) > 1:
+        path = path.rstrip("/") or "/"
+    
+    query_pairs = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name, tracking_params)
+    ]
+    query = urlencode(sorted(query_pairs), quote_via=quote)
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
 class URLProcessor:
     """Consolidated URL processing utilities"""
     
@@ -776,10 +858,12 @@ class URLProcessor:
     
     @staticmethod
     def normalize_url(url: str) -> str:
-        """Normalize URL by adding schema if missing"""
-        if not url.startswith(('http://', 'https://')):
-            return f'https://{url}'
-        return url
+        """Canonicalize URL (adds https:// if the scheme is missing)"""
+        try:
+            return canonicalize_url(url)
+        except ValueError:
+            # Unparseable (e.g. bad port); validate_url rejects it later
+            return url if url.startswith(('http://', 'https://')) else f'https://{url}'
     
     @staticmethod
     def process_urls(urls: Union[str, List[str]]) -> List[str]: